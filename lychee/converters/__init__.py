@@ -28,29 +28,42 @@
 
 # Jeff: "Well, a universal converter is, by definition, a pretty slutty thing."
 
-from lychee.converters import inbound, outbound
+from lychee.converters.registry import LazyConverters
 
 
 # NOTE: please keep the keys in lowercase
-INBOUND_CONVERTERS = {'lilypond': inbound.lilypond.convert,
-                      'abjad': inbound.abjad.convert,
-                      'mei': inbound.mei.convert
-                     }
+INBOUND_CONVERTERS = LazyConverters({
+    'lilypond': 'lychee.converters.inbound.lilypond:convert',
+    'abjad': 'lychee.converters.inbound.abjad:convert',
+    'mei': 'lychee.converters.inbound.mei:convert',
+})
 '''
 Mapping from the lowercase name of an inbound converter format to the :func:`convert` function that
-converts from that format to Lychee-MEI.
+converts from that format to Lychee-MEI. The converter modules are imported when first used; refer
+to :class:`~lychee.converters.registry.LazyConverters`.
 '''
 
 # NOTE: please keep the keys in lowercase
-OUTBOUND_CONVERTERS = {'abjad': outbound.abjad.convert,
-                       'document': outbound.document.convert,
-                       'lilypond': outbound.lilypond.convert,
-                       'mei': outbound.mei.convert,
-                       'python': outbound.python.convert,
-                       'vcs': outbound.vcs.convert,
-                       'verovio': outbound.verovio.convert,
-                      }
+OUTBOUND_CONVERTERS = LazyConverters({
+    'abjad': 'lychee.converters.outbound.abjad:convert',
+    'document': 'lychee.converters.outbound.document:convert',
+    'lilypond': 'lychee.converters.outbound.lilypond:convert',
+    'mei': 'lychee.converters.outbound.mei:convert',
+    'python': 'lychee.converters.outbound.python:convert',
+    'vcs': 'lychee.converters.outbound.vcs:convert',
+    'verovio': 'lychee.converters.outbound.verovio:convert',
+})
 '''
 Mapping from the lowercase name of an outbound converter format to the :func:`convert` function that
-converts from Lychee-MEI into hat format.
+converts from Lychee-MEI into hat format. The converter modules are imported when first used.
+'''
+
+# NOTE: please keep the keys in lowercase
+OUTBOUND_STREAMERS = LazyConverters({
+    'lilypond': 'lychee.converters.outbound.lilypond:iter_convert',
+})
+'''
+Mapping from the lowercase name of an outbound converter format to a function like the format's
+:func:`convert`, but that returns an iterator of the strings that make up the document, so it can
+be written as it is converted. Only some formats have one.
 '''
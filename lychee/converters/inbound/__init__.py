@@ -23,7 +23,5 @@
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 #--------------------------------------------------------------------------------------------------
 
-__all__ = ['__abjad', 'lilypond_parser', 'lilypond', 'mei']
-
-from . import *
-abjad = __abjad
+# NB: the converter modules are only imported when they are used; refer to lychee.converters
+__all__ = ['abjad', 'lilypond_parser', 'lilypond', 'mei']
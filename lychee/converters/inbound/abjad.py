@@ -4,7 +4,7 @@
 # Program Name:           Lychee
 # Program Description:    MEI document manager for formalized document control
 #
-# Filename:               lychee/converters/abjad_to_lmei.py
+# Filename:               lychee/converters/inbound/abjad.py
 # Purpose:                Converts an abjad document to an lmei document.
 #
 # Copyright (C) 2016 Jeffrey Treviño, Christopher Antila
@@ -32,6 +32,9 @@
     Refer to :ref:`how-to-use-converters` for more information.
 '''
 
+# NB: this module has the same name as the "abjad" package
+from __future__ import absolute_import
+
 import uuid
 
 from lxml import etree as etree
@@ -79,7 +82,14 @@ def convert(document, **kwargs):
     :const:`lychee.inbound.CONVERSION_FINISHED` signal with the converted document.
     '''
     inbound.CONVERSION_STARTED.emit()
+    inbound.CONVERSION_FINISH.emit(converted=convert_no_signals(document))
+
 
+def convert_no_signals(document, **kwargs):
+    '''
+    It's the convert() function that returns the converted document rather than emitting it with
+    the CONVERSION_FINISH signal.
+    '''
     conversion_dict = {
         "<class 'abjad.tools.scoretools.Note.Note'>": note_to_note,
         "<class 'abjad.tools.scoretools.Rest.Rest'>": rest_to_rest,
@@ -91,7 +101,7 @@ def convert(document, **kwargs):
         "<class 'abjad.tools.scoretools.Score.Score'>": score_to_section,
     }
     try:
-        inbound.CONVERSION_FINISH.emit(converted=conversion_dict[str(type(document))](document))
+        return conversion_dict[str(type(document))](document)
     except KeyError:
         raise exceptions.InboundConversionError(_UNKNOWN_OBJ_TO_CONVERT.format(type(document)))
 
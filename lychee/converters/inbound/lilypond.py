@@ -49,7 +49,9 @@ import collections
 from lxml import etree
 
 from lychee import exceptions
+from lychee.converters.inbound import lilypond_fast
 from lychee.converters.inbound import lilypond_parser
+from lychee.converters.inbound import lilypond_tree
 from lychee.utils import lilypond_utils
 from lychee.utils import music_utils
 from lychee import exceptions
@@ -113,6 +115,13 @@ _CLEF_MAPPING = {
 }
 # defined at end of file: _STAFF_SETTINGS_FUNCTIONS
 
+PARSER_SETTING = 'lilyPondParser'
+'''
+The user setting that chooses how to parse LilyPond: ``'fast'``, the default, to use
+:mod:`~lychee.converters.inbound.lilypond_fast` for the documents it recognizes, or ``'tatsu'`` to
+always use the TatSu parser.
+'''
+
 
 def check(condition, message=None):
     """
@@ -163,9 +172,9 @@ def convert_no_signals(document, user_settings=None):
     '''
     # NOTE: this function has no tests because it will soon be changed; see T113
 
+    fast = (user_settings or {}).get(PARSER_SETTING, 'fast') != 'tatsu'
     with log.info('parse LilyPond') as action:
-        parser = lilypond_parser.LilyPondParser(parseinfo=False)
-        parsed = parser.parse(document, filename='file', trace=False)
+        parsed = parse(document, fast=fast)
 
     with log.info('convert LilyPond') as action:
         converted = do_document(parsed, user_settings=user_settings)
@@ -173,6 +182,33 @@ def convert_no_signals(document, user_settings=None):
     return converted
 
 
+def parse(document, fast=True):
+    '''
+    Parse a LilyPond document into a compact parse tree.
+
+    :param str document: The LilyPond document.
+    :param bool fast: Whether to try :mod:`~lychee.converters.inbound.lilypond_fast` first. When
+        it does not recognize the document, or with ``fast=False``, the TatSu parser is used.
+    :returns: The parse tree, as made by
+        :class:`~lychee.converters.inbound.lilypond_tree.CompactSemantics`.
+    :rtype: list
+    :raises: :exc:`tatsu.exceptions.FailedParse` when the document is not valid.
+    '''
+    if fast:
+        with log.debug('parse LilyPond with the fast parser') as action:
+            try:
+                return lilypond_fast.parse(document)
+            except lilypond_fast.UnsupportedSyntax as exc:
+                action.failure('using TatSu instead: {reason}', reason=str(exc))
+
+    parser = lilypond_parser.LilyPondParser(parseinfo=False)
+    return parser.parse(
+        document,
+        filename='file',
+        semantics=lilypond_tree.CompactSemantics(),
+        trace=False)
+
+
 @log.wrap('info', 'process document')
 def do_document(l_document, user_settings):
     l_score = None
@@ -182,7 +218,7 @@ def do_document(l_document, user_settings):
         'language': 'nederlands',
     }
     for l_top_level_element in l_document:
-        if isinstance(l_top_level_element, dict):
+        if isinstance(l_top_level_element, (dict, lilypond_tree.Node)):
             ly_type = l_top_level_element['ly_type']
             if ly_type == 'version':
                 check_version(l_top_level_element)
@@ -230,7 +266,8 @@ def do_score(l_score, context=None):
     Convert a LilyPond score to an LMEI <section>.
 
     :param dict context: Contains document-wide information such as language.
-    :param dict l_score: The LilyPond score as parsed by TatSu.
+    :param l_score: The LilyPond score as parsed by TatSu.
+    :type l_score: dict or :class:`~lychee.converters.inbound.lilypond_tree.Node`
     :returns: A converted Lychee-MEI <section> element.
     :rtype: :class:`lxml.etree.Element`
     '''
@@ -242,7 +279,7 @@ def do_score(l_score, context=None):
 
     # Sometimes we only get one staff instead of simultaneous staves.
     staves = l_score['staves']
-    if isinstance(staves, dict):
+    if isinstance(staves, (dict, lilypond_tree.Node)):
         staves = [staves]
 
     for staff_n, l_staff in enumerate(staves):
@@ -939,6 +976,62 @@ def do_spacer(l_spacer, m_layer, context=None, action=None):
     return m_space
 
 
+def benchmark(count=10000):
+    '''
+    Measure the LilyPond parser on a generated document.
+
+    :param int count: How many notes, chords, and rests to put in the document.
+    :returns: A dictionary with ``'seconds'``, the time to parse the document; ``'peak'``, the
+        largest number of bytes allocated while parsing as measured by :mod:`tracemalloc`, or
+        ``None`` when :mod:`tracemalloc` is not available; and ``'memos'``, the largest number of
+        results TatSu held in its memo at once.
+    :rtype: dict
+
+    The cuts in the grammar let TatSu drop its memo at every barcheck, so ``'memos'`` should not
+    grow with ``count``.
+    '''
+    import timeit
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+
+    nodes = ["c''4", "d'8.(", "e'16)", "<c' e' g'>4~", 'r4', "fis''2", 's4', 'g,4']
+    content = []
+    for i in range(count):
+        content.append(nodes[i % len(nodes)])
+        if i % 4 == 3:
+            content.append('|')
+    document = ''.join((
+        '\\version "2.18.2"\n',
+        '\\score { << \\new Staff { \\clef "treble" \\time 4/4 ',
+        ' '.join(content),
+        ' } >> }\n',
+    ))
+
+    memos = [0]
+
+    class CountingParser(lilypond_parser.LilyPondParser):
+        # pylint: disable=missing-docstring,too-many-ancestors
+        def _memoize(self, key, memo):
+            memo = super(CountingParser, self)._memoize(key, memo)
+            memos[0] = max(memos[0], len(self._memos))
+            return memo
+
+    parser = CountingParser(parseinfo=False)
+    if tracemalloc is not None:
+        tracemalloc.start()
+    start = timeit.default_timer()
+    parser.parse(document, filename='file', trace=False)
+    seconds = timeit.default_timer() - start
+    peak = None
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {'seconds': seconds, 'peak': peak, 'memos': memos[0]}
+
+
 # this is at the bottom so the functions will already be defined
 _STAFF_SETTINGS_FUNCTIONS = {
     'clef': set_clef,
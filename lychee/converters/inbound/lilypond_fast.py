@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/converters/inbound/lilypond_fast.py
+# Purpose:                A fast parser for the subset of LilyPond in "lilypond.ebnf".
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+A fast parser for the subset of LilyPond in "lilypond.ebnf".
+
+The parser generated by TatSu calls several Python functions for every token it tries, so most of
+the time to convert a LilyPond document goes to parsing it. This module has a recursive-descent
+parser for the same grammar, with a method for each rule. Each method matches its tokens with a
+few regular expressions, and makes the same :mod:`~lychee.converters.inbound.lilypond_tree` nodes
+as the TatSu parser with :class:`~lychee.converters.inbound.lilypond_tree.CompactSemantics`:
+
+>>> lilypond_fast.parse(document)
+
+Whitespace and comments are skipped at the same places as in the TatSu parser. Where the grammar
+has a choice, this parser looks ahead to the one alternative that TatSu would accept, rather than
+backtracking, and it raises :exc:`UnsupportedSyntax` as soon as the document differs from what it
+expects. The TatSu parser should then parse the document, or report the syntax error;
+:func:`lychee.converters.inbound.lilypond.parse` does this.
+'''
+
+from __future__ import unicode_literals
+
+import re
+
+from lychee.converters.inbound import lilypond_tree as tree
+
+
+# whitespace and the two kinds of comment, as for the TatSu parser
+_SKIP = re.compile(r'(?:[ \t\n\r\f\v]|%\{.*?%\}|%(?:|[^{].*?)$)*', re.MULTILINE | re.UNICODE)
+_SKIP_START = frozenset(' \t\n\r\f\v%')
+
+_PITCH_NAME = re.compile(r'[a-z]+')
+_OCTAVE = re.compile(r",,|,|'{1,5}")
+_ACCIDENTAL_FORCE = re.compile(r'[?!]')
+_DURATION_NUMBER = re.compile(r'512|256|128|64|32|16|8|4|2|1')
+_TIME_NUMERATOR = re.compile(r'[1-9][0-9]?')
+_VERSION_NUMBER = re.compile(r'[0-9]*')
+_LANGUAGE = re.compile(r'[^"]*')
+_INSTR_NAME = re.compile(r'[A-Z a-z0-9&]*')
+
+# not valid as pitch names; refer to @@keyword in the grammar
+_KEYWORDS = frozenset(('q', 'r', 's', 'R'))
+_CLEF_TYPES = ('bass', 'tenor', 'alto', 'treble')
+_KEY_MODES = ('major', 'minor')
+
+_ERR_EXPECTED = 'expected {0} at character {1}'
+
+RULES = frozenset((
+    'start',
+    'version_statement',
+    'language_statement',
+    'header_block',
+    'layout_block',
+    'paper_block',
+    'instr_name',
+    'clef',
+    'key',
+    'time',
+    'staff_setting',
+    'tie',
+    'slur',
+    'post_event',
+    'note',
+    'chord_note',
+    'chord',
+    'rest',
+    'measure_rest',
+    'spacer',
+    'barcheck',
+    'music_node',
+    'nodes',
+    'unmarked_layer',
+    'marked_layer',
+    'monophonic_layers',
+    'polyphonic_layers',
+    'staff',
+    'score',
+))
+'''
+The grammar rules that :func:`parse` can start with. The other rules make dictionaries rather than
+nodes, so they are only parsed as part of these.
+'''
+
+
+class UnsupportedSyntax(Exception):
+    '''
+    Raised when :class:`FastParser` does not recognize part of a document. The document may be
+    invalid, or it may be valid in a way that only the TatSu parser handles.
+    '''
+
+
+def parse(document, rule_name='start'):
+    '''
+    Parse a LilyPond document with a :class:`FastParser`.
+
+    :param str document: The LilyPond document.
+    :param str rule_name: The grammar rule to parse, one of the :const:`RULES`. As for the TatSu
+        parser, only the ``'start'`` rule must parse the whole document.
+    :returns: The parse tree, as from the TatSu parser with
+        :class:`~lychee.converters.inbound.lilypond_tree.CompactSemantics`.
+    :raises: :exc:`UnsupportedSyntax` when the parser does not recognize the document.
+    :raises: :exc:`ValueError` when ``rule_name`` is not one of the :const:`RULES`.
+    '''
+    if rule_name not in RULES:
+        raise ValueError('cannot start parsing at "{0}"'.format(rule_name))
+    parser = FastParser(document)
+    post = getattr(parser, rule_name)()
+    if post is None:
+        parser.fail(rule_name)
+    return post
+
+
+class FastParser(object):
+    '''
+    Recursive-descent parser for one LilyPond document. There is a method for each rule in
+    :const:`RULES`, named the same, that parses that rule at the current position.
+
+    The methods for rules with a choice of what to parse (like :meth:`music_node`) return ``None``
+    when nothing in the choice is at the current position, so the caller can try something else.
+    Every other mismatch raises :exc:`UnsupportedSyntax`.
+
+    :param str document: The LilyPond document.
+    '''
+
+    def __init__(self, document):
+        self.text = document
+        self.pos = 0
+        self.end = len(document)
+
+    # Scanning
+    ##########
+
+    def fail(self, expected):
+        '''
+        Raise :exc:`UnsupportedSyntax` for ``expected`` at the current position.
+        '''
+        raise UnsupportedSyntax(_ERR_EXPECTED.format(expected, self.skip()))
+
+    def skip(self):
+        '''
+        Return the position after the whitespace and comments at the current position.
+        '''
+        pos = self.pos
+        if pos < self.end and self.text[pos] in _SKIP_START:
+            return _SKIP.match(self.text, pos).end()
+        return pos
+
+    def peek(self):
+        '''
+        Return the next character after whitespace and comments, or an empty string at the end.
+        '''
+        pos = self.skip()
+        return self.text[pos:pos + 1]
+
+    def pattern(self, regex, skip=True):
+        '''
+        Match a regular expression and move past it.
+
+        :param regex: The compiled regular expression.
+        :param bool skip: Whether to skip whitespace and comments first.
+        :returns: The matched string, which may be empty, or ``None`` if it does not match.
+        '''
+        pos = self.skip() if skip else self.pos
+        match = regex.match(self.text, pos)
+        if match is None:
+            return None
+        self.pos = match.end()
+        return match.group()
+
+    def token(self, token):
+        '''
+        Match a token after whitespace and comments, and move past it.
+
+        :returns: Whether the token matched.
+
+        As for the TatSu parser, a token made of letters and digits does not match when it is
+        followed by another letter or digit.
+        '''
+        pos = self.skip()
+        if not self.text.startswith(token, pos):
+            return False
+        end = pos + len(token)
+        if token.isalnum() and token[0].isalpha() and self.text[end:end + 1].isalnum():
+            return False
+        self.pos = end
+        return True
+
+    def at(self, *tokens):
+        '''
+        Return whether these tokens are next, without moving.
+        '''
+        pos = self.pos
+        try:
+            return all(self.token(token) for token in tokens)
+        finally:
+            self.pos = pos
+
+    def expect(self, token):
+        '''
+        Match a token as for :meth:`token`, or raise :exc:`UnsupportedSyntax`.
+        '''
+        if not self.token(token):
+            self.fail('"{0}"'.format(token))
+
+    def expect_one(self, tokens):
+        '''
+        Match the first of ``tokens`` that matches, and return it, or raise
+        :exc:`UnsupportedSyntax`.
+        '''
+        for token in tokens:
+            if self.token(token):
+                return token
+        self.fail(' or '.join(tokens))
+
+    # Document
+    ##########
+
+    def start(self):
+        post = []
+        while self.skip() < self.end:
+            post.append(self.top_level_expression())
+        return post
+
+    def top_level_expression(self):
+        if self.at('\\version'):
+            return self.version_statement()
+        elif self.at('\\language'):
+            return self.language_statement()
+        elif self.at('\\header'):
+            return self.header_block()
+        elif self.at('\\layout'):
+            return self.layout_block()
+        elif self.at('\\paper'):
+            return self.paper_block()
+        elif self.at('\\score') or self.at('\\new', 'Score'):
+            return self.score()
+        elif self.at('\\new', 'Staff'):
+            return self.staff()
+        self.fail('a top-level expression')
+
+    def version_statement(self):
+        self.expect('\\version')
+        self.expect('"')
+        version = [self.pattern(_VERSION_NUMBER, skip=False)]
+        while self.token('.'):
+            version.append(self.pattern(_VERSION_NUMBER, skip=False))
+        self.expect('"')
+        return tree.Version(tuple(version))
+
+    def language_statement(self):
+        self.expect('\\language')
+        self.expect('"')
+        language = self.pattern(_LANGUAGE, skip=False)
+        self.expect('"')
+        return tree.Language(language)
+
+    def _empty_block(self, command):
+        self.expect(command)
+        self.expect('{')
+        self.expect('}')
+        return [command, '{', '}']
+
+    def header_block(self):
+        return self._empty_block('\\header')
+
+    def layout_block(self):
+        return self._empty_block('\\layout')
+
+    def paper_block(self):
+        return self._empty_block('\\paper')
+
+    # Staff Settings
+    ################
+
+    def instr_name(self):
+        self.expect('\\set')
+        self.expect('Staff.instrumentName')
+        self.expect('=')
+        self.expect('"')
+        name = self.pattern(_INSTR_NAME, skip=False)
+        self.expect('"')
+        return tree.InstrName(name)
+
+    def clef(self):
+        self.expect('\\clef')
+        self.expect('"')
+        clef_type = self.expect_one(_CLEF_TYPES)
+        self.expect('"')
+        return tree.Clef(tree.share(clef_type))
+
+    def key(self):
+        self.expect('\\key')
+        keynote = self.pitch_name()
+        if keynote is None:
+            self.fail('a pitch name')
+        self.expect('\\')
+        mode = self.expect_one(_KEY_MODES)
+        return tree.Key(tree.share(keynote), tree.share(mode))
+
+    def time(self):
+        self.expect('\\time')
+        count = self.pattern(_TIME_NUMERATOR)
+        if count is None:
+            self.fail('a time signature')
+        self.expect('/')
+        unit = self.pattern(_DURATION_NUMBER)
+        if unit is None:
+            self.fail('a duration')
+        return tree.Time(tree.share(count), tree.share(unit))
+
+    def staff_setting(self):
+        if self.at('\\clef'):
+            return self.clef()
+        elif self.at('\\key'):
+            return self.key()
+        elif self.at('\\time'):
+            return self.time()
+        elif self.at('\\set'):
+            return self.instr_name()
+        return None
+
+    # Nodes: notes, rests, chords, spacers
+    ######################################
+
+    def pitch_name(self):
+        '''
+        Match a pitch name, or return ``None`` if there is none or it is one of the keywords.
+        '''
+        pos = self.skip()
+        match = _PITCH_NAME.match(self.text, pos)
+        if match is None or match.group() in _KEYWORDS:
+            return None
+        self.pos = match.end()
+        return match.group()
+
+    def duration(self):
+        '''
+        Match a duration, returning its number (or ``None``) and its dots as a string.
+        '''
+        dur = self.pattern(_DURATION_NUMBER)
+        if dur is None:
+            return None, ''
+        dots = 0
+        while self.token('.'):
+            dots += 1
+        return tree.share(dur), '.' * dots
+
+    def tie(self):
+        self.expect('~')
+        return tree.TIE
+
+    def slur(self):
+        return tree.Slur(tree.share(self.expect_one(('(', ')'))))
+
+    def post_event(self):
+        char = self.peek()
+        if char == '~':
+            return self.tie()
+        elif char == '(' or char == ')':
+            return self.slur()
+        return None
+
+    def post_events(self):
+        '''
+        Match any number of post-events, returning them as a tuple.
+        '''
+        post = []
+        post_event = self.post_event()
+        while post_event is not None:
+            post.append(post_event)
+            post_event = self.post_event()
+        return tuple(post)
+
+    def _notehead(self, pitch_name):
+        if pitch_name is None:
+            pitch_name = self.pitch_name()
+            if pitch_name is None:
+                self.fail('a pitch name')
+        return (
+            tree.share(pitch_name),
+            tree.share(self.pattern(_OCTAVE)),
+            tree.share(self.pattern(_ACCIDENTAL_FORCE)),
+        )
+
+    def note(self, pitch_name=None):
+        '''
+        Parse a note, after its ``pitch_name`` if given.
+        '''
+        pitch_name, octave, accid_force = self._notehead(pitch_name)
+        dur, dots = self.duration()
+        return tree.Note(pitch_name, octave, accid_force, dur, dots, self.post_events())
+
+    def chord_note(self, pitch_name=None):
+        '''
+        Parse a note in a chord, after its ``pitch_name`` if given.
+        '''
+        pitch_name, octave, accid_force = self._notehead(pitch_name)
+        return tree.ChordNote(pitch_name, octave, accid_force, self.post_events())
+
+    def chord(self):
+        self.expect('<')
+        if self.at('<'):
+            self.fail('a chord')
+        notes = []
+        pitch_name = self.pitch_name()
+        while pitch_name is not None:
+            notes.append(self.chord_note(pitch_name))
+            pitch_name = self.pitch_name()
+        self.expect('>')
+        dur, dots = self.duration()
+        return tree.Chord(tuple(notes), dur, dots, self.post_events())
+
+    def _rest_like(self, letter, node_class):
+        pos = self.skip()
+        if self.text[pos:pos + 1] != letter:
+            self.fail('"{0}"'.format(letter))
+        self.pos = pos + 1
+        dur, dots = self.duration()
+        return node_class(dur, dots, self.post_events())
+
+    def rest(self):
+        return self._rest_like('r', tree.Rest)
+
+    def measure_rest(self):
+        return self._rest_like('R', tree.MeasureRest)
+
+    def spacer(self):
+        return self._rest_like('s', tree.Spacer)
+
+    def barcheck(self):
+        self.expect('|')
+        return tree.BARCHECK
+
+    def music_node(self):
+        pos = self.skip()
+        char = self.text[pos:pos + 1]
+        if 'a' <= char <= 'z':
+            word = _PITCH_NAME.match(self.text, pos).group()
+            if word not in _KEYWORDS:
+                self.pos = pos + len(word)
+                return self.note(word)
+            elif word == 'r':
+                return self.rest()
+            elif word == 's':
+                return self.spacer()
+        elif char == 'R':
+            return self.measure_rest()
+        elif char == '<':
+            if not self.at('<', '<'):
+                return self.chord()
+        elif char == '|':
+            return self.barcheck()
+        return None
+
+    def nodes(self):
+        post = []
+        while True:
+            node = self.music_node()
+            if node is None:
+                node = self.staff_setting()
+                if node is None:
+                    break
+            post.append(node)
+        return tuple(post) if post else None
+
+    # Layers
+    ########
+
+    def unmarked_layer(self):
+        return self.nodes()
+
+    def marked_layer(self):
+        self.expect('{')
+        nodes = self.nodes()
+        if nodes is None:
+            self.fail('a note, rest, chord, or staff setting')
+        self.expect('}')
+        return nodes
+
+    def monophonic_layers(self):
+        nodes = self.unmarked_layer()
+        return None if nodes is None else tree.Layers((nodes,))
+
+    def polyphonic_layers(self):
+        self.expect('<<')
+        layers = []
+        if self.at('{'):
+            layers.append(self.marked_layer())
+            while self.token('\\\\'):
+                layers.append(self.marked_layer())
+        self.expect('>>')
+        return tree.Layers(tuple(layers))
+
+    # Staff and Music Block
+    #######################
+
+    def staff(self):
+        self.expect('\\new')
+        self.expect('Staff')
+        self.expect('{')
+        initial_settings = []
+        setting = self.staff_setting()
+        while setting is not None:
+            initial_settings.append(setting)
+            setting = self.staff_setting()
+        content = []
+        while True:
+            if self.at('<<'):
+                content.append(self.polyphonic_layers())
+            else:
+                layers = self.monophonic_layers()
+                if layers is None:
+                    break
+                content.append(layers)
+        if not content:
+            self.fail('a note, rest, chord, or staff setting')
+        self.expect('}')
+        return tree.Staff(tuple(initial_settings), tuple(content))
+
+    # Score and Layout
+    ##################
+
+    def _token_score(self):
+        if not self.token('\\score'):
+            self.expect('\\new')
+            self.expect('Score')
+
+    def _score_staff_content(self):
+        if self.token('<<'):
+            staves = [self.staff()]
+            while self.at('\\new', 'Staff'):
+                staves.append(self.staff())
+            self.expect('>>')
+            return tuple(staves)
+        return self.staff()
+
+    def score(self):
+        version = self.version_statement() if self.at('\\version') else None
+        self._token_score()
+        layout_block = None
+        if self.at('<<') or self.at('\\new'):
+            staves = self._score_staff_content()
+        else:
+            self.expect('{')
+            if self.at('\\score') or self.at('\\new', 'Score'):
+                self._token_score()
+                staves = self._score_staff_content()
+            else:
+                staves = self._score_staff_content()
+                if self.at('\\layout'):
+                    layout_block = self.layout_block()
+            self.expect('}')
+        return tree.Score(version, staves, layout_block)
@@ -95,6 +95,7 @@ class LilyPondParser(Parser):
         self._constant('version')
         self.name_last_node('ly_type')
         self._token('\\version')
+        self._cut()
         self._token('"')
 
         def sep2():
@@ -115,6 +116,7 @@ class LilyPondParser(Parser):
         self._constant('language')
         self.name_last_node('ly_type')
         self._token('\\language')
+        self._cut()
         self._token('"')
         self._pattern(r'[^"]*')
         self.name_last_node('language')
@@ -228,56 +230,15 @@ class LilyPondParser(Parser):
 
     @tatsumasu()
     def _octave_(self):  # noqa
-        with self._choice():
-            with self._option():
-                self._token(',,')
-            with self._option():
-                self._token(',')
-            with self._option():
-                self._token("'''''")
-            with self._option():
-                self._token("''''")
-            with self._option():
-                self._token("'''")
-            with self._option():
-                self._token("''")
-            with self._option():
-                self._token("'")
-            self._error('no available options')
+        self._pattern(r",,|,|'{1,5}")
 
     @tatsumasu()
     def _accidental_force_(self):  # noqa
-        with self._choice():
-            with self._option():
-                self._token('?')
-            with self._option():
-                self._token('!')
-            self._error('no available options')
+        self._pattern(r'[?!]')
 
     @tatsumasu()
     def _duration_number_(self):  # noqa
-        with self._choice():
-            with self._option():
-                self._token('512')
-            with self._option():
-                self._token('256')
-            with self._option():
-                self._token('128')
-            with self._option():
-                self._token('64')
-            with self._option():
-                self._token('32')
-            with self._option():
-                self._token('16')
-            with self._option():
-                self._token('8')
-            with self._option():
-                self._token('4')
-            with self._option():
-                self._token('2')
-            with self._option():
-                self._token('1')
-            self._error('no available options')
+        self._pattern(r'512|256|128|64|32|16|8|4|2|1')
 
     @tatsumasu()
     def _duration_dots_(self):  # noqa
@@ -429,6 +390,7 @@ class LilyPondParser(Parser):
         self._token('<')
         with self._ifnot():
             self._token('<')
+        self._cut()
 
         def block2():
             self._chord_note_()
@@ -465,6 +427,7 @@ class LilyPondParser(Parser):
         self._constant('rest')
         self.name_last_node('ly_type')
         self._pattern(r'r')
+        self._cut()
         with self._choice():
             with self._option():
                 with self._group():
@@ -495,6 +458,7 @@ class LilyPondParser(Parser):
         self._constant('measure_rest')
         self.name_last_node('ly_type')
         self._pattern(r'R')
+        self._cut()
         with self._choice():
             with self._option():
                 with self._group():
@@ -525,6 +489,7 @@ class LilyPondParser(Parser):
         self._constant('spacer')
         self.name_last_node('ly_type')
         self._pattern(r's')
+        self._cut()
         with self._choice():
             with self._option():
                 with self._group():
@@ -555,6 +520,7 @@ class LilyPondParser(Parser):
         self._constant('barcheck')
         self.name_last_node('ly_type')
         self._token('|')
+        self._cut()
         self.ast._define(
             ['ly_type'],
             []
@@ -694,6 +660,7 @@ class LilyPondParser(Parser):
         self.name_last_node('ly_type')
         self._token_new_()
         self._token_staff_()
+        self._cut()
         self._brace_l_()
 
         def block2():
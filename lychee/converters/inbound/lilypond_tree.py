@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/converters/inbound/lilypond_tree.py
+# Purpose:                A compact parse tree for LilyPond documents.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+A compact parse tree for LilyPond documents.
+
+By default, :class:`~lychee.converters.inbound.lilypond_parser.LilyPondParser` makes a dictionary
+for every note, rest, and setting, a list for every sequence, and a separate string for every
+token, so the parse tree of a large document can be several times the size of the document. With
+:class:`CompactSemantics`, the parser instead makes a :class:`Node` while it parses each rule:
+
+>>> parser = lilypond_parser.LilyPondParser(parseinfo=False)
+>>> parser.parse(document, semantics=lilypond_tree.CompactSemantics())
+
+Nodes have a ``__slots__`` field for each key of the dictionary they replace, and no ``__dict__``.
+Every sequence is a tuple, the dots of a duration are a string like ``'..'``, and the strings that
+repeat throughout a document (pitch names, octaves, and durations) are shared. A :class:`Node` can
+be read like the dictionary it replaces, with ``node['dur']``, ``node.get('dur')``, and
+``'dur' in node``, so the functions in :mod:`lychee.converters.inbound.lilypond` accept either.
+
+Use :func:`benchmark` to compare the memory used by the two kinds of parse tree.
+'''
+
+from __future__ import unicode_literals
+
+import sys
+
+from lychee.converters.inbound import lilypond_parser
+
+
+# strings that repeat in a document; refer to share()
+_SHARED = {}
+_EMPTY = ()
+
+
+def share(value):
+    '''
+    Return an equal string that is shared with the rest of the parse tree, so that the thousands
+    of durations, octaves, and pitch names in a document are a few objects. ``None`` is returned
+    as it is.
+    '''
+    if value is None:
+        return None
+    return _SHARED.setdefault(value, value)
+
+
+def _dots(value):
+    '''
+    Return the dots of a duration as a string.
+    '''
+    return ''.join(value) if value else ''
+
+
+def _tuple(value):
+    '''
+    Return a sequence from the parser as a tuple, sharing the empty tuple.
+    '''
+    return tuple(value) if value else _EMPTY
+
+
+class Node(object):
+    '''
+    Base class for the nodes of a compact parse tree. The fields are the ``__slots__`` of each
+    subclass, given to the initializer in the same order.
+    '''
+
+    __slots__ = ()
+    ly_type = None
+    '''The value of "ly_type" in the dictionary this node replaces, shared by every instance.'''
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        if key == 'ly_type':
+            return self.ly_type
+        elif key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__ or (key == 'ly_type' and self.ly_type is not None)
+
+    def get(self, key, default=None):
+        '''
+        Return a field, or ``default`` if this node does not have it, as for :meth:`dict.get`.
+        '''
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{0}({1})'.format(
+            type(self).__name__,
+            ', '.join('{0}={1!r}'.format(field, getattr(self, field)) for field in self.__slots__))
+
+
+class Version(Node):
+    '''A ``\\version`` statement.'''
+    __slots__ = ('version',)
+    ly_type = 'version'
+
+
+class Language(Node):
+    '''A ``\\language`` statement.'''
+    __slots__ = ('language',)
+    ly_type = 'language'
+
+
+class InstrName(Node):
+    '''An instrument name.'''
+    __slots__ = ('name',)
+    ly_type = 'instr_name'
+
+
+class Clef(Node):
+    '''A clef.'''
+    __slots__ = ('type',)
+    ly_type = 'clef'
+
+
+class Key(Node):
+    '''A key signature.'''
+    __slots__ = ('keynote', 'mode')
+    ly_type = 'key'
+
+
+class Time(Node):
+    '''A time signature.'''
+    __slots__ = ('count', 'unit')
+    ly_type = 'time'
+
+
+class Tie(Node):
+    '''A tie post-event.'''
+    __slots__ = ()
+    ly_type = 'tie'
+
+
+class Slur(Node):
+    '''A slur post-event, where "slur" is ``'('`` or ``')'``.'''
+    __slots__ = ('slur',)
+    ly_type = 'slur'
+
+
+class Note(Node):
+    '''A note that is not in a chord.'''
+    __slots__ = ('pitch_name', 'oct', 'accid_force', 'dur', 'dots', 'post_events')
+    ly_type = 'note'
+
+
+class ChordNote(Node):
+    '''A note in a chord, which has no duration of its own.'''
+    __slots__ = ('pitch_name', 'oct', 'accid_force', 'post_events')
+    ly_type = 'note'
+
+
+class Chord(Node):
+    '''A chord.'''
+    __slots__ = ('notes', 'dur', 'dots', 'post_events')
+    ly_type = 'chord'
+
+
+class Rest(Node):
+    '''A rest.'''
+    __slots__ = ('dur', 'dots', 'post_events')
+    ly_type = 'rest'
+
+
+class MeasureRest(Node):
+    '''A measure rest.'''
+    __slots__ = ('dur', 'dots', 'post_events')
+    ly_type = 'measure_rest'
+
+
+class Spacer(Node):
+    '''A spacer rest.'''
+    __slots__ = ('dur', 'dots', 'post_events')
+    ly_type = 'spacer'
+
+
+class Barcheck(Node):
+    '''A bar check.'''
+    __slots__ = ()
+    ly_type = 'barcheck'
+
+
+class Layers(Node):
+    '''One or more simultaneous layers in a staff, each a tuple of nodes.'''
+    __slots__ = ('layers',)
+
+
+class Staff(Node):
+    '''A staff.'''
+    __slots__ = ('initial_settings', 'content')
+    ly_type = 'staff'
+
+
+class Score(Node):
+    '''A score.'''
+    __slots__ = ('version', 'staves', 'layout_block')
+    ly_type = 'score'
+
+
+TIE = Tie()
+'''The one :class:`Tie` in every parse tree, since ties have no fields.'''
+BARCHECK = Barcheck()
+'''The one :class:`Barcheck` in every parse tree, since barchecks have no fields.'''
+
+
+class CompactSemantics(lilypond_parser.LilyPondSemantics):
+    '''
+    Semantic actions for :class:`~lychee.converters.inbound.lilypond_parser.LilyPondParser` that
+    make a :class:`Node` for each rule that would otherwise make a dictionary.
+    '''
+
+    # pylint: disable=no-self-use
+
+    def start(self, ast):
+        return list(ast)
+
+    def version_statement(self, ast):
+        return Version(_tuple(ast['version']))
+
+    def language_statement(self, ast):
+        return Language(ast['language'])
+
+    def instr_name(self, ast):
+        return InstrName(ast['name'])
+
+    def clef(self, ast):
+        return Clef(share(ast['type']))
+
+    def key(self, ast):
+        return Key(share(ast['keynote']), share(ast['mode']))
+
+    def time(self, ast):
+        return Time(share(ast['count']), share(ast['unit']))
+
+    def tie(self, ast):
+        return TIE
+
+    def slur(self, ast):
+        return Slur(share(ast['slur']))
+
+    def note(self, ast):
+        return Note(
+            share(ast['pitch_name']),
+            share(ast['oct']),
+            share(ast['accid_force']),
+            share(ast['dur']),
+            _dots(ast['dots']),
+            _tuple(ast['post_events']))
+
+    def chord_note(self, ast):
+        return ChordNote(
+            share(ast['pitch_name']),
+            share(ast['oct']),
+            share(ast['accid_force']),
+            _tuple(ast['post_events']))
+
+    def chord(self, ast):
+        return Chord(
+            _tuple(ast['notes']),
+            share(ast['dur']),
+            _dots(ast['dots']),
+            _tuple(ast['post_events']))
+
+    def rest(self, ast):
+        return Rest(share(ast['dur']), _dots(ast['dots']), _tuple(ast['post_events']))
+
+    def measure_rest(self, ast):
+        return MeasureRest(share(ast['dur']), _dots(ast['dots']), _tuple(ast['post_events']))
+
+    def spacer(self, ast):
+        return Spacer(share(ast['dur']), _dots(ast['dots']), _tuple(ast['post_events']))
+
+    def barcheck(self, ast):
+        return BARCHECK
+
+    def nodes(self, ast):
+        return _tuple(ast)
+
+    def monophonic_layers(self, ast):
+        return Layers(_tuple(ast['layers']))
+
+    def polyphonic_layers(self, ast):
+        return Layers(_tuple(ast['layers']))
+
+    def staff(self, ast):
+        return Staff(_tuple(ast['initial_settings']), _tuple(ast['content']))
+
+    def score(self, ast):
+        staves = ast['staves']
+        if not isinstance(staves, Node):
+            staves = _tuple(staves)
+        return Score(ast['version'], staves, ast['layout_block'])
+
+
+def _deep_size(obj, seen):
+    '''
+    Return the number of bytes used by ``obj`` and everything it refers to, counting each object
+    in ``seen`` (a set of ``id()``) only once.
+    '''
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _deep_size(key, seen) + _deep_size(value, seen)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += _deep_size(value, seen)
+    elif isinstance(obj, Node):
+        for slot in obj.__slots__:
+            size += _deep_size(getattr(obj, slot), seen)
+    return size
+
+
+def benchmark(document):
+    '''
+    Compare the memory used by the parse tree of a LilyPond document with and without
+    :class:`CompactSemantics`.
+
+    :param str document: The LilyPond document.
+    :returns: A dictionary with the keys ``'dict'`` and ``'compact'`` for the two kinds of parse
+        tree. Each value is a dictionary with ``'size'``, the number of bytes in the parse tree,
+        and ``'peak'``, the largest number of bytes allocated while parsing as measured by
+        :mod:`tracemalloc`, or ``None`` when :mod:`tracemalloc` is not available.
+    :rtype: dict
+    '''
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+
+    post = {}
+    for kind, semantics in (('dict', None), ('compact', CompactSemantics())):
+        parser = lilypond_parser.LilyPondParser(parseinfo=False)
+        if tracemalloc is not None:
+            tracemalloc.start()
+        parsed = parser.parse(document, filename='file', semantics=semantics, trace=False)
+        peak = None
+        if tracemalloc is not None:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        post[kind] = {'size': _deep_size(parsed, set()), 'peak': peak}
+
+    return post
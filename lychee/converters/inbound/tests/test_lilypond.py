@@ -33,10 +33,16 @@ A few of the more complicated tests do use the LilyPond parser to improve readab
 
 from __future__ import unicode_literals
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
 from lxml import etree
 import pytest
 
 from lychee.converters.inbound import lilypond
+from lychee.converters.inbound import lilypond_fast
 from lychee.converters.inbound import lilypond_parser
 from lychee import exceptions
 from lychee.namespaces import mei
@@ -44,6 +50,34 @@ from lychee.namespaces import mei
 parser = lilypond_parser.LilyPondParser()
 
 
+class TestParse(object):
+    """
+    Parsing with the fast parser or the TatSu parser.
+    """
+
+    @mock.patch('lychee.converters.inbound.lilypond_fast.parse')
+    def test_fast(self, mock_fast):
+        """The fast parser is used by default."""
+        mock_fast.return_value = ['parsed']
+        assert ['parsed'] == lilypond.parse('doc')
+        mock_fast.assert_called_once_with('doc')
+
+    @mock.patch('lychee.converters.inbound.lilypond_fast.parse')
+    def test_fallback(self, mock_fast):
+        """When the fast parser does not recognize the document, TatSu parses it."""
+        mock_fast.side_effect = lilypond_fast.UnsupportedSyntax('expected something')
+        actual = lilypond.parse(r'\new Staff { c4 }')
+        assert 'staff' == actual[0]['ly_type']
+
+    @mock.patch('lychee.converters.inbound.lilypond_fast.parse')
+    def test_tatsu(self, mock_fast):
+        """With the "lilyPondParser" user setting, only TatSu parses the document."""
+        user_settings = {lilypond.PARSER_SETTING: 'tatsu'}
+        actual = lilypond.convert_no_signals(r'\new Staff { c4 }', user_settings=user_settings)
+        assert mei.SECTION == actual.tag
+        assert mock_fast.call_count == 0
+
+
 class TestScore(object):
     """
     Converting a whole score.
@@ -1180,3 +1214,13 @@ class TestAccidentalRendering(object):
         assert actual[12].find(mei.ACCID).get('accid') == 'ff'
         assert actual[13].find(mei.ACCID) is None
         assert actual[14].find(mei.ACCID).get('accid') == 's'
+
+
+def test_benchmark():
+    """
+    The parser benchmark runs, and the size of TatSu's memo does not grow with the document.
+    """
+    short = lilypond.benchmark(40)
+    longer = lilypond.benchmark(200)
+    assert short['seconds'] > 0
+    assert short['memos'] == longer['memos']
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/converters/inbound/tests/test_lilypond_fast.py
+# Purpose:                Tests for the "lilypond_fast" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+"""
+Tests for the "lilypond_fast" module.
+
+Most of these tests are differential: they parse the same LilyPond with the fast parser and with the
+TatSu parser, and check the parse trees are the same. The LilyPond comes from the tests for the
+TatSu parser and the converter, which are run with a parser that records what they parse.
+"""
+
+from __future__ import unicode_literals
+
+import inspect
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from tatsu.exceptions import FailedParse
+import pytest
+
+from lychee.converters.inbound import lilypond_fast
+from lychee.converters.inbound import lilypond_parser
+from lychee.converters.inbound import lilypond_tree
+
+# the other test modules in this directory
+import test_lilypond
+import test_lilypond_parser
+
+
+DOCUMENTS = [
+    r'''
+    \version "2.18.2"
+    \language "deutsch"
+    \header { }
+    \score {
+        <<
+            \new Staff {
+                \set Staff.instrumentName = "Flute & Piccolo"
+                \clef "treble" \key g \major \time 3/4
+                c''4.( d''8) e''4~ | e''4 <c'' e''>2 | r2. | R2. | s4 <d'' fis''>4.. r16 |
+            }
+            \new Staff {
+                \clef "bass"
+                << { c4 d4 e4 } \\ { c,2. } >> f,?4 g,!2
+            }
+        >>
+        \layout { }
+    }
+    \paper { }
+    ''',
+    r'\new Score \new Staff { c4 }',
+    r'\score { \new Score << \new Staff { c4 } >> }',
+    r'\version "2." \new Staff { c4 }',
+    r'\new Staff { << >> }',
+    r'\new Staff { c 4 . ( ~ R r s }',
+    r'\new Staff { \set Staff.instrumentName = "" rest sol <> }',
+    '\\new Staff { c4 %{ x %} d4 % a comment\n e4 }',
+    '',
+]
+
+
+def record_corpus():
+    '''
+    Run the tests for the TatSu parser and the converter with a parser that records what they
+    parse, and return a list of (document, rule name) tuples.
+    '''
+    corpus = []
+    tatsu_parser = lilypond_parser.LilyPondParser()
+
+    class RecordingParser(object):
+        def parse(self, text, rule_name=None, **kwargs):
+            corpus.append((text, rule_name or 'start'))
+            return tatsu_parser.parse(text, rule_name=rule_name, **kwargs)
+
+    for module in (test_lilypond_parser, test_lilypond):
+        with mock.patch.object(module, 'parser', RecordingParser()):
+            for _, test_class in inspect.getmembers(module, inspect.isclass):
+                if not test_class.__name__.startswith('Test'):
+                    continue
+                for name, method in inspect.getmembers(test_class()):
+                    if name.startswith('test_'):
+                        try:
+                            method()
+                        except Exception:  # pylint: disable=broad-except
+                            pass
+
+    return corpus
+
+
+def parse_both(document, rule_name='start'):
+    '''
+    Parse with the TatSu parser and the fast parser. Return a tuple with each parse tree, or
+    ``None`` for a parser that raised.
+    '''
+    try:
+        expected = lilypond_parser.LilyPondParser(parseinfo=False).parse(
+            document,
+            rule_name=rule_name,
+            semantics=lilypond_tree.CompactSemantics(),
+            trace=False)
+    except FailedParse:
+        expected = None
+    try:
+        actual = lilypond_fast.parse(document, rule_name)
+    except lilypond_fast.UnsupportedSyntax:
+        actual = None
+    return expected, actual
+
+
+class TestDifferential(object):
+    '''
+    The fast parser makes the same parse tree as the TatSu parser.
+    '''
+
+    def test_corpus(self):
+        '''
+        Everything parsed in the tests for the TatSu parser and the converter.
+        '''
+        corpus = [(text, rule) for text, rule in record_corpus() if rule in lilypond_fast.RULES]
+        assert len(corpus) > 50
+        for text, rule in corpus:
+            expected, actual = parse_both(text, rule)
+            assert expected == actual, (text, rule)
+
+    @pytest.mark.parametrize('document', DOCUMENTS)
+    def test_documents(self, document):
+        '''
+        Whole documents, including unusual spacing and comments.
+        '''
+        expected, actual = parse_both(document)
+        assert expected is not None
+        assert expected == actual
+
+
+class TestUnsupported(object):
+    '''
+    The fast parser raises UnsupportedSyntax for what it does not recognize.
+    '''
+
+    @pytest.mark.parametrize('document', [
+        r'\new Staff { q4 }',
+        r'\new Staff { c4 }}',
+        r'\new Staff { c4 \clef "soprano" }',
+        r'\new Staff { <c e }',
+        r'\new Staff { << { c4 } \\ >> }',
+        r'\version "2.18.2" \relative { c4 }',
+    ])
+    def test_invalid(self, document):
+        '''
+        Documents that the TatSu parser also rejects.
+        '''
+        expected, actual = parse_both(document)
+        assert expected is None
+        assert actual is None
+
+    def test_error_message(self):
+        '''
+        The message says what was expected where.
+        '''
+        with pytest.raises(lilypond_fast.UnsupportedSyntax) as exc:
+            lilypond_fast.parse(r'\new Staff { c4 ]')
+        assert 'expected "}" at character 16' == str(exc.value)
+
+    def test_bad_rule(self):
+        '''
+        Only the rules that make nodes can be parsed on their own.
+        '''
+        with pytest.raises(ValueError):
+            lilypond_fast.parse('4..', 'duration')
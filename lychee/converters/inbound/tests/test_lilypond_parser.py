@@ -82,6 +82,13 @@ class TestNotehead(object):
         actual = parser.parse(content, rule_name='notehead')
         assert expected == actual
 
+    def test_notehead_6(self):
+        """With the highest octave."""
+        content = "d'''''"
+        expected = {'pitch_name': 'd', 'oct': "'''''", 'accid_force': None}
+        actual = parser.parse(content, rule_name='notehead')
+        assert expected == actual
+
 
 class TestDuration(object):
     """
@@ -119,6 +126,13 @@ class TestDuration(object):
         actual = parser.parse(content, rule_name='duration')
         assert expected == actual
 
+    def test_duration_5(self):
+        """A two-digit dur is not read as a one-digit dur."""
+        content = '16.'
+        expected = {'dur': '16', 'dots': ['.']}
+        actual = parser.parse(content, rule_name='duration')
+        assert expected == actual
+
 
 class TestNoteChordRestSpacer(object):
     """
@@ -229,6 +243,14 @@ class TestNoteChordRestSpacer(object):
         with pytest.raises(FailedLookahead):
             parser.parse(content, rule_name='chord')
 
+    def test_chord_6(self):
+        """
+        After the opening < the parser commits to a chord, so an unclosed chord fails there.
+        """
+        content = "<c' e' | d'4"
+        with pytest.raises(FailedParse):
+            parser.parse(content, rule_name='music_node')
+
     def test_rest_1(self):
         """Works as expected."""
         content = 'r256..'
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/converters/inbound/tests/test_lilypond_tree.py
+# Purpose:                Tests for the "lilypond_tree" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+"""
+Tests for the "lilypond_tree" module.
+"""
+
+from __future__ import unicode_literals
+
+from lxml import etree
+import pytest
+
+from lychee.converters.inbound import lilypond
+from lychee.converters.inbound import lilypond_parser
+from lychee.converters.inbound import lilypond_tree
+
+
+DOCUMENT = r"""
+\version "2.18.2"
+\language "nederlands"
+\score {
+    <<
+        \new Staff {
+            \set Staff.instrumentName = "Flute"
+            \clef "treble"
+            \key g \major
+            \time 3/4
+            c''4.( d''8) e''4~ | e''4 <c'' e''>2 | r2. | R2. | s4 <d'' fis''>4.. r16 |
+        }
+        \new Staff {
+            \clef "bass"
+            << { c4 d4 e4 } \\ { c,2. } >>
+        }
+    >>
+}
+"""
+
+
+def parse(semantics=None):
+    '''
+    Parse the DOCUMENT, with ``semantics`` if given.
+    '''
+    parser = lilypond_parser.LilyPondParser(parseinfo=False)
+    return parser.parse(DOCUMENT, filename='file', semantics=semantics, trace=False)
+
+
+class TestNode(object):
+    '''
+    Nodes can be read like dictionaries.
+    '''
+
+    def test_getitem(self):
+        note = lilypond_tree.Note('c', "'", None, '4', '.', ())
+        assert 'note' == note['ly_type']
+        assert '4' == note['dur']
+        assert '.' == note['dots']
+        with pytest.raises(KeyError):
+            note['pizza']
+
+    def test_contains_and_get(self):
+        rest = lilypond_tree.Rest(None, '', ())
+        assert 'dur' in rest
+        assert 'ly_type' in rest
+        assert 'pizza' not in rest
+        assert rest.get('dur') is None
+        assert 'x' == rest.get('pizza', 'x')
+
+    def test_no_dict(self):
+        '''
+        Nodes have no __dict__, so they cannot grow new attributes.
+        '''
+        note = lilypond_tree.Note('c', "'", None, '4', '', ())
+        with pytest.raises(AttributeError):
+            note.pizza = 5
+
+
+class TestCompactSemantics(object):
+    '''
+    The parser makes Nodes with the CompactSemantics.
+    '''
+
+    def test_tree(self):
+        parsed = parse(lilypond_tree.CompactSemantics())
+        score = parsed[-1]
+        assert isinstance(score, lilypond_tree.Score)
+        staff = score['staves'][0]
+        assert isinstance(staff['content'], tuple)
+        layer = staff['content'][0]['layers'][0]
+        assert isinstance(layer, tuple)
+        first_note = layer[0]
+        assert isinstance(first_note, lilypond_tree.Note)
+        assert '.' == first_note['dots']
+        assert 'slur' == first_note['post_events'][0]['ly_type']
+
+    def test_shared_strings(self):
+        '''
+        The durations of notes are the same object.
+        '''
+        parsed = parse(lilypond_tree.CompactSemantics())
+        layer = parsed[-1]['staves'][0]['content'][0]['layers'][0]
+        assert layer[2]['dur'] is layer[4]['dur']
+
+    def test_same_mei(self):
+        '''
+        The compact parse tree converts to the same LMEI as the default parse tree.
+        '''
+        expected = lilypond.do_document(parse(), user_settings={})
+        actual = lilypond.do_document(parse(lilypond_tree.CompactSemantics()), user_settings={})
+        assert etree.tostring(expected) == etree.tostring(actual)
+
+
+def test_benchmark():
+    '''
+    The benchmark runs, and the compact parse tree is smaller.
+    '''
+    post = lilypond_tree.benchmark(DOCUMENT)
+    assert post['compact']['size'] < post['dict']['size']
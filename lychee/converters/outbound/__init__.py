@@ -23,7 +23,5 @@
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 #--------------------------------------------------------------------------------------------------
 
-__all__ = ['__abjad', 'document', 'lilypond', 'mei', 'python', 'vcs', 'verovio']
-
-from . import *
-abjad = __abjad
+# NB: the converter modules are only imported when they are used; refer to lychee.converters
+__all__ = ['abjad', 'document', 'lilypond', 'mei', 'python', 'vcs', 'verovio']
@@ -4,7 +4,7 @@
 # Program Name:           Lychee
 # Program Description:    MEI document manager for formalized document control
 #
-# Filename:               lychee/converters/lmei_to_abjad.py
+# Filename:               lychee/converters/outbound/abjad.py
 # Purpose:                Converts an lmei document to an abjad document.
 #
 # Copyright (C) 2016 Jeffrey Treviño, Christopher Antila
@@ -37,6 +37,9 @@ Convert a Lychee-MEI document to an Abjad document.
     :mod:`lychee.signals.outbound` module for more information.
 '''
 
+# NB: this module has the same name as the "abjad" package
+from __future__ import absolute_import
+
 import six
 from lxml import etree as etree
 
@@ -400,6 +400,7 @@ def prepare_sections_inner(doc, section_ids, vcs_data):
     '''
     post = {'score_order': []}
 
+    doc.prefetch_sections(section_ids)
     for each_id in section_ids:
         post['score_order'].append(each_id)
         section = doc.get_section(each_id)
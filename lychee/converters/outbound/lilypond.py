@@ -68,11 +68,7 @@ def convert(document, user_settings=None, **kwargs):
         mei.SECTION: section,
     }
     CONTAINERS = (mei.LAYER, mei.MEASURE, mei.STAFF, mei.SECTION)
-    if user_settings is None:
-        user_settings = {}
-    context = {
-        'language': user_settings.get('lilyPondLanguage', 'nederlands')
-    }
+    context = _make_context(user_settings)
     if document.tag in CONV_FUNCS:
         if document.tag in CONTAINERS and len(document) == 0:
             return ''
@@ -81,6 +77,56 @@ def convert(document, user_settings=None, **kwargs):
         raise exceptions.OutboundConversionError('LMEI-to-LilyPond cannot do {0} elements'.format(document.tag))
 
 
+def _make_context(user_settings):
+    '''
+    Make the conversion context from the user settings.
+    '''
+    if user_settings is None:
+        user_settings = {}
+    return {
+        'language': user_settings.get('lilyPondLanguage', 'nederlands')
+    }
+
+
+def iter_convert(document, user_settings=None):
+    '''
+    Convert an MEI document into a LilyPond document, piece by piece.
+
+    The arguments are the same as for :func:`convert`, and joining the strings gives the same
+    document. A ``<section>`` is produced one staff and one measure at a time, so the whole
+    LilyPond document is never in memory at once. Other elements are produced in one piece.
+
+    :returns: An iterator of the strings that make up the LilyPond document.
+    :raises: :exc:`lychee.exceptions.OutboundConversionError` when the element cannot be
+        converted. An unsupported element is reported before this function returns; other errors
+        are raised while iterating.
+    '''
+    if document.tag == mei.SECTION and len(document) > 0:
+        return iter_section(document, context=_make_context(user_settings))
+    return iter([convert(document, user_settings=user_settings)])
+
+
+@log.wrap('info', 'write LMEI as LilyPond')
+def write(document, out_file, user_settings=None):
+    '''
+    Convert an MEI document into a LilyPond document, and write it to a file as it is converted.
+
+    :param document: As for :func:`convert`.
+    :param out_file: A text file, or any object with a ``write()`` method such as the file from
+        :meth:`socket.socket.makefile`. It is given each piece from :func:`iter_convert`.
+    :param user_settings: As for :func:`convert`.
+    :returns: The number of characters written.
+    :rtype: int
+    :raises: :exc:`lychee.exceptions.OutboundConversionError` as for :func:`convert`. Whatever was
+        converted before the error has already been written.
+    '''
+    written = 0
+    for chunk in iter_convert(document, user_settings=user_settings):
+        out_file.write(chunk)
+        written += len(chunk)
+    return written
+
+
 _OCTAVE_TO_MARK = {
     '8': "'''''",
     '7': "''''",
@@ -377,53 +423,64 @@ def staffdef(m_staffdef, context=None):
 def staff(m_staff, m_staffdef, context=None):
     '''
     '''
+    return ''.join(iter_staff(m_staff, m_staffdef, context))
+
+
+def iter_staff(m_staff, m_staffdef, context=None):
+    '''
+    Convert an MEI staff to LilyPond, like :func:`staff`, as a generator of strings: the staff's
+    settings, each measure, and the closing brace.
+    '''
     check_tag(m_staff, mei.STAFF)
     check_tag(m_staffdef, mei.STAFF_DEF)
 
-    post = [
+    yield ''.join([
         '\\new Staff {\n',
         '%{{ staff {0} %}}\n'.format(m_staff.get('n')),
         '\\set Staff.instrumentName = "{0}"\n'.format(m_staffdef.get('label', '')),
         clef(m_staffdef, context) + '\n',
         key(m_staffdef, context) + '\n',
         meter(m_staffdef, context) + '\n',
-    ]
+    ])
 
     there_are_no_measures = True
     for elem in m_staff.iterchildren(tag=mei.MEASURE):
-        post.append(measure(elem, context))
+        yield measure(elem, context)
         there_are_no_measures = False
 
     if there_are_no_measures:
-        post.append(' '.join(layers(m_staff, context)) + '\n')
+        yield ' '.join(layers(m_staff, context)) + '\n'
 
-    post.append('}\n')
-
-    return ''.join(post)
+    yield '}\n'
 
 
 @log.wrap('info', 'convert section')
 def section(m_section, context=None):
     '''
     '''
+    return ''.join(iter_section(m_section, context))
+
+
+def iter_section(m_section, context=None):
+    '''
+    Convert an MEI section to LilyPond, like :func:`section`, as a generator of strings: the
+    document's header, the pieces of each staff from :func:`iter_staff`, and the closing lines.
+    '''
     check_tag(m_section, mei.SECTION)
 
     if context is None:
         context = {}
 
-    post = [
+    yield ''.join([
         '\\version "2.18.2"\n',
         '\\language "{}"\n'.format(context.get("language", "nederlands")),
         '\\score {\n',
         '<<\n',
-    ]
+    ])
 
     for m_staffdef in m_section.iterfind('./{}//{}'.format(mei.SCORE_DEF, mei.STAFF_DEF)):
         query = './/{tag}[@n="{n}"]'.format(tag=mei.STAFF, n=m_staffdef.get('n'))
-        post.append(staff(m_section.find(query), m_staffdef, context))
-
-    post.append('>>\n')
-    post.append('\\layout { }\n')
-    post.append('}\n')
+        for chunk in iter_staff(m_section.find(query), m_staffdef, context):
+            yield chunk
 
-    return ''.join(post)
+    yield '>>\n\\layout { }\n}\n'
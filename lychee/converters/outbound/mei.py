@@ -45,11 +45,10 @@ from lxml import etree
 
 from lychee import exceptions
 from lychee.namespaces import mei, xml
+from lychee.utils import events
 
 _ERR_INPUT_NOT_SECTION = 'LMEI-to-MEI did not receive a <section>'
 
-_DURATION_HAVING_ELEMENTS = (mei.CHORD, mei.NOTE, mei.REST, mei.SPACE)
-
 
 def convert(document, **kwargs):
     '''
@@ -101,13 +100,17 @@ def wrap_section_element(section):
     return post
 
 
-def create_measures(lmei_section):
+def create_measures(lmei_section, section_events=None):
     '''
     Convert a Lychee-MEI <section> without <measure> elements into an MEI section by adding
     <measure> elements at the expected place in the standard MEI hierarchy.
 
     :param lmei_section: The <section> to convert.
     :type lmei_section: :class:`xml.etree.ElementTree.Element`
+    :param section_events: The event tables for ``lmei_section``, as from
+        :meth:`~lychee.document.Document.get_section_events`, for a caller that already has them.
+        They are built if omitted, as they are by :func:`convert`.
+    :type section_events: :class:`lychee.utils.events.SectionEvents`
     :returns: A converted <section>.
     :rtype: :class:`xml.etree.ElementTree.Element`
 
@@ -115,12 +118,13 @@ def create_measures(lmei_section):
 
     **Known Limitations**
 
-    - Does not process tuplets.
     - Uses one meter signature for all staves.
     - Uses one meter signature for the whole <section> (cannot change).
     - Assumes 4/4 meter unless indicated otherwise with @meter.count and @meter.unit
       on the *first* <staffDef>.
     '''
+    if section_events is None:
+        section_events = events.SectionEvents.from_section(lmei_section, pitches=False)
 
     # 0.) The poor man's deep copy.
     #     This allows us to reuse LMEI elements in the MEI output, rather than deep copying later.
@@ -134,7 +138,7 @@ def create_measures(lmei_section):
     meter_count = float(first_staff_def.get('meter.count', 4))
     meter_unit = float(first_staff_def.get('meter.unit', 4))
     # NB: the "meter count factor" is the beat count we actually need in every measure
-    meter_count_factor = meter_count / meter_unit
+    meter_count_factor = Fraction(meter_count) / Fraction(meter_unit)
 
     # 1.a.) Make sure all the first <staffDef> knows the metre (in case we assumed it).
     first_staff_def.set('meter.count', str(int(meter_count)))
@@ -144,102 +148,28 @@ def create_measures(lmei_section):
     m_section = etree.Element(mei.SECTION)
     m_section.append(l_section.find(mei.SCORE_DEF))
 
-    # 3.) For each LMEI <staff>
+    # 3.) For each LMEI <layer>, find where the measures start and stop in the layer's event table,
+    #     which holds the duration of every element with its dots and tuplets, then move each range
+    #     of elements into an MEI <measure>. Measure numbers continue from a previous <staff> with
+    #     the same @n.
     m_measures = {}  # NB: in this dict, keys are measure number as int
-    meas_nums = {}  # NB: in this dict, keys are staff[@n] and values are the measure number most
-                    #     recently processed for that <staff>
-    for l_staff in l_section.iterfind(mei.STAFF):
-        # in case we already had a <staff> with this @n, measure numbers don't start at 1
-        previous_measures = meas_nums.get(l_staff.get('n'), 0)
-        highest_meas_num_in_this_staff = previous_measures
-
-        # 4.) For each LMEI <layer>
-        for l_layer in l_staff.iterfind(mei.LAYER):
-            # 5.) Find enough stuff for an MEI <measure> and stick it in.
-            #     Limitation: does not handle tuplets.
-            meas_num = previous_measures + 1
-            beat_count = 0.0
-            # We can't use beat_count to tell us when we're at the start of a <measure> (and should
-            # therefore make new <measure> and <layer> elements) because there may be elements
-            # without duration at the start of a <measure>.
-            things_in_this_measure = 0
-
-            # Hold information about tuplets.
-            # Keys are @xml:id of affected chord/note/rest/spacer (without leading #).
-            # Value is a list of tuplet ratios as Fraction instances. When you multiply the @dur
-            # of a note in a tuplet by these Fraction instances, you get the note's "beat count."
-            # To save memory, remove values from the dictionary once the note is converted.
-            tuplets = {}
-
-            for l_elem in l_layer.iterfind('*'):
-                if things_in_this_measure == 0:
-                    # create a new measure, or find it from a previous <staff>
-                    if meas_num in m_measures:
-                        m_meas = m_measures[meas_num]
-                    else:
-                        m_meas = etree.SubElement(m_section, mei.MEASURE, n=str(meas_num))
-                        m_measures[meas_num] = m_meas
-
-                    # try to find this <staff> from a previous <layer>
-                    m_staff = m_meas.find('{tag}[@n="{n}"]'.format(tag=mei.STAFF, n=l_staff.get('n')))
-                    if m_staff is None:
-                        m_staff = etree.SubElement(m_meas, mei.STAFF, n=l_staff.get('n'))
-                    m_layer = etree.SubElement(m_staff, mei.LAYER, n=l_layer.get('n'))
-
-                # count the duration of this element (if relevant)
-                if l_elem.tag not in _DURATION_HAVING_ELEMENTS:
-                    pass
-                elif (beat_count == 0.0 and
-                      l_elem.get('dur') == '1' and
-                      l_elem.get(xml.ID) not in tuplets):
-                    # whole note as first thing in measure will always take the whole measure
-                    beat_count = meter_count_factor
-                else:
-                    # It's "scaled" according to the meter-count factor.
-                    # Use float() so the division works properly.
-                    scaled_dur = 1.0 / float(l_elem.get('dur'))
-
-                    if l_elem.get('dots'):
-                        last_value_added = scaled_dur
-                        for _ in range(int(l_elem.get('dots'))):
-                            last_value_added /= 2.0
-                            scaled_dur += last_value_added
-
-                    if l_elem.get(xml.ID) in tuplets:
-                        for each_tuplet in tuplets[l_elem.get(xml.ID)]:
-                            scaled_dur = scaled_dur * each_tuplet
-
-                        del tuplets[l_elem.get(xml.ID)]
-
-                    beat_count += scaled_dur
-
-                # set up a <tupletSpan>
-                if l_elem.tag == mei.TUPLET_SPAN:
-                    plist = l_elem.get('plist', '')
-                    plist = plist.replace('#', '')
-                    if plist != '':
-                        plist = plist.split(' ')
-                        tuplet_ratio = Fraction(
-                            int(l_elem.get('numbase', 0)),
-                            int(l_elem.get('num', 0))
-                        )
-                        for each_xmlid in plist:
-                            if each_xmlid in tuplets:
-                                tuplets[each_xmlid].append(tuplet_ratio)
-                            else:
-                                tuplets[each_xmlid] = [tuplet_ratio]
-
-                m_layer.append(l_elem)
-                things_in_this_measure += 1
-
-                if beat_count >= meter_count_factor:
-                    highest_meas_num_in_this_staff = max(highest_meas_num_in_this_staff, meas_num)
-                    beat_count = 0.0
-                    meas_num += 1
-                    things_in_this_measure = 0
-
-        # update "meas_nums" for next time we hit a <staff> with this @n
-        meas_nums[l_staff.get('n')] = highest_meas_num_in_this_staff
+    for l_staff, l_layer, _, numbered in events.number_measures(
+            l_section, section_events, meter_count_factor):
+        l_elems = l_layer.findall('*')
+        for meas_num, start, stop in numbered:
+            # create a new measure, or find it from a previous <staff>
+            if meas_num in m_measures:
+                m_meas = m_measures[meas_num]
+            else:
+                m_meas = etree.SubElement(m_section, mei.MEASURE, n=str(meas_num))
+                m_measures[meas_num] = m_meas
+
+            # try to find this <staff> from a previous <layer>
+            m_staff = m_meas.find('{tag}[@n="{n}"]'.format(tag=mei.STAFF, n=l_staff.get('n')))
+            if m_staff is None:
+                m_staff = etree.SubElement(m_meas, mei.STAFF, n=l_staff.get('n'))
+            m_layer = etree.SubElement(m_staff, mei.LAYER, n=l_layer.get('n'))
+            m_layer.extend(l_elems[start:stop])
 
     return m_section
 
@@ -29,6 +29,7 @@ Tests for converting an MEI document to a LilyPond document.
 from lxml import etree
 
 import pytest
+import six
 
 from lychee.converters.outbound import lilypond
 from lychee import exceptions
@@ -590,3 +591,60 @@ class TestSection(object):
             "}\n",
         ])
         assert lilypond.section(m_section, context) == expected
+
+
+class TestStreaming(object):
+    '''
+    Tests for iter_convert() and write(), which produce a LilyPond document piece by piece.
+    '''
+
+    m_section = '''
+        <mei:section xmlns:mei="http://www.music-encoding.org/ns/mei">
+            <mei:scoreDef>
+                <mei:staffGrp>
+                    <mei:staffDef n="1" label="Flute" clef.line="2" clef.shape="G"/>
+                    <mei:staffDef n="2" label="Cello" clef.line="4" clef.shape="F"/>
+                </mei:staffGrp>
+            </mei:scoreDef>
+            <mei:staff n="1">
+                <mei:measure n="1"><mei:layer n="1"><mei:note dur="1" oct="5" pname="e"/></mei:layer></mei:measure>
+                <mei:measure n="2"><mei:layer n="1"><mei:note dur="1" oct="5" pname="d"/></mei:layer></mei:measure>
+            </mei:staff>
+            <mei:staff n="2">
+                <mei:measure n="1"><mei:layer n="1"><mei:note dur="1" oct="3" pname="c"/></mei:layer></mei:measure>
+                <mei:measure n="2"><mei:layer n="1"><mei:note dur="1" oct="2" pname="g"/></mei:layer></mei:measure>
+            </mei:staff>
+        </mei:section>
+        '''
+
+    def test_section(self):
+        "A <section> comes one staff and one measure at a time, and joins to the whole document."
+        m_section = etree.fromstring(self.m_section)
+        chunks = list(lilypond.iter_convert(m_section, {'lilyPondLanguage': 'english'}))
+        # header, then for each staff its settings, two measures, and "}", then the end
+        assert 10 == len(chunks)
+        assert "%{ m.2 %} %{ l.1 %} d''1 |\n" == chunks[3]
+        assert "}\n" == chunks[4]
+        expected = lilypond.convert(m_section, user_settings={'lilyPondLanguage': 'english'})
+        assert expected == ''.join(chunks)
+        assert lilypond.section(m_section) == ''.join(lilypond.iter_section(m_section))
+
+    def test_other_elements(self):
+        "Other elements come in one piece, and an empty container is an empty string."
+        m_note = etree.fromstring(
+            '<mei:note xmlns:mei="http://www.music-encoding.org/ns/mei" dur="4" oct="4" pname="g"/>')
+        assert ["g'4"] == list(lilypond.iter_convert(m_note))
+        assert [''] == list(lilypond.iter_convert(etree.Element(mei.SECTION)))
+
+    def test_unsupported(self):
+        "An element that cannot be converted fails before iterating."
+        with pytest.raises(exceptions.OutboundConversionError):
+            lilypond.iter_convert(etree.Element(mei.SCORE))
+
+    def test_write(self):
+        "write() writes every piece to the file and returns how many characters it wrote."
+        m_section = etree.fromstring(self.m_section)
+        out_file = six.StringIO()
+        written = lilypond.write(m_section, out_file)
+        assert lilypond.convert(m_section) == out_file.getvalue()
+        assert len(out_file.getvalue()) == written
@@ -93,7 +93,7 @@ def export_for_verovio(document):
     :rtype: unicode
     '''
     document = lmei_to_mei.convert_raw(document)
-    document = etree.tostring(document, encoding=unicode)
+    document = etree.tostring(document, encoding='unicode')
     document = document.replace('mei:', '')
     document = _XML_DECLARATION + document
     return document
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/converters/registry.py
+# Purpose:                Mappings that import converter modules when they are first used.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Mappings that import converter modules when they are first used.
+
+Importing every converter module takes much longer than the rest of Lychee put together, because
+the LilyPond parser is generated by TatSu and the Abjad converters import Abjad. A
+:class:`LazyConverters` mapping holds the import path of each converter function instead, and only
+imports the module when the function is looked up.
+'''
+
+import importlib
+
+import six
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+
+_ERR_BAD_PATH = 'Converter path "{0}" must be like "package.module:function"'
+
+
+class LazyConverters(MutableMapping):
+    '''
+    A mapping from the name of a format to a converter function, like a :class:`dict`, that imports
+    the converter's module the first time the function is looked up.
+
+    Checking whether a format is in the mapping, iterating over the names, and :func:`len` do not
+    import anything. Assigning a function stores it as it is.
+
+    >>> converters = LazyConverters({'mei': 'lychee.converters.outbound.mei:convert'})
+    >>> 'mei' in converters
+    True
+    >>> converters.is_loaded('mei')
+    False
+    >>> converters['mei']
+    <function convert at 0x...>
+    '''
+
+    def __init__(self, paths=None):
+        '''
+        :param dict paths: Mapping from the name of a format to the import path of its converter,
+            like ``'lychee.converters.outbound.mei:convert'``, or to the converter function.
+        '''
+        # format name to either an import path (a string) or the converter function
+        self._entries = {}
+        if paths:
+            for name, path in paths.items():
+                if isinstance(path, six.string_types) and ':' not in path:
+                    raise ValueError(_ERR_BAD_PATH.format(path))
+                self._entries[name] = path
+
+    def __getitem__(self, name):
+        entry = self._entries[name]
+        if isinstance(entry, six.string_types):
+            module_name, func_name = entry.split(':')
+            entry = getattr(importlib.import_module(module_name), func_name)
+            self._entries[name] = entry
+        return entry
+
+    def __setitem__(self, name, converter):
+        self._entries[name] = converter
+
+    def __delitem__(self, name):
+        del self._entries[name]
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self._entries)
+
+    def is_loaded(self, name):
+        '''
+        Return whether the converter for ``name`` was already imported.
+
+        :raises: :exc:`KeyError` if ``name`` is not in the mapping.
+        '''
+        return not isinstance(self._entries[name], six.string_types)
+
+    def loaded(self):
+        '''
+        Return the converter functions that were already imported, without importing the others.
+
+        :rtype: list
+        '''
+        return [entry for entry in self._entries.values() if not isinstance(entry, six.string_types)]
+
+    def copy(self):
+        '''
+        Return a new :class:`LazyConverters` with the same converters. The copy imports a converter
+        module again (from :data:`sys.modules`) only if it was not loaded here.
+        '''
+        return LazyConverters(self._entries)
+
+
+_BENCHMARK_SCRIPT = '''
+import json, sys, timeit
+start = timeit.default_timer()
+import lychee
+imported = timeit.default_timer() - start
+modules = sorted(name for name in sys.modules if sys.modules[name] is not None)
+from lychee import converters
+from lychee.workflow import dispatch
+for mapping in (converters.INBOUND_CONVERTERS, converters.OUTBOUND_CONVERTERS,
+                dispatch.INBOUND_CONVERTERS):
+    for name in mapping:
+        mapping[name]
+print(json.dumps({'import': imported, 'converters': timeit.default_timer() - start - imported,
+                  'modules': modules}))
+'''
+
+
+def benchmark(python=None):
+    '''
+    Measure how long ``import lychee`` takes in a new Python process, and how much longer it takes
+    to import every converter after that.
+
+    :param str python: The Python interpreter to run. The default is :data:`sys.executable`.
+    :returns: A dictionary with the seconds for ``import lychee`` (``'import'``) and for the
+        converters (``'converters'``), and the names of the modules imported by ``import lychee``
+        (``'modules'``).
+    :rtype: dict
+    '''
+    import json
+    import os
+    import subprocess
+    import sys
+
+    # run with this copy of Lychee, even if another is installed
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+
+    output = subprocess.check_output([python or sys.executable, '-c', _BENCHMARK_SCRIPT], env=env)
+    return json.loads(output.decode('utf-8').strip().split('\n')[-1])
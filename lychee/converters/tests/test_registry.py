@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/converters/tests/test_registry.py
+# Purpose:                Tests for the "registry" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "registry" module.
+'''
+
+import pytest
+
+from lychee import converters
+from lychee.converters import registry
+from lychee.workflow import dispatch
+
+
+_MEI = 'lychee.converters.outbound.mei:convert'
+_MISSING = 'lychee.converters.outbound.does_not_exist:convert'
+
+
+class TestLazyConverters(object):
+
+    def test_lookup(self):
+        '''
+        The module is imported when the converter is looked up, not before.
+        '''
+        mapping = registry.LazyConverters({'mei': _MEI, 'missing': _MISSING})
+        assert 'missing' in mapping
+        assert ['mei', 'missing'] == sorted(mapping)
+        assert 2 == len(mapping)
+        assert not mapping.is_loaded('mei')
+        assert [] == mapping.loaded()
+
+        from lychee.converters.outbound import mei
+        assert mei.convert is mapping['mei']
+        assert mapping.is_loaded('mei')
+        assert [mei.convert] == mapping.loaded()
+        with pytest.raises(ImportError):
+            mapping['missing']  # pylint: disable=pointless-statement
+
+    def test_dict_interface(self):
+        '''
+        Assigning, deleting, and copying work like a dict, and a copy is independent.
+        '''
+        mapping = registry.LazyConverters({'mei': _MEI})
+        converter = lambda document, **kwargs: document
+        mapping['test'] = converter
+        assert mapping.is_loaded('test')
+        assert converter is mapping.get('test')
+        assert mapping.get('nothing') is None
+        with pytest.raises(KeyError):
+            mapping['nothing']  # pylint: disable=pointless-statement
+
+        copied = mapping.copy()
+        del mapping['test']
+        assert 'test' not in mapping
+        assert converter is copied['test']
+        assert not copied.is_loaded('mei')
+
+    def test_bad_path(self):
+        '''
+        An import path without a function name is an error.
+        '''
+        with pytest.raises(ValueError):
+            registry.LazyConverters({'mei': 'lychee.converters.outbound.mei'})
+
+    def test_registries(self):
+        '''
+        Every converter in the registries can be imported.
+        '''
+        for mapping in (converters.INBOUND_CONVERTERS, converters.OUTBOUND_CONVERTERS,
+                        dispatch.INBOUND_CONVERTERS):
+            for name in mapping:
+                assert callable(mapping[name])
+
+
+def test_benchmark():
+    '''
+    "import lychee" does not import the converters, and takes less time than importing them. This
+    compares the two times in the same process so it does not depend on how fast the computer is.
+    '''
+    actual = registry.benchmark()
+
+    for module in ('abjad', 'tatsu', 'lychee.converters.inbound.lilypond_parser',
+                   'lychee.converters.outbound.abjad', 'lychee.utils.lilypond_note_names'):
+        assert module not in actual['modules']
+    assert 'lychee.workflow.session' in actual['modules']
+    assert actual['import'] < actual['converters']
@@ -26,3 +26,5 @@
 # NOTE: the __init__ module is not built in the API
 
 from lychee.document.document import Document
+from lychee.document.document import (DURABILITY_NONE, DURABILITY_RENAME, DURABILITY_FULL,
+                                      DURABILITY_SETTINGS)
@@ -31,8 +31,13 @@ The Lychee-MEI specification is described in :ref:`lychee_mei`. You can find inf
 supported Lychee-MEI metadata headers in :ref:`mei_headers`.
 '''
 
+import hashlib
+import json
+import os
 import os.path
 import random
+import sqlite3
+from multiprocessing.pool import ThreadPool
 
 import six
 from six.moves import range
@@ -41,8 +46,11 @@ from lxml import etree
 
 import lychee
 from lychee import exceptions
+from lychee.document import search
 from lychee.logs import DOCUMENT_LOG as log
 from lychee.namespaces import mei, xlink, xml, lychee as lyns
+from lychee.utils import events
+from lychee.utils.files import write_atomically
 
 
 # translatable strings
@@ -61,6 +69,37 @@ _LY_VERSION_MISSING = 'Lychee-MEI file file is missing @ly:version'
 _LY_VERSION_NEWER = 'Lychee-MEI file was produced by a newer version of Lychee'
 _LY_VERSION_OLDER = 'Lychee-MEI file was produced by an unsupported version'
 _LY_VERSION_INVALID = 'Lychee-MEI file has invalid @ly:version'
+_ERR_INVALID_DURABILITY = 'Invalid durability setting: "{0}"'
+_ERR_SEARCH_WITHOUT_REPO = 'A search index requires a repository_path'
+
+
+# durability settings for Document.save_everything()
+DURABILITY_NONE = 'none'
+'''
+Write files in place, without a temporary file and without calling :func:`os.fsync`. This is the
+fastest setting, but a crash during a save may leave a truncated file.
+'''
+DURABILITY_RENAME = 'rename'
+'''
+Write each file to a temporary file in the same directory, then atomically rename it over the
+target. After a crash, every file is either the old or the new version, though the most recent
+changes may not have reached the disk.
+'''
+DURABILITY_FULL = 'full'
+'''
+As :const:`DURABILITY_RENAME`, but also :func:`os.fsync` each file before renaming it, and the
+repository directory once after all files in a save are renamed. This is the default.
+'''
+DURABILITY_SETTINGS = (DURABILITY_NONE, DURABILITY_RENAME, DURABILITY_FULL)
+
+# number of threads Document.prefetch_sections() uses by default
+DEFAULT_LOAD_WORKERS = 4
+
+# approximate bytes of memory used by one parsed lxml element, for Document.estimate_memory()
+ESTIMATED_ELEMENT_SIZE = 512
+
+# the cache of information Document needs on initialization; refer to _load_manifest()
+MANIFEST_FILE = 'manifest.json'
 
 
 def _check_xmlid_chars(xmlid):
@@ -157,16 +196,25 @@ def _ensure_score_order(score, order):
     return True
 
 
-def _save_out(this, to_here):
+def _save_out(this, to_here, durability=None):
     '''
     Take ``this`` :class:`Element` or :class:`ElementTree` and save ``to_here``.
 
     :param this: An element (tree) to save to a file.
     :type this: :class:`lxml.etree.Element` or :class:`lxml.etree.ElementTree`
     :param str to_here: The pathname in which to save the file.
+    :param str durability: One of the :const:`DURABILITY_SETTINGS`. Defaults to
+        :const:`DURABILITY_FULL`.
     :returns: ``None``
     :raises: :exc:`lychee.exceptions.CannotSaveError` if something messes up
+
+    Unless ``durability`` is :const:`DURABILITY_NONE`, the file is first written to a temporary
+    file in the same directory, then renamed to ``to_here``. This function never synchronizes the
+    directory itself; call :func:`_fsync_dir` once after saving all the files that belong together.
     '''
+    if durability is None:
+        durability = DURABILITY_FULL
+
     # get an ElementTree in "this" and the root Element in "root"
     if isinstance(this, etree._Element):  # pylint: disable=protected-access
         root = this
@@ -175,13 +223,46 @@ def _save_out(this, to_here):
         root = this.getroot()
     # make sure the root element has a proper @ly:version attribute
     root.set(lyns.VERSION, lychee.__version__)
+
     # finally, save it out
+    if DURABILITY_NONE == durability:
+        try:
+            this.write(to_here, encoding='UTF-8', pretty_print=True, xml_declaration=True)
+        except IOError:
+            raise exceptions.CannotSaveError(_SAVE_OUT_ERROR)
+        return
+
     try:
-        this.write(to_here, encoding='UTF-8', pretty_print=True, xml_declaration=True)
-    except IOError:
+        write_atomically(
+            to_here,
+            lambda temp_file: this.write(
+                temp_file, encoding='UTF-8', pretty_print=True, xml_declaration=True),
+            fsync=(DURABILITY_FULL == durability))
+    except (IOError, OSError):
         raise exceptions.CannotSaveError(_SAVE_OUT_ERROR)
 
 
+def _fsync_dir(dirname):
+    '''
+    Call :func:`os.fsync` on a directory so that the files just renamed into it are durable.
+
+    :param str dirname: The pathname of the directory.
+    :returns: ``None``
+
+    Some platforms (notably Windows) cannot open a directory; this function does nothing there.
+    '''
+    try:
+        dir_fd = os.open(dirname, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
 def _load_in(from_here, recover=None):
     '''
     Try to load an MEI/XML file at the path ``from_here``.
@@ -210,6 +291,24 @@ def _load_in(from_here, recover=None):
         raise exceptions.InvalidFileError(xse.args[0])
 
 
+def _parse_quietly(from_here):
+    '''
+    Try to parse an MEI/XML file at the path ``from_here``, for :meth:`Document.prefetch_sections`.
+
+    :param str from_here: The pathname from which to try parsing a file.
+    :returns: The MEI/XML document stored at ``from_here``, or ``None`` if it cannot be loaded.
+    :rtype: :class:`lxml.etree.ElementTree` or NoneType
+
+    This function runs in worker threads, so unlike :func:`_load_in` it neither logs nor checks
+    @ly:version. A file that cannot be loaded is simply not prefetched; loading it again with
+    :func:`_load_in` raises the proper exception.
+    '''
+    try:
+        return etree.parse(from_here, etree.XMLParser())
+    except (IOError, OSError, etree.XMLSyntaxError):
+        return None
+
+
 @log.wrap('info', 'check LMEI version attribute', 'action')
 def _check_version_attr(lmei, action):
     '''
@@ -436,6 +535,159 @@ def _init_sections_dict(all_files):
     return post
 
 
+def _hash_file(pathname):
+    '''
+    Compute the SHA-1 hash of a file's contents.
+
+    :param str pathname: The file to hash.
+    :returns: The hexadecimal digest.
+    :rtype: str
+    :raises: :exc:`IOError` or :exc:`OSError` if the file cannot be read.
+    '''
+    digest = hashlib.sha1()
+    with open(pathname, 'rb') as the_file:
+        for chunk in iter(lambda: the_file.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_stamp(pathname, previous=None):
+    '''
+    Make the manifest entry for a file: its size, modification time, and content hash.
+
+    :param str pathname: The file to describe.
+    :param list previous: The file's entry in an older manifest, if there is one. When the size and
+        modification time are unchanged, this entry is reused instead of hashing the file again.
+    :returns: A three-element list with the size, the modification time, and the SHA-1 hash.
+    :rtype: list
+    :raises: :exc:`IOError` or :exc:`OSError` if the file does not exist or cannot be read.
+    '''
+    stat = os.stat(pathname)
+    if previous is not None and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+        return previous
+    return [stat.st_size, stat.st_mtime, _hash_file(pathname)]
+
+
+def _stamp_matches(pathname, stamp):
+    '''
+    Determine whether a file still matches its manifest entry.
+
+    :param str pathname: The file to check.
+    :param list stamp: The file's entry in the manifest, as produced by :func:`_file_stamp`.
+    :returns: Whether the file is unchanged.
+    :rtype: bool
+
+    A different size means the file changed. The same size and modification time means the file is
+    unchanged. Otherwise the file is hashed, so that rewriting the same contents (for example, by
+    updating to a VCS changeset) does not make the manifest stale.
+    '''
+    try:
+        stat = os.stat(pathname)
+        if stat.st_size != stamp[0]:
+            return False
+        elif stat.st_mtime == stamp[1]:
+            return True
+        else:
+            return _hash_file(pathname) == stamp[2]
+    except (IOError, OSError):
+        return False
+
+
+def _load_manifest(repo_path):
+    '''
+    Load the repository's manifest file, if it exists and is still valid.
+
+    :param str repo_path: The repository's directory path.
+    :returns: The manifest, or ``None`` if the manifest is missing, corrupt, or stale.
+    :rtype: dict or NoneType
+
+    The manifest holds everything :class:`Document` learns from parsing "all_files.mei" and
+    "score.mei" on initialization. It is stale if it was written by another version of *Lychee*
+    or if one of the files describing the document's structure ("all_files.mei," "score.mei," and
+    "head.mei") changed since it was written. Changes to ``<section>`` files do not matter, since
+    they are not loaded on initialization.
+    '''
+    try:
+        with open(os.path.join(repo_path, MANIFEST_FILE), 'rb') as manifest_file:
+            manifest = json.loads(manifest_file.read().decode('utf-8'))
+    except (IOError, OSError, ValueError):
+        return None
+
+    try:
+        if manifest['lychee'] != lychee.__version__:
+            return None
+        files = manifest['files']
+        if 'all_files.mei' not in files:
+            return None
+        for filename in ('all_files.mei', 'score.mei', 'head.mei'):
+            if filename in files:
+                if not _stamp_matches(os.path.join(repo_path, filename), files[filename]):
+                    return None
+        # make sure the other fields are present
+        manifest['score_order']
+        manifest['sections']
+        manifest['head']
+    except (KeyError, TypeError, IndexError):
+        return None
+
+    return manifest
+
+
+def _save_manifest(repo_path, score_order, section_ids, head, previous=None):
+    '''
+    Write the repository's manifest file.
+
+    :param str repo_path: The repository's directory path.
+    :param score_order: The @xml:id of every ``<section>`` in the active score, in order.
+    :type score_order: list of str
+    :param section_ids: The @xml:id of every ``<section>`` in the document.
+    :type section_ids: list of str
+    :param str head: The pathname of the ``<meiHead>`` file, relative to ``repo_path``, or ``None``
+        if the ``<meiHead>`` is stored in "all_files.mei."
+    :param dict previous: The current manifest, if any, so unchanged files need not be hashed again.
+    :returns: The new manifest, or ``None`` if it could not be written.
+    :rtype: dict or NoneType
+
+    The manifest is only a cache, so failing to write it is not an error. Since every entry is
+    checked against the filesystem when the manifest is loaded, an outdated manifest is harmless.
+    It is only written by :meth:`Document.save_everything`, so opening a :class:`Document` never
+    changes the repository.
+    '''
+    old_files = {} if previous is None else previous.get('files', {})
+    files = {}
+    filenames = ['all_files.mei', 'score.mei']
+    if head is not None:
+        filenames.append(head)
+    filenames.extend('{}.mei'.format(xmlid) for xmlid in section_ids)
+    try:
+        for filename in filenames:
+            pathname = os.path.join(repo_path, filename)
+            if os.path.exists(pathname):
+                files[filename] = _file_stamp(pathname, old_files.get(filename))
+    except (IOError, OSError):
+        return None
+    if 'all_files.mei' not in files:
+        return None
+
+    manifest = {
+        'lychee': lychee.__version__,
+        'head': head,
+        'score_order': list(score_order),
+        'sections': sorted(section_ids),
+        'files': files,
+    }
+
+    try:
+        write_atomically(
+            os.path.join(repo_path, MANIFEST_FILE),
+            lambda temp_file: temp_file.write(
+                json.dumps(manifest, separators=(',', ':')).encode('utf-8')))
+    except (IOError, OSError):
+        return None
+
+    return manifest
+
+
 class Document(object):
     '''
     Object representing an MEI document. Use methods prefixed with ``get`` to obtain portions of
@@ -457,35 +709,125 @@ class Document(object):
     _APPROVED_HEAD_ELEMENTS = ('fileDesc', 'titleStmt', 'title', 'respStmt', 'arranger', 'author',
         'composer', 'editor', 'funder', 'librettist', 'lyricist', 'sponsor', 'pubStmt')
 
-    def __init__(self, repository_path=None):
+    def __init__(self, repository_path=None, durability=None, load_workers=None,
+                 search_index=False):
         '''
         :param str repository_path: Path to a directory in which the files for this :class:`Document`
             are or will be stored. The default of ``None`` will not save any files.
+        :param str durability: How hard :meth:`save_everything` should try to make sure its files
+            survive a crash. One of the :const:`DURABILITY_SETTINGS`; the default is
+            :const:`DURABILITY_FULL`.
+        :param int load_workers: The number of threads :meth:`prefetch_sections` uses to parse
+            ``<section>`` files. The default is :const:`DEFAULT_LOAD_WORKERS`.
+        :param bool search_index: Whether to keep the n-gram index of :mod:`lychee.document.search`
+            for this repository, updating it in :meth:`save_everything`.
+        :raises: :exc:`ValueError` if ``durability`` is not valid, or if ``search_index`` is true
+            without a ``repository_path``.
+        :raises: :exc:`sqlite3.Error` if the search index cannot be opened.
         '''
 
         # path to the Mercurial repository directory
         self._repo_path = repository_path
 
-        # file that indicates the other files in this repository
-        self._all_files_path = None
-        if self._repo_path is None:
-            self._all_files = _make_empty_all_files(None)
-        else:
-            self._all_files_path = os.path.join(self._repo_path, 'all_files.mei')
-            if os.path.exists(self._all_files_path):
-                self._all_files = etree.parse(self._all_files_path)
+        # how save_everything() writes files
+        if durability is None:
+            durability = DURABILITY_FULL
+        elif durability not in DURABILITY_SETTINGS:
+            raise ValueError(_ERR_INVALID_DURABILITY.format(durability))
+        self._durability = durability
+
+        # for prefetch_sections()
+        self._load_workers = DEFAULT_LOAD_WORKERS if load_workers is None else load_workers
+        # @xml:id to a parsed <section> file that get_section() has not returned yet
+        self._prefetched = {}
+        # whether a put_*() method was called since the last save_everything()
+        self._dirty = False
+        # @xml:id to the SectionEvents of that <section>; refer to get_section_events()
+        self._section_events = {}
+        # @xml:id to the SectionIndex of that <section>; refer to get_section_index()
+        self._section_indices = {}
+        # the result of estimate_memory(), or None when the elements held may have changed
+        self._memory_estimate = None
+
+        # the n-gram index updated by save_everything(); refer to get_search_index()
+        self._search = None
+        # whether the last update of the index failed; refer to is_search_index_stale()
+        self._search_stale = False
+        if search_index:
+            if self._repo_path is None:
+                raise ValueError(_ERR_SEARCH_WITHOUT_REPO)
+            self._search = search.SearchIndex(os.path.join(self._repo_path, search.INDEX_FILE))
+
+        with log.info('open document') as action:
+            # file that indicates the other files in this repository; when the manifest is valid,
+            # it is only parsed if required, through the "_all_files" property
+            self._all_files_path = None
+            self._all_files_tree = None
+            # the cached result of parsing "all_files.mei" and "score.mei"
+            self._manifest = None
+            if self._repo_path is None:
+                self._all_files = _make_empty_all_files(None)
+            else:
+                self._all_files_path = os.path.join(self._repo_path, 'all_files.mei')
+                if os.path.exists(self._all_files_path):
+                    self._manifest = _load_manifest(self._repo_path)
+                    if self._manifest is None:
+                        self._all_files = etree.parse(self._all_files_path)
+                else:
+                    self._all_files = _make_empty_all_files(self._all_files_path)
+
+            # the <score> element
+            self._score = None
+            # the <meiHead> element
+            self._head = None
+
+            if self._manifest is None:
+                # @xml:id to the <section> with that id
+                self._sections = _init_sections_dict(self._all_files)
+                # the order of <section> elements in the <score>, indicated with @xml:id
+                self._score_order = _load_score_order(self._repo_path, self._all_files)
+                self._head = self.get_head()
+                # opening never writes into the repository, so the manifest is only brought up to
+                # date by save_everything()
+                action.success('opened {num} sections by parsing', num=len(self._sections))
+
             else:
-                self._all_files = _make_empty_all_files(self._all_files_path)
-
-        # @xml:id to the <section> with that id
-        self._sections = _init_sections_dict(self._all_files)
-        # the <score> element
-        self._score = None
-        # the order of <section> elements in the <score>, indicated with @xml:id
-        self._score_order = _load_score_order(self._repo_path, self._all_files)
-        # the <meiHead> element
-        self._head = None
-        self._head = self.get_head()
+                self._sections = dict.fromkeys(self._manifest['sections'])
+                self._score_order = list(self._manifest['score_order'])
+                if self._manifest['head'] is not None:
+                    # the manifest guarantees the file is unchanged and has the right @ly:version
+                    try:
+                        head_path = os.path.join(self._repo_path, self._manifest['head'])
+                        self._head = etree.parse(head_path).getroot()
+                    except (IOError, OSError, etree.XMLSyntaxError):
+                        self._head = None
+                self._head = self.get_head()
+                action.success('opened {num} sections from the manifest', num=len(self._sections))
+
+    @property
+    def _all_files(self):
+        '''
+        The "all_files.mei" document, parsed on first access if :class:`Document` was initialized
+        from the manifest.
+        '''
+        if self._all_files_tree is None and self._all_files_path is not None:
+            self._all_files_tree = etree.parse(self._all_files_path)
+        return self._all_files_tree
+
+    @_all_files.setter
+    def _all_files(self, value):
+        '''
+        Set the "all_files.mei" document.
+        '''
+        self._all_files_tree = value
+
+    def _head_target(self):
+        '''
+        Return the @target of the ``<ptr>`` to the ``<meiHead>`` file, or ``None`` if the
+        ``<meiHead>`` is stored directly in "all_files.mei."
+        '''
+        ptr = self._all_files.find('./{}/{}[@targettype="head"]'.format(mei.MEI_HEAD, mei.PTR))
+        return None if ptr is None else ptr.get('target')
 
     def __enter__(self):
         '''
@@ -549,6 +891,15 @@ class Document(object):
         Note that the return value includes any file in the document. The files may not have been
         modified, and in fact may not even have been saved at all---they are simply part of this
         document.
+
+        Each file is written according to the ``durability`` setting given on initialization (refer
+        to :const:`DURABILITY_SETTINGS`). With :const:`DURABILITY_FULL`, the repository directory
+        is synchronized once, after all the files are written.
+
+        With a search index, the sections written are indexed again if their files changed. Since
+        the index is only a cache, failing to update it is not an error: the failure is logged, and
+        the index is marked stale (refer to :meth:`is_search_index_stale`) until a later save
+        brings every section up to date; refer to :meth:`update_search_index`.
         '''
 
         if self._repo_path is None:
@@ -569,7 +920,7 @@ class Document(object):
         # 1.) save the <meiHead> element
         if self._head is not None:
             head_path = os.path.join(self._repo_path, 'head.mei')
-            _save_out(self._head, head_path)
+            _save_out(self._head, head_path, durability=self._durability)
             saved_files.append(head_path)
             mei_head.append(_make_ptr('head', 'head.mei'))
 
@@ -581,7 +932,7 @@ class Document(object):
                 section_path = '{}.mei'.format(xmlid)  # path relative to "all_files.mei"
                 score.append(_make_ptr('section', section_path))
             score_path = os.path.join(self._repo_path, 'score.mei')
-            _save_out(score, score_path)
+            _save_out(score, score_path, durability=self._durability)
             saved_files.append(score_path)
             # put a <ptr> in "all_files"
             mei_elem.insert(0, _make_ptr('score', 'score.mei'))
@@ -595,7 +946,7 @@ class Document(object):
             saved_files.append(abs_section_path)
             if section is not None:
                 # assume this <section> was never loaded to begin with
-                _save_out(section, abs_section_path)
+                _save_out(section, abs_section_path, durability=self._durability)
         section_paths = sorted(section_paths)
         for each_path in section_paths:
             mei_elem.append(_make_ptr('section', each_path))
@@ -604,11 +955,167 @@ class Document(object):
         all_files.append(mei_head)
         all_files.append(mei_elem)
         self._all_files = all_files
-        _save_out(self._all_files, self._all_files_path)
+        _save_out(self._all_files, self._all_files_path, durability=self._durability)
         saved_files.append(self._all_files_path)
 
+        # 6.) make the renames durable, with one fsync for the whole save
+        if DURABILITY_FULL == self._durability:
+            _fsync_dir(self._repo_path)
+
+        # 7.) update the manifest, which is not part of the document so is not returned
+        self._manifest = _save_manifest(
+            self._repo_path,
+            self._score_order,
+            list(self._sections),
+            self._head_target(),
+            previous=self._manifest)
+
+        # 8.) update the search index for the sections just written, or for every section if an
+        #     earlier update failed
+        if self._search is not None:
+            section_ids = None
+            if not self._search_stale:
+                section_ids = [xmlid for xmlid, sect in self._sections.items() if sect is not None]
+            with log.info('update the search index after saving') as action:
+                try:
+                    self.update_search_index(section_ids)
+                    self._search_stale = False
+                except sqlite3.Error as exc:
+                    self._search_stale = True
+                    action.failure('the search index is stale: {exc!r}', exc=exc)
+
+        self._memory_estimate = None
+        self._dirty = False
         return saved_files
 
+    def get_search_index(self):
+        '''
+        Return the n-gram index of this repository, if this :class:`Document` was initialized with
+        ``search_index=True``.
+
+        :rtype: :class:`lychee.document.search.SearchIndex` or ``None``
+        '''
+        return self._search
+
+    def is_search_index_stale(self):
+        '''
+        Return whether the search index missed changes because :meth:`save_everything` could not
+        update it. The next :meth:`save_everything` tries again for every section.
+
+        :rtype: bool
+        '''
+        return self._search_stale
+
+    @log.wrap('info', 'update the search index', 'action')
+    def update_search_index(self, section_ids=None, action=None):
+        '''
+        Index the saved sections whose files changed since they were last indexed, and remove the
+        sections that are no longer in this document from the search index.
+
+        :param section_ids: The @xml:id of the sections to check. The default is every section in
+            the document, which hashes every ``<section>`` file, so an index that missed some
+            changes (for example, made by another program) is brought up to date.
+        :type section_ids: list of str
+        :returns: The number of sections indexed. Without a search index, this is always ``0``.
+        :rtype: int
+        :raises: :exc:`sqlite3.Error` if the index cannot be updated.
+        '''
+        if self._search is None:
+            return 0
+        if section_ids is None:
+            section_ids = list(self._sections)
+
+        indexed = self._search.digests()
+        files = {} if self._manifest is None else self._manifest['files']
+        updated = 0
+        for xmlid in section_ids:
+            filename = '{}.mei'.format(xmlid)
+            if filename in files:
+                digest = files[filename][2]
+            else:
+                try:
+                    digest = _hash_file(os.path.join(self._repo_path, filename))
+                except (IOError, OSError):
+                    continue
+            if indexed.get(xmlid) != digest:
+                self._search.put_section(
+                    xmlid, digest, self.get_section(xmlid), self.get_section_events(xmlid))
+                updated += 1
+
+        for xmlid in indexed:
+            if xmlid not in self._sections:
+                self._search.forget_section(xmlid)
+
+        action.success('indexed {num} sections', num=updated)
+        return updated
+
+    def is_dirty(self):
+        '''
+        Return whether this :class:`Document` has changes that :meth:`save_everything` has not yet
+        written.
+
+        :rtype: bool
+        '''
+        return self._dirty
+
+    def estimate_memory(self):
+        '''
+        Estimate how much memory is used by the parts of the document held in this instance.
+
+        :returns: The approximate number of bytes, counting :const:`ESTIMATED_ELEMENT_SIZE` for
+            every element in the ``<meiHead>``, the cached ``<score>``, and the ``<section>``
+            elements that are loaded or prefetched.
+        :rtype: int
+
+        Counting the elements takes time proportional to their number, so the estimate is kept
+        until an element is put, loaded, or prefetched, or the document is saved. Elements modified
+        in place are not counted again until then.
+        '''
+        if self._memory_estimate is not None:
+            return self._memory_estimate
+
+        roots = {}
+        trees = [self._head, self._score]
+        trees.extend(six.itervalues(self._sections))
+        trees.extend(six.itervalues(self._prefetched))
+        for tree in trees:
+            if tree is None:
+                continue
+            elif isinstance(tree, etree._ElementTree):  # pylint: disable=protected-access
+                root = tree.getroot()
+            else:
+                root = tree.getroottree().getroot()
+            roots[id(root)] = root
+
+        num_elements = 0
+        for root in six.itervalues(roots):
+            num_elements += sum(1 for _ in root.iter())
+        self._memory_estimate = num_elements * ESTIMATED_ELEMENT_SIZE
+        return self._memory_estimate
+
+    def get_durability(self):
+        '''
+        Return the durability setting used by :meth:`save_everything`.
+
+        :returns: One of the :const:`DURABILITY_SETTINGS`.
+        :rtype: str
+        '''
+        return self._durability
+
+    def set_durability(self, durability):
+        '''
+        Change the durability setting used by :meth:`save_everything`.
+
+        :param str durability: One of the :const:`DURABILITY_SETTINGS`.
+        :raises: :exc:`ValueError` if ``durability`` is not valid.
+
+        Interactive sessions may prefer :const:`DURABILITY_RENAME`, which avoids waiting for the
+        disk on every save but still never leaves a partially-written file.
+        '''
+        if durability not in DURABILITY_SETTINGS:
+            raise ValueError(_ERR_INVALID_DURABILITY.format(durability))
+        self._durability = durability
+
     def get_head(self):
         '''
         Load and return the MEI header metadata.
@@ -632,10 +1139,12 @@ class Document(object):
                 # the Document's probably empty; we'll return the <meiHead> we have, and put_head()
                 # can save it with a <ptr> later
                 self._head = mei_head
+                self._memory_estimate = None
             else:
                 # otherwise we can load the file specified in the <ptr>
                 try:
                     self._head = _load_in(os.path.join(self._repo_path, ptr.get('target'))).getroot()
+                    self._memory_estimate = None
                 except exceptions.FileNotFoundError:
                     raise exceptions.HeaderNotFoundError(_ERR_MISSING_MEIHEAD)
                 except exceptions.InvalidFileError:
@@ -663,6 +1172,8 @@ class Document(object):
                                                   xlink.ACTUATE: 'onRequest',
                                                   xlink.SHOW: 'embed'}))
         self._head = new_head
+        self._memory_estimate = None
+        self._dirty = True
 
     def get_from_head(self, what):
         '''
@@ -751,10 +1262,12 @@ class Document(object):
         if self._score is not None and _ensure_score_order(self._score, self._score_order):
             return self._score
         else:
+            self.prefetch_sections(self._score_order)
             score = etree.Element(mei.SCORE)
             for xmlid in self._score_order:
                 score.append(self.get_section(xmlid))
             self._score = score
+            self._memory_estimate = None
             return score
 
     def put_score(self, new_music):
@@ -775,6 +1288,7 @@ class Document(object):
         '''
 
         self._score_order = []
+        self._dirty = True
         for section in new_music.findall('./{}'.format(mei.SECTION)):
             xmlid = self.put_section(section)
             self._score_order.append(xmlid)
@@ -805,6 +1319,9 @@ class Document(object):
             return self._sections[section_id]
         elif self._repo_path is None:
             raise exceptions.SectionNotFoundError(_SECTION_NOT_FOUND.format(xmlid=section_id))
+        elif section_id in self._prefetched:
+            self._memory_estimate = None
+            return _check_version_attr(self._prefetched.pop(section_id)).getroot()
         else:
             try:
                 return _load_in(os.path.join(self._repo_path, section_id + '.mei')).getroot()
@@ -834,8 +1351,111 @@ class Document(object):
             new_section.set(xml.ID, xmlid)
 
         self._sections[xmlid] = new_section
+        self._prefetched.pop(xmlid, None)
+        self._section_events.pop(xmlid, None)
+        self._section_indices.pop(xmlid, None)
+        self._memory_estimate = None
+        self._dirty = True
         return xmlid
 
+    def get_section_events(self, section_id):
+        '''
+        Return the columnar event tables for the layers of a section, building them the first time.
+
+        :param str section_id: The @xml:id of the ``<section>``.
+        :returns: The tables, which are kept until the section is replaced with :meth:`put_section`.
+        :rtype: :class:`lychee.utils.events.SectionEvents`
+        :raises: As for :meth:`get_section`.
+
+        .. note:: If you modify a ``<section>`` in place, call :meth:`put_section` with it again so
+            its tables are built again.
+
+        The tables are used by :meth:`get_section_index` and the search index. The outbound
+        conversions build their own, since they do not share a :class:`Document`.
+        '''
+        if section_id.startswith('#'):
+            section_id = section_id[1:]
+        if section_id not in self._section_events:
+            self._section_events[section_id] = events.SectionEvents.from_section(
+                self.get_section(section_id))
+        return self._section_events[section_id]
+
+    def get_section_index(self, section_id):
+        '''
+        Return the index that finds the elements of a section by measure number and time, building
+        it the first time.
+
+        :param str section_id: The @xml:id of the ``<section>``.
+        :returns: The index, which is kept until the section is replaced with :meth:`put_section`.
+        :rtype: :class:`lychee.utils.events.SectionIndex`
+        :raises: As for :meth:`get_section`.
+
+        The index is built from the tables of :meth:`get_section_events`, and refers to the
+        elements of the ``<section>``, so every query returns the same element objects until the
+        section is replaced.
+        '''
+        if section_id.startswith('#'):
+            section_id = section_id[1:]
+        if section_id not in self._section_indices:
+            section_events = self.get_section_events(section_id)
+            self._section_indices[section_id] = events.SectionIndex(
+                self.get_section(section_id), section_events)
+        return self._section_indices[section_id]
+
+    @log.wrap('info', 'prefetch sections', 'action')
+    def prefetch_sections(self, section_ids, workers=None, action=None):
+        '''
+        Parse the files of many ``<section>`` elements concurrently, so that the following calls to
+        :meth:`get_section` for those sections need not wait for the parser.
+
+        :param section_ids: The @xml:id attributes of the ``<section>`` elements to load.
+        :type section_ids: list of str
+        :param int workers: The number of threads to use. The default is the ``load_workers``
+            argument given on initialization.
+        :returns: The number of sections prefetched.
+        :rtype: int
+
+        Sections that are already in memory, or were already prefetched, are skipped. Files that
+        cannot be loaded are also skipped, so that :meth:`get_section` raises the usual exception
+        when they are requested. Each prefetched section is returned by :meth:`get_section` only
+        once; after that, it is loaded from its file again, as usual.
+        '''
+        if self._repo_path is None:
+            return 0
+
+        if workers is None:
+            workers = self._load_workers
+
+        to_load = []
+        for xmlid in section_ids:
+            if xmlid.startswith('#'):
+                xmlid = xmlid[1:]
+            if (self._sections.get(xmlid) is None and xmlid not in self._prefetched
+                    and xmlid not in to_load):
+                to_load.append(xmlid)
+        pathnames = [os.path.join(self._repo_path, xmlid + '.mei') for xmlid in to_load]
+
+        if workers > 1 and len(pathnames) > 1:
+            pool = ThreadPool(min(workers, len(pathnames)))
+            try:
+                loaded = pool.map(_parse_quietly, pathnames)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            loaded = [_parse_quietly(pathname) for pathname in pathnames]
+
+        num_loaded = 0
+        for xmlid, tree in zip(to_load, loaded):
+            if tree is not None:
+                self._prefetched[xmlid] = tree
+                self._memory_estimate = None
+                num_loaded += 1
+
+        action.success('prefetched {num} sections with {workers} workers',
+                       num=num_loaded, workers=workers)
+        return num_loaded
+
     def move_section_to(self, xmlid, position):
         '''
         Move a ``<section>`` to another position in the score.
@@ -866,3 +1486,4 @@ class Document(object):
         score_order.insert(position, xmlid)
 
         self._score_order = score_order
+        self._dirty = True
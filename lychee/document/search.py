@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/document/search.py
+# Purpose:                An n-gram index for finding melodic and rhythmic patterns.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Find melodic and rhythmic patterns in a repository with an n-gram index.
+
+Finding a melody in a repository would otherwise mean parsing every ``<section>`` for every query.
+A :class:`SearchIndex` keeps an inverted index, in an SQLite database stored with the repository's
+files as :const:`INDEX_FILE`, from every n-gram of the melody in every ``<layer>`` to where it
+occurs.
+
+The melody of a layer is its notes and chords in order, where a chord counts as its lowest note.
+Rests and other elements are skipped. Two sequences are indexed for every melody:
+
+- the intervals, in semitones from each note to the next, so that a transposed melody matches; and
+- the rhythm, as the duration of each note divided by the duration of the previous note, so that
+  the same rhythm in augmentation or diminution matches.
+
+Every run of :const:`NGRAM_LENGTH` consecutive intervals, and of as many duration ratios, is an
+n-gram. A pattern with at least that many intervals is found by intersecting the positions of all
+its n-grams, so answering a query does not parse any ``<section>``:
+
+>>> doc = Document(repo_dir, search_index=True)
+>>> doc.get_search_index().search(intervals=search.intervals([60, 62, 64, 60]))
+
+A :class:`~lychee.document.Document` made with ``search_index=True`` updates the index when
+:meth:`~lychee.document.Document.save_everything` writes a section, indexing again only the sections
+whose files changed. Use :func:`search_corpus` to search many repositories.
+'''
+
+from collections import namedtuple
+import contextlib
+import fractions
+import json
+import os.path
+import sqlite3
+
+from lychee.namespaces import xml
+from lychee.utils import events
+
+
+INDEX_FILE = 'search.sqlite'
+'''
+The name of the index database in a repository directory. The index is a cache, like the
+:const:`~lychee.document.document.MANIFEST_FILE`, so it is never among the files returned by
+:meth:`~lychee.document.Document.save_everything`, and must not be given to the VCS ``add`` step.
+'''
+
+NGRAM_LENGTH = 3
+'''The number of intervals, or duration ratios, in each n-gram.'''
+
+INTERVALS = 'i'
+'''The kind of n-gram made of intervals.'''
+RHYTHM = 'r'
+'''The kind of n-gram made of duration ratios.'''
+
+# stored in the database; an index with other values is emptied and built again
+_INFO = {'version': '1', 'ngram_length': str(NGRAM_LENGTH)}
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)',
+    'CREATE TABLE IF NOT EXISTS sections (section TEXT PRIMARY KEY, digest TEXT)',
+    'CREATE TABLE IF NOT EXISTS layers ('
+    'id INTEGER PRIMARY KEY, section TEXT, staff TEXT, layer TEXT, ids TEXT, measures TEXT)',
+    'CREATE INDEX IF NOT EXISTS layers_section ON layers (section)',
+    'CREATE TABLE IF NOT EXISTS grams (gram TEXT, layer INTEGER, position INTEGER)',
+    'CREATE INDEX IF NOT EXISTS grams_gram ON grams (gram)',
+    'CREATE INDEX IF NOT EXISTS grams_layer ON grams (layer)',
+)
+_TABLES = ('info', 'sections', 'layers', 'grams')
+# the duration ratio of a note without a duration, which no query matches
+_NO_RATIO = '?'
+
+_ERR_NO_PATTERN = 'Search for an interval or rhythm pattern'
+_ERR_SHORT_PATTERN = 'A search pattern must have at least {0} intervals or ratios'
+_ERR_MISMATCHED = 'The interval and rhythm patterns must be the same length'
+
+
+class SearchHit(namedtuple('SearchHit', ('section', 'staff', 'layer', 'measure', 'ids'))):
+    '''
+    Where a pattern was found.
+
+    :ivar str section: The @xml:id of the ``<section>``.
+    :ivar str staff: The @n of the ``<staff>``.
+    :ivar str layer: The @n of the ``<layer>``.
+    :ivar int measure: The number of the measure with the first note, as from
+        :class:`lychee.utils.events.SectionIndex`.
+    :ivar ids: The @xml:id of every note and chord in the pattern, in order, or ``None`` for those
+        without one.
+    :vartype ids: list of str
+    '''
+    __slots__ = ()
+
+
+def intervals(pitches):
+    '''
+    Make an interval pattern from a melody.
+
+    :param pitches: The MIDI key number of every note, in order.
+    :type pitches: list of int
+    :returns: The semitones from each note to the next.
+    :rtype: list of int
+    '''
+    return [second - first for first, second in zip(pitches, pitches[1:])]
+
+
+def rhythm(durations):
+    '''
+    Make a rhythm pattern from a melody.
+
+    :param durations: The duration of every note, in order, as numbers with the same unit.
+    :type durations: list of int or :class:`fractions.Fraction`
+    :returns: The duration of each note divided by the duration of the previous note.
+    :rtype: list of :class:`fractions.Fraction`
+    '''
+    return [
+        fractions.Fraction(second) / fractions.Fraction(first)
+        for first, second in zip(durations, durations[1:])]
+
+
+def _ratio(first, second):
+    '''
+    Return the duration ratio between two durations in ticks, as stored in an n-gram.
+    '''
+    if first <= 0 or second <= 0:
+        return _NO_RATIO
+    return str(fractions.Fraction(second, first))
+
+
+def _gram(kind, values):
+    '''
+    Return the key of an n-gram.
+    '''
+    return '{0}:{1}'.format(kind, ','.join(str(value) for value in values))
+
+
+def melodies(m_section, section_events=None):
+    '''
+    Find the melody of every ``<layer>`` in a ``<section>``.
+
+    :param m_section: The ``<section>``.
+    :type m_section: :class:`lxml.etree.Element`
+    :param section_events: The tables for ``m_section``, with pitches. They are built if omitted.
+    :type section_events: :class:`lychee.utils.events.SectionEvents`
+    :returns: For every layer in order, the @n of the ``<staff>`` and ``<layer>``, then the pitch,
+        the duration in ticks, the @xml:id, and the measure number of every note and chord.
+    :rtype: list of 6-tuple of str, str, and four lists
+    '''
+    if section_events is None:
+        section_events = events.SectionEvents.from_section(m_section)
+
+    post = []
+    for m_staff, m_layer, table, numbered in events.number_measures(
+            m_section, section_events, events.meter(m_section)):
+        elems = m_layer.findall('*')
+        measure_of = [0] * len(table)
+        for number, start, stop in numbered:
+            measure_of[start:stop] = [number] * (stop - start)
+
+        kind = table.column('kind')
+        pitch = table.column('pitch')
+        duration = table.column('duration')
+        notes = [
+            i for i in range(len(table))
+            if kind[i] in (events.NOTE, events.CHORD) and pitch[i] >= 0]
+        post.append((
+            m_staff.get('n'),
+            m_layer.get('n'),
+            [int(pitch[i]) for i in notes],
+            [int(duration[i]) for i in notes],
+            [elems[i].get(xml.ID) for i in notes],
+            [measure_of[i] for i in notes]))
+    return post
+
+
+class SearchIndex(object):
+    '''
+    The n-gram index of one repository.
+
+    The index is a cache. When its database cannot be read or written, :exc:`sqlite3.Error` is
+    raised, and the database may be deleted to build it again.
+    '''
+
+    def __init__(self, pathname):
+        '''
+        :param str pathname: The pathname of the database, which is created if it does not exist.
+        '''
+        self._pathname = pathname
+        with self._connect() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            if dict(conn.execute('SELECT key, value FROM info')) != _INFO:
+                for table in _TABLES:
+                    conn.execute('DELETE FROM {0}'.format(table))
+                conn.executemany('INSERT INTO info VALUES (?, ?)', list(_INFO.items()))
+
+    @contextlib.contextmanager
+    def _connect(self):
+        '''
+        Open the database for one transaction, which is committed if the block succeeds and rolled
+        back if it raises.
+        '''
+        conn = sqlite3.connect(self._pathname)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def digests(self):
+        '''
+        Return the digest of the file of every indexed section, as given to :meth:`put_section`.
+
+        :returns: A dictionary from the @xml:id of every indexed ``<section>`` to its digest.
+        :rtype: dict
+        '''
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT section, digest FROM sections'))
+
+    def put_section(self, section_id, digest, m_section, section_events=None):
+        '''
+        Index a ``<section>``, replacing what was indexed for it before.
+
+        :param str section_id: The @xml:id of the ``<section>``.
+        :param str digest: The digest of the section's file, so that :meth:`digests` can tell
+            whether it changed since.
+        :param m_section: The ``<section>``.
+        :type m_section: :class:`lxml.etree.Element`
+        :param section_events: As for :func:`melodies`.
+        '''
+        layers = melodies(m_section, section_events)
+        with self._connect() as conn:
+            self._forget(conn, section_id)
+            conn.execute('INSERT INTO sections VALUES (?, ?)', (section_id, digest))
+            for staff_n, layer_n, pitches, durations, ids, measures in layers:
+                cursor = conn.execute(
+                    'INSERT INTO layers (section, staff, layer, ids, measures) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (section_id, staff_n, layer_n, json.dumps(ids), json.dumps(measures)))
+                layer_id = cursor.lastrowid
+
+                steps = intervals(pitches)
+                ratios = [_ratio(first, second) for first, second in zip(durations, durations[1:])]
+                conn.executemany('INSERT INTO grams VALUES (?, ?, ?)', [
+                    (_gram(kind, values[position:position + NGRAM_LENGTH]), layer_id, position)
+                    for kind, values in ((INTERVALS, steps), (RHYTHM, ratios))
+                    for position in range(len(values) - NGRAM_LENGTH + 1)])
+
+    @staticmethod
+    def _forget(conn, section_id):
+        '''
+        Remove a section from the index, in an open transaction.
+        '''
+        conn.execute(
+            'DELETE FROM grams WHERE layer IN (SELECT id FROM layers WHERE section = ?)',
+            (section_id,))
+        conn.execute('DELETE FROM layers WHERE section = ?', (section_id,))
+        conn.execute('DELETE FROM sections WHERE section = ?', (section_id,))
+
+    def forget_section(self, section_id):
+        '''
+        Remove a ``<section>`` from the index.
+
+        :param str section_id: The @xml:id of the ``<section>``.
+        '''
+        with self._connect() as conn:
+            self._forget(conn, section_id)
+
+    def search(self, intervals=None, rhythm=None):  # pylint: disable=redefined-outer-name
+        '''
+        Find a melodic pattern, a rhythmic pattern, or both at once.
+
+        :param intervals: The semitones between consecutive notes, as from :func:`intervals`.
+        :type intervals: list of int
+        :param rhythm: The ratios between consecutive durations, as from :func:`rhythm`.
+        :type rhythm: list of :class:`fractions.Fraction`
+        :returns: Every place the pattern occurs, ordered by when the layers were indexed and then
+            by position in the layer.
+        :rtype: list of :class:`SearchHit`
+        :raises: :exc:`ValueError` if there is no pattern, if a pattern has fewer than
+            :const:`NGRAM_LENGTH` values, or if both are given with different lengths.
+        '''
+        patterns = []
+        if intervals is not None:
+            patterns.append((INTERVALS, [int(value) for value in intervals]))
+        if rhythm is not None:
+            patterns.append((RHYTHM, [fractions.Fraction(value) for value in rhythm]))
+        if not patterns:
+            raise ValueError(_ERR_NO_PATTERN)
+        length = len(patterns[0][1])
+        if any(len(values) != length for _, values in patterns):
+            raise ValueError(_ERR_MISMATCHED)
+        elif length < NGRAM_LENGTH:
+            raise ValueError(_ERR_SHORT_PATTERN.format(NGRAM_LENGTH))
+
+        with self._connect() as conn:
+            # (layer ID, position of the first interval) for every place all the n-grams match
+            found = None
+            for kind, values in patterns:
+                for offset in range(length - NGRAM_LENGTH + 1):
+                    gram = _gram(kind, values[offset:offset + NGRAM_LENGTH])
+                    here = set(
+                        (layer_id, position - offset) for layer_id, position in conn.execute(
+                            'SELECT layer, position FROM grams WHERE gram = ?', (gram,)))
+                    found = here if found is None else found & here
+                    if not found:
+                        return []
+
+            layers = {}
+            post = []
+            for layer_id, start in sorted(found):
+                if layer_id not in layers:
+                    layers[layer_id] = conn.execute(
+                        'SELECT section, staff, layer, ids, measures FROM layers WHERE id = ?',
+                        (layer_id,)).fetchone()
+                section_id, staff_n, layer_n, ids, measures = layers[layer_id]
+                post.append(SearchHit(
+                    section_id,
+                    staff_n,
+                    layer_n,
+                    json.loads(measures)[start],
+                    json.loads(ids)[start:start + length + 1]))
+            return post
+
+
+def search_corpus(repo_dirs, intervals=None, rhythm=None):  # pylint: disable=redefined-outer-name
+    '''
+    Search the index of every repository in a corpus, as for :meth:`SearchIndex.search`.
+
+    :param repo_dirs: The repository directories. Those without an index are skipped.
+    :type repo_dirs: list of str
+    :returns: The directory and the hit, for every hit, in the order of ``repo_dirs``.
+    :rtype: list of 2-tuple of str and :class:`SearchHit`
+    :raises: :exc:`ValueError` as for :meth:`SearchIndex.search`.
+    '''
+    post = []
+    for repo_dir in repo_dirs:
+        pathname = os.path.join(repo_dir, INDEX_FILE)
+        if os.path.exists(pathname):
+            hits = SearchIndex(pathname).search(intervals=intervals, rhythm=rhythm)
+            post.extend((repo_dir, hit) for hit in hits)
+    return post
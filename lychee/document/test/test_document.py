@@ -32,6 +32,7 @@ import inspect
 import os
 import os.path
 import shutil
+import sqlite3
 import tempfile
 import unittest
 
@@ -434,6 +435,29 @@ class TestSaveAndLoad(DocumentTestCase):
             document._save_out(tree, to_here)
         assert document._SAVE_OUT_ERROR == err.value[0]
 
+    def test__save_out_4(self):
+        '''
+        With any durability setting, the file is saved and no temporary file is left behind.
+        '''
+        to_here = os.path.join(self.repo_dir, 'something.mei')
+        for durability in document.DURABILITY_SETTINGS:
+            document._save_out(etree.Element('something'), to_here, durability=durability)
+            assert ['all_files.mei', 'something.mei'] == sorted(os.listdir(self.repo_dir))
+            assert etree.parse(to_here).getroot().tag == 'something'
+
+    def test__save_out_5(self):
+        '''
+        When the rename fails, the temporary file is removed and the original file is unchanged.
+        '''
+        to_here = os.path.join(self.repo_dir, 'something.mei')
+        document._save_out(etree.Element('something'), to_here)
+        with mock.patch('lychee.utils.files._replace') as mock_replace:
+            mock_replace.side_effect = OSError('lol')
+            with pytest.raises(exceptions.CannotSaveError):
+                document._save_out(etree.Element('different'), to_here)
+        assert ['all_files.mei', 'something.mei'] == sorted(os.listdir(self.repo_dir))
+        assert etree.parse(to_here).getroot().tag == 'something'
+
     @mock.patch('lychee.document.document._check_version_attr')
     @mock.patch('lxml.etree.XMLParser')
     @mock.patch('lxml.etree.parse')
@@ -1250,7 +1274,8 @@ class TestSaveLoadEverything(DocumentTestCase):
 
         self.assertEqual(len(save_out_calls), mock_save_out.call_count)
         for each_call in save_out_calls:
-            mock_save_out.assert_any_call(each_call[0], each_call[1])
+            mock_save_out.assert_any_call(
+                each_call[0], each_call[1], durability=document.DURABILITY_FULL)
 
         return actual
 
@@ -1295,6 +1320,7 @@ class TestSaveLoadEverything(DocumentTestCase):
         head = etree.parse(os.path.join(self.path_to_here, 'input_meiHead.mei'))
         files = self.test_save_template_nomock(head=head, expected=saved_out)
         listdir = os.listdir(os.path.dirname(files[0]))
+        listdir.remove(document.MANIFEST_FILE)
         six.assertCountEqual(self, saved_out, listdir)
         for each_file in files:
             if each_file.endswith('all_files.mei'):
@@ -1326,6 +1352,7 @@ class TestSaveLoadEverything(DocumentTestCase):
         saved_out = ['all_files.mei', '1.mei', '2.mei', '3.mei']
         files = self.test_save_template_nomock(sections=sections, expected=saved_out)
         listdir = os.listdir(os.path.dirname(files[0]))
+        listdir.remove(document.MANIFEST_FILE)
         six.assertCountEqual(self, saved_out, listdir)
         for each_file in files:
             if each_file.endswith('all_files.mei'):
@@ -1371,6 +1398,7 @@ class TestSaveLoadEverything(DocumentTestCase):
         files = self.test_save_template_nomock(sections=sections, score_order=['1', '2', '1'],
                                                expected=saved_out)
         listdir = os.listdir(os.path.dirname(files[0]))
+        listdir.remove(document.MANIFEST_FILE)
         six.assertCountEqual(self, saved_out, listdir)
         for each_file in files:
             if each_file.endswith('all_files.mei'):
@@ -1425,6 +1453,7 @@ class TestSaveLoadEverything(DocumentTestCase):
         files = self.test_save_template_nomock(sections=sections, score_order=['1', '2', '1'],
                                                head=head, expected=saved_out)
         listdir = os.listdir(os.path.dirname(files[0]))
+        listdir.remove(document.MANIFEST_FILE)
         six.assertCountEqual(self, saved_out, listdir)
         for each_file in files:
             if each_file.endswith('all_files.mei'):
@@ -1459,6 +1488,37 @@ class TestSaveLoadEverything(DocumentTestCase):
                                 expected=['1.mei', '2.mei', '3.mei', 'all_files.mei'],
                                 save_out_calls=[])
 
+    @mock.patch('lychee.document.document._fsync_dir')
+    def test_save_8a(self, mock_fsync_dir):
+        '''
+        With the default durability, the repository directory is synchronized once per save.
+        '''
+        self.doc._sections = {'1': etree.Element(mei.SECTION), '2': etree.Element(mei.SECTION)}
+        self.doc._score_order = ['1', '2']
+        self.doc.save_everything()
+        mock_fsync_dir.assert_called_once_with(self.repo_dir)
+
+    @mock.patch('lychee.document.document._fsync_dir')
+    def test_save_8b(self, mock_fsync_dir):
+        '''
+        With weaker durability, the repository directory is never synchronized.
+        '''
+        for durability in (document.DURABILITY_NONE, document.DURABILITY_RENAME):
+            self.doc.set_durability(durability)
+            self.doc._sections = {'1': etree.Element(mei.SECTION)}
+            self.doc.save_everything()
+        assert 0 == mock_fsync_dir.call_count
+
+    def test_durability_invalid(self):
+        '''
+        Invalid durability settings are refused.
+        '''
+        with pytest.raises(ValueError):
+            document.Document(self.repo_dir, durability='sometimes')
+        with pytest.raises(ValueError):
+            self.doc.set_durability('sometimes')
+        assert document.DURABILITY_FULL == self.doc.get_durability()
+
 
 class TestGetFromPutInHead(DocumentTestCase):
     '''
@@ -1512,6 +1572,352 @@ class TestGetFromPutInHead(DocumentTestCase):
         assert document._PLACEHOLDER_TITLE == actual.text
 
 
+class TestPrefetchSections(DocumentTestCase):
+    '''
+    Tests for Document.prefetch_sections().
+    '''
+
+    def setUp(self):
+        '''
+        Save a Document with three sections in the score, then open it again.
+        '''
+        DocumentTestCase.setUp(self)
+        self.ids = []
+        for i in range(3):
+            xmlid = self.doc.put_section(etree.Element(mei.SECTION, {'n': str(i)}))
+            self.doc.move_section_to(xmlid, i)
+            self.ids.append(xmlid)
+        self.doc.save_everything()
+        self.doc = document.Document(self.repo_dir)
+
+    def test_prefetch(self):
+        '''
+        All sections are parsed, then get_section() returns each of them once.
+        '''
+        assert 3 == self.doc.prefetch_sections(self.ids, workers=3)
+        with mock.patch('lychee.document.document._load_in') as mock_load_in:
+            for i, xmlid in enumerate(self.ids):
+                assert str(i) == self.doc.get_section(xmlid).get('n')
+        assert 0 == mock_load_in.call_count
+        assert {} == self.doc._prefetched
+
+    def test_skipped(self):
+        '''
+        Sections in memory and missing files are not prefetched.
+        '''
+        self.doc.put_section(etree.Element(mei.SECTION, {xml.ID: self.ids[0]}))
+        os.remove(os.path.join(self.repo_dir, '{}.mei'.format(self.ids[1])))
+        assert 1 == self.doc.prefetch_sections(self.ids + ['Sme-s-m-l-e1234567'], workers=2)
+        assert [self.ids[2]] == list(self.doc._prefetched)
+        with pytest.raises(exceptions.SectionNotFoundError):
+            self.doc.get_section(self.ids[1])
+
+    def test_put_section_discards(self):
+        '''
+        Replacing a section discards its prefetched file.
+        '''
+        self.doc.prefetch_sections(self.ids)
+        replacement = etree.Element(mei.SECTION, {xml.ID: self.ids[1], 'n': 'new'})
+        self.doc.put_section(replacement)
+        assert replacement is self.doc.get_section(self.ids[1])
+        assert self.ids[1] not in self.doc._prefetched
+
+    def test_get_score(self):
+        '''
+        get_score() prefetches the sections in the score, with the configured number of workers.
+        '''
+        doc = document.Document(self.repo_dir, load_workers=2)
+        with mock.patch('lychee.document.document.ThreadPool', wraps=document.ThreadPool) as pool:
+            score = doc.get_score()
+        pool.assert_called_once_with(2)
+        assert ['0', '1', '2'] == [section.get('n') for section in score]
+
+
+class TestDirtyAndMemory(DocumentTestCase):
+    '''
+    Tests for Document.is_dirty() and Document.estimate_memory().
+    '''
+
+    def test_dirty(self):
+        '''
+        The Document is dirty after put_section(), and clean after save_everything().
+        '''
+        assert self.doc.is_dirty() is False
+        self.doc.put_section(etree.Element(mei.SECTION))
+        assert self.doc.is_dirty() is True
+        self.doc.save_everything()
+        assert self.doc.is_dirty() is False
+
+    def test_estimate_memory(self):
+        '''
+        Every element is counted once, even when a <section> is also in the cached <score>.
+        '''
+        self.doc._head = None
+        section = etree.Element(mei.SECTION)
+        etree.SubElement(section, mei.STAFF)
+        self.doc.put_section(section)
+        assert 2 * document.ESTIMATED_ELEMENT_SIZE == self.doc.estimate_memory()
+        score = etree.Element(mei.SCORE)
+        score.append(section)
+        self.doc._score = score
+        self.doc._memory_estimate = None
+        assert 3 * document.ESTIMATED_ELEMENT_SIZE == self.doc.estimate_memory()
+
+    def test_estimate_memory_cached(self):
+        '''
+        The estimate is kept until a <section> is put or the document is saved, so a change made
+        in place is only counted after saving.
+        '''
+        self.doc._head = None
+        self.doc._memory_estimate = None
+        section = etree.Element(mei.SECTION)
+        xmlid = self.doc.put_section(section)
+        assert document.ESTIMATED_ELEMENT_SIZE == self.doc.estimate_memory()
+
+        etree.SubElement(section, mei.STAFF)
+        assert document.ESTIMATED_ELEMENT_SIZE == self.doc.estimate_memory()
+        self.doc.save_everything()
+        assert 2 * document.ESTIMATED_ELEMENT_SIZE == self.doc.estimate_memory()
+
+        self.doc.put_section(etree.Element(mei.SECTION, {xml.ID: xmlid}))
+        assert document.ESTIMATED_ELEMENT_SIZE == self.doc.estimate_memory()
+
+
+class TestSectionEvents(DocumentTestCase):
+    '''
+    Tests for Document.get_section_events().
+    '''
+
+    def test_cached_until_put(self):
+        '''
+        The tables are built once, and built again after put_section().
+        '''
+        section = etree.Element(mei.SECTION)
+        layer = etree.SubElement(etree.SubElement(section, mei.STAFF, n='1'), mei.LAYER, n='1')
+        etree.SubElement(layer, mei.NOTE, dur='4', pname='c', oct='4')
+        xmlid = self.doc.put_section(section)
+
+        first = self.doc.get_section_events(xmlid)
+        assert first is self.doc.get_section_events('#' + xmlid)
+        assert 1 == len(first.layers[0][2])
+
+        etree.SubElement(layer, mei.NOTE, dur='4', pname='d', oct='4')
+        self.doc.put_section(section)
+        second = self.doc.get_section_events(xmlid)
+        assert second is not first
+        assert [60, 62] == list(second.layers[0][2].column('pitch'))
+
+    def test_missing_section(self):
+        '''
+        A section that does not exist raises SectionNotFoundError.
+        '''
+        with pytest.raises(exceptions.SectionNotFoundError):
+            self.doc.get_section_events('Sme-s-m-l-e1234567')
+
+    def test_index_cached_until_put(self):
+        '''
+        The index is built once from the cached tables, and built again after put_section().
+        '''
+        section = etree.Element(mei.SECTION)
+        layer = etree.SubElement(etree.SubElement(section, mei.STAFF, n='1'), mei.LAYER, n='1')
+        etree.SubElement(layer, mei.NOTE, dur='1', pname='c', oct='4')
+        xmlid = self.doc.put_section(section)
+
+        first = self.doc.get_section_index(xmlid)
+        assert first is self.doc.get_section_index('#' + xmlid)
+        assert [1] == first.measure_numbers()
+        assert [layer[0]] == first.at(1, 0)
+
+        etree.SubElement(layer, mei.NOTE, dur='1', pname='d', oct='4')
+        self.doc.put_section(section)
+        second = self.doc.get_section_index(xmlid)
+        assert second is not first
+        assert [layer[1]] == second.elements(2)
+
+
+class TestSearchIndex(DocumentTestCase):
+    '''
+    Tests for the search index kept by a Document.
+    '''
+
+    def make_section(self, pitches):
+        '''
+        Make a <section> with a quarter note of every pitch name in "pitches," in octave 4.
+        '''
+        section = etree.Element(mei.SECTION)
+        layer = etree.SubElement(etree.SubElement(section, mei.STAFF, n='1'), mei.LAYER, n='1')
+        for pname in pitches:
+            etree.SubElement(layer, mei.NOTE, pname=pname, oct='4', dur='4')
+        return section
+
+    def test_without_repository(self):
+        '''
+        A search index requires a repository directory.
+        '''
+        with pytest.raises(ValueError):
+            document.Document(search_index=True)
+        assert self.doc.get_search_index() is None
+        assert 0 == self.doc.update_search_index()
+
+    def test_save_updates(self):
+        '''
+        Saving indexes the sections whose files changed, and only those.
+        '''
+        doc = document.Document(self.repo_dir, search_index=True)
+        first = doc.put_section(self.make_section('cdec'))
+        second = doc.put_section(self.make_section('gfed'))
+        doc.save_everything()
+        index = doc.get_search_index()
+        assert first == index.search(intervals=[2, 2, -4])[0].section
+        assert second == index.search(intervals=[-2, -1, -2])[0].section
+
+        with mock.patch.object(index, 'put_section') as mock_put:
+            doc.save_everything()
+            assert 0 == mock_put.call_count
+
+        replacement = self.make_section('cdeg')
+        replacement.set(xml.ID, first)
+        doc.put_section(replacement)
+        doc.save_everything()
+        assert [] == index.search(intervals=[2, 2, -4])
+        assert first == index.search(intervals=[2, 2, 3])[0].section
+
+    def test_update_all(self):
+        '''
+        Updating every section indexes those saved without an index, and forgets those that are not
+        in the document.
+        '''
+        xmlid = self.doc.put_section(self.make_section('cdec'))
+        self.doc.save_everything()
+
+        doc = document.Document(self.repo_dir, search_index=True)
+        index = doc.get_search_index()
+        index.put_section('Sme-s-m-l-e1234567', 'gone', self.make_section('gfed'))
+        assert 1 == doc.update_search_index()
+        assert {xmlid} == set(index.digests())
+        assert 0 == doc.update_search_index()
+
+    def test_save_survives_index_errors(self):
+        '''
+        The document is saved even when the index cannot be updated. Then the index is stale until
+        a later save updates every section.
+        '''
+        doc = document.Document(self.repo_dir, search_index=True)
+        xmlid = doc.put_section(self.make_section('cdec'))
+        assert not doc.is_search_index_stale()
+        with mock.patch.object(doc.get_search_index(), 'put_section') as mock_put:
+            mock_put.side_effect = sqlite3.OperationalError('disk I/O error')
+            doc.save_everything()
+        assert not doc.is_dirty()
+        assert doc.is_search_index_stale()
+
+        with mock.patch.object(doc, 'update_search_index') as mock_update:
+            doc.save_everything()
+        mock_update.assert_called_once_with(None)
+        doc.save_everything()
+        assert not doc.is_search_index_stale()
+        assert xmlid == doc.get_search_index().search(intervals=[2, 2, -4])[0].section
+
+
+class TestManifest(DocumentTestCase):
+    '''
+    Tests for the manifest that allows opening a Document without parsing "all_files.mei" and
+    "score.mei".
+    '''
+
+    def setUp(self):
+        '''
+        Save a Document with three sections, two of them in the score.
+        '''
+        DocumentTestCase.setUp(self)
+        self.ids = [self.doc.put_section(etree.Element(mei.SECTION)) for _ in range(3)]
+        self.doc.move_section_to(self.ids[2], 0)
+        self.doc.move_section_to(self.ids[0], 1)
+        self.doc.save_everything()
+
+    def test_fast_open(self):
+        '''
+        With a valid manifest, the Document is opened without parsing the structure files.
+        '''
+        assert os.path.exists(os.path.join(self.repo_dir, document.MANIFEST_FILE))
+        with mock.patch('lychee.document.document._load_score_order') as mock_lso:
+            with mock.patch('lychee.document.document._init_sections_dict') as mock_isd:
+                doc = document.Document(self.repo_dir)
+        assert 0 == mock_lso.call_count
+        assert 0 == mock_isd.call_count
+        assert [self.ids[2], self.ids[0]] == doc.get_section_ids()
+        six.assertCountEqual(self, self.ids, doc.get_section_ids(all_sections=True))
+        self.assertEqual(self.doc.get_head(), doc.get_head())
+        assert doc._all_files_tree is None
+
+    def test_stale_all_files(self):
+        '''
+        When "all_files.mei" changed since the manifest was written, the Document parses it.
+        '''
+        other = document.Document(self.repo_dir)
+        other.put_section(etree.Element(mei.SECTION))
+        with mock.patch('lychee.document.document._save_manifest'):
+            other.save_everything()
+
+        with mock.patch('lychee.document.document._init_sections_dict',
+                        wraps=document._init_sections_dict) as mock_isd:
+            document.Document(self.repo_dir)
+        assert 1 == mock_isd.call_count
+        assert 4 == len(document.Document(self.repo_dir).get_section_ids(all_sections=True))
+        # ... and the manifest is only brought up to date by saving
+        assert document._load_manifest(self.repo_dir) is None
+        document.Document(self.repo_dir).save_everything()
+        assert document._load_manifest(self.repo_dir) is not None
+
+    def test_open_does_not_write(self):
+        '''
+        Opening a Document without a manifest does not write one into the repository.
+        '''
+        os.remove(os.path.join(self.repo_dir, document.MANIFEST_FILE))
+        before = sorted(os.listdir(self.repo_dir))
+        with mock.patch('lychee.document.document._save_manifest') as mock_save:
+            doc = document.Document(self.repo_dir)
+        assert 0 == mock_save.call_count
+        assert before == sorted(os.listdir(self.repo_dir))
+        assert [self.ids[2], self.ids[0]] == doc.get_section_ids()
+
+    def test_same_contents(self):
+        '''
+        When "all_files.mei" is rewritten with identical contents, the manifest is still valid.
+        '''
+        all_files_path = os.path.join(self.repo_dir, 'all_files.mei')
+        stat = os.stat(all_files_path)
+        os.utime(all_files_path, (stat.st_atime + 10, stat.st_mtime + 10))
+        assert document._load_manifest(self.repo_dir) is not None
+
+    def test_other_version(self):
+        '''
+        A manifest written by a different version of Lychee is stale.
+        '''
+        with mock.patch('lychee.__version__', '0.0.1'):
+            assert document._load_manifest(self.repo_dir) is None
+
+    def test_corrupt(self):
+        '''
+        A corrupt manifest is ignored.
+        '''
+        with open(os.path.join(self.repo_dir, document.MANIFEST_FILE), 'w') as manifest:
+            manifest.write('{"lychee": ')
+        assert document._load_manifest(self.repo_dir) is None
+        assert [self.ids[2], self.ids[0]] == document.Document(self.repo_dir).get_section_ids()
+
+    def test_section_stamps(self):
+        '''
+        The manifest records the size, modification time, and hash of every section file.
+        '''
+        manifest = document._load_manifest(self.repo_dir)
+        for xmlid in self.ids:
+            pathname = os.path.join(self.repo_dir, '{}.mei'.format(xmlid))
+            size, mtime, sha1 = manifest['files']['{}.mei'.format(xmlid)]
+            assert os.path.getsize(pathname) == size
+            assert document._hash_file(pathname) == sha1
+
+
 class TestInitSectionsDict(object):
     '''
     Tests for the _init_sections_dict() helper function.
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/document/test/test_search.py
+# Purpose:                Tests for the "search" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "search" module.
+'''
+
+import fractions
+import os.path
+import sqlite3
+
+from lxml import etree
+import pytest
+
+from lychee.document import search
+from lychee.namespaces import mei, xml
+
+
+# pitch name, octave, and @dur of every note in the first layer
+_MELODY = [
+    ('c', '4', '4'), ('d', '4', '4'), ('e', '4', '8'), ('c', '4', '8'),
+    ('g', '4', '2'), ('d', '5', '4'), ('e', '5', '4'), ('f', '5', '8'),
+]
+
+
+def make_section(melody, xmlid_prefix='n', meter_count='4'):
+    '''
+    Make a <section> with one <layer> holding the "melody", with a rest after the third note, and
+    a chord at the end.
+    '''
+    section = etree.Element(mei.SECTION)
+    staff_def = etree.SubElement(etree.SubElement(section, mei.SCORE_DEF), mei.STAFF_DEF)
+    staff_def.set('meter.count', meter_count)
+    staff_def.set('meter.unit', '4')
+    layer = etree.SubElement(etree.SubElement(section, mei.STAFF, n='1'), mei.LAYER, n='1')
+    for index, (pname, octave, dur) in enumerate(melody):
+        note = etree.SubElement(layer, mei.NOTE, pname=pname, oct=octave, dur=dur)
+        note.set(xml.ID, '{0}{1}'.format(xmlid_prefix, index))
+        if index == 2:
+            etree.SubElement(layer, mei.REST, dur='8')
+    chord = etree.SubElement(layer, mei.CHORD, dur='8')
+    chord.set(xml.ID, '{0}c'.format(xmlid_prefix))
+    etree.SubElement(chord, mei.NOTE, pname='c', oct='6')
+    etree.SubElement(chord, mei.NOTE, pname='a', oct='5')
+    return section
+
+
+@pytest.fixture
+def index(tmpdir):
+    '''
+    An index with one section.
+    '''
+    post = search.SearchIndex(os.path.join(str(tmpdir), search.INDEX_FILE))
+    post.put_section('S1', 'digest', make_section(_MELODY))
+    return post
+
+
+def test_patterns():
+    '''
+    Intervals and rhythm ratios are made from pitches and durations.
+    '''
+    assert [2, 2, -4] == search.intervals([60, 62, 64, 60])
+    assert [1, fractions.Fraction(1, 2), 2] == search.rhythm(
+        [fractions.Fraction(1, 4), fractions.Fraction(1, 4), fractions.Fraction(1, 8),
+         fractions.Fraction(1, 4)])
+
+
+def test_melodies():
+    '''
+    Melodies skip rests, use the lowest note of a chord, and know the measure of every note.
+    '''
+    actual = search.melodies(make_section(_MELODY, meter_count='3'))
+    assert 1 == len(actual)
+    staff_n, layer_n, pitches, durations, ids, measures = actual[0]
+    assert ('1', '1') == (staff_n, layer_n)
+    assert [60, 62, 64, 60, 67, 74, 76, 77, 81] == pitches
+    assert [2, 2, 1, 1, 4, 2, 2, 1, 1] == durations
+    assert ['n0', 'n1', 'n2', 'n3', 'n4', 'n5', 'n6', 'n7', 'nc'] == ids
+    assert [1, 1, 1, 2, 2, 2, 3, 3, 3] == measures
+
+
+class TestSearchIndex(object):
+
+    def test_transposed(self, index):
+        '''
+        An interval pattern matches wherever it occurs, at any pitch, with every note's @xml:id.
+        '''
+        actual = index.search(intervals=search.intervals([65, 67, 69, 65]))
+        assert [search.SearchHit('S1', '1', '1', 1, ['n0', 'n1', 'n2', 'n3'])] == actual
+
+        actual = index.search(intervals=[7, 2, 1, 4])
+        assert [('S1', 1, ['n4', 'n5', 'n6', 'n7', 'nc'])] == [
+            (hit.section, hit.measure, hit.ids) for hit in actual]
+
+    def test_rhythm(self, index):
+        '''
+        A rhythm pattern matches in augmentation, and may be combined with intervals.
+        '''
+        pattern = search.rhythm([2, 2, 1, 1])
+        assert [['n0', 'n1', 'n2', 'n3'], ['n5', 'n6', 'n7', 'nc']] == [
+            hit.ids for hit in index.search(rhythm=pattern)]
+        assert [['n5', 'n6', 'n7', 'nc']] == [
+            hit.ids for hit in index.search(intervals=[2, 1, 4], rhythm=pattern)]
+
+    def test_no_match(self, index):
+        '''
+        A pattern that does not occur, or only partly occurs, has no hits.
+        '''
+        assert [] == index.search(intervals=[2, 2, 2])
+        assert [] == index.search(intervals=[2, 2, -4, 6])
+
+    def test_invalid_patterns(self, index):
+        '''
+        Patterns that are missing, too short, or of different lengths raise ValueError.
+        '''
+        with pytest.raises(ValueError):
+            index.search()
+        with pytest.raises(ValueError):
+            index.search(intervals=[2, 2])
+        with pytest.raises(ValueError):
+            index.search(intervals=[2, 2, -4], rhythm=[1, 1])
+
+    def test_replace_and_forget(self, index):
+        '''
+        Putting a section again replaces its n-grams, and forgetting it removes them.
+        '''
+        index.put_section('S1', 'other', make_section(_MELODY[:3]))
+        assert {'S1': 'other'} == index.digests()
+        assert [] == index.search(intervals=[2, 2, -4])
+        assert 1 == len(index.search(intervals=[2, 2, 17]))
+
+        index.forget_section('S1')
+        assert {} == index.digests()
+        assert [] == index.search(intervals=[2, 2, 17])
+
+    def test_reopen(self, index, tmpdir):
+        '''
+        The index is kept on disk, and emptied if it was built with another n-gram length.
+        '''
+        pathname = os.path.join(str(tmpdir), search.INDEX_FILE)
+        assert {'S1': 'digest'} == search.SearchIndex(pathname).digests()
+
+        conn = sqlite3.connect(pathname)
+        with conn:
+            conn.execute("UPDATE info SET value = '5' WHERE key = 'ngram_length'")
+        conn.close()
+        assert {} == search.SearchIndex(pathname).digests()
+
+    def test_search_corpus(self, index, tmpdir):
+        '''
+        Every repository with an index is searched, in order.
+        '''
+        actual = search.search_corpus(
+            [str(tmpdir), os.path.join(str(tmpdir), 'nothing'), str(tmpdir)], intervals=[2, 2, -4])
+        assert [str(tmpdir)] * 2 == [repo_dir for repo_dir, _ in actual]
+        assert ['n0', 'n0'] == [hit.ids[0] for _, hit in actual]
@@ -156,6 +156,29 @@ class OutboundConversionError(ConversionError):
     pass
 
 
+class WorkerError(ConversionError):
+    '''
+    When a conversion in a supervised worker process did not finish, for example because the
+    process crashed. Refer to :mod:`lychee.workflow.supervise`.
+    '''
+    pass
+
+
+class DeadlineExceededError(WorkerError):
+    '''
+    When a conversion in a supervised worker process ran past its deadline, so the process was
+    stopped.
+    '''
+    pass
+
+
+class ConversionCancelledError(WorkerError):
+    '''
+    When a conversion in a supervised worker process was cancelled, so the process was stopped.
+    '''
+    pass
+
+
 class ViewsError(LycheeError):
     '''
     When an error occurs while processing "view" information.
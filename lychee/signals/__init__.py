@@ -35,7 +35,8 @@ from . import signal
 def set_fujian(to_this):
     """
     Call this with a :class:`fujian.FujianWebSocketHandler` instance. :class:`Signal` instances will
-    use it to emit themselves over the WebSocket connection.
+    use it to emit themselves over the WebSocket connection. To encode signals as compressed binary
+    frames on a background thread, give a :class:`~lychee.signals.framing.FramedSender` instead.
     """
     from . import signal
     signal.set_fujian(to_this)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/signals/framing.py
+# Purpose:                Encode signals for Fujian as compact binary frames on a background thread.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Encode signals for Fujian as compact binary frames on a background thread.
+
+By default, :meth:`lychee.signals.signal.Signal.emit` calls the Fujian handler's ``signal()`` method
+on the emitting thread, with the Python objects given to the signal. When the outbound documents
+are large, serializing them delays the rest of the workflow. Instead, give a :class:`FramedSender`
+to :func:`lychee.signals.set_fujian`. It has the same ``signal()`` method, but puts the signal on a
+queue, then a background thread encodes it with :func:`encode_frame` and passes the frame to the
+``deliver`` function (for example, a function that writes a binary WebSocket message).
+
+**Frame Format**
+
+Every frame starts with a six-byte header: one byte with :const:`FRAME_VERSION`, one byte of flags,
+then the length of the body as a four-byte unsigned big-endian integer. The body is compact JSON,
+encoded as UTF-8, for an object with the ``"signal"`` (the signal's name) and ``"kwargs"`` keys.
+If the JSON is longer than the "compress threshold," the body is compressed with "deflate" (as by
+:func:`zlib.compress`) and the :const:`FLAG_DEFLATE` flag is set.
+
+Values that JSON cannot hold are converted to strings; in particular, :mod:`lxml` elements are
+serialized as XML. Use :func:`decode_frame` to read a frame. Frames may come from another program,
+so :func:`read_frame` and :func:`decode_frame` refuse a body, compressed or not, longer than
+:const:`DEFAULT_MAX_SIZE` bytes, rather than trusting the length in the header.
+
+.. warning:: Because signals are encoded later, on another thread, do not modify the objects given
+    to a signal after it is emitted.
+'''
+
+import json
+import struct
+import threading
+import zlib
+
+from lxml import etree
+import six
+from six.moves import queue
+
+
+FRAME_VERSION = 1
+FLAG_DEFLATE = 0x01
+DEFAULT_COMPRESS_THRESHOLD = 16 * 1024
+DEFAULT_MAX_PENDING = 32
+DEFAULT_MAX_SIZE = 128 * 1024 * 1024
+
+_HEADER = struct.Struct('>BBI')
+_ERR_FRAME_VERSION = 'Unsupported frame version: {0}'
+_ERR_FRAME_LENGTH = 'Frame body is {0} bytes but the header says {1}'
+_ERR_FRAME_TRUNCATED = 'The stream ended after {0} of {1} bytes of a frame'
+_ERR_FRAME_TOO_LARGE = 'Frame body is longer than the limit of {0} bytes'
+_ERR_FRAME_DEFLATE = 'Frame body cannot be decompressed: {0}'
+
+
+def _json_default(obj):
+    '''
+    Convert an object that JSON cannot hold into a string.
+    '''
+    if isinstance(obj, (etree._Element, etree._ElementTree)):  # pylint: disable=protected-access
+        return etree.tostring(obj, encoding=six.text_type)
+    elif isinstance(obj, six.binary_type):
+        return obj.decode('utf-8', 'replace')
+    else:
+        return six.text_type(obj)
+
+
+def encode_frame(name, kwargs, compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
+    '''
+    Encode a signal as a frame.
+
+    :param str name: The name of the signal.
+    :param dict kwargs: The keyword arguments given to the signal.
+    :param int compress_threshold: Compress the body if it is longer than this many bytes. Use
+        ``None`` to never compress.
+    :returns: The frame.
+    :rtype: bytes
+    '''
+    body = json.dumps(
+        {'signal': name, 'kwargs': kwargs},
+        default=_json_default,
+        separators=(',', ':'))
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+
+    flags = 0
+    if compress_threshold is not None and len(body) > compress_threshold:
+        body = zlib.compress(body)
+        flags |= FLAG_DEFLATE
+
+    return _HEADER.pack(FRAME_VERSION, flags, len(body)) + body
+
+
+def _inflate(body, max_size):
+    '''
+    Decompress a frame body, without making more than ``max_size`` bytes.
+    '''
+    inflater = zlib.decompressobj()
+    try:
+        post = inflater.decompress(body, max_size + 1)
+        if len(post) > max_size or inflater.unconsumed_tail:
+            raise ValueError(_ERR_FRAME_TOO_LARGE.format(max_size))
+        post += inflater.flush()
+    except zlib.error as exc:
+        raise ValueError(_ERR_FRAME_DEFLATE.format(exc))
+    if len(post) > max_size:
+        raise ValueError(_ERR_FRAME_TOO_LARGE.format(max_size))
+    return post
+
+
+def decode_frame(frame, max_size=DEFAULT_MAX_SIZE):
+    '''
+    Decode a frame made by :func:`encode_frame`.
+
+    :param bytes frame: The frame.
+    :param int max_size: The most bytes the body may hold, before and after it is decompressed.
+    :returns: The name of the signal and its keyword arguments.
+    :rtype: 2-tuple of str and dict
+    :raises: :exc:`ValueError` if the frame is invalid or too large.
+    '''
+    version, flags, length = _HEADER.unpack(frame[:_HEADER.size])
+    if version != FRAME_VERSION:
+        raise ValueError(_ERR_FRAME_VERSION.format(version))
+    elif length > max_size:
+        raise ValueError(_ERR_FRAME_TOO_LARGE.format(max_size))
+    body = frame[_HEADER.size:]
+    if len(body) != length:
+        raise ValueError(_ERR_FRAME_LENGTH.format(len(body), length))
+
+    if flags & FLAG_DEFLATE:
+        body = _inflate(body, max_size)
+    decoded = json.loads(body.decode('utf-8'))
+    return decoded['signal'], decoded['kwargs']
+
+
+def read_frame(stream, max_size=DEFAULT_MAX_SIZE):
+    '''
+    Read one frame made by :func:`encode_frame` from a stream, such as a socket file.
+
+    :param stream: A binary file-like object with a ``read()`` method.
+    :param int max_size: The most bytes the body may hold. A longer frame is not read.
+    :returns: The frame, which may be given to :func:`decode_frame`, or ``None`` if the stream
+        ended before the frame started.
+    :rtype: bytes
+    :raises: :exc:`ValueError` if the stream ends in the middle of a frame, or if the frame is
+        too large.
+    '''
+    header = stream.read(_HEADER.size)
+    if not header:
+        return None
+    elif len(header) < _HEADER.size:
+        raise ValueError(_ERR_FRAME_TRUNCATED.format(len(header), _HEADER.size))
+
+    length = _HEADER.unpack(header)[2]
+    if length > max_size:
+        raise ValueError(_ERR_FRAME_TOO_LARGE.format(max_size))
+    body = stream.read(length)
+    if len(body) != length:
+        raise ValueError(
+            _ERR_FRAME_TRUNCATED.format(_HEADER.size + len(body), _HEADER.size + length))
+    return header + body
+
+
+class FramedSender(object):
+    '''
+    A stand-in for the Fujian handler that encodes and delivers signals on a background thread.
+    '''
+
+    def __init__(self, deliver, max_pending=None, compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
+        '''
+        :param deliver: Called on the background thread with each frame, in the order the signals
+            were emitted.
+        :type deliver: callable
+        :param int max_pending: The most signals that may wait to be encoded. When the queue is
+            full, :meth:`signal` blocks until there is space. Defaults to
+            :const:`DEFAULT_MAX_PENDING`.
+        :param int compress_threshold: As for :func:`encode_frame`.
+        '''
+        self._deliver = deliver
+        self._compress_threshold = compress_threshold
+        self._queue = queue.Queue(max_pending or DEFAULT_MAX_PENDING)
+        self.sent = 0
+        self.failed = 0
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name='lychee-fujian-sender')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def signal(self, name, **kwargs):
+        '''
+        Queue a signal to be encoded and delivered. Blocks while the queue is full.
+
+        :param str name: The name of the signal.
+        '''
+        self._queue.put((name, kwargs))
+
+    def flush(self):
+        '''
+        Wait until every queued signal has been delivered (or has failed).
+        '''
+        self._queue.join()
+
+    def close(self):
+        '''
+        Deliver every queued signal, then stop the background thread.
+        '''
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        '''
+        Encode and deliver signals until :meth:`close` is called.
+
+        .. note:: This method does not log anything: log messages are signals, so they would be put
+            on the queue this thread is meant to empty.
+        '''
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._deliver(encode_frame(item[0], item[1], self._compress_threshold))
+                self.sent += 1
+            except Exception as exc:  # pylint: disable=broad-except
+                self.failed += 1
+                self.last_error = exc
+            finally:
+                self._queue.task_done()
+
+
+class LocalWebSocketHandler(object):
+    '''
+    A stand-in for a WebSocket handler that keeps the binary messages it is asked to write, for use
+    in tests and benchmarks without a network or a Fujian server.
+    '''
+
+    def __init__(self):
+        ""
+        self.messages = []
+        self.bytes_written = 0
+
+    def write_message(self, message, binary=False):
+        '''
+        Store a message, as :meth:`tornado.websocket.WebSocketHandler.write_message` would send it.
+        '''
+        self.messages.append(message)
+        self.bytes_written += len(message)
+
+    def received(self):
+        '''
+        Decode every stored message.
+
+        :returns: A list of the 2-tuples returned by :func:`decode_frame`.
+        :rtype: list
+        '''
+        return [decode_frame(message) for message in self.messages]
+
+
+def benchmark(document, count=20, compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
+    '''
+    Measure how long emitting :const:`~lychee.signals.outbound.CONVERSION_FINISHED` with a document
+    blocks the emitting thread, with and without a :class:`FramedSender`.
+
+    :param document: The "document" argument to emit, such as a Verovio string.
+    :param int count: How many times to emit the signal.
+    :param int compress_threshold: As for :func:`encode_frame`.
+    :returns: A dictionary with the seconds spent by the emitting thread when encoding directly
+        (``'direct'``) and when queueing (``'queued'``), the seconds until the queue was empty
+        (``'queued_total'``), and the total size of the frames in bytes (``'bytes'``).
+    :rtype: dict
+    '''
+    import timeit
+    kwargs = {'dtype': 'verovio', 'placement': 'Sme-s-m-l-e1234567', 'document': document,
+              'changeset': ''}
+    name = 'outbound.CONVERSION_FINISHED'
+
+    direct = LocalWebSocketHandler()
+    start = timeit.default_timer()
+    for _ in range(count):
+        direct.write_message(encode_frame(name, kwargs, compress_threshold), binary=True)
+    direct_time = timeit.default_timer() - start
+
+    handler = LocalWebSocketHandler()
+    sender = FramedSender(
+        lambda frame: handler.write_message(frame, binary=True),
+        max_pending=count,
+        compress_threshold=compress_threshold)
+    start = timeit.default_timer()
+    for _ in range(count):
+        sender.signal(name, **kwargs)
+    queued_time = timeit.default_timer() - start
+    sender.close()
+    queued_total = timeit.default_timer() - start
+
+    return {
+        'direct': direct_time,
+        'queued': queued_time,
+        'queued_total': queued_total,
+        'bytes': handler.bytes_written,
+    }
@@ -34,7 +34,8 @@ outbound data format can be processed at once).
 from . import signal
 
 
-REGISTER_FORMAT = signal.Signal(args=['dtype', 'who', 'outbound'], name='outbound.REGISTER_FORMAT')
+REGISTER_FORMAT = signal.Signal(args=['dtype', 'who', 'outbound', 'delta'],
+                                name='outbound.REGISTER_FORMAT')
 '''
 .. danger::
     .. deprecated:: 0.5.4
@@ -46,6 +47,8 @@ To request that Lychee produce output data in a given format, call this signal b
 :kwarg str dtype: The data type to produce ('abjad', 'lilypond', 'mei', 'verovio').
 :kwarg str who: (Optional). A unique identifier for the component requesting a format.
 :kwarg bool outbound: (Optional). Whether to run an "outbound" step immediately.
+:kwarg bool delta: (Optional). Whether this "who" should receive :const:`DELTA_FINISHED` rather
+    than :const:`CONVERSION_FINISHED`. Only possible for the "mei" and "verovio" data types.
 
 The "outbound" argument causes the outbound step to run immediately, producing data for the whole
 MEI document. Use this if you do not want to wait for data until an action has been run.
@@ -118,6 +121,19 @@ as the conversions finish.
 '''
 
 
+DELTA_FINISHED = signal.Signal(args=['dtype', 'placement', 'delta', 'changeset', 'who'],
+                               name='outbound.DELTA_FINISHED')
+'''
+Emitted instead of :const:`CONVERSION_FINISHED` for each "who" registered with ``delta=True``.
+
+The arguments are the same as :const:`CONVERSION_FINISHED` except:
+
+:param dict delta: The parts of the <section> that changed since the previous :const:`DELTA_FINISHED`
+    for this "who." Refer to :mod:`lychee.workflow.delta` for a description.
+:param str who: The "who" argument given to :const:`REGISTER_FORMAT`.
+'''
+
+
 ERROR = signal.Signal(args=['msg'], name='outbound.ERROR')
 '''
 .. danger::
@@ -32,7 +32,12 @@ from lychee.logs import SESSION_LOG as log
 
 
 # These are the signals that Fujian wants to know about, if we're being run by Fujian.
-FUJIAN_INTERESTED_SIGNALS = ('outbound.CONVERSION_FINISHED', 'outbound.ERROR', 'LOG_MESSAGE')
+FUJIAN_INTERESTED_SIGNALS = (
+    'outbound.CONVERSION_FINISHED',
+    'outbound.DELTA_FINISHED',
+    'outbound.ERROR',
+    'LOG_MESSAGE',
+)
 
 
 # This is a module-level FujianWebSocketHandler instance. The Signal class uses it to emit signals
@@ -50,7 +55,8 @@ def have_fujian():
 def set_fujian(to_this):
     '''
     Call this with a :class:`fujian.FujianWebSocketHandler` instance. :class:`Signal` instances will
-    use it to emit themselves over the WebSocket connection.
+    use it to emit themselves over the WebSocket connection. To encode signals as compressed binary
+    frames on a background thread, give a :class:`~lychee.signals.framing.FramedSender` instead.
     '''
     global _module_fujian
     _module_fujian = to_this
@@ -62,6 +68,14 @@ class Signal(signalslot.Signal):
     the "Fujian" WebSocket server, if it's available.
     '''
 
+    def is_observed(self):
+        '''
+        Return ``True`` if emitting this signal would call a slot or send it through Fujian.
+        '''
+        if _module_fujian is not None and self.name in FUJIAN_INTERESTED_SIGNALS:
+            return True
+        return len(self.slots) > 0
+
     def emit(self, **kwargs):
         '''
         Emit the signal via Fujian if possible, then call the superclass :meth:`emit`.
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/signals/test/test_framing.py
+# Purpose:                Tests for binary framing of signals for Fujian.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for binary framing of signals for Fujian.
+'''
+
+import io
+import threading
+
+from lxml import etree
+import pytest
+
+from lychee.signals import framing, signal
+
+
+def test_round_trip_small():
+    '''
+    A small signal is not compressed, and decodes to the same arguments.
+    '''
+    frame = framing.encode_frame('outbound.ERROR', {'msg': 'oops'})
+    assert framing.FRAME_VERSION == bytearray(frame)[0]
+    assert 0 == bytearray(frame)[1] & framing.FLAG_DEFLATE
+    assert ('outbound.ERROR', {'msg': 'oops'}) == framing.decode_frame(frame)
+
+
+def test_round_trip_large():
+    '''
+    A large signal is compressed, and decodes to the same arguments.
+    '''
+    document = '<mei>' + '<note pname="c"/>' * 10000 + '</mei>'
+    frame = framing.encode_frame('outbound.CONVERSION_FINISHED', {'document': document}, 1024)
+    assert bytearray(frame)[1] & framing.FLAG_DEFLATE
+    assert len(frame) < len(document) / 10
+    assert document == framing.decode_frame(frame)[1]['document']
+
+
+def test_elements():
+    '''
+    lxml elements are serialized as XML.
+    '''
+    elem = etree.Element('note', pname='c')
+    frame = framing.encode_frame('outbound.CONVERSION_FINISHED', {'document': elem})
+    assert '<note pname="c"/>' == framing.decode_frame(frame)[1]['document']
+
+
+def test_invalid_frame():
+    '''
+    Frames with the wrong version or length are refused.
+    '''
+    frame = framing.encode_frame('outbound.ERROR', {'msg': 'oops'})
+    with pytest.raises(ValueError):
+        framing.decode_frame(b'\x09' + frame[1:])
+    with pytest.raises(ValueError):
+        framing.decode_frame(frame[:-1])
+
+
+def test_read_frame():
+    '''
+    Frames are read one at a time from a stream, and a stream that ends inside a frame is refused.
+    '''
+    first = framing.encode_frame('ping', {})
+    second = framing.encode_frame('convert', {'document': 'c4'})
+    stream = io.BytesIO(first + second)
+    assert first == framing.read_frame(stream)
+    assert ('convert', {'document': 'c4'}) == framing.decode_frame(framing.read_frame(stream))
+    assert framing.read_frame(stream) is None
+
+    for end in (3, len(first) - 1):
+        with pytest.raises(ValueError):
+            framing.read_frame(io.BytesIO(first[:end]))
+
+
+def test_too_large():
+    '''
+    Frames whose body is longer than the limit are refused, before and after decompression, and
+    a read does not wait for the body of a frame that is too large.
+    '''
+    frame = framing.encode_frame('convert', {'document': 'c4 ' * 1000}, compress_threshold=0)
+    assert len(frame) < 1000
+    with pytest.raises(ValueError):
+        framing.decode_frame(frame, max_size=1000)
+    with pytest.raises(ValueError):
+        framing.decode_frame(frame, max_size=len(frame) - 7)
+    assert framing.decode_frame(frame, max_size=4000)
+
+    huge = framing._HEADER.pack(framing.FRAME_VERSION, 0, 2 ** 32 - 1)
+    with pytest.raises(ValueError):
+        framing.read_frame(io.BytesIO(huge + b'{}'))
+    with pytest.raises(ValueError):
+        framing.decode_frame(huge)
+
+    corrupt = framing._HEADER.pack(framing.FRAME_VERSION, framing.FLAG_DEFLATE, 3) + b'abc'
+    with pytest.raises(ValueError):
+        framing.decode_frame(corrupt)
+
+
+class TestFramedSender(object):
+
+    def test_in_order(self):
+        '''
+        Signals are delivered in order, and can be emitted through a Signal.
+        '''
+        handler = framing.LocalWebSocketHandler()
+        sender = framing.FramedSender(handler.write_message)
+        try:
+            signal.set_fujian(sender)
+            sig = signal.Signal(name='outbound.ERROR', args=['msg'])
+            for i in range(5):
+                sig.emit(msg=str(i))
+            sender.flush()
+        finally:
+            signal.set_fujian(None)
+            sender.close()
+
+        assert 5 == sender.sent
+        assert [('outbound.ERROR', {'msg': str(i)}) for i in range(5)] == handler.received()
+
+    def test_backpressure(self):
+        '''
+        When the queue is full, signal() blocks until the background thread catches up.
+        '''
+        release = threading.Event()
+        delivered = []
+
+        def deliver(frame):
+            release.wait()
+            delivered.append(frame)
+
+        sender = framing.FramedSender(deliver, max_pending=1)
+        sender.signal('a')  # taken by the background thread, which waits
+        sender.signal('b')  # fills the queue
+        emitter = threading.Thread(target=sender.signal, args=('c',))
+        emitter.start()
+        emitter.join(0.2)
+        assert emitter.is_alive()
+
+        release.set()
+        emitter.join()
+        sender.close()
+        assert 3 == len(delivered)
+
+    def test_failure(self):
+        '''
+        An exception while delivering is counted, and later signals are still delivered.
+        '''
+        handler = framing.LocalWebSocketHandler()
+
+        def deliver(frame):
+            if not handler.messages and not deliver.failed:
+                deliver.failed = True
+                raise IOError('closed')
+            handler.write_message(frame, binary=True)
+        deliver.failed = False
+
+        sender = framing.FramedSender(deliver)
+        sender.signal('a')
+        sender.signal('b')
+        sender.close()
+        assert 1 == sender.failed
+        assert isinstance(sender.last_error, IOError)
+        assert [('b', {})] == handler.received()
+
+
+def test_benchmark():
+    '''
+    The benchmark runs and reports the frames' size.
+    '''
+    actual = framing.benchmark('<mei>' + '<note/>' * 5000 + '</mei>', count=3)
+    assert 0 < actual['bytes'] < 3 * 5000
+    assert actual['queued'] <= actual['queued_total']
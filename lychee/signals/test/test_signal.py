@@ -171,3 +171,25 @@ def test_emit_with_fujian_4():
     assert sig_name == sig.name
     assert mock_fujian.signal.call_count == 0
     slot_mock.assert_called_once_with(a=elem)
+
+def test_is_observed_1():
+    '''
+    A signal is observed when a slot is connected, and not when it isn't.
+    '''
+    signal._module_fujian = None
+    sig = signal.Signal(name='outbound.CONVERSION_FINISHED')
+    assert sig.is_observed() is False
+    slot = lambda **kwargs: None
+    sig.connect(slot)
+    assert sig.is_observed() is True
+
+def test_is_observed_2():
+    '''
+    A signal is observed when Fujian is interested in it, even without slots.
+    '''
+    try:
+        signal._module_fujian = mock.Mock()
+        assert signal.Signal(name='outbound.CONVERSION_FINISHED').is_observed() is True
+        assert signal.Signal(name='beep beep honk honk').is_observed() is False
+    finally:
+        signal._module_fujian = None
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/tui/batch.py
+# Purpose:                Convert many files between formats without a repository.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Convert many files between formats without a repository.
+
+This is the program run by ``python -m lychee``. It converts every input file from an inbound format
+to Lychee-MEI and then to an outbound format, and writes the result to a file. It does not use a
+:class:`~lychee.workflow.session.InteractiveSession`, a :class:`~lychee.document.Document`, or the
+signals, so no repository is required.
+
+.. code-block:: shell
+
+    $ python -m lychee --to mei --output converted/ scores/ extra.ly
+    [1/3] scores/a.ly -> converted/a.mei (0.081 s)
+    [2/3] extra.ly -> converted/extra.mei (0.064 s)
+    [3/3] scores/strings/b.ly -> converted/strings/b.mei (0.112 s)
+    converted 3 of 3 files in 0.190 s: 15.8 files/s, 41.2 KiB/s
+
+Directories are searched recursively for files with an extension of the inbound format. The files
+are converted in a pool of worker processes, and each one is reported as soon as it finishes. Only
+the converter modules for the chosen formats are imported. Lychee's log messages are only printed
+with ``--verbose``.
+'''
+
+from __future__ import print_function
+
+import argparse
+from collections import namedtuple
+import io
+import multiprocessing
+import os
+import os.path
+import sys
+import timeit
+
+from lxml import etree
+import six
+
+from lychee import converters
+from lychee import exceptions
+from lychee import signals
+from lychee.utils.files import write_atomically
+from lychee.workflow import dispatch
+
+
+INBOUND_FORMATS = {
+    'lilypond': ('.ly', '.ily'),
+}
+'''
+Mapping from the lowercase name of an inbound format to its file extensions. The converters are in
+:const:`lychee.workflow.dispatch.INBOUND_CONVERTERS`.
+'''
+
+OUTBOUND_FORMATS = {
+    'lilypond': '.ly',
+    'mei': '.mei',
+    'verovio': '.mei',
+}
+'''
+Mapping from the lowercase name of an outbound format to its file extension. The converters are in
+:const:`lychee.converters.OUTBOUND_CONVERTERS`.
+'''
+
+LMEI = 'lmei'
+'''
+The name for a Lychee-MEI ``<section>`` as the input or output of :func:`convert_document`, which
+skips the inbound or outbound conversion.
+'''
+
+_ERR_NO_FILES = 'no {dtype} files found'
+_ERR_NO_FORMAT = 'There is no converter for "{0}"'
+_ERR_OVERWRITE = 'the output file would replace the input file'
+_ERR_FAILED = '{kind}: {error}'
+
+_PROGRESS = '[{done}/{total}] {source} -> {target} ({seconds:.3f} s)'
+_PROGRESS_FAILED = '[{done}/{total}] {source} FAILED ({error})'
+_SUMMARY = (
+    'converted {ok} of {total} files in {seconds:.3f} s: {files_per_second:.1f} files/s, '
+    '{kib_per_second:.1f} KiB/s'
+)
+
+class FileResult(namedtuple('FileResult', ('source', 'target', 'size', 'seconds', 'error'))):
+    '''
+    The result of converting one file with :func:`convert_file`.
+
+    :ivar str source: The input pathname.
+    :ivar str target: The output pathname.
+    :ivar int size: The size of the input file, in bytes.
+    :ivar float seconds: How long the conversion took.
+    :ivar str error: Why the conversion failed, or ``None`` if it succeeded.
+    '''
+    __slots__ = ()
+
+
+def _serialize(converted):
+    '''
+    Return the output of an outbound converter as bytes.
+    '''
+    if isinstance(converted, (etree._Element, etree._ElementTree)):
+        return etree.tostring(
+            converted, encoding='UTF-8', xml_declaration=True, pretty_print=True)
+    elif isinstance(converted, six.text_type):
+        return converted.encode('utf-8')
+    return converted
+
+
+def describe_error(exc):
+    '''
+    Return a one-line description of an exception raised by a conversion.
+
+    :rtype: str
+    '''
+    # TatSu puts the parser's rule stack after the first line
+    return _ERR_FAILED.format(
+        kind=type(exc).__name__, error=six.text_type(exc).strip().split('\n')[0])
+
+
+def convert_document(document, in_dtype, out_dtype):
+    '''
+    Convert a document from an inbound format to an outbound format, through Lychee-MEI.
+
+    :param str document: The inbound document.
+    :param str in_dtype: The inbound format, one of the :const:`INBOUND_FORMATS` or :const:`LMEI`
+        for a Lychee-MEI ``<section>``.
+    :param str out_dtype: The outbound format, one of the :const:`OUTBOUND_FORMATS` or
+        :const:`LMEI`.
+    :returns: The outbound document, encoded as UTF-8.
+    :rtype: bytes
+    :raises: :exc:`~lychee.exceptions.InvalidDataTypeError` if there is no converter for either
+        format, or any exception raised by the converters.
+    '''
+    return b''.join(iter_convert_document(document, in_dtype, out_dtype))
+
+
+def iter_convert_document(document, in_dtype, out_dtype):
+    '''
+    Convert a document like :func:`convert_document`, but return the outbound document in pieces.
+
+    When the outbound format is in :const:`lychee.converters.OUTBOUND_STREAMERS`, the pieces are
+    converted one at a time as the iterator is used, so the whole outbound document is never in
+    memory. Otherwise there is one piece.
+
+    :returns: An iterator of the outbound document's pieces, encoded as UTF-8.
+    :raises: :exc:`~lychee.exceptions.InvalidDataTypeError` if there is no converter for either
+        format, or any exception raised by the inbound converter. Exceptions raised by the outbound
+        converter may only be raised while iterating.
+    '''
+    in_dtype, out_dtype = in_dtype.lower(), out_dtype.lower()
+    for dtype, formats in ((in_dtype, INBOUND_FORMATS), (out_dtype, OUTBOUND_FORMATS)):
+        if dtype != LMEI and dtype not in formats:
+            raise exceptions.InvalidDataTypeError(_ERR_NO_FORMAT.format(dtype))
+
+    user_settings = {}
+    if in_dtype == LMEI:
+        if isinstance(document, six.text_type):
+            document = document.encode('utf-8')
+        converted = etree.fromstring(document)
+    else:
+        converted = dispatch.INBOUND_CONVERTERS[in_dtype](document, user_settings=user_settings)
+
+    if out_dtype in converters.OUTBOUND_STREAMERS:
+        outbound = converters.OUTBOUND_STREAMERS[out_dtype]
+        return (_serialize(chunk) for chunk in outbound(converted, user_settings=user_settings))
+    elif out_dtype != LMEI:
+        outbound = converters.OUTBOUND_CONVERTERS[out_dtype]
+        converted = outbound(converted, user_settings=user_settings)
+    return iter([_serialize(converted)])
+
+
+def convert_file(job):
+    '''
+    Convert one file. This runs in a worker process.
+
+    :param tuple job: The input pathname, inbound format, output pathname, and outbound format.
+    :returns: The result.
+    :rtype: :class:`FileResult`
+    '''
+    source, in_dtype, target, out_dtype = job
+    start = timeit.default_timer()
+    size = 0
+    if os.path.abspath(source) == os.path.abspath(target):
+        return FileResult(source, target, size, 0.0, _ERR_OVERWRITE)
+
+    try:
+        with io.open(source, 'r', encoding='utf-8') as source_file:
+            inbound = source_file.read()
+        size = os.path.getsize(source)
+
+        outbound = iter_convert_document(inbound, in_dtype, out_dtype)
+
+        target_dir = os.path.dirname(target)
+        if target_dir and not os.path.isdir(target_dir):
+            try:
+                os.makedirs(target_dir)
+            except OSError:
+                # another worker may have made it
+                if not os.path.isdir(target_dir):
+                    raise
+        def write(target_file):
+            for chunk in outbound:
+                target_file.write(chunk)
+        write_atomically(target, write)
+    except Exception as exc:  # pylint: disable=broad-except
+        error = describe_error(exc)
+        return FileResult(source, target, size, timeit.default_timer() - start, error)
+
+    return FileResult(source, target, size, timeit.default_timer() - start, None)
+
+
+def find_jobs(paths, in_dtype, out_dtype, output_dir=None):
+    '''
+    Make the jobs for :func:`convert_file` from the files and directories to convert.
+
+    :param paths: Pathnames of files, which are converted whatever their extension, and of
+        directories, which are searched recursively for files with an extension of ``in_dtype``.
+    :type paths: list of str
+    :param str in_dtype: The inbound format, one of the :const:`INBOUND_FORMATS`.
+    :param str out_dtype: The outbound format, one of the :const:`OUTBOUND_FORMATS`.
+    :param str output_dir: The directory for the output files. Files found in a directory given in
+        ``paths`` keep their path relative to it. If omitted, each output file is written next to
+        its input file.
+    :returns: The jobs, in the order of ``paths`` and sorted within each directory.
+    :rtype: list of tuple
+    '''
+    extensions = INBOUND_FORMATS[in_dtype]
+    out_extension = OUTBOUND_FORMATS[out_dtype]
+
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() in extensions:
+                        source = os.path.join(dirpath, filename)
+                        found.append((source, os.path.relpath(source, path)))
+        else:
+            found.append((path, os.path.basename(path)))
+
+    jobs = []
+    for source, relative in found:
+        if output_dir is None:
+            target = os.path.splitext(source)[0] + out_extension
+        else:
+            target = os.path.join(output_dir, os.path.splitext(relative)[0] + out_extension)
+        jobs.append((source, in_dtype, target, out_dtype))
+    return jobs
+
+
+def silence_logs():
+    '''
+    Stop printing Lychee's log messages in this process. This is the initializer for the worker
+    processes of :func:`convert_many`.
+    '''
+    signals.LOG_MESSAGE.disconnect(signals.simple_log_outputter)
+
+
+def convert_many(jobs, workers=None, progress=None, verbose=False):
+    '''
+    Run :func:`convert_file` for every job.
+
+    :param jobs: The jobs, as from :func:`find_jobs`.
+    :param int workers: The number of worker processes. The default is the number of CPUs. With
+        ``0`` or ``1``, the files are converted in this process.
+    :param progress: A function called with every :class:`FileResult` as soon as it is ready.
+    :param bool verbose: Whether the worker processes print Lychee's log messages.
+    :returns: The results, in the order they finished.
+    :rtype: list of :class:`FileResult`
+    '''
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(jobs))
+
+    results = []
+    pool = None
+    if workers <= 1:
+        finished = (convert_file(job) for job in jobs)
+    else:
+        pool = multiprocessing.Pool(workers, initializer=None if verbose else silence_logs)
+        finished = pool.imap_unordered(convert_file, jobs, chunksize=1)
+
+    try:
+        for result in finished:
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return results
+
+
+def summarize(results, seconds):
+    '''
+    Compute the throughput of a batch of conversions.
+
+    :param results: The results from :func:`convert_many`.
+    :param float seconds: The wall-clock time of the whole batch.
+    :returns: A dictionary with the keys ``ok``, ``total``, ``seconds``, ``files_per_second``, and
+        ``kib_per_second``, counting only the files that were converted.
+    :rtype: dict
+    '''
+    converted = [result for result in results if result.error is None]
+    seconds = max(seconds, 1e-9)
+    return {
+        'ok': len(converted),
+        'total': len(results),
+        'seconds': seconds,
+        'files_per_second': len(converted) / seconds,
+        'kib_per_second': sum(result.size for result in converted) / 1024.0 / seconds,
+    }
+
+
+def make_parser():
+    '''
+    Make the command-line argument parser.
+
+    :rtype: :class:`argparse.ArgumentParser`
+    '''
+    parser = argparse.ArgumentParser(
+        prog='python -m lychee',
+        description='Convert music files between formats, through Lychee-MEI.')
+    parser.add_argument(
+        'paths', nargs='+', metavar='PATH',
+        help='a file to convert, or a directory to search for files to convert')
+    parser.add_argument(
+        '-f', '--from', dest='in_dtype', default='lilypond', type=str.lower,
+        choices=sorted(INBOUND_FORMATS), help='the inbound format (default: %(default)s)')
+    parser.add_argument(
+        '-t', '--to', dest='out_dtype', required=True, type=str.lower,
+        choices=sorted(OUTBOUND_FORMATS), help='the outbound format')
+    parser.add_argument(
+        '-o', '--output', dest='output_dir', metavar='DIR',
+        help='the directory for the output files (default: next to each input file)')
+    parser.add_argument(
+        '-j', '--jobs', dest='workers', type=int, metavar='N',
+        help='the number of worker processes (default: the number of CPUs)')
+    parser.add_argument(
+        '-q', '--quiet', action='store_true', help='only report failures and the summary')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help="also print Lychee's log messages")
+    return parser
+
+
+def main(argv=None, out=None):
+    '''
+    Run the batch converter.
+
+    :param argv: The command-line arguments, without the program name. The default is
+        :data:`sys.argv`.
+    :param out: The file for progress and the summary. The default is :data:`sys.stdout`.
+    :returns: The exit status: ``0`` when every file was converted, ``1`` otherwise.
+    :rtype: int
+    '''
+    args = make_parser().parse_args(argv)
+    out = sys.stdout if out is None else out
+
+    jobs = find_jobs(args.paths, args.in_dtype, args.out_dtype, args.output_dir)
+    if not jobs:
+        print(_ERR_NO_FILES.format(dtype=args.in_dtype), file=out)
+        return 1
+
+    done = [0]
+
+    def report(result):
+        done[0] += 1
+        if result.error is not None:
+            print(_PROGRESS_FAILED.format(
+                done=done[0], total=len(jobs), source=result.source, error=result.error), file=out)
+        elif not args.quiet:
+            print(_PROGRESS.format(
+                done=done[0], total=len(jobs), source=result.source, target=result.target,
+                seconds=result.seconds), file=out)
+        out.flush()
+
+    if not args.verbose:
+        silence_logs()
+    try:
+        start = timeit.default_timer()
+        results = convert_many(jobs, args.workers, progress=report, verbose=args.verbose)
+    finally:
+        if not args.verbose:
+            signals.LOG_MESSAGE.connect(signals.simple_log_outputter)
+    summary = summarize(results, timeit.default_timer() - start)
+    print(_SUMMARY.format(**summary), file=out)
+
+    return 0 if summary['ok'] == summary['total'] else 1
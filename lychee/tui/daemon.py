@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/tui/daemon.py
+# Purpose:                A conversion daemon on a Unix domain socket, and its client.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+A conversion daemon on a Unix domain socket, and its client.
+
+Every short-lived program that converts a document with Lychee, like an editor plugin or a build
+script, pays for starting Python and importing lxml, TatSu, and Abjad. Instead, start a daemon once:
+
+.. code-block:: shell
+
+    $ python -m lychee serve --jobs 4
+
+The daemon keeps a pool of worker processes, each of which imported the converters and ran one
+conversion before the first request, and answers requests on the socket. Each connection is served
+by its own thread, so requests from many clients are converted at the same time. Then convert with
+the thin :class:`Client`, or from the command line:
+
+.. code-block:: shell
+
+    $ python -m lychee client --from lilypond --to mei score.ly
+
+**Security**
+
+Anyone who can connect to the socket can use the daemon, and anyone who can create the socket could
+pretend to be the daemon. So the socket must be in a directory that only its owner may change, like
+:const:`DEFAULT_SOCKET`. The daemon makes the directory if it is missing, and the daemon and the
+client both refuse to use a socket in a directory that belongs to another user or that other users
+may write. The socket itself is made so that only its owner may connect.
+
+**Protocol**
+
+Requests and responses are frames, as made by :func:`lychee.signals.framing.encode_frame`, with the
+request or response type as the signal name. A client may send any number of requests on one
+connection, and receives one response for each, in order. The daemon closes a connection that sends
+nothing for ``--idle-timeout`` seconds, or that sends a frame longer than
+:const:`~lychee.signals.framing.DEFAULT_MAX_SIZE` bytes.
+
+``convert``
+    Arguments: the ``document``, and the ``from`` and ``to`` formats, as for
+    :func:`~lychee.tui.batch.convert_document`. Response: ``converted``, with the ``document`` and
+    the ``seconds`` the conversion took, or ``error``.
+``ping``
+    No arguments. Response: ``pong``, with the daemon's ``pid``, the number of ``workers``, the
+    ``deadline`` (or ``None``), and the ``from`` and ``to`` formats.
+``shutdown``
+    No arguments. Response: ``stopping``; then the daemon stops.
+
+Every ``error`` response has an ``error`` argument with the reason.
+
+**Deadlines**
+
+A pool worker that is stuck on one document cannot be stopped, and it would slowly take the pool
+away from the other clients. With ``--deadline SECONDS``, the daemon instead converts each request
+in a new worker process, forked from the warmed-up daemon, that is stopped when the deadline passes,
+as with :func:`lychee.workflow.supervise.run`. At most ``--jobs`` requests are converted at once.
+A conversion that was stopped gets an ``error`` response. The workers are forked from a handler
+thread, so a worker that needs a lock another thread held at the fork blocks until its deadline.
+'''
+
+from __future__ import print_function
+
+import argparse
+import io
+import multiprocessing
+import os
+import os.path
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import timeit
+
+import six
+from six.moves import socketserver
+
+from lychee import exceptions
+from lychee.signals import framing
+from lychee.tui import batch
+from lychee.workflow import supervise
+
+
+def _default_socket():
+    '''
+    Return the default pathname of the daemon's socket: in ``$XDG_RUNTIME_DIR`` if it is set, or
+    else in a directory named for the user in the temporary directory.
+    '''
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'lychee', 'daemon.sock')
+    user = getattr(os, 'getuid', lambda: 'user')()
+    return os.path.join(tempfile.gettempdir(), 'lychee-{0}'.format(user), 'daemon.sock')
+
+
+DEFAULT_SOCKET = _default_socket()
+'''
+The default pathname of the daemon's socket, in a directory for the user. Refer to "Security" above.
+'''
+
+DEFAULT_IDLE_TIMEOUT = 300.0
+'''Seconds the daemon waits for the next part of a request before it closes the connection.'''
+
+_WARM_UP_DOCUMENT = '\\new Staff { c4 }'
+_ERR_ALREADY_RUNNING = 'A Lychee daemon is already listening on {0}'
+_ERR_UNKNOWN_REQUEST = 'Unknown request: "{0}"'
+_ERR_BAD_RESPONSE = 'Unexpected response from the daemon: "{0}"'
+_ERR_CLOSED = 'The daemon closed the connection'
+_ERR_INSECURE = 'Refusing to use the socket {0}: {1}'
+_ERR_NOT_DIRECTORY = 'its directory is not a directory'
+_ERR_NOT_OWNER = 'it or its directory belongs to another user'
+_ERR_WRITABLE = 'other users may write its directory'
+
+
+def check_socket_dir(socket_path, create=False):
+    '''
+    Make sure only this user may create or replace a socket at ``socket_path``.
+
+    :param str socket_path: The pathname of the socket.
+    :param bool create: Whether to make the socket's directory, only for this user, if it is
+        missing.
+    :raises: :exc:`~lychee.exceptions.LycheeError` if the socket's directory is missing, is not a
+        directory, belongs to another user, or may be written by other users, or if the socket
+        exists and belongs to another user.
+
+    Without :func:`os.getuid`, as on Windows, nothing is checked.
+    '''
+    if not hasattr(os, 'getuid'):
+        return
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+    if create and not os.path.lexists(socket_dir):
+        try:
+            os.makedirs(socket_dir, 0o700)
+        except OSError:
+            # another daemon may have made it; it is checked below
+            pass
+
+    try:
+        dir_stat = os.lstat(socket_dir)
+    except OSError as exc:
+        raise exceptions.LycheeError(_ERR_INSECURE.format(socket_path, exc.strerror))
+    if not stat.S_ISDIR(dir_stat.st_mode):
+        raise exceptions.LycheeError(_ERR_INSECURE.format(socket_path, _ERR_NOT_DIRECTORY))
+    elif dir_stat.st_uid != os.getuid():
+        raise exceptions.LycheeError(_ERR_INSECURE.format(socket_path, _ERR_NOT_OWNER))
+    elif dir_stat.st_mode & 0o022:
+        raise exceptions.LycheeError(_ERR_INSECURE.format(socket_path, _ERR_WRITABLE))
+
+    if os.path.lexists(socket_path) and os.lstat(socket_path).st_uid != os.getuid():
+        raise exceptions.LycheeError(_ERR_INSECURE.format(socket_path, _ERR_NOT_OWNER))
+
+
+def warm_up():
+    '''
+    Import the converters and run one conversion to every outbound format, so the first request
+    is as fast as the others. This is the initializer of the worker processes.
+    '''
+    batch.silence_logs()
+    for out_dtype in batch.OUTBOUND_FORMATS:
+        try:
+            batch.convert_document(_WARM_UP_DOCUMENT, 'lilypond', out_dtype)
+        except Exception:  # pylint: disable=broad-except
+            # the request that needs this converter will report the error
+            pass
+
+
+def handle_convert(kwargs):
+    '''
+    Run one ``convert`` request. This runs in a worker process.
+
+    :param dict kwargs: The arguments of the request.
+    :returns: The name and arguments of the response.
+    :rtype: 2-tuple of str and dict
+    '''
+    start = timeit.default_timer()
+    try:
+        converted = batch.convert_document(kwargs['document'], kwargs['from'], kwargs['to'])
+    except Exception as exc:  # pylint: disable=broad-except
+        return 'error', {'error': batch.describe_error(exc)}
+    return 'converted', {
+        'document': converted.decode('utf-8'),
+        'seconds': timeit.default_timer() - start,
+    }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    '''
+    Answer the requests on one connection, until the client closes it.
+    '''
+
+    def setup(self):
+        # a client that stops sending must not keep this thread waiting forever
+        self.timeout = self.server.idle_timeout
+        socketserver.StreamRequestHandler.setup(self)
+
+    def handle(self):
+        while True:
+            try:
+                frame = framing.read_frame(self.rfile)
+            except (ValueError, socket.error):
+                return
+            if frame is None:
+                return
+
+            try:
+                name, kwargs = framing.decode_frame(frame)
+            except ValueError as exc:
+                name, kwargs = None, {}
+                response = ('error', {'error': batch.describe_error(exc)})
+            else:
+                try:
+                    response = self.server.respond(name, kwargs)
+                except Exception as exc:  # pylint: disable=broad-except
+                    response = ('error', {'error': batch.describe_error(exc)})
+
+            self.wfile.write(framing.encode_frame(response[0], response[1]))
+            self.wfile.flush()
+            if name == 'shutdown':
+                # NB: shutdown() waits for serve_forever() to stop, which runs on another thread
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    '''
+    The conversion daemon. Call :meth:`serve_forever` to answer requests, then :meth:`server_close`
+    to stop the worker processes and remove the socket.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, workers=None, deadline=None,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        '''
+        :param str socket_path: The pathname of the socket. If a socket from a daemon that stopped
+            is still there, it is replaced. The directory is made if it is missing, and checked
+            with :func:`check_socket_dir`.
+        :param int workers: The number of worker processes. The default is the number of CPUs.
+            With ``0``, requests are converted on the thread of their connection, in this process.
+        :param float deadline: Seconds each conversion may run. With a deadline, each request is
+            converted in a new supervised worker process, and at most ``workers`` (or one) at once.
+        :param float idle_timeout: Seconds to wait for each read from a connection before closing
+            it. ``None`` waits forever.
+        :raises: :exc:`~lychee.exceptions.LycheeError` if another daemon is listening on
+            ``socket_path``, or as for :func:`check_socket_dir`.
+        '''
+        check_socket_dir(socket_path, create=True)
+        if os.path.exists(socket_path):
+            if is_running(socket_path):
+                raise exceptions.LycheeError(_ERR_ALREADY_RUNNING.format(socket_path))
+            os.unlink(socket_path)
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.deadline = deadline
+        self.idle_timeout = idle_timeout
+        self.handled = 0
+        '''The number of requests answered.'''
+        self._lock = threading.Lock()
+
+        socketserver.UnixStreamServer.__init__(self, socket_path, _RequestHandler)
+
+        self._pool = None
+        self._slots = None
+        if deadline is not None:
+            # the supervised workers are forked from this process, so warm it up
+            self._slots = threading.BoundedSemaphore(max(workers, 1))
+            warm_up()
+        elif workers > 0:
+            self._pool = multiprocessing.Pool(workers, initializer=warm_up)
+        else:
+            warm_up()
+
+    def server_bind(self):
+        '''
+        Bind the socket, and allow only this user to connect to it.
+        '''
+        socketserver.UnixStreamServer.server_bind(self)
+        # nobody can connect before server_activate() listens, so this leaves no window open
+        os.chmod(self.server_address, 0o600)
+
+    def _convert(self, kwargs):
+        '''
+        Run one ``convert`` request as required by the ``workers`` and ``deadline``.
+        '''
+        if self._slots is not None:
+            with self._slots:
+                try:
+                    return supervise.run(handle_convert, (kwargs,), deadline=self.deadline)
+                except exceptions.WorkerError as exc:
+                    return 'error', {'error': exc.args[0]}
+        elif self._pool is not None:
+            return self._pool.apply(handle_convert, (kwargs,))
+        return handle_convert(kwargs)
+
+    def respond(self, name, kwargs):
+        '''
+        Answer one request. This runs on the thread of the connection.
+
+        :param str name: The request type.
+        :param dict kwargs: The arguments of the request.
+        :returns: The name and arguments of the response.
+        :rtype: 2-tuple of str and dict
+        '''
+        if name == 'convert':
+            response = self._convert(kwargs)
+        elif name == 'ping':
+            response = ('pong', {
+                'pid': os.getpid(),
+                'workers': self.workers,
+                'deadline': self.deadline,
+                'from': sorted(batch.INBOUND_FORMATS) + [batch.LMEI],
+                'to': sorted(batch.OUTBOUND_FORMATS) + [batch.LMEI],
+            })
+        elif name == 'shutdown':
+            response = ('stopping', {})
+        else:
+            response = ('error', {'error': _ERR_UNKNOWN_REQUEST.format(name)})
+
+        with self._lock:
+            self.handled += 1
+        return response
+
+    def server_close(self):
+        '''
+        Stop listening, stop the worker processes, and remove the socket.
+        '''
+        socketserver.UnixStreamServer.server_close(self)
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class Client(object):
+    '''
+    A connection to the conversion daemon.
+
+    >>> with Client() as client:
+    ...     mei = client.convert(r'\\new Staff { c4 }', 'lilypond', 'mei')
+    '''
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=None):
+        '''
+        :param str socket_path: The pathname of the daemon's socket.
+        :param float timeout: Seconds to wait for each response. The default is to wait forever.
+        :raises: :exc:`socket.error` if the daemon is not listening.
+        :raises: :exc:`~lychee.exceptions.LycheeError` as for :func:`check_socket_dir`.
+        '''
+        check_socket_dir(socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(socket_path)
+        except socket.error:
+            self._socket.close()
+            raise
+        self._stream = self._socket.makefile('rwb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        '''
+        Close the connection.
+        '''
+        self._stream.close()
+        self._socket.close()
+
+    def request(self, name, **kwargs):
+        '''
+        Send a request and wait for its response.
+
+        :param str name: The request type.
+        :returns: The name and arguments of the response.
+        :rtype: 2-tuple of str and dict
+        :raises: :exc:`~lychee.exceptions.LycheeError` if the daemon closed the connection.
+        '''
+        self._stream.write(framing.encode_frame(name, kwargs))
+        self._stream.flush()
+        frame = framing.read_frame(self._stream)
+        if frame is None:
+            raise exceptions.LycheeError(_ERR_CLOSED)
+        return framing.decode_frame(frame)
+
+    def convert(self, document, in_dtype, out_dtype):
+        '''
+        Convert a document.
+
+        :param str document: The inbound document.
+        :param str in_dtype: The inbound format, as for :func:`~lychee.tui.batch.convert_document`.
+        :param str out_dtype: The outbound format.
+        :returns: The outbound document.
+        :rtype: str
+        :raises: :exc:`~lychee.exceptions.ConversionError` with the daemon's reason if the
+            conversion failed.
+        '''
+        arguments = {'document': document, 'from': in_dtype, 'to': out_dtype}
+        name, kwargs = self.request('convert', **arguments)
+        if name == 'error':
+            raise exceptions.ConversionError(kwargs['error'])
+        elif name != 'converted':
+            raise exceptions.LycheeError(_ERR_BAD_RESPONSE.format(name))
+        return kwargs['document']
+
+    def ping(self):
+        '''
+        Ask about the daemon.
+
+        :returns: The arguments of the ``pong`` response.
+        :rtype: dict
+        '''
+        return self.request('ping')[1]
+
+    def shutdown(self):
+        '''
+        Ask the daemon to stop. It finishes the requests it already received.
+        '''
+        self.request('shutdown')
+
+
+def is_running(socket_path=DEFAULT_SOCKET):
+    '''
+    Return whether a daemon is listening on ``socket_path``.
+
+    :rtype: bool
+    :raises: :exc:`~lychee.exceptions.LycheeError` as for :func:`check_socket_dir`, if the socket
+        exists.
+    '''
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        Client(socket_path, timeout=5).close()
+    except socket.error:
+        return False
+    return True
+
+
+def serve_main(argv=None, out=None):
+    '''
+    Run the daemon until it is asked to stop, or is interrupted.
+
+    :param argv: The command-line arguments, without the program name and ``serve``.
+    :param out: The file for status messages. The default is :data:`sys.stdout`.
+    :returns: The exit status.
+    :rtype: int
+    '''
+    parser = argparse.ArgumentParser(
+        prog='python -m lychee serve', description='Run the Lychee conversion daemon.')
+    parser.add_argument(
+        '-s', '--socket', default=DEFAULT_SOCKET, help='the socket pathname (default: %(default)s)')
+    parser.add_argument(
+        '-j', '--jobs', dest='workers', type=int, metavar='N',
+        help='the number of worker processes (default: the number of CPUs)')
+    parser.add_argument(
+        '-d', '--deadline', type=float, metavar='SECONDS',
+        help='stop a conversion that runs longer than this (default: no deadline)')
+    parser.add_argument(
+        '--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT, metavar='SECONDS',
+        help='close a connection that sends nothing for this long (default: %(default)s)')
+    args = parser.parse_args(argv)
+    out = sys.stdout if out is None else out
+
+    server = ConversionServer(args.socket, args.workers, args.deadline, args.idle_timeout)
+    print('listening on {0} with {1} workers'.format(args.socket, server.workers), file=out)
+    out.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print('stopped after {0} requests'.format(server.handled), file=out)
+    return 0
+
+
+def client_main(argv=None, out=None):
+    '''
+    Convert one file (or standard input) with the daemon, and print the result.
+
+    :param argv: The command-line arguments, without the program name and ``client``.
+    :param out: The file for the converted document. The default is :data:`sys.stdout`.
+    :returns: The exit status: ``0`` if the conversion succeeded, ``1`` otherwise.
+    :rtype: int
+    '''
+    parser = argparse.ArgumentParser(
+        prog='python -m lychee client',
+        description='Convert a document with the Lychee conversion daemon.')
+    parser.add_argument(
+        'path', nargs='?', help='the file to convert (default: read standard input)')
+    parser.add_argument(
+        '-s', '--socket', default=DEFAULT_SOCKET, help='the socket pathname (default: %(default)s)')
+    parser.add_argument('-f', '--from', dest='in_dtype', default='lilypond', type=str.lower)
+    parser.add_argument('-t', '--to', dest='out_dtype', default=batch.LMEI, type=str.lower)
+    parser.add_argument(
+        '--stop', action='store_true', help='ask the daemon to stop instead of converting')
+    args = parser.parse_args(argv)
+    out = sys.stdout if out is None else out
+
+    with Client(args.socket) as client:
+        if args.stop:
+            client.shutdown()
+            return 0
+
+        if args.path is None:
+            document = sys.stdin.read()
+        else:
+            with io.open(args.path, 'r', encoding='utf-8') as the_file:
+                document = the_file.read()
+        if isinstance(document, six.binary_type):
+            document = document.decode('utf-8')
+
+        try:
+            converted = client.convert(document, args.in_dtype, args.out_dtype)
+        except exceptions.ConversionError as exc:
+            print(exc.args[0], file=sys.stderr)
+            return 1
+
+    out.write(converted)
+    return 0
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/tui/tests/test_batch.py
+# Purpose:                Tests for the "batch" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "batch" module.
+'''
+
+import os.path
+import shutil
+import tempfile
+
+from lxml import etree
+import pytest
+import six
+
+from lychee import converters
+from lychee.namespaces import mei
+from lychee.tui import batch
+
+
+_STAFF = '\\new Staff { \\clef "treble" c4 d4 e2 }\n'
+
+
+class TestBatch(object):
+
+    def setup_method(self, method):
+        self.temp_dir = tempfile.mkdtemp()
+        self.in_dir = os.path.join(self.temp_dir, 'in')
+        self.out_dir = os.path.join(self.temp_dir, 'out')
+        os.makedirs(os.path.join(self.in_dir, 'sub'))
+        self.write('a.ly', _STAFF)
+        self.write(os.path.join('sub', 'b.ly'), _STAFF)
+        self.write('notes.txt', 'not LilyPond')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        with open(os.path.join(self.in_dir, name), 'w') as the_file:
+            the_file.write(content)
+
+    def run(self, *argv):
+        out = six.StringIO()
+        status = batch.main(list(argv), out=out)
+        return status, out.getvalue()
+
+    def test_find_jobs(self):
+        '''
+        Directories are searched for files of the inbound format, which keep their relative path in
+        the output directory; files are used whatever their extension.
+        '''
+        notes = os.path.join(self.in_dir, 'notes.txt')
+        actual = batch.find_jobs([self.in_dir, notes], 'lilypond', 'mei', self.out_dir)
+        assert [
+            (os.path.join(self.in_dir, 'a.ly'), 'lilypond',
+             os.path.join(self.out_dir, 'a.mei'), 'mei'),
+            (os.path.join(self.in_dir, 'sub', 'b.ly'), 'lilypond',
+             os.path.join(self.out_dir, 'sub', 'b.mei'), 'mei'),
+            (notes, 'lilypond', os.path.join(self.out_dir, 'notes.mei'), 'mei'),
+        ] == actual
+
+        actual = batch.find_jobs([self.in_dir], 'lilypond', 'verovio')
+        assert os.path.join(self.in_dir, 'a.mei') == actual[0][2]
+
+    @pytest.mark.parametrize('workers', ['0', '2'])
+    def test_to_mei(self, workers):
+        '''
+        Every file is converted and reported, in this process or in a pool.
+        '''
+        status, output = self.run('--to', 'MEI', '-o', self.out_dir, '-j', workers, self.in_dir)
+
+        assert 0 == status
+        assert '[2/2]' in output
+        assert 'converted 2 of 2 files' in output
+        for name in ('a.mei', os.path.join('sub', 'b.mei')):
+            root = etree.parse(os.path.join(self.out_dir, name)).getroot()
+            assert mei.MEI == root.tag
+            assert len(root.findall('.//{}'.format(mei.NOTE))) == 3
+
+    def test_to_lilypond(self):
+        '''
+        The LilyPond output is written, and --quiet only prints the summary.
+        '''
+        status, output = self.run('-t', 'lilypond', '-o', self.out_dir, '-j', '0', '-q',
+                                  os.path.join(self.in_dir, 'a.ly'))
+
+        assert 0 == status
+        assert ['converted 1 of 1 files'] == [line[:22] for line in output.splitlines()]
+        with open(os.path.join(self.out_dir, 'a.ly')) as the_file:
+            assert 'c4 d4 e2' in the_file.read()
+
+    def test_failures(self):
+        '''
+        A file that fails is reported, the others are converted, and the status is 1. The input
+        file is never replaced.
+        '''
+        self.write('bad.ly', '\\new Staff { c4')
+
+        status, output = self.run('-t', 'mei', '-o', self.out_dir, '-j', '0', self.in_dir)
+        assert 1 == status
+        assert 'bad.ly FAILED (FailedToken' in output
+        assert 'converted 2 of 3 files' in output
+
+        status, output = self.run('-t', 'lilypond', '-j', '0', os.path.join(self.in_dir, 'a.ly'))
+        assert 1 == status
+        assert batch._ERR_OVERWRITE in output
+        with open(os.path.join(self.in_dir, 'a.ly')) as the_file:
+            assert _STAFF == the_file.read()
+
+    def test_streaming(self):
+        '''
+        The LilyPond output is converted in pieces. When the conversion fails part way, neither
+        part of the new output nor a temporary file is left behind.
+        '''
+        source = os.path.join(self.in_dir, 'a.ly')
+        chunks = list(batch.iter_convert_document(_STAFF, 'lilypond', 'lilypond'))
+        assert len(chunks) > 1
+        assert batch.convert_document(_STAFF, 'lilypond', 'lilypond') == b''.join(chunks)
+        assert 1 == len(list(batch.iter_convert_document(_STAFF, 'lilypond', 'mei')))
+
+        def failing(document, user_settings):
+            yield '\\version "2.18.2"\n'
+            raise RuntimeError('disk full')
+
+        target = os.path.join(self.out_dir, 'a.ly')
+        streamers = converters.OUTBOUND_STREAMERS
+        streamers['lilypond'], original = failing, streamers['lilypond']
+        try:
+            result = batch.convert_file((source, 'lilypond', target, 'lilypond'))
+        finally:
+            streamers['lilypond'] = original
+        assert 'RuntimeError: disk full' == result.error
+        assert [] == os.listdir(self.out_dir)
+
+    def test_failed_reconversion(self):
+        '''
+        When converting a file again fails, the output of the previous conversion is kept.
+        '''
+        source = os.path.join(self.in_dir, 'a.ly')
+        target = os.path.join(self.out_dir, 'a.ly')
+        assert batch.convert_file((source, 'lilypond', target, 'lilypond')).error is None
+        with open(target, 'rb') as the_file:
+            previous = the_file.read()
+
+        def failing(document, user_settings):
+            yield '\\version "2.18.2"\n'
+            raise RuntimeError('disk full')
+
+        streamers = converters.OUTBOUND_STREAMERS
+        streamers['lilypond'], original = failing, streamers['lilypond']
+        try:
+            result = batch.convert_file((source, 'lilypond', target, 'lilypond'))
+        finally:
+            streamers['lilypond'] = original
+        assert result.error is not None
+        assert ['a.ly'] == os.listdir(self.out_dir)
+        with open(target, 'rb') as the_file:
+            assert previous == the_file.read()
+
+    def test_no_files(self):
+        '''
+        When there are no input files, nothing is converted and the status is 1.
+        '''
+        empty = os.path.join(self.temp_dir, 'empty')
+        os.mkdir(empty)
+        assert (1, 'no lilypond files found\n') == self.run('-t', 'mei', empty)
+
+    def test_bad_format(self):
+        '''
+        An unknown format is an argument error.
+        '''
+        with pytest.raises(SystemExit):
+            batch.make_parser().parse_args(['-t', 'pdf', self.in_dir])
+
+    def test_summarize(self):
+        '''
+        Only the files that were converted count for the throughput.
+        '''
+        results = [
+            batch.FileResult('a', 'b', 2048, 0.5, None),
+            batch.FileResult('c', 'd', 1024, 0.5, 'failed'),
+        ]
+        actual = batch.summarize(results, 2.0)
+        assert {'ok': 1, 'total': 2, 'seconds': 2.0, 'files_per_second': 0.5,
+                'kib_per_second': 1.0} == actual
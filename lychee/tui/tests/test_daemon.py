@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/tui/tests/test_daemon.py
+# Purpose:                Tests for the "daemon" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "daemon" module.
+
+The daemon runs on a thread of the test process, with a socket in a temporary directory.
+'''
+
+import os.path
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lxml import etree
+import pytest
+import six
+
+from lychee import exceptions
+from lychee.namespaces import mei
+from lychee.signals import framing
+from lychee.tui import daemon
+
+
+_STAFF = '\\new Staff { \\clef "treble" c4 d4 e2 }'
+
+
+class TestDaemon(object):
+
+    workers = 0
+    deadline = None
+
+    def setup_method(self, method):
+        self.temp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.temp_dir, 'lychee.sock')
+        self.server = daemon.ConversionServer(
+            self.socket_path, workers=self.workers, deadline=self.deadline)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def teardown_method(self, method):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_convert(self):
+        '''
+        Many requests on one connection: to LMEI, from LMEI, and straight through.
+        '''
+        with daemon.Client(self.socket_path) as client:
+            lmei = client.convert(_STAFF, 'lilypond', 'lmei')
+            assert mei.SECTION == etree.fromstring(lmei.encode('utf-8')).tag
+            assert 'c4 d4 e2' in client.convert(lmei, 'lmei', 'lilypond')
+            converted = etree.fromstring(client.convert(_STAFF, 'LilyPond', 'mei').encode('utf-8'))
+            assert 3 == len(converted.findall('.//{}'.format(mei.NOTE)))
+        assert 3 == self.server.handled
+
+    def test_errors(self):
+        '''
+        A failed conversion or an unknown request gives an error, and the connection still works.
+        '''
+        with daemon.Client(self.socket_path) as client:
+            with pytest.raises(exceptions.ConversionError) as exc:
+                client.convert(_STAFF, 'lilypond', 'pdf')
+            assert 'pdf' in exc.value.args[0]
+            with pytest.raises(exceptions.ConversionError) as exc:
+                client.convert('\\new Staff { c4', 'lilypond', 'mei')
+            assert 'FailedToken' in exc.value.args[0]
+            assert 'error' == client.request('bake')[0]
+            assert self.workers == client.ping()['workers']
+
+    def test_concurrent(self):
+        '''
+        Many clients at once each receive their own result.
+        '''
+        results = {}
+
+        def convert(index):
+            document = '\\new Staff {{ {0} }}'.format(' '.join(['c4'] * (index + 1)))
+            with daemon.Client(self.socket_path, timeout=60) as client:
+                results[index] = client.convert(document, 'lilypond', 'lilypond')
+
+        threads = [threading.Thread(target=convert, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for index in range(4):
+            assert ' '.join(['c4'] * (index + 1)) in results[index]
+
+    def test_socket(self):
+        '''
+        Only one daemon may listen on a socket, and the socket is only for this user.
+        '''
+        assert daemon.is_running(self.socket_path)
+        assert 0o600 == os.stat(self.socket_path).st_mode & 0o777
+        with pytest.raises(exceptions.LycheeError):
+            daemon.ConversionServer(self.socket_path, workers=0)
+
+    def connect(self):
+        '''
+        Connect to the daemon without a Client.
+        '''
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(10)
+        connection.connect(self.socket_path)
+        return connection
+
+    def test_idle_timeout(self):
+        '''
+        The daemon closes a connection that stops sending in the middle of a request.
+        '''
+        self.server.idle_timeout = 0.2
+        connection = self.connect()
+        try:
+            connection.sendall(framing.encode_frame('ping', {})[:3])
+            assert b'' == connection.recv(1)
+        finally:
+            connection.close()
+
+    def test_frame_too_large(self):
+        '''
+        The daemon closes a connection that sends a frame longer than the limit, without waiting
+        for its body.
+        '''
+        connection = self.connect()
+        try:
+            connection.sendall(framing._HEADER.pack(framing.FRAME_VERSION, 0, 2 ** 32 - 1))
+            assert b'' == connection.recv(1)
+        finally:
+            connection.close()
+
+    def test_insecure_directory(self):
+        '''
+        The client refuses a socket in a directory that other users may write.
+        '''
+        os.chmod(self.temp_dir, 0o777)
+        try:
+            with pytest.raises(exceptions.LycheeError) as exc:
+                daemon.Client(self.socket_path)
+            assert daemon._ERR_WRITABLE in exc.value.args[0]
+        finally:
+            os.chmod(self.temp_dir, 0o700)
+
+    def test_client_main(self):
+        '''
+        The command-line client prints the converted file, or the error and status 1.
+        '''
+        path = os.path.join(self.temp_dir, 'a.ly')
+        with open(path, 'w') as the_file:
+            the_file.write(_STAFF)
+
+        out = six.StringIO()
+        assert 0 == daemon.client_main(['-s', self.socket_path, '-t', 'lilypond', path], out=out)
+        assert 'c4 d4 e2' in out.getvalue()
+        assert 1 == daemon.client_main(['-s', self.socket_path, '-t', 'pdf', path], out=out)
+
+
+class TestDaemonPool(TestDaemon):
+    '''
+    The same tests, with worker processes.
+    '''
+
+    workers = 2
+
+
+class TestDaemonDeadline(TestDaemon):
+    '''
+    The same tests, with a supervised worker process for every conversion.
+    '''
+
+    workers = 2
+    deadline = 30
+
+    @mock.patch('lychee.tui.batch.convert_document')
+    def test_deadline(self, mock_convert):
+        '''
+        A conversion that runs past the deadline is stopped, and the connection still works.
+        '''
+        mock_convert.side_effect = lambda *args: time.sleep(30)
+        self.server.deadline = 0.5
+        with daemon.Client(self.socket_path) as client:
+            start = time.time()
+            with pytest.raises(exceptions.ConversionError) as exc:
+                client.convert(_STAFF, 'lilypond', 'mei')
+            assert time.time() - start < 10
+            assert '0.5 seconds' in exc.value.args[0]
+            assert 0.5 == client.ping()['deadline']
+
+
+def test_shutdown():
+    '''
+    A client may stop the daemon, which removes its socket; a stale socket is replaced.
+    '''
+    temp_dir = tempfile.mkdtemp()
+    socket_path = os.path.join(temp_dir, 'lychee.sock')
+    try:
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+        assert not daemon.is_running(socket_path)
+
+        out = six.StringIO()
+        thread = threading.Thread(
+            target=daemon.serve_main, args=(['-s', socket_path, '-j', '0'],), kwargs={'out': out})
+        thread.start()
+        for _ in range(100):
+            if daemon.is_running(socket_path):
+                break
+            thread.join(0.05)
+
+        assert 0 == daemon.client_main(['-s', socket_path, '--stop'])
+        thread.join(10)
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
+        assert 'stopped after 1 requests' in out.getvalue()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='requires Unix')
+class TestCheckSocketDir(object):
+    '''
+    Tests for check_socket_dir() and the default socket.
+    '''
+
+    def setup_method(self, method):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_create(self):
+        '''
+        A missing directory is made only for this user, if requested.
+        '''
+        socket_path = os.path.join(self.temp_dir, 'lychee', 'daemon.sock')
+        with pytest.raises(exceptions.LycheeError):
+            daemon.check_socket_dir(socket_path)
+        daemon.check_socket_dir(socket_path, create=True)
+        assert 0o700 == os.stat(os.path.dirname(socket_path)).st_mode & 0o777
+        daemon.check_socket_dir(socket_path)
+
+    def test_not_directory(self):
+        '''
+        The socket's directory may not be a file or a symbolic link.
+        '''
+        target = os.path.join(self.temp_dir, 'target')
+        os.mkdir(target, 0o700)
+        os.symlink(target, os.path.join(self.temp_dir, 'link'))
+        with pytest.raises(exceptions.LycheeError) as exc:
+            daemon.check_socket_dir(os.path.join(self.temp_dir, 'link', 'daemon.sock'))
+        assert daemon._ERR_NOT_DIRECTORY in exc.value.args[0]
+
+    def test_other_owner(self):
+        '''
+        A directory that belongs to another user is refused.
+        '''
+        with mock.patch('lychee.tui.daemon.os.getuid', return_value=os.getuid() + 1):
+            with pytest.raises(exceptions.LycheeError) as exc:
+                daemon.check_socket_dir(os.path.join(self.temp_dir, 'daemon.sock'))
+        assert daemon._ERR_NOT_OWNER in exc.value.args[0]
+
+    def test_default_socket(self):
+        '''
+        The default socket is in $XDG_RUNTIME_DIR when it is set, and never directly in the
+        temporary directory.
+        '''
+        with mock.patch.dict('os.environ', {'XDG_RUNTIME_DIR': '/run/user/1000'}):
+            assert '/run/user/1000/lychee/daemon.sock' == daemon._default_socket()
+        with mock.patch.dict('os.environ', {'XDG_RUNTIME_DIR': ''}):
+            socket_dir = os.path.dirname(daemon._default_socket())
+        assert tempfile.gettempdir() == os.path.dirname(socket_dir)
+        assert str(os.getuid()) in os.path.basename(socket_dir)
@@ -26,3 +26,5 @@
 # NOTE: the __init__ module is not built in the API
 
 from lychee.utils.elements_equal import elements_equal
+from lychee.utils.subtree_hash import subtree_hash
+from lychee.utils.section_diff import section_diff
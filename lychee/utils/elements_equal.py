@@ -25,6 +25,8 @@
 '''
 Tests for equality of two lxml objects.
 '''
+from six.moves import zip_longest
+
 from lychee.namespaces import lychee as lyns
 from lychee.namespaces import xml as xmlns
 
@@ -32,30 +34,32 @@ from lychee.namespaces import xml as xmlns
 def elements_equal(first, second):
     '''
     Type-specific equality function for :class:`lxml.etree.Element` and
-    :class:`lxml.etree.ElementTree` objects. Ignores xml:id attributes.
+    :class:`lxml.etree.ElementTree` objects. Ignores xml:id attributes, and the value of ly:version
+    attributes when both elements have one.
+
+    The elements are compared one by one in document order, by their tags and attributes only, so
+    text is ignored, and comments are compared like elements. To compare the music in two subtrees
+    including text, compare their :func:`~lychee.utils.subtree_hash.subtree_hash` instead.
     '''
-    first_list = [x for x in first.iter()]
-    second_list = [x for x in second.iter()]
-    if len(first_list) != len(second_list):
-        # different number of children
-        return False
-    for i in range(len(first_list)):
-        if first_list[i].tag != second_list[i].tag:
+    if first is second:
+        return True
+    for first_elem, second_elem in zip_longest(first.iter(), second.iter()):
+        if first_elem is None or second_elem is None:
+            # different number of children
+            return False
+        if first_elem.tag != second_elem.tag:
             # tags don't match
             return False
-        first_keys = [x for x in first_list[i].keys() if x != xmlns.ID]
-        second_keys = [x for x in second_list[i].keys() if x != xmlns.ID]
+        first_keys = [x for x in first_elem.keys() if x != xmlns.ID]
+        second_keys = [x for x in second_elem.keys() if x != xmlns.ID]
         if len(first_keys) != len(second_keys):
             # different number of attributes
             return False
         for key in first_keys:
             if key == lyns.VERSION:
-                if first_list[i].get(key) is None:
-                    return False
-                if second_list[i].get(key) is None:
-                    return False
-            else:
-                if first_list[i].get(key) != second_list[i].get(key):
-                    # elements are not equal
+                if second_elem.get(key) is None:
                     return False
+            elif first_elem.get(key) != second_elem.get(key):
+                # elements are not equal
+                return False
     return True
@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/events.py
+# Purpose:                Columnar tables of the events in Lychee-MEI layers.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Columnar tables of the events in Lychee-MEI layers.
+
+Measure creation and autobeaming need the onset and duration of every element in a ``<layer>``.
+Reading them from the tree means parsing string attributes like @dur and @dots, with
+:class:`~fractions.Fraction` arithmetic, for every element every time. A :class:`LayerEvents` table
+reads each element once, and holds one integer column for each of the :const:`FIELDS`:
+
+``onset``
+    When the element starts, in ticks from the start of the layer.
+``duration``
+    How long the element lasts in the layer, in ticks, including dots and tuplets. Only notes,
+    chords, rests, and spaces have a duration; for other elements it is ``0``.
+``nominal``
+    The duration in ticks from @dur and @dots alone, ignoring tuplets, for any element with @dur.
+``pitch``
+    The MIDI key number of a note, or of the lowest note in a chord; ``-1`` for other elements.
+``kind``
+    What the element is, as one of :const:`NOTE`, :const:`CHORD`, :const:`REST`, :const:`SPACE`,
+    :const:`TUPLET_SPAN`, or :const:`OTHER`.
+``dur``
+    The position of @dur in :const:`lychee.utils.music_utils.DURATIONS`, or ``-1`` without @dur.
+``index``
+    The position of the element in ``m_layer.findall('*')``, which omits comments.
+
+A tick is a fraction of a whole note chosen for each table, :attr:`LayerEvents.ticks_per_whole`, so
+that every duration is a whole number of ticks. The table is a NumPy structured array when NumPy
+is installed, or one :class:`array.array` per column otherwise; :func:`measure_ranges` and
+:func:`beam_groups` use vectorized operations with NumPy and simple loops without it.
+
+Build the tables for a whole ``<section>`` with :meth:`SectionEvents.from_section`, or have a
+:class:`~lychee.document.Document` build and cache them with
+:meth:`~lychee.document.Document.get_section_events`. The cache serves the :class:`SectionIndex`
+and the search index of :mod:`lychee.document.search`. The outbound conversions do not use it:
+:func:`~lychee.workflow.steps.do_outbound_steps` opens a new :class:`~lychee.document.Document`
+for every conversion, so :func:`~lychee.converters.outbound.mei.create_measures` builds the tables
+it needs once per conversion instead, and autobeaming builds a table for each ``<layer>`` it makes
+during the inbound conversion.
+
+A :class:`SectionIndex` numbers the measures in a ``<section>`` as they will be made on output, and
+finds the elements in a measure, or sounding at a time in a measure, without reading the whole
+section. A :class:`~lychee.document.Document` caches these too, with
+:meth:`~lychee.document.Document.get_section_index`.
+'''
+
+import array
+import bisect
+import fractions
+import sys
+
+from lychee import exceptions
+from lychee.namespaces import mei, xml
+
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+
+
+# NumPy is imported by _numpy() when the first table is built, since importing it takes longer than
+# most conversions; None if NumPy is not installed
+numpy = _NOT_IMPORTED = object()
+
+
+def _numpy():
+    '''
+    Return the :mod:`numpy` module, or ``None`` if it is not installed.
+    '''
+    global numpy  # pylint: disable=global-statement
+    if numpy is _NOT_IMPORTED:
+        try:
+            import numpy as module  # pylint: disable=redefined-outer-name
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+
+FIELDS = ('onset', 'duration', 'nominal', 'pitch', 'kind', 'dur', 'index')
+'''The names of the columns in a :class:`LayerEvents` table.'''
+
+OTHER = 0
+NOTE = 1
+CHORD = 2
+REST = 3
+SPACE = 4
+TUPLET_SPAN = 5
+
+_KINDS = {
+    mei.NOTE: NOTE,
+    mei.CHORD: CHORD,
+    mei.REST: REST,
+    mei.SPACE: SPACE,
+    mei.TUPLET_SPAN: TUPLET_SPAN,
+}
+
+# same order as lychee.utils.music_utils.DURATIONS, which imports this module
+_DURATIONS = ('long', 'breve', '1', '2', '4', '8', '16', '32', '64', '128', '256', '512', '1024',
+              '2048')
+_DURATION_VALUES = dict(
+    [('long', fractions.Fraction(4)), ('breve', fractions.Fraction(2))] +
+    [(dur, fractions.Fraction(1, int(dur))) for dur in _DURATIONS[2:]])
+# notes and chords with this @dur or longer are not beamed
+_QUARTER = _DURATIONS.index('4')
+
+_ZERO = (0, 1)
+# NB: a <layer> uses few combinations of @dur and @dots, so their values are computed once
+_DURATION_CACHE = {}
+_TIMED = (NOTE, CHORD, REST, SPACE)
+
+_PITCH_CLASSES = {'c': 0, 'd': 2, 'e': 4, 'f': 5, 'g': 7, 'a': 9, 'b': 11}
+_ACCIDENTALS = {'ff': -2, 'f': -1, 'n': 0, 's': 1, 'ss': 2, 'x': 2}
+
+# NB: "l" is only 32 bits on some platforms, and "q" needs Python 3.3
+_TYPECODE = 'q' if sys.version_info >= (3, 3) else 'l'
+
+_ERR_UNKNOWN_DURATION = "Unknown duration: '{}'"
+
+
+def _lcm(first, second):
+    '''
+    Return the least common multiple of two positive integers.
+    '''
+    return first * second // gcd(first, second)
+
+
+def _duration(elem):
+    '''
+    Return the @dur of an element as a position in :const:`_DURATIONS`, and its value in whole
+    notes including @dots as a numerator and denominator, or ``(-1, (0, 1))`` without @dur.
+    '''
+    key = (elem.get('dur'), elem.get('dots'))
+    if key not in _DURATION_CACHE:
+        dur, dots = key
+        if not dur:
+            return -1, _ZERO
+        elif dur not in _DURATION_VALUES:
+            raise exceptions.LycheeMEIError(_ERR_UNKNOWN_DURATION.format(dur))
+        value = _DURATION_VALUES[dur]
+        if dots:
+            dots = int(dots)
+            value *= fractions.Fraction(2 ** (dots + 1) - 1, 2 ** dots)
+        _DURATION_CACHE[key] = (_DURATIONS.index(dur), (value.numerator, value.denominator))
+    return _DURATION_CACHE[key]
+
+
+def _note_pitch(m_note):
+    '''
+    Return the MIDI key number of a ``<note>``, or ``-1`` if it has no pitch.
+    '''
+    pname = m_note.get('pname')
+    octave = m_note.get('oct')
+    if pname not in _PITCH_CLASSES or not octave:
+        return -1
+    accid = m_note.get('accid.ges') or m_note.get('accid')
+    if accid is None and len(m_note):
+        for m_accid in m_note.iterchildren(mei.ACCID):
+            accid = m_accid.get('accid.ges') or m_accid.get('accid')
+            break
+    return 12 * (int(octave) + 1) + _PITCH_CLASSES[pname] + _ACCIDENTALS.get(accid, 0)
+
+
+def _chord_pitch(m_chord):
+    '''
+    Return the MIDI key number of the lowest ``<note>`` in a ``<chord>``, or ``-1`` if none has a
+    pitch.
+    '''
+    pitches = [_note_pitch(m_note) for m_note in m_chord.iterchildren(mei.NOTE)]
+    pitches = [pitch for pitch in pitches if pitch >= 0]
+    return min(pitches) if pitches else -1
+
+
+def _read_layer(m_layer, pitches):
+    '''
+    Read every element of a ``<layer>`` once, and the pitches only if ``pitches`` is true.
+
+    :returns: A list with a row for every element, each a list of the values in :const:`FIELDS`,
+        except that ``onset`` is ``0``, and ``duration`` and ``nominal`` are a numerator and
+        denominator of a whole note.
+    :rtype: list of list
+
+    Tuplets are applied as by :func:`lychee.converters.outbound.mei.create_measures`: the ratio of a
+    ``<tupletSpan>`` applies to the elements in its @plist that follow it in the layer.
+    '''
+    rows = []
+    # @xml:id of an element to the ratios of the <tupletSpan> elements that include it
+    tuplets = {}
+    for index, elem in enumerate(m_layer.iterfind('*')):
+        kind = _KINDS.get(elem.tag, OTHER)
+        dur, nominal = _duration(elem)
+
+        duration = _ZERO
+        if kind in _TIMED:
+            duration = nominal
+            if tuplets and elem.get(xml.ID) in tuplets:
+                value = fractions.Fraction(*duration)
+                for ratio in tuplets.pop(elem.get(xml.ID)):
+                    value *= ratio
+                duration = (value.numerator, value.denominator)
+        elif kind == TUPLET_SPAN:
+            plist = elem.get('plist', '').replace('#', '')
+            if plist:
+                ratio = fractions.Fraction(int(elem.get('numbase', 0)), int(elem.get('num', 0)))
+                for xmlid in plist.split(' '):
+                    tuplets.setdefault(xmlid, []).append(ratio)
+
+        if not pitches:
+            pitch = -1
+        elif kind == NOTE:
+            pitch = _note_pitch(elem)
+        elif kind == CHORD:
+            pitch = _chord_pitch(elem)
+        else:
+            pitch = -1
+
+        rows.append([0, duration, nominal, pitch, kind, dur, index])
+    return rows
+
+
+class LayerEvents(object):
+    '''
+    A table of the events in one ``<layer>``, with one column for each of the :const:`FIELDS`.
+    '''
+
+    def __init__(self, rows, ticks_per_whole):
+        '''
+        :param rows: The values of the :const:`FIELDS` for every element, with durations in ticks.
+        :type rows: list of list of int
+        :param int ticks_per_whole: The number of ticks in a whole note.
+        '''
+        self.ticks_per_whole = ticks_per_whole
+        '''The number of ticks in a whole note.'''
+        numpy = _numpy()
+        if numpy is not None:
+            self._table = numpy.array(
+                [tuple(row) for row in rows],
+                dtype=[(field, numpy.int64) for field in FIELDS])
+        else:
+            self._table = dict(
+                (field, array.array(_TYPECODE, [row[i] for row in rows]))
+                for i, field in enumerate(FIELDS))
+        self._length = len(rows)
+
+    @classmethod
+    def from_layer(cls, m_layer, pitches=True):
+        '''
+        Build the table for a ``<layer>``.
+
+        :param m_layer: The ``<layer>``.
+        :type m_layer: :class:`lxml.etree.Element`
+        :param bool pitches: Whether to read the pitches. If false, every ``pitch`` is ``-1``, which
+            is faster for a table that is used once for durations only.
+        :rtype: :class:`LayerEvents`
+        :raises: :exc:`~lychee.exceptions.LycheeMEIError` if an element has an unknown @dur.
+        '''
+        rows = _read_layer(m_layer, pitches)
+
+        values = set(row[1] for row in rows)
+        values.update(row[2] for row in rows)
+        ticks_per_whole = 1
+        for _, denominator in values:
+            ticks_per_whole = _lcm(ticks_per_whole, denominator)
+
+        ticks = dict(
+            ((numerator, denominator), numerator * (ticks_per_whole // denominator))
+            for numerator, denominator in values)
+        onset = 0
+        for row in rows:
+            row[0] = onset
+            row[1] = ticks[row[1]]
+            row[2] = ticks[row[2]]
+            onset += row[1]
+
+        return cls(rows, ticks_per_whole)
+
+    def __len__(self):
+        return self._length
+
+    def column(self, field):
+        '''
+        Return one column of the table.
+
+        :param str field: One of the :const:`FIELDS`.
+        :returns: The column, which must not be modified.
+        :rtype: :class:`numpy.ndarray` or :class:`array.array`
+        '''
+        return self._table[field]
+
+    def ends(self):
+        '''
+        Return when each element ends, in ticks from the start of the layer.
+
+        :rtype: :class:`numpy.ndarray` or :class:`array.array`
+        '''
+        numpy = _numpy()
+        if numpy is not None:
+            return self._table['onset'] + self._table['duration']
+        return array.array(_TYPECODE, [
+            onset + duration
+            for onset, duration in zip(self._table['onset'], self._table['duration'])])
+
+
+class SectionEvents(object):
+    '''
+    The :class:`LayerEvents` tables for every ``<layer>`` in a ``<section>``.
+    '''
+
+    def __init__(self, layers):
+        '''
+        :param layers: The @n of the ``<staff>``, the @n of the ``<layer>``, and the table for every
+            layer, in document order.
+        :type layers: list of 3-tuple
+        '''
+        self.layers = layers
+        '''The @n of the ``<staff>`` and ``<layer>``, and the table, for every layer in order.'''
+
+    @classmethod
+    def from_section(cls, m_section, pitches=True):
+        '''
+        Build the tables for every ``<layer>`` in every ``<staff>`` that is a child of a
+        ``<section>``, as processed by :func:`lychee.converters.outbound.mei.create_measures`.
+
+        :param m_section: The ``<section>``.
+        :type m_section: :class:`lxml.etree.Element`
+        :param bool pitches: As for :meth:`LayerEvents.from_layer`.
+        :rtype: :class:`SectionEvents`
+        '''
+        return cls([
+            (m_staff.get('n'), m_layer.get('n'), LayerEvents.from_layer(m_layer, pitches))
+            for m_staff in m_section.iterfind(mei.STAFF)
+            for m_layer in m_staff.iterfind(mei.LAYER)])
+
+    def __len__(self):
+        return len(self.layers)
+
+
+def measure_ranges(events, measure):
+    '''
+    Divide a layer into measures, as for :func:`lychee.converters.outbound.mei.create_measures`.
+
+    :param events: The table for the layer.
+    :type events: :class:`LayerEvents`
+    :param measure: The duration of a measure in whole notes.
+    :type measure: :class:`fractions.Fraction`
+    :returns: The start and stop index of every measure, and whether it is complete.
+    :rtype: list of 3-tuple of int, int, bool
+
+    A measure is complete after the element where the duration since the end of the previous
+    measure reaches ``measure``; any excess is not carried into the next measure. A whole note at
+    the start of a measure completes it, unless it is in a tuplet. Elements after the last
+    complete measure are in an incomplete measure.
+    '''
+    length = len(events)
+    ends = events.ends()
+    measure_ticks = measure * events.ticks_per_whole
+    # the first end at or after this many ticks past the previous measure completes a measure
+    needed = -(-measure_ticks.numerator // measure_ticks.denominator)
+
+    kind = events.column('kind')
+    dur = events.column('dur')
+    duration = events.column('duration')
+    nominal = events.column('nominal')
+    whole = _DURATIONS.index('1')
+    numpy = _numpy()
+    if numpy is not None:
+        timed = numpy.flatnonzero((kind >= NOTE) & (kind <= SPACE)).tolist()
+        fills = ((dur == whole) & (duration == nominal)).tolist()
+    else:
+        timed = [i for i in range(length) if NOTE <= kind[i] <= SPACE]
+        fills = [d == whole and a == b for d, a, b in zip(dur, duration, nominal)]
+
+    post = []
+    start = 0
+    previous_end = 0
+    while start < length:
+        if numpy is not None:
+            stop = start + int(numpy.searchsorted(ends[start:], previous_end + needed))
+        else:
+            stop = bisect.bisect_left(ends, previous_end + needed, start)
+        first_timed = bisect.bisect_left(timed, start)
+        if first_timed < len(timed) and timed[first_timed] < stop and fills[timed[first_timed]]:
+            stop = timed[first_timed]
+
+        if stop >= length:
+            post.append((start, length, False))
+            break
+        post.append((start, stop + 1, True))
+        previous_end = int(ends[stop])
+        start = stop + 1
+
+    return post
+
+
+def number_measures(m_section, section_events, measure):
+    '''
+    Number the measures in every ``<layer>`` of a ``<section>``, as for
+    :func:`lychee.converters.outbound.mei.create_measures`.
+
+    :param m_section: The ``<section>``.
+    :type m_section: :class:`lxml.etree.Element`
+    :param section_events: The tables for ``m_section``.
+    :type section_events: :class:`SectionEvents`
+    :param measure: The duration of a measure in whole notes.
+    :type measure: :class:`fractions.Fraction`
+    :returns: For every layer in order, the ``<staff>``, the ``<layer>``, its table, and a list with
+        the number, start index, and stop index of each of its measures, as from
+        :func:`measure_ranges`.
+    :rtype: iterator of 4-tuple
+
+    Measures are numbered from 1 in every ``<staff>``. When a later ``<staff>`` has the same @n,
+    its measures are numbered from after the last complete measure of the earlier one.
+    '''
+    layer_tables = iter(section_events.layers)
+    # staff @n to the highest complete measure number so far
+    meas_nums = {}
+    for m_staff in m_section.iterfind(mei.STAFF):
+        previous = meas_nums.get(m_staff.get('n'), 0)
+        highest = previous
+        for m_layer in m_staff.iterfind(mei.LAYER):
+            _, _, table = next(layer_tables)
+            numbered = []
+            for number, (start, stop, complete) in enumerate(
+                    measure_ranges(table, measure), previous + 1):
+                numbered.append((number, start, stop))
+                if complete:
+                    highest = max(highest, number)
+            yield m_staff, m_layer, table, numbered
+        meas_nums[m_staff.get('n')] = highest
+
+
+def beam_groups(events, beat):
+    '''
+    Find the notes and chords to beam together, as for
+    :func:`lychee.utils.music_utils.get_autobeam_structure`.
+
+    :param events: The table for the layer.
+    :type events: :class:`LayerEvents`
+    :param beat: The duration of a beat in whole notes.
+    :type beat: :class:`fractions.Fraction`
+    :returns: The indices of the elements in each beam with two or more elements, in order.
+    :rtype: list of list of int
+
+    Only elements with @dur count. Rests, and notes and chords of a quarter note or longer, end a
+    beam; shorter notes and chords join it. A beam also ends at every beat, counting @dur and
+    @dots but not tuplets.
+    '''
+    beat_ticks = beat * events.ticks_per_whole
+    kind = events.column('kind')
+    dur = events.column('dur')
+    nominal = events.column('nominal')
+
+    numpy = _numpy()
+    if numpy is not None:
+        timed = numpy.flatnonzero(dur >= 0)
+        kind = kind[timed]
+        dur = dur[timed]
+        elapsed = numpy.cumsum(nominal[timed])
+        notes = (kind == NOTE) | (kind == CHORD)
+        breaks = (kind == REST) | (notes & (dur <= _QUARTER))
+        beamable = notes & (dur > _QUARTER)
+        on_beat = (elapsed * beat_ticks.denominator) % beat_ticks.numerator == 0
+        # each element's beam is the number of beam ends before it
+        beam = numpy.cumsum(breaks) + numpy.cumsum(on_beat) - on_beat
+        members = timed[beamable]
+        splits = numpy.flatnonzero(numpy.diff(beam[beamable])) + 1
+        groups = [group.tolist() for group in numpy.split(members, splits)]
+    else:
+        groups = [[]]
+        elapsed = 0
+        for index in range(len(events)):
+            if dur[index] < 0:
+                continue
+            notes = kind[index] in (NOTE, CHORD)
+            if kind[index] == REST or (notes and dur[index] <= _QUARTER):
+                groups.append([])
+            elif notes:
+                groups[-1].append(index)
+            elapsed += nominal[index]
+            if (elapsed * beat_ticks.denominator) % beat_ticks.numerator == 0:
+                groups.append([])
+
+    return [group for group in groups if len(group) > 1]
+
+
+def meter(m_section):
+    '''
+    Return the duration of a measure in a ``<section>``, from @meter.count and @meter.unit on its
+    first ``<staffDef>``, as for :func:`lychee.converters.outbound.mei.create_measures`.
+
+    :param m_section: The ``<section>``.
+    :type m_section: :class:`lxml.etree.Element`
+    :returns: The duration in whole notes, which is ``4/4`` if not indicated.
+    :rtype: :class:`fractions.Fraction`
+    '''
+    m_staffdef = m_section.find('.//{0}'.format(mei.STAFF_DEF))
+    if m_staffdef is None:
+        return fractions.Fraction(1)
+    count = fractions.Fraction(float(m_staffdef.get('meter.count', 4)))
+    unit = fractions.Fraction(float(m_staffdef.get('meter.unit', 4)))
+    return count / unit
+
+
+class SectionIndex(object):
+    '''
+    Find the elements of a ``<section>`` by measure number and by time in a measure, with the
+    measures numbered as by :func:`lychee.converters.outbound.mei.create_measures`.
+
+    >>> index = SectionIndex(m_section)
+    >>> index.at(120, Fraction(2, 4))  # everything sounding on beat 3 of measure 120 in 4/4
+
+    Finding a measure is a dictionary lookup, and finding a time in it is a binary search in each
+    layer, so neither depends on the length of the section.
+    '''
+
+    def __init__(self, m_section, section_events=None):
+        '''
+        :param m_section: The ``<section>``. The index refers to its elements, so do not modify it.
+        :type m_section: :class:`lxml.etree.Element`
+        :param section_events: The tables for ``m_section``. They are built if omitted.
+        :type section_events: :class:`SectionEvents`
+        '''
+        if section_events is None:
+            section_events = SectionEvents.from_section(m_section, pitches=False)
+        self.measure_duration = meter(m_section)
+        '''The duration of a measure in whole notes, as from :func:`meter`.'''
+
+        # for every layer: its elements, their onsets and ends in ticks, and ticks per whole note
+        self._layers = []
+        # measure number to a list of (staff @n, layer @n, position in self._layers, start, stop)
+        self._measures = {}
+        for m_staff, m_layer, table, numbered in number_measures(
+                m_section, section_events, self.measure_duration):
+            position = len(self._layers)
+            self._layers.append((
+                m_layer.findall('*'),
+                list(table.column('onset')),
+                list(table.ends()),
+                table.ticks_per_whole))
+            for number, start, stop in numbered:
+                self._measures.setdefault(number, []).append(
+                    (m_staff.get('n'), m_layer.get('n'), position, start, stop))
+        self._numbers = sorted(self._measures)
+
+    def measure_numbers(self):
+        '''
+        Return the number of every measure in the section, in order.
+
+        :rtype: list of int
+        '''
+        return list(self._numbers)
+
+    def _ranges(self, number, staff, layer):
+        '''
+        Return the ranges of a measure, in the layers selected by ``staff`` and ``layer``.
+        '''
+        return [
+            each for each in self._measures.get(number, [])
+            if (staff is None or each[0] == staff) and (layer is None or each[1] == layer)]
+
+    def ranges(self, number, staff=None, layer=None):
+        '''
+        Return where a measure is in each layer.
+
+        :param int number: The measure number.
+        :param str staff: Only in the ``<staff>`` with this @n.
+        :param str layer: Only in the ``<layer>`` with this @n.
+        :returns: The @n of the ``<staff>`` and ``<layer>``, and the start and stop index of the
+            measure in ``m_layer.findall('*')``, for every layer that has the measure, in document
+            order.
+        :rtype: list of 4-tuple
+        '''
+        return [
+            (staff_n, layer_n, start, stop)
+            for staff_n, layer_n, _, start, stop in self._ranges(number, staff, layer)]
+
+    def elements(self, number, staff=None, layer=None):
+        '''
+        Return the elements in a measure.
+
+        :param int number: The measure number.
+        :param str staff: Only in the ``<staff>`` with this @n.
+        :param str layer: Only in the ``<layer>`` with this @n.
+        :returns: The elements in every layer, in document order. The list is empty if there is no
+            such measure.
+        :rtype: list of :class:`lxml.etree.Element`
+        '''
+        post = []
+        for _, _, position, start, stop in self._ranges(number, staff, layer):
+            post.extend(self._layers[position][0][start:stop])
+        return post
+
+    def at(self, number, offset, staff=None, layer=None):
+        '''
+        Return the elements sounding at a time in a measure.
+
+        :param int number: The measure number.
+        :param offset: The time from the start of the measure, in whole notes.
+        :type offset: :class:`fractions.Fraction`
+        :param str staff: Only in the ``<staff>`` with this @n.
+        :param str layer: Only in the ``<layer>`` with this @n.
+        :returns: The elements that start at ``offset``, including those without duration, and
+            those that started earlier in the measure and end after it, in document order.
+        :rtype: list of :class:`lxml.etree.Element`
+        '''
+        post = []
+        for _, _, position, start, stop in self._ranges(number, staff, layer):
+            elems, onsets, ends, ticks_per_whole = self._layers[position]
+            tick = onsets[start] + fractions.Fraction(offset) * ticks_per_whole
+            first = bisect.bisect_left(ends, tick, start, stop)
+            last = bisect.bisect_right(onsets, tick, start, stop)
+            post.extend(
+                elems[i] for i in range(first, last) if ends[i] > tick or onsets[i] == tick)
+        return post
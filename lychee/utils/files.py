@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/files.py
+# Purpose:                Write files so that readers never see them half-written.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Write files so that readers never see them half-written.
+
+:func:`write_atomically` writes to a temporary file in the same directory, then renames it over the
+file, so a reader finds either the old contents or the new contents. Unlike a file made with
+:func:`tempfile.mkstemp`, which only its owner may read, the new file gets the permissions of the
+file it replaces or, for a new file, the permissions allowed by the umask.
+'''
+
+import binascii
+import errno
+import os
+import os.path
+import stat
+
+from six.moves import range
+
+
+# os.rename() cannot replace an existing file on Windows, but os.replace() is Python 3.3+ only
+_replace = getattr(os, 'replace', os.rename)
+
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+_TEMP_ATTEMPTS = 100
+_ERR_NO_TEMP = 'Could not find an unused temporary file name'
+
+
+def _make_temp(pathname):
+    '''
+    Create a temporary file beside ``pathname``. Return its file descriptor and pathname.
+    '''
+    dirname = os.path.dirname(pathname) or os.curdir
+    prefix = '.{0}.'.format(os.path.basename(pathname))
+    for _ in range(_TEMP_ATTEMPTS):
+        name = prefix + binascii.hexlify(os.urandom(4)).decode('ascii') + '.tmp'
+        temp_path = os.path.join(dirname, name)
+        try:
+            # the kernel applies the umask to this mode, as for any new file
+            return os.open(temp_path, _TEMP_FLAGS, 0o666), temp_path
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    raise IOError(errno.EEXIST, _ERR_NO_TEMP, pathname)
+
+
+def write_atomically(pathname, write, fsync=False):
+    '''
+    Replace the file at ``pathname`` with what ``write`` writes, or leave it as it was.
+
+    :param str pathname: The pathname of the file to write.
+    :param write: A function that writes the contents to the binary file object it is given.
+    :param bool fsync: Whether to call :func:`os.fsync` on the file before it is renamed. This
+        does not synchronize the directory.
+    :returns: ``None``
+    :raises: :exc:`IOError` or :exc:`OSError` if the file cannot be written, or any exception
+        raised by ``write``. Then the temporary file is removed.
+    '''
+    temp_fd, temp_path = _make_temp(pathname)
+    try:
+        with os.fdopen(temp_fd, 'wb') as temp_file:
+            write(temp_file)
+            if fsync:
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        if os.path.exists(pathname):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(pathname).st_mode))
+        _replace(temp_path, pathname)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -30,6 +30,7 @@ import random
 from lxml import etree
 from lychee.namespaces import mei, xml
 from lychee import exceptions
+from lychee.utils import events
 import fractions
 
 
@@ -146,41 +147,10 @@ def get_autobeam_structure(m_layer, m_staffdef):
     if unit < fractions.Fraction(1, 4) and count % 3 == 0:
         unit *= 3
 
-    measure_length = measure_duration(m_staffdef)
-
-    nodes_in_this_beam = []
-    beams = []
-
-    beat_phase = 0
-    for m_node in m_layer:
-        if m_node.get('dur'):
-            this_node_is_beamable = (
-                m_node.tag in (mei.NOTE, mei.CHORD) and
-                m_node.get('dur') not in ('long', 'breve', '1', '2', '4'))
-            this_node_breaks_beams = (
-                m_node.tag == mei.REST or (
-                    m_node.tag in (mei.NOTE, mei.CHORD) and
-                    m_node.get('dur') in ('long', 'breve', '1', '2', '4')))
-
-            if this_node_breaks_beams:
-                beams.append(nodes_in_this_beam)
-                nodes_in_this_beam = []
-            if this_node_is_beamable:
-                nodes_in_this_beam.append(m_node)
-
-            beat_phase += duration(m_node)
-            if beat_phase >= unit:
-                beat_phase = beat_phase % unit
-                if beat_phase == 0:
-                    beams.append(nodes_in_this_beam)
-                    nodes_in_this_beam = []
-                    pass
-
-    beams.append(nodes_in_this_beam)
-
-    # Filter out empty beams and length-1 beams.
-    beams = [beam for beam in beams if len(beam) > 1]
-    return beams
+    # The beams are found from the layer's event table; refer to lychee.utils.events.beam_groups().
+    m_nodes = m_layer.findall('*')
+    groups = events.beam_groups(events.LayerEvents.from_layer(m_layer, pitches=False), unit)
+    return [[m_nodes[index] for index in group] for group in groups]
 
 
 def autobeam(m_layer, m_staffdef):
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/section_diff.py
+# Purpose:                Find the measures and layers that differ between two <section> elements.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Find the staves, measures, and layers that differ between two versions of a <section>.
+
+The :func:`section_diff` function produces an "edit script": a list of :class:`Edit` tuples that
+say which elements were inserted, deleted, or replaced. The diff only descends into <section>,
+<staff>, and <measure> elements, so the smallest unit of change is a <layer> (or another child of
+a container, like <scoreDef>). This works for Lychee-MEI, where <layer> elements are in <staff>,
+and for MEI produced by outbound converters, where <staff> elements are in <measure>.
+
+Subtrees with the same :func:`~lychee.utils.subtree_hash.subtree_hash` are skipped without being
+compared, so the diff of two large sections that differ by one note only descends along the path
+to that note's <layer>. Every element is hashed once; pass the same ``cache`` to several calls to
+avoid hashing an unmodified <section> again.
+
+The @xml:id attribute is different every time the same music is converted, so elements are
+matched by their tag and @n attribute. Each element in the edit script is identified by a "path"
+from the <section>, such as ``'staff[n=1]/measure[n=4]/layer[n=1]'``. When several siblings have
+the same tag and @n (or no @n), the second and later siblings have their position appended, as in
+``'scoreDef'`` then ``'scoreDef[2]'``.
+'''
+
+from __future__ import unicode_literals
+
+import collections
+
+from lxml import etree
+import six
+
+from lychee.utils.subtree_hash import subtree_hash
+
+
+INSERT = 'insert'
+DELETE = 'delete'
+REPLACE = 'replace'
+
+# local names of elements that are compared child-by-child; all others are replaced as a whole
+# NB: local names, since the MEI for Verovio does not use the MEI namespace
+CONTAINERS = ('section', 'staff', 'measure')
+
+
+class Edit(collections.namedtuple('Edit', ('action', 'path', 'index', 'old', 'new'))):
+    '''
+    One change in the edit script produced by :func:`section_diff`.
+
+    :param str action: One of :const:`INSERT`, :const:`DELETE`, or :const:`REPLACE`.
+    :param str path: The path of the element, relative to the <section>.
+    :param int index: For :const:`INSERT` and :const:`REPLACE`, the position of the new element in
+        its parent in the new <section>. For :const:`DELETE`, the position of the old element in its
+        parent in the old <section>.
+    :param old: The element in the old <section>, or ``None`` for :const:`INSERT`.
+    :param new: The element in the new <section>, or ``None`` for :const:`DELETE`.
+    '''
+    __slots__ = ()
+
+
+def _local_name(tag):
+    '''
+    Return the tag without its namespace.
+    '''
+    return etree.QName(tag).localname
+
+
+def _child_keys(elem):
+    '''
+    Produce the path component of every element child of "elem."
+
+    :returns: A list of 2-tuples with the key and the child element, in document order.
+    :rtype: list
+    '''
+    post = []
+    seen = collections.Counter()
+    for child in elem:
+        if not isinstance(child.tag, six.string_types):
+            continue
+        key = _local_name(child.tag)
+        if child.get('n') is not None:
+            key = '{0}[n={1}]'.format(key, child.get('n'))
+        seen[key] += 1
+        if seen[key] > 1:
+            key = '{0}[{1}]'.format(key, seen[key])
+        post.append((key, child))
+    return post
+
+
+def _join(path, key):
+    '''
+    Add a key to the end of a path.
+    '''
+    return '{0}/{1}'.format(path, key) if path else key
+
+
+def _diff_children(old, new, path, parent_index, cache, post):
+    '''
+    Append the edits between the children of two container elements to "post."
+
+    If the children found in both containers are in a different order, the container is replaced
+    as a whole, since the edits only insert, delete, and replace elements in place.
+    '''
+    old_children = _child_keys(old)
+    new_children = _child_keys(new)
+    old_lookup = {key: (index, child) for index, (key, child) in enumerate(old_children)}
+    new_keys = set(key for key, _ in new_children)
+
+    old_order = [key for key, _ in old_children if key in new_keys]
+    new_order = [key for key, _ in new_children if key in old_lookup]
+    if old_order != new_order:
+        post.append(Edit(REPLACE, path, parent_index, old, new))
+        return
+
+    for index, (key, old_child) in enumerate(old_children):
+        if key not in new_keys:
+            post.append(Edit(DELETE, _join(path, key), index, old_child, None))
+
+    for index, (key, new_child) in enumerate(new_children):
+        if key not in old_lookup:
+            post.append(Edit(INSERT, _join(path, key), index, None, new_child))
+            continue
+
+        old_child = old_lookup[key][1]
+        if subtree_hash(old_child, cache) == subtree_hash(new_child, cache):
+            continue
+        elif _local_name(new_child.tag) in CONTAINERS and _attributes_equal(old_child, new_child):
+            _diff_children(old_child, new_child, _join(path, key), index, cache, post)
+        else:
+            post.append(Edit(REPLACE, _join(path, key), index, old_child, new_child))
+
+
+def _attributes_equal(old, new):
+    '''
+    Determine whether two containers differ only in their children. If their own attributes or
+    text differ, the container must be replaced as a whole.
+    '''
+    shell_old = old.makeelement(old.tag, old.attrib)
+    shell_old.text = old.text
+    shell_new = new.makeelement(new.tag, new.attrib)
+    shell_new.text = new.text
+    return subtree_hash(shell_old) == subtree_hash(shell_new)
+
+
+def section_diff(old, new, cache=None):
+    '''
+    Produce an edit script that changes one <section> into another.
+
+    :param old: The original <section>.
+    :type old: :class:`lxml.etree.Element`
+    :param new: The changed <section>.
+    :type new: :class:`lxml.etree.Element`
+    :param dict cache: An optional dictionary of subtree hashes, as accepted by
+        :func:`~lychee.utils.subtree_hash.subtree_hash`. Pass the same cache for several diffs
+        against the same unmodified <section> to avoid hashing it again.
+    :returns: The list of :class:`Edit` tuples. For each parent, deletions are listed first, then
+        insertions and replacements in the order of the new <section>. The list is empty if the
+        sections hold the same music.
+    :rtype: list of :class:`Edit`
+
+    If the <section> elements themselves have different attributes, the edit script holds one
+    :const:`REPLACE` edit with the path ``''``. Likewise, a container whose children were moved
+    relative to each other, such as two swapped <staff> elements, is replaced as a whole.
+    '''
+    if cache is None:
+        cache = {}
+
+    post = []
+    if subtree_hash(old, cache) == subtree_hash(new, cache):
+        pass
+    elif old.tag != new.tag or not _attributes_equal(old, new):
+        post.append(Edit(REPLACE, '', 0, old, new))
+    else:
+        _diff_children(old, new, '', 0, cache, post)
+
+    return post
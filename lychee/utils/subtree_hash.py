@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/subtree_hash.py
+# Purpose:                Canonical structural hashes of lxml objects.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Canonical structural hashes of Lychee-MEI subtrees.
+
+The hash of an element depends on its tag, its attributes, its text, and the hashes of its children
+in order, so two subtrees have the same hash exactly when they hold the same music. The hash does
+not depend on:
+
+- the @xml:id attribute, since the same music converted twice gets different @xml:id values,
+- the value of the @ly:version attribute, only whether it is present, and
+- whitespace-only text, such as that added by pretty-printing.
+
+Because the hash of an element is computed from the hashes of its children (like a Merkle tree),
+two versions of a large document can be compared by their hashes at each level, only descending
+into the subtrees whose hashes differ.
+'''
+
+from __future__ import unicode_literals
+
+import hashlib
+
+from lxml import etree
+import six
+
+from lychee.namespaces import lychee as lyns
+from lychee.namespaces import xml as xmlns
+
+
+def _field(value):
+    '''
+    Produce an unambiguous, length-prefixed representation of a string for hashing.
+    '''
+    if value is None:
+        value = ''
+    value = six.text_type(value)
+    return '{0}:{1}'.format(len(value), value)
+
+
+def _text(value):
+    '''
+    Return the text, or ``None`` if it only holds whitespace.
+    '''
+    if value is None or value.strip() == '':
+        return None
+    else:
+        return value.strip()
+
+
+def subtree_hash(elem, cache=None):
+    '''
+    Compute the canonical structural hash of an element and all its descendants.
+
+    :param elem: The element (tree) to hash.
+    :type elem: :class:`lxml.etree.Element` or :class:`lxml.etree.ElementTree`
+    :param dict cache: An optional dictionary from elements to their hash. Hashes found here are
+        used instead of being computed, and newly computed hashes are added for every element in
+        the subtree. Only reuse a cache while the elements in it are not modified.
+    :returns: The hexadecimal SHA-1 digest.
+    :rtype: str
+
+    Refer to the module's description for what the hash does and does not depend on.
+    '''
+    if isinstance(elem, etree._ElementTree):  # pylint: disable=protected-access
+        elem = elem.getroot()
+    if cache is None:
+        cache = {}
+
+    if elem in cache:
+        return cache[elem]
+
+    fields = [_field(elem.tag)]
+    for key, value in sorted(elem.attrib.items()):
+        if key == xmlns.ID:
+            continue
+        elif key == lyns.VERSION:
+            value = ''
+        fields.append(_field(key))
+        fields.append(_field(value))
+    # the "tail" of a child belongs to this element, not the child, so the child's hash does not
+    # depend on whether it is part of a larger document
+    text = elem.text or ''
+    for child in elem:
+        if isinstance(child.tag, six.string_types):
+            fields.append(_field(_text(text)))
+            fields.append(subtree_hash(child, cache))
+            text = child.tail or ''
+        else:
+            # comments and processing instructions are not part of the music, but the text around
+            # them is
+            text += child.tail or ''
+    fields.append(_field(_text(text)))
+
+    post = hashlib.sha1('|'.join(fields).encode('utf-8')).hexdigest()
+    cache[elem] = post
+    return post
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/tests/test_events.py
+# Purpose:                Tests for the "events" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "events" module.
+
+Every test runs with NumPy, if it is installed, and with the :class:`array.array` fallback.
+'''
+
+import fractions
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lxml import etree
+import pytest
+
+from lychee import exceptions
+from lychee.namespaces import mei, xml
+from lychee.utils import events
+
+
+_LAYER = '''
+    <mei:layer xmlns:mei="http://www.music-encoding.org/ns/mei"
+               xmlns:xml="http://www.w3.org/XML/1998/namespace">
+        <mei:note dur="4" dots="1" pname="c" oct="4"/>
+        <!-- a comment -->
+        <mei:staffDef clef.shape="F" clef.line="4"/>
+        <mei:tupletSpan num="3" numbase="2" plist="#n1 #n2 #n3"/>
+        <mei:note xml:id="n1" dur="8" pname="f" oct="3" accid.ges="s"/>
+        <mei:chord xml:id="n2" dur="8">
+            <mei:note pname="e" oct="4"><mei:accid accid="f"/></mei:note>
+            <mei:note pname="b" oct="3"/>
+        </mei:chord>
+        <mei:rest xml:id="n3" dur="8"/>
+        <mei:space dur="2"/>
+    </mei:layer>
+    '''
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request):
+    '''
+    Run a test with NumPy, then without it.
+    '''
+    if request.param == 'numpy':
+        if events._numpy() is None:
+            pytest.skip('requires NumPy')
+        yield
+    else:
+        with mock.patch('lychee.utils.events.numpy', None):
+            yield
+
+
+def make_layer(durs):
+    '''
+    Make a <layer> of notes with these @dur values; a "r" prefix makes a rest.
+    '''
+    layer = etree.Element(mei.LAYER)
+    for dur in durs:
+        if dur.startswith('r'):
+            etree.SubElement(layer, mei.REST, dur=dur[1:])
+        else:
+            etree.SubElement(layer, mei.NOTE, dur=dur)
+    return layer
+
+
+class TestLayerEvents(object):
+
+    def test_columns(self, backend):
+        '''
+        Every element is read once, with dots, tuplets, pitches, and kinds, and comments omitted.
+        '''
+        actual = events.LayerEvents.from_layer(etree.fromstring(_LAYER))
+        # a dotted quarter is 3/8, and an eighth in a triplet is 1/12 of a whole note
+        assert 24 == actual.ticks_per_whole
+        assert 7 == len(actual)
+
+        assert [0, 9, 9, 9, 11, 13, 15] == list(actual.column('onset'))
+        assert [9, 0, 0, 2, 2, 2, 12] == list(actual.column('duration'))
+        assert [9, 0, 0, 3, 3, 3, 12] == list(actual.column('nominal'))
+        assert [60, -1, -1, 54, 59, -1, -1] == list(actual.column('pitch'))
+        assert [events.NOTE, events.OTHER, events.TUPLET_SPAN, events.NOTE, events.CHORD,
+                events.REST, events.SPACE] == list(actual.column('kind'))
+        assert [4, -1, -1, 5, 5, 5, 3] == list(actual.column('dur'))
+        assert list(range(7)) == list(actual.column('index'))
+        assert [9, 9, 9, 11, 13, 15, 27] == list(actual.ends())
+
+    def test_without_pitches(self, backend):
+        '''
+        Without pitches, the pitch column is -1 and the durations are the same.
+        '''
+        actual = events.LayerEvents.from_layer(etree.fromstring(_LAYER), pitches=False)
+        assert [-1] * 7 == list(actual.column('pitch'))
+        assert [9, 0, 0, 2, 2, 2, 12] == list(actual.column('duration'))
+
+    def test_unknown_duration(self, backend):
+        '''
+        An unknown @dur raises LycheeMEIError, as for music_utils.duration().
+        '''
+        with pytest.raises(exceptions.LycheeMEIError):
+            events.LayerEvents.from_layer(make_layer(['4', '3']))
+
+    def test_section(self, backend):
+        '''
+        There is a table for every <layer> in every <staff>, in order.
+        '''
+        section = etree.Element(mei.SECTION)
+        for staff_n in ('1', '2'):
+            staff = etree.SubElement(section, mei.STAFF, n=staff_n)
+            for layer_n in ('1', '2'):
+                staff.append(make_layer(['4'] * int(layer_n)))
+                staff[-1].set('n', layer_n)
+
+        actual = events.SectionEvents.from_section(section)
+
+        assert 4 == len(actual)
+        assert [('1', '1', 1), ('1', '2', 2), ('2', '1', 1), ('2', '2', 2)] == [
+            (staff_n, layer_n, len(table)) for staff_n, layer_n, table in actual.layers]
+
+
+class TestMeasureRanges(object):
+
+    def test_measures(self, backend):
+        '''
+        Complete measures, then an incomplete measure at the end.
+        '''
+        table = events.LayerEvents.from_layer(make_layer(['4', '2', '4', '2', '2', '8']))
+        actual = events.measure_ranges(table, fractions.Fraction(1))
+        assert [(0, 3, True), (3, 5, True), (5, 6, False)] == actual
+
+    def test_excess_not_carried(self, backend):
+        '''
+        A note that crosses the barline ends the measure, and the next measure starts from zero.
+        '''
+        table = events.LayerEvents.from_layer(make_layer(['2', '2', '4', '4', '4']))
+        actual = events.measure_ranges(table, fractions.Fraction(3, 4))
+        assert [(0, 2, True), (2, 5, True)] == actual
+
+    def test_whole_note_fills_measure(self, backend):
+        '''
+        A whole note at the start of a measure fills it, whatever the metre, and an element without
+        a duration after the last measure makes a new measure.
+        '''
+        layer = make_layer(['1', '4', '4', '4'])
+        etree.SubElement(layer, mei.STAFF_DEF)
+        table = events.LayerEvents.from_layer(layer)
+        actual = events.measure_ranges(table, fractions.Fraction(3, 4))
+        assert [(0, 1, True), (1, 4, True), (4, 5, False)] == actual
+
+    def test_dotted_whole_note_fills_measure(self, backend):
+        '''
+        A dotted whole note at the start of a measure also fills it, even when the measure is
+        longer, as in create_measures().
+        '''
+        layer = make_layer(['1', '2', '2', '1'])
+        layer[0].set('dots', '1')
+        table = events.LayerEvents.from_layer(layer)
+        actual = events.measure_ranges(table, fractions.Fraction(2))
+        assert [(0, 1, True), (1, 4, True)] == actual
+
+    def test_empty(self, backend):
+        '''
+        An empty layer has no measures.
+        '''
+        table = events.LayerEvents.from_layer(make_layer([]))
+        assert [] == events.measure_ranges(table, fractions.Fraction(1))
+
+
+class TestBeamGroups(object):
+
+    def test_beats(self, backend):
+        '''
+        Beams end at every beat, and at rests and quarter notes.
+        '''
+        table = events.LayerEvents.from_layer(
+            make_layer(['8', '8', '8', '8', '8', 'r8', '16', '16', '16', '4', '8', '8']))
+        actual = events.beam_groups(table, fractions.Fraction(1, 4))
+        assert [[0, 1], [2, 3], [6, 7, 8], [10, 11]] == actual
+
+    def test_tuplets_ignored(self, backend):
+        '''
+        The beat is counted from @dur and @dots, without tuplets, as by get_autobeam_structure().
+        '''
+        layer = make_layer(['8'] * 5)
+        for index, m_note in enumerate(layer[:3]):
+            m_note.set(xml.ID, 'n{0}'.format(index))
+        layer.insert(0, etree.Element(mei.TUPLET_SPAN, num='3', numbase='2', plist='#n0 #n1 #n2'))
+
+        actual = events.beam_groups(events.LayerEvents.from_layer(layer), fractions.Fraction(1, 4))
+
+        assert [[1, 2], [3, 4]] == actual
+
+
+def make_section(staves, count=None, unit=None):
+    '''
+    Make a <section> with a <staff> for each item in "staves", which are lists of layers for
+    make_layer(). The <staffDef> has "count" and "unit" as its metre, if given.
+    '''
+    section = etree.Element(mei.SECTION)
+    staff_def = etree.SubElement(
+        etree.SubElement(etree.SubElement(section, mei.SCORE_DEF), mei.STAFF_GRP), mei.STAFF_DEF)
+    if count:
+        staff_def.set('meter.count', count)
+        staff_def.set('meter.unit', unit)
+    for staff_n, layers in staves:
+        staff = etree.SubElement(section, mei.STAFF, n=staff_n)
+        for layer_n, durs in enumerate(layers, 1):
+            layer = make_layer(durs)
+            layer.set('n', str(layer_n))
+            staff.append(layer)
+    return section
+
+
+class TestNumberMeasures(object):
+
+    def test_continued_staff(self, backend):
+        '''
+        A later <staff> with the same @n continues after the last complete measure.
+        '''
+        section = make_section([('1', [['1', '1', '2']]), ('2', [['1']]), ('1', [['1']])])
+        actual = [
+            (staff.get('n'), numbered)
+            for staff, _, _, numbered in events.number_measures(
+                section, events.SectionEvents.from_section(section), fractions.Fraction(1))]
+        assert [
+            ('1', [(1, 0, 1), (2, 1, 2), (3, 2, 3)]),
+            ('2', [(1, 0, 1)]),
+            ('1', [(3, 0, 1)]),
+        ] == actual
+
+
+class TestMeter(object):
+
+    def test_meter(self):
+        '''
+        The metre is from the first <staffDef>, or 4/4.
+        '''
+        assert fractions.Fraction(3, 4) == events.meter(make_section([], '3', '4'))
+        assert fractions.Fraction(1) == events.meter(make_section([]))
+        assert fractions.Fraction(1) == events.meter(etree.Element(mei.SECTION))
+
+
+class TestSectionIndex(object):
+
+    def setup_method(self, method):
+        '''
+        Two staves in 3/4: the first with two layers, the second with half notes that cross the
+        barline.
+        '''
+        self.section = make_section(
+            [('1', [['4', '4', '4', '2', '8', '8'], ['2', '4', 'r2', 'r4']]),
+             ('2', [['2', '2', '2']])],
+            '3', '4')
+
+    def test_measures(self, backend):
+        '''
+        The measures and their ranges are as from create_measures().
+        '''
+        index = events.SectionIndex(self.section)
+        assert fractions.Fraction(3, 4) == index.measure_duration
+        assert [1, 2] == index.measure_numbers()
+        assert [('1', '1', 0, 3), ('1', '2', 0, 2), ('2', '1', 0, 2)] == index.ranges(1)
+        assert [('1', '1', 3, 6)] == index.ranges(2, staff='1', layer='1')
+        assert [('2', '1', 2, 3)] == index.ranges(2, staff='2')
+        assert [] == index.ranges(9)
+
+    def test_elements(self, backend):
+        '''
+        The elements in a measure are the same elements as in the <section>, in document order.
+        '''
+        index = events.SectionIndex(self.section)
+        layers = self.section.findall('.//{0}'.format(mei.LAYER))
+        assert list(layers[0][3:6]) + list(layers[1][2:4]) + [layers[2][2]] == index.elements(2)
+        assert [layers[2][2]] == index.elements(2, staff='2')
+        assert [] == index.elements(4)
+
+    def test_at(self, backend):
+        '''
+        The elements at a time are those that start then, or that started earlier and are still
+        sounding.
+        '''
+        index = events.SectionIndex(self.section)
+        layers = self.section.findall('.//{0}'.format(mei.LAYER))
+
+        # beat 2 of measure 1: the second quarter note and both first half notes
+        assert [layers[0][1], layers[1][0], layers[2][0]] == index.at(1, fractions.Fraction(1, 4))
+        # the last eighth of measure 2, in the first layer only
+        assert [layers[0][5]] == index.at(2, fractions.Fraction(5, 8), staff='1', layer='1')
+        # the first half note ends where the second half note starts
+        assert [layers[2][1]] == index.at(1, fractions.Fraction(1, 2), staff='2')
+        # after the end of a measure, unless its last note crosses the barline
+        assert [] == index.at(1, fractions.Fraction(7, 8), staff='1', layer='1')
+        assert [layers[2][1]] == index.at(1, fractions.Fraction(7, 8), staff='2')
+
+    def test_tables(self, backend):
+        '''
+        The index uses the tables it is given.
+        '''
+        tables = events.SectionEvents.from_section(self.section)
+        with mock.patch('lychee.utils.events.SectionEvents.from_section') as mock_from:
+            index = events.SectionIndex(self.section, tables)
+        assert 0 == mock_from.call_count
+        assert [1, 2] == index.measure_numbers()
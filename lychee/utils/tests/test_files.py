@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/tests/test_files.py
+# Purpose:                Tests for the "files" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Unit tests for :func:`lychee.utils.files.write_atomically`.
+'''
+import os
+import os.path
+import shutil
+import stat
+import tempfile
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from lychee.utils import files
+
+
+class TestWriteAtomically(object):
+
+    def setup_method(self, method):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pathname = os.path.join(self.temp_dir, 'file.txt')
+        self.old_umask = os.umask(0o022)
+
+    def teardown_method(self, method):
+        os.umask(self.old_umask)
+        shutil.rmtree(self.temp_dir)
+
+    def mode(self):
+        return stat.S_IMODE(os.stat(self.pathname).st_mode)
+
+    def test_new_file(self):
+        '''
+        A new file is written with the permissions allowed by the umask.
+        '''
+        files.write_atomically(self.pathname, lambda temp_file: temp_file.write(b'new'))
+        with open(self.pathname, 'rb') as the_file:
+            assert b'new' == the_file.read()
+        assert ['file.txt'] == os.listdir(self.temp_dir)
+        assert 0o644 == self.mode()
+
+    def test_keeps_mode(self):
+        '''
+        A replaced file keeps its permissions, and fsync works.
+        '''
+        files.write_atomically(self.pathname, lambda temp_file: temp_file.write(b'old'))
+        os.chmod(self.pathname, 0o600)
+        files.write_atomically(
+            self.pathname, lambda temp_file: temp_file.write(b'new'), fsync=True)
+        with open(self.pathname, 'rb') as the_file:
+            assert b'new' == the_file.read()
+        assert 0o600 == self.mode()
+
+    def test_write_fails(self):
+        '''
+        When "write" raises, the exception propagates, the temporary file is removed, and the
+        file is unchanged.
+        '''
+        files.write_atomically(self.pathname, lambda temp_file: temp_file.write(b'old'))
+
+        def write(temp_file):
+            temp_file.write(b'partial')
+            raise ValueError('lol')
+
+        with pytest.raises(ValueError):
+            files.write_atomically(self.pathname, write)
+        with open(self.pathname, 'rb') as the_file:
+            assert b'old' == the_file.read()
+        assert ['file.txt'] == os.listdir(self.temp_dir)
+
+    def test_replace_fails(self):
+        '''
+        When the rename fails, the temporary file is removed and the file does not exist.
+        '''
+        with mock.patch('lychee.utils.files._replace') as mock_replace:
+            mock_replace.side_effect = OSError('lol')
+            with pytest.raises(OSError):
+                files.write_atomically(self.pathname, lambda temp_file: temp_file.write(b'new'))
+        assert [] == os.listdir(self.temp_dir)
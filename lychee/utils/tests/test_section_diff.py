@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/tests/test_section_diff.py
+# Purpose:                Tests for section_diff().
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Unit tests for :func:`lychee.utils.section_diff.section_diff`.
+'''
+from lxml import etree
+
+from lychee.namespaces import mei, xml
+from lychee.utils.section_diff import section_diff, DELETE, INSERT, REPLACE
+
+
+def make_section(pitches):
+    '''
+    Make a <section> with a <scoreDef>, then one <staff> per list in "pitches," each with one
+    <measure> per string, each with a <layer> holding one note of that pitch name.
+    '''
+    section = etree.Element(mei.SECTION, {xml.ID: 'S1'})
+    etree.SubElement(section, mei.SCORE_DEF)
+    for staff_n, staff_pitches in enumerate(pitches, 1):
+        staff = etree.SubElement(section, mei.STAFF, {'n': str(staff_n)})
+        for meas_n, pname in enumerate(staff_pitches, 1):
+            measure = etree.SubElement(staff, mei.MEASURE, {'n': str(meas_n)})
+            layer = etree.SubElement(measure, mei.LAYER, {'n': '1'})
+            etree.SubElement(layer, mei.NOTE, {'pname': pname, 'dur': '1'})
+    return section
+
+
+class TestSectionDiff(object):
+
+    def test_same(self):
+        '''
+        Sections with the same music, but different @xml:id, have no edits.
+        '''
+        new = make_section([['c', 'd']])
+        new.set(xml.ID, 'S2')
+        assert [] == section_diff(make_section([['c', 'd']]), new)
+
+    def test_replace_layer(self):
+        '''
+        A changed note replaces only its <layer>.
+        '''
+        old = make_section([['c', 'd', 'e'], ['c', 'd', 'e']])
+        new = make_section([['c', 'd', 'e'], ['c', 'f', 'e']])
+        actual = section_diff(old, new)
+        assert 1 == len(actual)
+        assert REPLACE == actual[0].action
+        assert 'staff[n=2]/measure[n=2]/layer[n=1]' == actual[0].path
+        assert 0 == actual[0].index
+        assert old[2][1][0] is actual[0].old
+        assert new[2][1][0] is actual[0].new
+
+    def test_insert_and_delete(self):
+        '''
+        Measures and staves that only exist in one section are inserted or deleted.
+        '''
+        old = make_section([['c', 'd'], ['e']])
+        new = make_section([['c', 'd', 'e']])
+        actual = section_diff(old, new)
+        assert [(DELETE, 'staff[n=2]', 2), (INSERT, 'staff[n=1]/measure[n=3]', 2)] == [
+            (edit.action, edit.path, edit.index) for edit in actual]
+        assert actual[0].new is None
+        assert actual[1].old is None
+
+    def test_container_attributes(self):
+        '''
+        A container with different attributes is replaced as a whole.
+        '''
+        old = make_section([['c', 'd']])
+        new = make_section([['c', 'd']])
+        new[1][0].set('right', 'dbl')
+        actual = section_diff(old, new)
+        assert [(REPLACE, 'staff[n=1]/measure[n=1]')] == [(e.action, e.path) for e in actual]
+
+        new.set('label', 'A')
+        actual = section_diff(old, new)
+        assert [(REPLACE, '')] == [(e.action, e.path) for e in actual]
+
+    def test_reordered_staves(self):
+        '''
+        When staves are swapped, the <section> is replaced, even though every staff is unchanged.
+        '''
+        old = make_section([['c'], ['d']])
+        new = make_section([['c'], ['d']])
+        new.append(new[1])
+        actual = section_diff(old, new)
+        assert [(REPLACE, '', 0)] == [(e.action, e.path, e.index) for e in actual]
+        assert old is actual[0].old
+        assert new is actual[0].new
+
+    def test_reordered_measures(self):
+        '''
+        When measures are swapped, their <staff> is replaced. Inserted and deleted siblings do not
+        count as a change of order.
+        '''
+        old = make_section([['c', 'd'], ['e', 'f', 'g']])
+        new = make_section([['c', 'd'], ['e', 'f', 'g']])
+        new[2].append(new[2][0])
+        actual = section_diff(old, new)
+        assert [(REPLACE, 'staff[n=2]', 2)] == [(e.action, e.path, e.index) for e in actual]
+
+        new = make_section([['c', 'd', 'e'], ['e', 'f', 'g']])
+        new[1].remove(new[1][0])
+        actual = section_diff(old, new)
+        assert [(DELETE, 'staff[n=1]/measure[n=1]', 0), (INSERT, 'staff[n=1]/measure[n=3]', 1)] == [
+            (e.action, e.path, e.index) for e in actual]
+
+    def test_repeated_keys(self):
+        '''
+        Siblings without @n are identified by their position.
+        '''
+        old = make_section([['c']])
+        new = make_section([['c']])
+        etree.SubElement(new, mei.SCORE_DEF, {'key.sig': '1s'})
+        actual = section_diff(old, new)
+        assert [(INSERT, 'scoreDef[2]', 2)] == [(e.action, e.path, e.index) for e in actual]
+
+    def test_cache(self):
+        '''
+        The cache holds hashes for both sections, and may be reused while they are not modified.
+        '''
+        old = make_section([['c', 'd'], ['e', 'f']])
+        new = make_section([['c', 'd'], ['e', 'g']])
+        cache = {}
+        expected = section_diff(old, new, cache)
+        assert old[1][0][0] in cache
+        assert new[2][1][0] in cache
+        num_hashes = len(cache)
+        assert expected == section_diff(old, new, cache)
+        assert num_hashes == len(cache)
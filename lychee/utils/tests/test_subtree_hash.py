@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/utils/tests/test_subtree_hash.py
+# Purpose:                Tests for structural hashes and elements_equal().
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Unit tests for :func:`lychee.utils.subtree_hash.subtree_hash` and
+:func:`lychee.utils.elements_equal.elements_equal`.
+'''
+from lxml import etree
+
+from lychee.namespaces import lychee as lyns
+from lychee.namespaces import mei, xml
+from lychee.utils import elements_equal, subtree_hash
+
+
+def make_layer(xmlid_prefix='a', version='0.6.0', pname='c'):
+    '''
+    Make a small <layer> with two notes.
+    '''
+    layer = etree.Element(mei.LAYER, {xml.ID: xmlid_prefix + '1', lyns.VERSION: version})
+    etree.SubElement(layer, mei.NOTE, {xml.ID: xmlid_prefix + '2', 'pname': pname, 'dur': '4'})
+    etree.SubElement(layer, mei.NOTE, {xml.ID: xmlid_prefix + '3', 'pname': 'd', 'dur': '4'})
+    return layer
+
+
+class TestSubtreeHash(object):
+
+    def test_ignored_differences(self):
+        '''
+        @xml:id values, @ly:version values, and whitespace do not change the hash.
+        '''
+        first = make_layer()
+        second = etree.fromstring(
+            etree.tostring(make_layer(xmlid_prefix='b', version='0.7.1'), pretty_print=True))
+        assert subtree_hash(first) == subtree_hash(second)
+        assert elements_equal(first, second)
+        assert elements_equal(etree.ElementTree(first), second)
+
+    def test_attribute_differs(self):
+        '''
+        A different attribute value in a descendant changes the hash.
+        '''
+        assert subtree_hash(make_layer()) != subtree_hash(make_layer(pname='e'))
+        assert not elements_equal(make_layer(), make_layer(pname='e'))
+
+    def test_version_presence(self):
+        '''
+        Whether @ly:version is present changes the hash.
+        '''
+        first = make_layer()
+        second = make_layer()
+        del second.attrib[lyns.VERSION]
+        assert not elements_equal(first, second)
+
+    def test_nesting_differs(self):
+        '''
+        The same elements with different nesting have different hashes.
+        '''
+        first = etree.Element('a')
+        etree.SubElement(first, 'b')
+        etree.SubElement(first, 'c')
+        second = etree.Element('a')
+        etree.SubElement(etree.SubElement(second, 'b'), 'c')
+        assert subtree_hash(first) != subtree_hash(second)
+
+    def test_text_differs(self):
+        '''
+        Different text changes the hash.
+        '''
+        first = etree.Element(mei.TITLE)
+        first.text = 'Symphony'
+        second = etree.Element(mei.TITLE)
+        second.text = 'Sonata'
+        assert subtree_hash(first) != subtree_hash(second)
+
+    def test_comment_ignored(self):
+        '''
+        Comments do not change the hash.
+        '''
+        first = make_layer()
+        second = make_layer()
+        second.insert(1, etree.Comment('a comment'))
+        assert subtree_hash(first) == subtree_hash(second)
+
+    def test_cache(self):
+        '''
+        Every element in the subtree is added to the cache, and cached hashes are used.
+        '''
+        layer = make_layer()
+        cache = {}
+        expected = subtree_hash(layer, cache)
+        assert 3 == len(cache)
+        assert cache[layer[0]] == subtree_hash(layer[0])
+        cache[layer] = 'cached'
+        assert 'cached' == subtree_hash(layer, cache)
+        assert expected == subtree_hash(layer)
+
+
+class TestElementsEqual(object):
+
+    def test_text_ignored(self):
+        '''
+        Only tags and attributes are compared, not text.
+        '''
+        first = etree.Element(mei.TITLE)
+        first.text = 'Symphony'
+        second = etree.Element(mei.TITLE)
+        second.text = 'Sonata'
+        assert elements_equal(first, second)
+
+    def test_comment_compared(self):
+        '''
+        Comments are compared like elements.
+        '''
+        first = make_layer()
+        second = make_layer()
+        second.insert(1, etree.Comment('a comment'))
+        assert not elements_equal(first, second)
+        first.insert(1, etree.Comment('a comment'))
+        assert elements_equal(first, second)
+
+    def test_extra_element(self):
+        '''
+        A tree with another element at the end is different.
+        '''
+        first = make_layer()
+        second = make_layer()
+        etree.SubElement(second, mei.REST, dur='4')
+        assert not elements_equal(first, second)
+        assert not elements_equal(second, first)
@@ -72,6 +72,12 @@ def init_repo(session, **kwargs):
 def add(pathnames, session, **kwargs):
     '''
     Given a list of pathnames, ensure they are all tracked in the repository.
+
+    The pathnames come from :meth:`~lychee.document.Document.save_everything`, so they never include
+    the caches that :class:`~lychee.document.Document` keeps in the repository directory: the
+    :const:`~lychee.document.document.MANIFEST_FILE` and the search index
+    (:const:`~lychee.document.search.INDEX_FILE`). These must stay untracked, since they are
+    rewritten by every save and are rebuilt from the tracked files.
     '''
     session.hug.add(pathnames)
 
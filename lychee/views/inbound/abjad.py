@@ -58,39 +58,52 @@ def place_view(converted, document, session, **kwargs):
     signals.inbound.VIEWS_FINISH.emit(views_info=post)
 
 
-def _place_view(converted, document, session, section_id):
+def place_view_no_signals(converted, document, session, views_info=None, ids_atom=None):
+    '''
+    It's the place_view() function that returns the @xml:id of the ``<section>`` rather than
+    emitting it with the VIEWS_FINISH signal. Used for sessions with their own signal bus; refer to
+    :mod:`lychee.workflow.dispatch`.
+
+    :param dict ids_atom: The Abjad-to-LMEI @xml:id mapping for this session. If omitted, the
+        module-level mapping is used.
+    '''
+    return _place_view(converted, document, session, views_info, ids_atom)
+
+
+def _place_view(converted, document, session, section_id, ids_atom=None):
     '''
     Do the actual work for :func:`place_view`. That is a public wrapper function for error handling,
     and this is a private function with easier testing.
     '''
-    global _ids_atom
+    if ids_atom is None:
+        ids_atom = _ids_atom
 
     if converted.tag != mei.SECTION:
         raise NotImplementedError('Abjad inbound views must receive a <section>')
 
     path_to_atom_map = os.path.join(session.get_repo_dir(), 'atom_xmlids.json')
-    if len(_ids_atom) == 0:
+    if len(ids_atom) == 0:
         if os.path.exists(path_to_atom_map):
             with open(path_to_atom_map, 'r') as thefile:
-                _ids_atom = json.load(thefile)
+                ids_atom.update(json.load(thefile))
 
     # TODO: load the "mtoa" map
 
     if section_id:
         converted.set(xml.ID, section_id)
 
-    if converted.get(xml.ID) in _ids_atom:
+    if converted.get(xml.ID) in ids_atom:
         # It's not a new section.
         # Fetch the existing ID, set it on the <section>, then return the ID.
-        xmlid = _ids_atom[converted.get(xml.ID)]
+        xmlid = ids_atom[converted.get(xml.ID)]
         converted.set(xml.ID, xmlid)
 
         for staff in converted.iter(tag=mei.STAFF):
-            _ids_atom.update(_add_ids_staff(staff, _ids_atom, xmlid))
+            ids_atom.update(_add_ids_staff(staff, ids_atom, xmlid))
 
         # @xmlid values elsewhere in the tree may have changed
         with open(path_to_atom_map, 'w') as thefile:
-            json.dump(_ids_atom, thefile)
+            json.dump(ids_atom, thefile)
 
         return xmlid
 
@@ -99,15 +112,15 @@ def _place_view(converted, document, session, section_id):
         # It's a new section.
         # Generate a new ID, set it in the mappings, set it on the <section>, then return the ID.
         xmlid = section_id if section_id else 'Sme-s-m-l-e{}'.format(_seven_digits())
-        _ids_atom[converted.get(xml.ID)] = xmlid
-        _ids_atom[xmlid] = converted.get(xml.ID)
+        ids_atom[converted.get(xml.ID)] = xmlid
+        ids_atom[xmlid] = converted.get(xml.ID)
         converted.set(xml.ID, xmlid)
 
         for staff in converted.iter(tag=mei.STAFF):
-            _ids_atom.update(_add_ids_staff(staff, _ids_atom, xmlid))
+            ids_atom.update(_add_ids_staff(staff, ids_atom, xmlid))
 
         with open(path_to_atom_map, 'w') as thefile:
-            json.dump(_ids_atom, thefile)
+            json.dump(ids_atom, thefile)
 
         return xmlid
 
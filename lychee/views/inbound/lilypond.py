@@ -52,6 +52,15 @@ def place_view(converted, document, session, **kwargs):
     signals.inbound.VIEWS_FINISH.emit(views_info=post)
 
 
+def place_view_no_signals(converted, document, session, views_info=None):
+    '''
+    It's the place_view() function that returns the @xml:id of the ``<section>`` rather than
+    emitting it with the VIEWS_FINISH signal. Used for sessions with their own signal bus; refer to
+    :mod:`lychee.workflow.dispatch`.
+    '''
+    return _place_view(converted, document, session, views_info)
+
+
 def _place_view(converted, document, session, section_id):
     '''
     Do the actual work for :func:`place_view`. That is a public wrapper function for error handling,
@@ -23,6 +23,14 @@
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 #--------------------------------------------------------------------------------------------------
 
+from . import delta
+from . import dispatch
+from . import manager
 from . import registrar
+from . import scheduler
+from . import settings
 from . import session
 from . import steps
+from . import supervise
+from . import aio  # NB: after "steps" to avoid a circular import
+from . import bulk  # NB: after "steps" to avoid a circular import
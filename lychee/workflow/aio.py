@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/aio.py
+# Purpose:                An asyncio API for InteractiveSession workflows.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+An :mod:`asyncio` API for :class:`~lychee.workflow.session.InteractiveSession` workflows.
+
+The methods of :class:`~lychee.workflow.session.InteractiveSession` run every workflow step on the
+calling thread. An :class:`AsyncSession` runs them in executors, so they do not block the event
+loop while converting, parsing, or saving the document:
+
+>>> aio_session = AsyncSession(session)
+>>> sect_id = await aio_session.run_inbound('lilypond', doc)
+>>> async for result in aio_session.run_outbound(sect_id):
+...     send(result['dtype'], result['document'])
+
+Or both together, with :meth:`AsyncSession.run_workflow`:
+
+>>> async for result in aio_session.run_workflow('lilypond', doc, sect_id):
+...     send(result['dtype'], result['document'])
+
+The inbound, document, and VCS steps change the session, so they run one at a time on a private
+single-thread executor. The outbound steps only read the repository, so the conversions for all the
+registered formats run at once on the event loop's default executor (or the ``executor`` given to
+:class:`AsyncSession`), and results are yielded in the order they finish.
+
+Unlike :meth:`~lychee.workflow.session.InteractiveSession.run_outbound`, the outbound methods here
+do not emit the :const:`~lychee.signals.outbound.CONVERSION_FINISHED` signal, since the results are
+given to the caller instead.
+
+This module is written without the ``async`` and ``await`` keywords so that it can be imported with
+Python 2, but the API requires Python 3.5 or newer.
+'''
+
+import collections
+import functools
+import sys
+
+try:
+    import asyncio
+    from concurrent import futures
+except ImportError:
+    asyncio = None
+if sys.version_info < (3, 5):
+    asyncio = None
+
+from lychee.workflow import steps
+
+
+_NO_ASYNCIO = 'The asyncio API for Lychee requires Python 3.5 or newer'
+_ERR_CLOSED = 'The AsyncSession was closed'
+
+# put in the queue of an OutboundResults when there are no more results
+_DONE = object()
+
+
+def _running_loop():
+    '''
+    Return the running event loop. Before Python 3.7, return the current event loop instead.
+
+    :raises: :exc:`RuntimeError` with Python 3.7 or newer, if no event loop is running.
+    '''
+    if hasattr(asyncio, 'get_running_loop'):
+        return asyncio.get_running_loop()
+    return asyncio.get_event_loop()
+
+
+class AsyncSession(object):
+    '''
+    Run the workflow of an :class:`~lychee.workflow.session.InteractiveSession` without blocking
+    an :mod:`asyncio` event loop.
+    '''
+
+    def __init__(self, session, executor=None, loop=None):
+        '''
+        :param session: The session to run.
+        :type session: :class:`~lychee.workflow.session.InteractiveSession`
+        :param executor: Where to run outbound conversions. Defaults to the event loop's default
+            executor.
+        :type executor: :class:`concurrent.futures.Executor`
+        :param loop: The event loop. Defaults to the running event loop, so it must be given when
+            an :class:`AsyncSession` is made outside the event loop.
+        :raises: :exc:`RuntimeError` with Python 2, or Python 3 before 3.5, or if there is no
+            ``loop`` and no event loop is running.
+        '''
+        if asyncio is None:
+            raise RuntimeError(_NO_ASYNCIO)
+        self._session = session
+        self._executor = executor
+        self._loop = loop or _running_loop()
+        self._session_executor = futures.ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def session(self):
+        '''
+        Return the :class:`~lychee.workflow.session.InteractiveSession` this instance runs.
+        '''
+        return self._session
+
+    @property
+    def loop(self):
+        '''
+        Return the event loop used by this instance.
+        '''
+        return self._loop
+
+    def close(self):
+        '''
+        Stop the executor used for the inbound steps, after the steps already started finish.
+
+        Steps that would start afterward fail with :exc:`RuntimeError` instead, including the ones
+        an :class:`OutboundResults` has yet to start, so iterating it raises the error.
+        '''
+        self._session_executor.shutdown(wait=False)
+
+    def _run_in_session_executor(self, func):
+        '''
+        Run a function on the session's executor.
+
+        :returns: An awaitable for the function's result, which raises :exc:`RuntimeError` if
+            :meth:`close` was called.
+        :rtype: :class:`asyncio.Future`
+        '''
+        try:
+            return self._loop.run_in_executor(self._session_executor, func)
+        except RuntimeError:
+            # the executor was shut down, and this may be called from a done callback, where an
+            # exception would never reach the caller
+            failed = self._loop.create_future()
+            failed.set_exception(RuntimeError(_ERR_CLOSED))
+            return failed
+
+    def run_inbound(self, dtype, doc, sect_id=None):
+        '''
+        Run the inbound, document, and VCS steps.
+
+        Arguments are as for :meth:`~lychee.workflow.session.InteractiveSession.run_inbound`.
+
+        :returns: An awaitable for the @xml:id of the converted ``<section>``.
+        :rtype: :class:`asyncio.Future`
+        :raises: :exc:`~lychee.exceptions.InboundConversionError` from the awaitable.
+        '''
+        return self._run_in_session_executor(
+            functools.partial(self._session.run_inbound, dtype, doc, sect_id))
+
+    def run_outbound(self, views_info=None):
+        '''
+        Run the outbound steps for every registered format.
+
+        :param str views_info: As for :func:`lychee.workflow.steps.do_outbound_steps`.
+        :returns: An asynchronous iterator of the dictionaries returned by
+            :func:`~lychee.workflow.steps.do_outbound_steps`, in the order they finish.
+        :rtype: :class:`OutboundResults`
+        '''
+        inbound = self._loop.create_future()
+        inbound.set_result(views_info)
+        return OutboundResults(self, inbound)
+
+    def run_workflow(self, dtype, doc, sect_id=None):
+        '''
+        Run the inbound steps, then the outbound steps for the converted ``<section>``.
+
+        Arguments are as for :meth:`~lychee.workflow.session.InteractiveSession.run_workflow`.
+
+        :returns: An asynchronous iterator as for :meth:`run_outbound`. If the inbound steps fail,
+            iterating raises their exception.
+        :rtype: :class:`OutboundResults`
+        '''
+        return OutboundResults(self, self.run_inbound(dtype, doc, sect_id))
+
+    def prepare_outbound(self):
+        '''
+        Collect what the outbound steps need from the session, on the session's executor.
+
+        :returns: An awaitable for the repository directory, a snapshot of the user settings shared
+            by every conversion, and the list of registered formats.
+        :rtype: :class:`asyncio.Future`
+        '''
+        def prepare():
+            return (
+                self._session.get_repo_dir(),
+                self._session.user_settings_snapshot(),
+                self._session.registrar.get_registered_formats(),
+            )
+        return self._run_in_session_executor(prepare)
+
+    def convert(self, repo_dir, views_info, dtype, user_settings):
+        '''
+        Run the outbound steps for one format, on the outbound executor.
+
+        Arguments are as for :func:`~lychee.workflow.steps.do_outbound_steps`.
+
+        :returns: An awaitable for the dictionary returned by
+            :func:`~lychee.workflow.steps.do_outbound_steps`.
+        :rtype: :class:`asyncio.Future`
+        :raises: :exc:`~lychee.exceptions.WorkerError` from the awaitable, if the session has a
+            ``deadline`` and the conversion was stopped.
+        '''
+        args = (repo_dir, views_info, dtype, user_settings)
+        if steps._get_deadline(self._session) is None:  # pylint: disable=protected-access
+            return self._loop.run_in_executor(self._executor, steps.do_outbound_steps, *args)
+        return self._loop.run_in_executor(
+            self._executor, steps.do_supervised_outbound_steps, self._session, *args)
+
+
+class OutboundResults(object):
+    '''
+    An asynchronous iterator of outbound results, in the order the conversions finish.
+
+    Use it with ``async for``, or call :meth:`collect` to wait for every result.
+    '''
+
+    def __init__(self, aio_session, inbound):
+        '''
+        :param aio_session: The :class:`AsyncSession` that made this iterator.
+        :param inbound: A future for the @xml:id of the ``<section>`` to convert. The conversions
+            start when it is done.
+        :type inbound: :class:`asyncio.Future`
+        '''
+        self._aio = aio_session
+        self._loop = aio_session.loop
+        # made by _get_queue() on the event loop, since Queue has no "loop" argument after 3.9
+        self._queue = None
+        # items taken from the queue for an __anext__() that was cancelled, to be given out first
+        self._returned = collections.deque()
+        self._remaining = None
+        self._finished = False
+        inbound.add_done_callback(self._inbound_done)
+
+    def _get_queue(self):
+        '''
+        Return the queue of finished conversions. This must be called on the event loop.
+        '''
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def _inbound_done(self, inbound):
+        '''
+        Start the outbound conversions once the @xml:id of the ``<section>`` is known.
+        '''
+        if inbound.exception() is not None:
+            self._get_queue().put_nowait(inbound)
+            self._get_queue().put_nowait(_DONE)
+            return
+
+        views_info = inbound.result()
+        prepared = self._aio.prepare_outbound()
+        prepared.add_done_callback(functools.partial(self._start_conversions, views_info))
+
+    def _start_conversions(self, views_info, prepared):
+        '''
+        Start one outbound conversion for every registered format.
+        '''
+        if prepared.exception() is not None:
+            self._get_queue().put_nowait(prepared)
+            self._get_queue().put_nowait(_DONE)
+            return
+
+        repo_dir, user_settings, dtypes = prepared.result()
+        self._remaining = len(dtypes)
+        if self._remaining == 0:
+            self._get_queue().put_nowait(_DONE)
+        for dtype in dtypes:
+            converted = self._aio.convert(repo_dir, views_info, dtype, user_settings)
+            converted.add_done_callback(self._conversion_done)
+
+    def _conversion_done(self, converted):
+        '''
+        Queue a finished conversion.
+        '''
+        self._get_queue().put_nowait(converted)
+        self._remaining -= 1
+        if self._remaining == 0:
+            self._get_queue().put_nowait(_DONE)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        '''
+        Return an awaitable for the next result.
+        '''
+        post = self._loop.create_future()
+        if self._finished:
+            post.set_exception(StopAsyncIteration())  # pylint: disable=undefined-variable
+            return post
+
+        def got_item(getter):
+            if getter.cancelled():
+                return
+            item = getter.result()
+            if post.cancelled():
+                # the caller stopped waiting, so keep the item for the next call
+                self._returned.append(item)
+                return
+            if item is _DONE:
+                self._finished = True
+                post.set_exception(StopAsyncIteration())  # pylint: disable=undefined-variable
+            elif item.exception() is not None:
+                post.set_exception(item.exception())
+            else:
+                post.set_result(item.result())
+
+        def get_item():
+            if post.cancelled():
+                return
+            if self._returned:
+                getter = self._loop.create_future()
+                getter.set_result(self._returned.popleft())
+            else:
+                getter = asyncio.ensure_future(self._get_queue().get())
+                # stop waiting for the queue if the caller stops waiting; Queue.get() leaves the
+                # item in the queue when it is cancelled
+                post.add_done_callback(lambda post: post.cancelled() and getter.cancel())
+            getter.add_done_callback(got_item)
+
+        # __anext__() may be called before the event loop runs
+        self._loop.call_soon(get_item)
+        return post
+
+    def collect(self):
+        '''
+        Wait for every result.
+
+        :returns: An awaitable for the list of results, in the order they finished. If a
+            conversion fails, the awaitable raises its exception.
+        :rtype: :class:`asyncio.Future`
+        '''
+        post = self._loop.create_future()
+        results = []
+
+        def got_next(getter):
+            if isinstance(getter.exception(), StopAsyncIteration):  # pylint: disable=undefined-variable
+                post.set_result(results)
+            elif getter.exception() is not None:
+                post.set_exception(getter.exception())
+            else:
+                results.append(getter.result())
+                self.__anext__().add_done_callback(got_next)
+
+        self.__anext__().add_done_callback(got_next)
+        return post
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/bulk.py
+# Purpose:                Import many inbound documents into a repository in one pass.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Import many inbound documents into a repository in one pass.
+
+Calling :meth:`~lychee.workflow.session.InteractiveSession.run_inbound` once per document saves the
+whole :class:`~lychee.document.Document` and the user settings every time. The
+:func:`import_many` function, used by
+:meth:`~lychee.workflow.session.InteractiveSession.run_bulk_inbound`, instead:
+
+#. converts every document in a pool of worker processes, with the converters in
+   :const:`lychee.workflow.dispatch.INBOUND_CONVERTERS`;
+#. places the views of each converted ``<section>``, in order;
+#. puts every ``<section>`` in the score, replacing a ``<section>`` with the same @xml:id or adding
+   it to the end; then
+#. saves the document and the user settings, and runs the VCS step, once.
+
+A document that fails to convert or place does not stop the others. Its error is reported in the
+:class:`BulkResult` for that item.
+'''
+
+from collections import namedtuple
+import multiprocessing
+
+from lxml import etree
+
+from lychee import exceptions
+from lychee.logs import SESSION_LOG as log
+from lychee.workflow import dispatch, steps
+
+
+_ITEM_FAILED = '{message} ({kind}: {error})'
+
+
+class BulkResult(namedtuple('BulkResult', ('index', 'sect_id', 'error'))):
+    '''
+    The result of importing one item with :func:`import_many`.
+
+    :ivar int index: The position of the item in the list given to :func:`import_many`.
+    :ivar str sect_id: The @xml:id of the ``<section>`` made from the item, or ``None`` if it
+        failed.
+    :ivar str error: Why the item failed, or ``None`` if it succeeded.
+    '''
+    __slots__ = ()
+
+
+def _describe(exc, message):
+    '''
+    Return an error message for an item, as for :attr:`BulkResult.error`.
+    '''
+    if isinstance(exc, exceptions.InvalidDataTypeError):
+        return exc.args[0]
+    return _ITEM_FAILED.format(message=message, kind=type(exc).__name__, error=exc)
+
+
+def convert_item(args):
+    '''
+    Convert one inbound document. This runs in a worker process.
+
+    :param tuple args: The inbound ``dtype``, the document, and a dictionary of user settings.
+    :returns: The converted ``<section>`` serialized as bytes (or ``None``), the user settings after
+        conversion, and an error message (or ``None``).
+    :rtype: tuple
+    '''
+    dtype, doc, user_settings = args
+    dtype = dtype.lower()
+    try:
+        if dtype not in dispatch.INBOUND_CONVERTERS:
+            raise exceptions.InvalidDataTypeError(steps._INVALID_INBOUND_DTYPE.format(dtype))
+        converted = dispatch.INBOUND_CONVERTERS[dtype](doc, user_settings=user_settings)
+        if not isinstance(converted, (etree._Element, etree._ElementTree)):
+            raise exceptions.InboundConversionError()
+        return etree.tostring(converted), user_settings, None
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, user_settings, _describe(exc, steps._UNEXP_ERR_INBOUND_CONVERSION)
+
+
+def _convert_all(jobs, workers):
+    '''
+    Run :func:`convert_item` for every job, in a pool of ``workers`` processes if there is more than
+    one worker and more than one job.
+
+    :returns: The results of :func:`convert_item`, in the order of ``jobs``.
+    :rtype: list
+    '''
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [convert_item(job) for job in jobs]
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(convert_item, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+@log.wrap('info', 'import many inbound documents', 'action')
+def import_many(session, items, workers=None, action=None):
+    '''
+    Run the inbound, document, and VCS steps for many inbound documents at once.
+
+    :param session: The session whose repository receives the documents.
+    :type session: :class:`~lychee.workflow.session.InteractiveSession`
+    :param items: The documents to import, each a ``(dtype, doc, sect_id)`` tuple with the
+        arguments for :meth:`~lychee.workflow.session.InteractiveSession.run_inbound`. The
+        ``sect_id`` may be ``None`` to add a new ``<section>``.
+    :param int workers: The number of worker processes that convert the documents. The default is
+        the number of CPUs. With ``0`` or ``1``, the documents are converted in this process, which
+        is required for documents that cannot be pickled, like Abjad objects.
+    :returns: One result for every item, in the same order.
+    :rtype: list of :class:`BulkResult`
+    :raises: :exc:`~lychee.exceptions.CannotSaveError` if the document cannot be saved.
+    '''
+    items = list(items)
+    user_settings = session.user_settings_snapshot()
+    doc = session.document
+    dispatcher = session.dispatcher or dispatch.DirectDispatcher()
+
+    # a new repository has one empty <section>; the first new section replaces it
+    placeholder = None
+    score_order = doc.get_section_ids()
+    if len(score_order) == 1 and len(doc.get_section(score_order[0])) == 0:
+        if score_order[0] not in [sect_id for _, _, sect_id in items]:
+            placeholder = score_order[0]
+
+    jobs = [(dtype, inbound, dict(user_settings)) for dtype, inbound, _ in items]
+    converted_items = _convert_all(jobs, workers)
+
+    results = []
+    merged_settings = dict(user_settings)
+    for index, (item, converted_item) in enumerate(zip(items, converted_items)):
+        dtype, inbound, sect_id = item
+        serialized, item_settings, error = converted_item
+        merged_settings.update(item_settings)
+        if error is not None:
+            session._emit('inbound.CONVERSION_ERROR', msg=error)  # pylint: disable=protected-access
+            results.append(BulkResult(index, None, error))
+            continue
+
+        if not sect_id and placeholder is not None:
+            sect_id, placeholder = placeholder, None
+        section = etree.fromstring(serialized)
+        try:
+            xmlid = dispatcher.place_view(dtype.lower(), section, inbound, session, sect_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            error = _describe(exc, steps._UNEXP_ERR_INBOUND_VIEWS)
+            session._emit('inbound.VIEWS_ERROR', msg=error)  # pylint: disable=protected-access
+            results.append(BulkResult(index, None, error))
+            continue
+
+        doc.put_section(section)
+        if xmlid not in doc.get_section_ids():
+            doc.move_section_to(xmlid, len(doc.get_section_ids()))
+        results.append(BulkResult(index, xmlid, None))
+
+    pathnames = doc.save_everything()
+    session.write_user_settings(merged_settings)
+    steps.do_vcs(session=session, pathnames=pathnames)
+
+    action.success(
+        '{ok} of {total} items imported',
+        ok=sum(1 for result in results if result.error is None),
+        total=len(results))
+    return results
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/delta.py
+# Purpose:                Make incremental ("delta") payloads for outbound conversions.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Make incremental ("delta") payloads for outbound conversions.
+
+.. warning::
+    This module is intended for internal *Lychee* use only, so the API may change without notice.
+    If you wish to use this module outside *Lychee*, please contact us to discuss the best way.
+
+Interface components that register for an outbound format with ``delta=True`` receive the
+:const:`~lychee.signals.outbound.DELTA_FINISHED` signal instead of
+:const:`~lychee.signals.outbound.CONVERSION_FINISHED`. Rather than the whole converted document,
+the ``delta`` argument holds only the parts of the <section> that changed since the previous
+payload sent to the same "who." It is a dictionary with three keys:
+
+- ``'base'``: the :func:`~lychee.utils.subtree_hash.subtree_hash` of the <section> in the
+  previous payload, or ``None`` if there was no previous payload.
+- ``'hash'``: the hash of the <section> after the edits are applied.
+- ``'edits'``: a list of dictionaries, each with the ``'action'``, ``'path'``, and ``'index'`` keys
+  of an :class:`~lychee.utils.section_diff.Edit`, and ``'fragment'`` with the inserted or
+  replacement element in the same type as the full document would have (``None`` for deletions).
+
+When ``'base'`` is ``None``, or does not match the hash of the component's current document, the
+component cannot apply the edits. The first payload always has one edit that replaces the whole
+<section> (with the path ``''``), so it holds the same music as a full payload.
+
+Only the formats in :const:`DELTA_DTYPES` have a <section> to compare, so only they may be
+registered for deltas. The parts of an MEI document outside the <section> are always the same, so
+they are never included in a delta.
+'''
+
+from __future__ import unicode_literals
+
+from lxml import etree
+import six
+
+from lychee import exceptions
+from lychee.utils.section_diff import section_diff, REPLACE
+from lychee.utils.subtree_hash import subtree_hash
+
+
+DELTA_DTYPES = ('mei', 'verovio')
+
+_ERR_NO_SECTION = 'Cannot make a delta for a document without a <section>'
+
+
+class DeltaBase(object):
+    '''
+    The previous payload sent to one interface component, which the next delta is made against.
+    '''
+
+    __slots__ = ('placement', 'section', 'cache')
+
+    def __init__(self, placement, section, cache):
+        '''
+        :param placement: The "placement" of the payload.
+        :param section: The <section> in the payload.
+        :type section: :class:`lxml.etree.Element`
+        :param dict cache: Subtree hashes of every element in ``section``.
+        '''
+        self.placement = placement
+        self.section = section
+        self.cache = cache
+
+
+def find_section(dtype, document):
+    '''
+    Find the <section> in a full outbound payload.
+
+    :param str dtype: One of the :const:`DELTA_DTYPES`.
+    :param document: The converted document, as emitted by
+        :const:`~lychee.signals.outbound.CONVERSION_FINISHED`.
+    :returns: The <section>.
+    :rtype: :class:`lxml.etree.Element`
+    :raises: :exc:`~lychee.exceptions.OutboundConversionError` if there is no <section>.
+    '''
+    if isinstance(document, six.string_types):
+        if isinstance(document, six.text_type):
+            # lxml refuses unicode strings with an encoding declaration
+            document = document.encode('utf-8')
+        document = etree.fromstring(document)
+    elif isinstance(document, etree._ElementTree):  # pylint: disable=protected-access
+        document = document.getroot()
+
+    # NB: the "verovio" dtype does not use the MEI namespace for tags
+    for elem in document.iter(tag=etree.Element):
+        if etree.QName(elem.tag).localname == 'section':
+            return elem
+    raise exceptions.OutboundConversionError(_ERR_NO_SECTION)
+
+
+def _fragment(dtype, elem):
+    '''
+    Prepare an element for the "fragment" key of an edit in the same type as "dtype" uses for
+    a full document.
+    '''
+    if elem is None:
+        return None
+    elif dtype == 'verovio':
+        return etree.tostring(elem, encoding=six.text_type)
+    else:
+        return elem
+
+
+def make_delta(dtype, placement, document, previous=None):
+    '''
+    Make a delta payload.
+
+    :param str dtype: One of the :const:`DELTA_DTYPES`.
+    :param placement: The "placement" of the converted document.
+    :param document: The converted document, as emitted by
+        :const:`~lychee.signals.outbound.CONVERSION_FINISHED`.
+    :param previous: The base returned by the previous call for this interface component, if any.
+    :type previous: :class:`DeltaBase`
+    :returns: A 2-tuple with the delta, as described above, and the :class:`DeltaBase` to use for
+        the next delta.
+    :rtype: tuple
+    :raises: :exc:`~lychee.exceptions.OutboundConversionError` if there is no <section>.
+
+    If the ``placement`` differs from that of ``previous`` the delta replaces the whole <section>.
+    So does a delta whose <section> hash changed although the diff found no edits.
+    '''
+    section = find_section(dtype, document)
+    cache = {}
+    new_hash = subtree_hash(section, cache)
+    base = DeltaBase(placement, section, cache)
+
+    if previous is None or previous.placement != placement:
+        delta = {
+            'base': None,
+            'hash': new_hash,
+            'edits': [{'action': REPLACE, 'path': '', 'index': 0,
+                       'fragment': _fragment(dtype, section)}],
+        }
+        return delta, base
+
+    both_caches = dict(previous.cache)
+    both_caches.update(cache)
+    base_hash = subtree_hash(previous.section, previous.cache)
+    edits = []
+    for edit in section_diff(previous.section, section, both_caches):
+        edits.append({
+            'action': edit.action,
+            'path': edit.path,
+            'index': edit.index,
+            'fragment': _fragment(dtype, edit.new),
+        })
+
+    if not edits and base_hash != new_hash:
+        # the diff missed a change, so the component would keep stale music
+        edits.append({'action': REPLACE, 'path': '', 'index': 0,
+                      'fragment': _fragment(dtype, section)})
+
+    delta = {
+        'base': base_hash,
+        'hash': new_hash,
+        'edits': edits,
+    }
+    return delta, base
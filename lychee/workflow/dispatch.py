@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/dispatch.py
+# Purpose:                Direct and session-scoped dispatch of converters and signals.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Direct and session-scoped dispatch of converters, views processors, and signals.
+
+By default, an :class:`~lychee.workflow.session.InteractiveSession` uses the module-level signals
+in :mod:`lychee.signals` for everything: for every action, the inbound steps connect a converter to
+:const:`~lychee.signals.inbound.CONVERSION_START`, emit it, receive the result through the session's
+slot for :const:`~lychee.signals.inbound.CONVERSION_FINISH`, then disconnect every converter; and
+the same again for the views processors.
+
+A session created with ``dispatch=DIRECT`` uses a :class:`DirectDispatcher` instead. The inbound
+steps look up the converter and views processor in its dispatch tables, call them directly, and
+return their results. The other signals, like
+:const:`~lychee.signals.outbound.CONVERSION_FINISHED` and the ``*_STARTED`` and ``*_FINISHED``
+notifications, are still the module-level signals, but they are only emitted when a slot (or
+Fujian) observes them. Formats are registered with the module-level signals, as by default.
+
+A session created with ``dispatch=SESSION`` goes further, with a :class:`SessionBus`. The bus has
+its own dispatch tables, and its own copies of the signals a session emits, so the session does not
+use the module-level signals at all:
+
+>>> session = InteractiveSession(dispatch=dispatch.SESSION)
+>>> session.registrar.register('verovio', 'my-component')
+>>> session.bus.connect('outbound.CONVERSION_FINISHED', my_slot)
+>>> session.run_workflow('lilypond', doc)
+
+Such a session ignores the :const:`~lychee.signals.outbound.REGISTER_FORMAT` and
+:const:`~lychee.signals.ACTION_START` signals, so register outbound formats with its
+:attr:`~lychee.workflow.session.InteractiveSession.registrar`. Sessions that use a bus may run
+in parallel threads, as long as each session is used by one thread at a time.
+
+With either dispatcher, the VCS step runs without the :mod:`lychee.signals.vcs` notifications.
+Logging is always shared by the whole process.
+'''
+
+import signalslot
+
+from lychee.converters.registry import LazyConverters
+from lychee import exceptions
+from lychee import signals
+from lychee.views import inbound as views_in
+
+
+SIGNALS = 'signals'
+'''Dispatch through the module-level signals in :mod:`lychee.signals`. This is the default.'''
+DIRECT = 'direct'
+'''Call converters directly with a :class:`DirectDispatcher`, sharing the module-level signals.'''
+SESSION = 'session'
+'''Dispatch through a :class:`SessionBus` owned by the session.'''
+DISPATCH_MODES = (SIGNALS, DIRECT, SESSION)
+
+
+INBOUND_CONVERTERS = LazyConverters({
+    'abjad': 'lychee.converters.inbound.abjad:convert_no_signals',
+    'lilypond': 'lychee.converters.inbound.lilypond:convert_no_signals',
+})
+'''
+Mapping from the lowercase name of an inbound format to a function that takes the inbound document
+and ``user_settings`` keyword argument, and returns the converted ``<section>``. Each dispatcher
+starts with a copy. The converter modules are imported when first used.
+'''
+
+INBOUND_VIEWS = {
+    'abjad': views_in.abjad.place_view_no_signals,
+    'lilypond': views_in.lilypond.place_view_no_signals,
+}
+'''
+Mapping from the lowercase name of an inbound format to a function that takes the ``converted``,
+``document``, ``session``, and ``views_info`` arguments, and returns the @xml:id of the converted
+``<section>``. Each dispatcher starts with a copy.
+'''
+
+
+_NO_CONVERTER = 'Invalid "dtype" for inbound conversion: "{0}"'
+_NO_VIEWS = 'There is no inbound views processor for {0}'
+
+
+class DirectDispatcher(object):
+    '''
+    Dispatch tables for the inbound converters and views processors of a session, and the signals
+    it emits.
+    '''
+
+    SIGNAL_NAMES = (
+        'inbound.CONVERSION_STARTED',
+        'inbound.CONVERSION_FINISHED',
+        'inbound.CONVERSION_ERROR',
+        'inbound.VIEWS_STARTED',
+        'inbound.VIEWS_FINISHED',
+        'inbound.VIEWS_ERROR',
+        'outbound.STARTED',
+        'outbound.CONVERSION_FINISHED',
+        'outbound.DELTA_FINISHED',
+        'outbound.ERROR',
+    )
+    '''The names of the signals emitted through a dispatcher.'''
+
+    def __init__(self):
+        self.inbound_converters = INBOUND_CONVERTERS.copy()
+        '''This dispatcher's copy of :const:`INBOUND_CONVERTERS`.'''
+        self.inbound_views = dict(INBOUND_VIEWS)
+        '''This dispatcher's copy of :const:`INBOUND_VIEWS`.'''
+        self._signals = {}
+        for name in DirectDispatcher.SIGNAL_NAMES:
+            module, attr = name.split('.')
+            self._signals[name] = getattr(getattr(signals, module), attr)
+
+    def signal(self, name):
+        '''
+        Return one of the signals emitted by this dispatcher.
+
+        :param str name: The name of the signal, like ``'outbound.CONVERSION_FINISHED'``.
+        :rtype: :class:`signalslot.Signal`
+        :raises: :exc:`KeyError` if ``name`` is not one of the :const:`SIGNAL_NAMES`.
+        '''
+        return self._signals[name]
+
+    def emit(self, name, **kwargs):
+        '''
+        Emit one of the signals, as for :meth:`signal`, if anything observes it.
+        '''
+        emitting = self._signals[name]
+        if emitting.is_observed():
+            emitting.emit(**kwargs)
+
+    def convert_inbound(self, dtype, document, user_settings=None):
+        '''
+        Run the inbound converter for ``dtype``.
+
+        :param str dtype: The lowercase inbound format.
+        :param document: The inbound document, as required by the converter.
+        :param dict user_settings: The user settings.
+        :returns: The converted ``<section>``.
+        :rtype: :class:`lxml.etree.Element`
+        :raises: :exc:`~lychee.exceptions.InvalidDataTypeError` when there is no inbound converter
+            for ``dtype``.
+        '''
+        if dtype not in self.inbound_converters:
+            raise exceptions.InvalidDataTypeError(_NO_CONVERTER.format(dtype))
+        return self.inbound_converters[dtype](document, user_settings=user_settings)
+
+    def place_view(self, dtype, converted, document, session, views_info):
+        '''
+        Run the inbound views processor for ``dtype``.
+
+        :param str dtype: The lowercase inbound format.
+        :returns: The @xml:id of the converted ``<section>``.
+        :rtype: str
+        :raises: :exc:`~lychee.exceptions.InvalidDataTypeError` when there is no inbound views
+            processor for ``dtype``.
+
+        The other arguments are as for :const:`~lychee.signals.inbound.VIEWS_START`.
+        '''
+        if dtype not in self.inbound_views:
+            raise exceptions.InvalidDataTypeError(_NO_VIEWS.format(dtype))
+        return self.inbound_views[dtype](converted, document, session, views_info)
+
+
+class SessionBus(DirectDispatcher):
+    '''
+    A :class:`DirectDispatcher` with its own copies of the signals, for one
+    :class:`~lychee.workflow.session.InteractiveSession`.
+
+    The signals on a bus have the same names and arguments as the module-level signals, but they
+    are not sent through Fujian. Connect the transport for the session's client to them instead.
+    '''
+
+    def __init__(self):
+        super(SessionBus, self).__init__()
+        self.inbound_views['abjad'] = self._abjad_place_view
+        # this session's Abjad-to-LMEI @xml:id mapping; refer to lychee.views.inbound.abjad
+        self._abjad_ids = {}
+        for name, shared in list(self._signals.items()):
+            self._signals[name] = signalslot.Signal(args=shared.args, name=name, threadsafe=True)
+
+    def connect(self, name, slot):
+        '''
+        Connect a slot to one of the signals on this bus, as for :meth:`signal`.
+        '''
+        self._signals[name].connect(slot)
+
+    def disconnect(self, name, slot):
+        '''
+        Disconnect a slot from one of the signals on this bus, as for :meth:`signal`.
+        '''
+        self._signals[name].disconnect(slot)
+
+    def emit(self, name, **kwargs):
+        '''
+        Emit one of the signals on this bus, as for :meth:`signal`.
+        '''
+        self._signals[name].emit(**kwargs)
+
+    def _abjad_place_view(self, converted, document, session, views_info):
+        '''
+        Run the Abjad inbound views processor with this session's @xml:id mapping.
+        '''
+        return views_in.abjad.place_view_no_signals(
+            converted, document, session, views_info, ids_atom=self._abjad_ids)
+
+
+def benchmark(count=1000):
+    '''
+    Measure the overhead of the inbound conversion and views steps in each dispatch mode, with a
+    converter and views processor that do no work.
+
+    :param int count: How many actions to run in each mode.
+    :returns: A dictionary from each of the :const:`DISPATCH_MODES` to the mean seconds per action.
+    :rtype: dict
+
+    For :const:`SIGNALS`, this registers the format ``'benchmark'`` in the module-level tables
+    while it runs, so do not run it while a session is converting.
+    '''
+    import timeit
+    from lxml import etree
+    from lychee import converters
+    from lychee.namespaces import mei
+    from lychee.workflow import session as session_mod, steps
+
+    dtype = 'benchmark'
+    section = etree.Element(mei.SECTION)
+    xmlid = 'Sme-s-m-l-e1234567'
+
+    def convert_with_signal(document, **kwargs):
+        signals.inbound.CONVERSION_FINISH.emit(converted=section)
+
+    def place_view_with_signal(converted, document, session, **kwargs):
+        signals.inbound.VIEWS_FINISH.emit(views_info=xmlid)
+
+    def one_action(session):
+        session._cleanup_for_new_action()  # pylint: disable=protected-access
+        converted = steps.do_inbound_conversion(session, dtype, None)
+        if session.dispatcher is None:
+            converted = session._inbound_converted  # pylint: disable=protected-access
+        steps.do_inbound_views(session, dtype, None, converted, None)
+
+    post = {}
+    converters.INBOUND_CONVERTERS[dtype] = convert_with_signal
+    steps._INBOUND_VIEWS[dtype] = place_view_with_signal  # pylint: disable=protected-access
+    try:
+        for mode in DISPATCH_MODES:
+            session = session_mod.InteractiveSession(dispatch=mode)
+            if session.dispatcher is not None:
+                session.dispatcher.inbound_converters[dtype] = lambda document, **kwargs: section
+                session.dispatcher.inbound_views[dtype] = lambda *args: xmlid
+            start = timeit.default_timer()
+            for _ in range(count):
+                one_action(session)
+            post[mode] = (timeit.default_timer() - start) / count
+    finally:
+        del converters.INBOUND_CONVERTERS[dtype]
+        del steps._INBOUND_VIEWS[dtype]  # pylint: disable=protected-access
+
+    return post
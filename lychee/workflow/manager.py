@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/manager.py
+# Purpose:                Manage the sessions for many repositories in one process.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Manage the sessions for many repositories in one process.
+
+A server that hosts many scores would otherwise keep one :class:`~lychee.document.Document` in
+memory for every :class:`~lychee.workflow.session.InteractiveSession` it ever opened. The
+:class:`SessionManager` keeps one session per repository directory, and keeps the memory used by
+their :class:`Document` instances under a budget: when the budget is exceeded, the documents of the
+least recently used sessions are saved (if they have unsaved changes) and released. A released
+session keeps its registrations, and opens its :class:`Document` again the next time it is used.
+
+The converter modules are imported once per process, so all the sessions already share them.
+'''
+
+import collections
+import os.path
+
+from lychee.logs import SESSION_LOG as log
+from lychee.workflow import dispatch
+from lychee.workflow import session as session_mod
+
+
+# bytes; compared to the sum of InteractiveSession.estimate_memory() for all the managed sessions
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+class SessionManager(object):
+    '''
+    Keep an :class:`~lychee.workflow.session.InteractiveSession` for each of many repositories,
+    releasing the least recently used :class:`~lychee.document.Document` instances to stay within
+    a memory budget.
+    '''
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, **session_kwargs):
+        '''
+        :param int memory_budget: The most bytes, as estimated by
+            :meth:`~lychee.document.Document.estimate_memory`, that the documents of all the
+            sessions may use after :meth:`get` returns.
+        :param session_kwargs: Keyword arguments for every new
+            :class:`~lychee.workflow.session.InteractiveSession`, like ``durability``. The default
+            ``dispatch`` is :const:`~lychee.workflow.dispatch.SESSION`, so that each session has
+            its own signals and does not receive the events of the others.
+        '''
+        self._memory_budget = memory_budget
+        self._session_kwargs = dict(session_kwargs)
+        self._session_kwargs.setdefault('dispatch', dispatch.SESSION)
+        # absolute repository directory to its session; the most recently used is last
+        self._sessions = collections.OrderedDict()
+        self.evictions = 0
+        '''The number of times a :class:`Document` was released to stay within the budget.'''
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, repo_dir):
+        return os.path.abspath(repo_dir) in self._sessions
+
+    def get(self, repo_dir):
+        '''
+        Return the session for a repository, creating it if required, and mark it as the most
+        recently used.
+
+        :param str repo_dir: The repository directory, as for
+            :meth:`~lychee.workflow.session.InteractiveSession.set_repo_dir`.
+        :returns: The session.
+        :rtype: :class:`~lychee.workflow.session.InteractiveSession`
+        :raises: :exc:`~lychee.exceptions.RepositoryError` as for
+            :meth:`~lychee.workflow.session.InteractiveSession.set_repo_dir`.
+
+        Before returning, this method releases the documents of less recently used sessions until
+        the memory used is within the budget. The returned session is never released here, even
+        if it alone is over the budget.
+        '''
+        repo_dir = os.path.abspath(repo_dir)
+        if repo_dir in self._sessions:
+            session = self._sessions.pop(repo_dir)
+        else:
+            session = session_mod.InteractiveSession(**self._session_kwargs)
+            session.set_repo_dir(repo_dir)
+        self._sessions[repo_dir] = session
+
+        self.enforce_budget(keep=repo_dir)
+        return session
+
+    def memory_used(self):
+        '''
+        Estimate the memory used by the documents of all the sessions.
+
+        :returns: The approximate number of bytes.
+        :rtype: int
+        '''
+        return sum(session.estimate_memory() for session in self._sessions.values())
+
+    def resident(self):
+        '''
+        Return the repository directories of the sessions that hold a :class:`Document` in memory,
+        from the least to the most recently used.
+
+        :rtype: list of str
+        '''
+        return [repo for repo, session in self._sessions.items() if session.has_document()]
+
+    @log.wrap('info', 'enforce the session memory budget', 'action')
+    def enforce_budget(self, keep=None, action=None):
+        '''
+        Release documents, from the least recently used session, until the memory used is within
+        the budget.
+
+        :param str keep: The absolute repository directory of a session that must not be released.
+        :returns: The number of documents released.
+        :rtype: int
+        '''
+        sizes = collections.OrderedDict(
+            (repo, session.estimate_memory()) for repo, session in self._sessions.items())
+        used = sum(sizes.values())
+        released = 0
+
+        for repo, size in sizes.items():
+            if used <= self._memory_budget:
+                break
+            elif repo == keep or size == 0:
+                continue
+            if self._sessions[repo].release_document():
+                used -= size
+                released += 1
+
+        self.evictions += released
+        action.success('released {num} documents; {used} bytes in use', num=released, used=used)
+        return released
+
+    def release(self, repo_dir):
+        '''
+        Save and release the :class:`Document` of one session, keeping the session.
+
+        :param str repo_dir: The repository directory.
+        :returns: Whether a :class:`Document` was released.
+        :rtype: bool
+        '''
+        session = self._sessions.get(os.path.abspath(repo_dir))
+        return False if session is None else session.release_document()
+
+    def close(self, repo_dir):
+        '''
+        Save and release the :class:`Document` of one session, disconnect it from the
+        module-level signals, then forget the session.
+
+        :param str repo_dir: The repository directory.
+        :returns: Whether there was a session for ``repo_dir``.
+        :rtype: bool
+        '''
+        session = self._sessions.pop(os.path.abspath(repo_dir), None)
+        if session is None:
+            return False
+        session.release_document()
+        session.disconnect_signals()
+        session.unset_repo_dir()
+        return True
+
+    def close_all(self):
+        '''
+        Save, release, and forget every session.
+        '''
+        for repo_dir in list(self._sessions):
+            self.close(repo_dir)
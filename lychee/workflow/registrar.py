@@ -33,6 +33,10 @@ import six
 import lychee.converters
 from lychee.logs import SESSION_LOG as log
 from lychee import signals
+from lychee.workflow import delta as delta_mod
+
+
+_INVALID_DELTA_DTYPE = 'cannot register {dtype} for deltas; only {delta_dtypes} have deltas'
 
 
 class Registrar(object):
@@ -53,13 +57,16 @@ class Registrar(object):
     # self._registrations is a dictionary that holds registrations. The currently-registered formats
     # are the dictionary keys. Values are a list of currently registered "who" values. If the "who"
     # argument is omitted, it will be None, so this is represented in the list as None.
+    #
+    # self._deltas is a set of (dtype, who) tuples for the registrations that asked for deltas.
 
     def __init__(self):
         ""
         self._registrations = {}
+        self._deltas = set()
 
     @log.wrap('info', 'register outbound format', 'action')
-    def register(self, dtype, who=None, outbound=False, action=None, **kwargs):
+    def register(self, dtype, who=None, outbound=False, delta=False, action=None, **kwargs):
         '''
         Register a format for outbound conversion.
 
@@ -67,19 +74,33 @@ class Registrar(object):
         :param str who: An optional identifying string.
         :param bool outbound: An optional "True" to specify that the "ACTION_START" signal should
             be emitted after registering the outbound format, which will run the outbound step.
+        :param bool delta: An optional "True" to specify that this "who" should receive deltas with
+            the :const:`~lychee.signals.outbound.DELTA_FINISHED` signal, rather than full documents.
 
         If ``dtype`` does not have a converter listed in :const:`lychee.converters.OUTBOUND_CONVERTERS`,
-        the format will not be registered and WARN message will be written to the log.
+        or if ``delta`` is ``True`` and ``dtype`` is not in
+        :const:`lychee.workflow.delta.DELTA_DTYPES`, the format will not be registered and WARN
+        message will be written to the log.
+
+        Registering again with the same ``dtype`` and ``who`` changes whether they receive deltas.
         '''
         if dtype not in lychee.converters.OUTBOUND_CONVERTERS:
             action.failure('cannot register an invalid dtype ({dtype}) for outbound conversion', dtype=dtype)
             return
+        elif delta and dtype not in delta_mod.DELTA_DTYPES:
+            action.failure(_INVALID_DELTA_DTYPE, dtype=dtype, delta_dtypes=delta_mod.DELTA_DTYPES)
+            return
         elif dtype in self._registrations:
             if who not in self._registrations[dtype]:
                 self._registrations[dtype].append(who)
         else:
             self._registrations[dtype] = [who]
 
+        if delta:
+            self._deltas.add((dtype, who))
+        else:
+            self._deltas.discard((dtype, who))
+
         action.success('registered {dtype} outbound for {who}', dtype=dtype, who=who)
 
         if outbound:
@@ -105,6 +126,7 @@ class Registrar(object):
                     if who != each_who:
                         new_reg.append(each_who)
                 self._registrations[dtype] = new_reg
+            self._deltas.discard((dtype, who))
             action.success('unregistered {dtype} outbound for {who}', dtype=dtype, who=who)
         else:
             action.failure(
@@ -120,3 +142,23 @@ class Registrar(object):
         :rtype: list of str
         '''
         return list(six.iterkeys(self._registrations))
+
+    def get_delta_whos(self, dtype):
+        '''
+        Return a list of the "who" values registered to receive deltas for a format.
+
+        :param str dtype: The format to check.
+        :returns: The list, which is empty if no "who" asked for deltas.
+        :rtype: list
+        '''
+        return [who for who in self._registrations.get(dtype, []) if (dtype, who) in self._deltas]
+
+    def wants_full(self, dtype):
+        '''
+        Return whether a "who" registered for a format without asking for deltas.
+
+        :param str dtype: The format to check.
+        :returns: ``True`` if the full converted document should be emitted for ``dtype``.
+        :rtype: bool
+        '''
+        return any((dtype, who) not in self._deltas for who in self._registrations.get(dtype, []))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/scheduler.py
+# Purpose:                Debounce and coalesce rapid successive workflow actions.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Debounce and coalesce rapid successive workflow actions.
+
+When a user types in a text editor, the editor may ask for a workflow action after every keystroke.
+Each :meth:`~lychee.workflow.session.InteractiveSession.run_workflow` call runs every step, even if
+a newer version of the same ``<section>`` is already waiting. The :class:`WorkflowScheduler` runs
+actions on a background thread instead:
+
+- An action waits for ``delay`` seconds after it is submitted before it runs.
+- If another action for the same ``sect_id`` is submitted while the first is waiting, the older
+  one is dropped ("collapsed") and the newer one waits for the full ``delay`` again.
+- If another action for the same ``sect_id`` is submitted while the first is running, the first
+  action's remaining outbound conversions are skipped ("cancelled"), since the newer action will
+  produce newer outbound data anyway. The inbound, document, and VCS steps always finish.
+
+Actions without a ``sect_id`` create a new ``<section>``, so they are never collapsed.
+
+Actions run one at a time, in the order they became ready. While a scheduler is in use, do not call
+the session's ``run_*()`` methods directly, since the session is not thread-safe.
+'''
+
+import collections
+import threading
+import time
+
+from lychee.logs import SESSION_LOG as log
+
+
+DEFAULT_DELAY = 0.15
+
+
+class WorkflowScheduler(object):
+    '''
+    Run workflow actions for an :class:`~lychee.workflow.session.InteractiveSession` on a
+    background thread, collapsing actions for the same ``<section>``.
+
+    The background thread is only running while there are actions waiting, so an idle scheduler
+    does not keep its session alive.
+    '''
+
+    def __init__(self, session, delay=DEFAULT_DELAY):
+        '''
+        :param session: The session that runs the actions.
+        :type session: :class:`~lychee.workflow.session.InteractiveSession`
+        :param float delay: How many seconds an action waits for a newer action before it runs.
+        '''
+        self._session = session
+        self._delay = delay
+        self._cond = threading.Condition()
+        self._pending = collections.OrderedDict()
+        self._running = None
+        self._thread = None
+
+        self.collapsed = 0
+        '''The number of waiting actions replaced by a newer action.'''
+        self.cancelled = 0
+        '''The number of actions whose outbound conversions were skipped.'''
+        self.completed = 0
+        '''The number of actions that have run.'''
+        self.last_error = None
+        '''The most recent exception raised by an action, if any.'''
+
+    def submit(self, dtype, doc, sect_id=None):
+        '''
+        Schedule a workflow action. Arguments are as for
+        :meth:`~lychee.workflow.session.InteractiveSession.run_workflow`.
+
+        :returns: Whether a waiting action for the same ``sect_id`` was collapsed into this one.
+        :rtype: bool
+        '''
+        key = sect_id if sect_id else object()
+        with self._cond:
+            collapsed = key in self._pending
+            if collapsed:
+                del self._pending[key]
+                self.collapsed += 1
+            self._pending[key] = (time.time() + self._delay, dtype, doc, sect_id)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='lychee-workflow-scheduler')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify_all()
+
+        return collapsed
+
+    def flush(self, timeout=None):
+        '''
+        Wait until every scheduled action has run.
+
+        :param float timeout: The most seconds to wait, or ``None`` to wait as long as required.
+        :returns: Whether every scheduled action has run.
+        :rtype: bool
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._pending or self._running is not None:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def is_obsolete(self, key):
+        '''
+        Return whether a newer action is waiting for the same ``<section>``. If so, the action
+        with this key is counted as cancelled.
+        '''
+        with self._cond:
+            if key in self._pending:
+                self.cancelled += 1
+                return True
+            return False
+
+    def _next_ready(self):
+        '''
+        Remove and return the next action that is ready to run, or wait until one is. Must be called
+        with the condition held.
+
+        :returns: The key and action tuple, or ``None`` if there are no more actions.
+        '''
+        while self._pending:
+            key, item = min(list(self._pending.items()), key=lambda pair: pair[1][0])
+            wait_for = item[0] - time.time()
+            if wait_for <= 0:
+                del self._pending[key]
+                return key, item
+            self._cond.wait(wait_for)
+        return None
+
+    def _run(self):
+        '''
+        Run actions until none are waiting, then stop the thread.
+        '''
+        while True:
+            with self._cond:
+                ready = self._next_ready()
+                if ready is None:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                key, (_, dtype, doc, sect_id) = ready
+                self._running = key
+
+            try:
+                with log.info('run a scheduled action') as action:
+                    self._session.run_workflow(
+                        dtype, doc, sect_id, obsolete=lambda: self.is_obsolete(key))
+                    action.success(
+                        '{collapsed} collapsed and {cancelled} cancelled so far',
+                        collapsed=self.collapsed,
+                        cancelled=self.cancelled)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.last_error = exc
+            finally:
+                with self._cond:
+                    self._running = None
+                    self.completed += 1
+                    self._cond.notify_all()
@@ -28,9 +28,10 @@ Manage a document editing session through several workflow actions.
 
 import os
 import os.path
+import numbers
 import shutil
 import tempfile
-import codecs
+import threading
 
 from lxml import etree
 import six
@@ -44,7 +45,7 @@ from lychee import exceptions
 from lychee.logs import SESSION_LOG as log
 from lychee.namespaces import mei
 from lychee import signals
-from lychee.workflow import registrar, steps
+from lychee.workflow import delta, dispatch, registrar, scheduler, settings, steps, supervise
 
 
 _CANNOT_SAFELY_HG_INIT = 'Could not safely initialize the repository'
@@ -53,6 +54,9 @@ _FAILURE_DURING_INBOUND = 'Action failed during the inbound steps'
 _UNKNOWN_REVISION = "ACTION_START requested a revision that doesn't exist"
 _VCS_UNSUPPORTED = 'VCS is unsupported'
 _SAVE_ERR_BAD_DATA = 'Incorrect data while trying to save.'
+_INVALID_DURABILITY = 'Invalid durability setting: "{0}"'
+_INVALID_DISPATCH = 'Invalid dispatch mode: "{0}"'
+_INVALID_DEADLINE = 'Invalid deadline: "{0}"'
 
 # for text editor contents not passed through the workflow
 SAVE_DIR = 'save'
@@ -92,20 +96,68 @@ class InteractiveSession(object):
     def __init__(self, *args, **kwargs):
         '''
         :param str vcs: The VCS system to use. This is the string ``'mercurial'`` or ``None``.
+        :param str durability: How the :class:`~lychee.document.Document` saves its files, as one
+            of the :const:`~lychee.document.document.DURABILITY_SETTINGS`. Interactive sessions
+            may use :const:`~lychee.document.document.DURABILITY_RENAME` for lower latency.
+        :param str dispatch: How the workflow steps reach the converters and how the session emits
+            its results, as one of the :const:`~lychee.workflow.dispatch.DISPATCH_MODES`. With
+            :const:`~lychee.workflow.dispatch.DIRECT`, converters are called directly rather than
+            connected to signals for every action. With :const:`~lychee.workflow.dispatch.SESSION`,
+            the session also has its own :attr:`bus` and does not use the module-level signals, so
+            several sessions may run in parallel threads.
+        :param float deadline: Seconds each inbound conversion and each outbound format may run.
+            With a deadline, they run in worker processes that are stopped when it passes, or when
+            the action is cancelled with :meth:`cancel`. Refer to :mod:`lychee.workflow.supervise`.
+            The default, ``None``, runs them in this process without a deadline.
+        :param bool search_index: Whether the :class:`~lychee.document.Document` keeps the n-gram
+            index of :mod:`lychee.document.search` up to date when it saves.
         :raises: :exc:`lychee.exceptions.RepositoryError` when ``vcs`` is not valid.
+        :raises: :exc:`ValueError` when ``durability``, ``dispatch``, or ``deadline`` is not valid.
         '''
         self._doc = None
+        self._durability = kwargs.get('durability', document.DURABILITY_FULL)
+        if self._durability not in document.DURABILITY_SETTINGS:
+            raise ValueError(_INVALID_DURABILITY.format(self._durability))
+        self._search_index = bool(kwargs.get('search_index', False))
         self._hug = None
         self._temp_dir = False
         self._repo_dir = None
         self._registrar = registrar.Registrar()
-
-        signals.outbound.REGISTER_FORMAT.connect(self._registrar.register)
-        signals.outbound.UNREGISTER_FORMAT.connect(self._registrar.unregister)
-        signals.ACTION_START.connect(self._action_start)  # NOTE: this connection isn't tested
-        signals.vcs.START.connect(steps._vcs_driver)
-        signals.inbound.CONVERSION_FINISH.connect(self._inbound_conversion_finish)
-        signals.inbound.VIEWS_FINISH.connect(self._inbound_views_finish)
+        # the previous payload sent to each (dtype, who) registered for deltas
+        self._delta_bases = {}
+        self._scheduler = None
+        # the user settings file of the repository; refer to _settings_cache()
+        self._settings = None
+
+        self._deadline = kwargs.get('deadline')
+        if self._deadline is not None and (
+                isinstance(self._deadline, bool) or
+                not isinstance(self._deadline, numbers.Real) or
+                self._deadline <= 0):
+            raise ValueError(_INVALID_DEADLINE.format(self._deadline))
+        # set by cancel() to stop the supervised conversions of the current action
+        self._cancel = threading.Event()
+
+        dispatch_mode = kwargs.get('dispatch', dispatch.SIGNALS)
+        if dispatch_mode not in dispatch.DISPATCH_MODES:
+            raise ValueError(_INVALID_DISPATCH.format(dispatch_mode))
+        self._dispatch_mode = dispatch_mode
+        self._dispatcher = None
+        if dispatch_mode == dispatch.SESSION:
+            self._dispatcher = dispatch.SessionBus()
+            self._dispatcher.connect('inbound.CONVERSION_ERROR', _error_slot)
+            self._dispatcher.connect('inbound.VIEWS_ERROR', _error_slot)
+            self._dispatcher.connect('outbound.ERROR', _error_slot)
+        else:
+            signals.outbound.REGISTER_FORMAT.connect(self._registrar.register)
+            signals.outbound.UNREGISTER_FORMAT.connect(self._registrar.unregister)
+            signals.ACTION_START.connect(self._action_start)  # NOTE: this connection isn't tested
+            signals.vcs.START.connect(steps._vcs_driver)
+            if dispatch_mode == dispatch.DIRECT:
+                self._dispatcher = dispatch.DirectDispatcher()
+            else:
+                signals.inbound.CONVERSION_FINISH.connect(self._inbound_conversion_finish)
+                signals.inbound.VIEWS_FINISH.connect(self._inbound_views_finish)
 
         # thse should be cleared for each action
         self._inbound_converted = None
@@ -138,6 +190,84 @@ class InteractiveSession(object):
         '''
         return self._registrar
 
+    @property
+    def dispatcher(self):
+        '''
+        Return this session's :class:`~lychee.workflow.dispatch.DirectDispatcher`, or ``None`` if
+        the session dispatches through the module-level signals.
+        '''
+        return self._dispatcher
+
+    @property
+    def bus(self):
+        '''
+        Return this session's :class:`~lychee.workflow.dispatch.SessionBus`, or ``None`` if the
+        session uses the module-level signals.
+        '''
+        if isinstance(self._dispatcher, dispatch.SessionBus):
+            return self._dispatcher
+        return None
+
+    @property
+    def deadline(self):
+        '''
+        Return the seconds each supervised conversion may run, or ``None`` if conversions run in
+        this process without a deadline.
+        '''
+        return self._deadline
+
+    def cancel(self):
+        '''
+        Stop the supervised conversion that is running now, and skip the rest of the current
+        action's supervised conversions. This may be called from any thread.
+
+        A stopped inbound conversion emits ``inbound.CONVERSION_ERROR``, and a stopped outbound
+        format emits ``outbound.ERROR``. This has no effect without a :attr:`deadline`, because the
+        conversions are not supervised then. The next action is not cancelled.
+        '''
+        self._cancel.set()
+
+    def run_supervised(self, func, args=()):
+        '''
+        Call a function in a supervised worker process, with this session's :attr:`deadline`, and
+        stop it if :meth:`cancel` is called.
+
+        :returns: What ``func`` returned.
+        :raises: As for :func:`lychee.workflow.supervise.run`.
+        '''
+        return supervise.run(func, args, deadline=self._deadline, cancel=self._cancel)
+
+    def _emit(self, name, **kwargs):
+        '''
+        Emit a signal with this session's :attr:`dispatcher`, or the module-level signal with the
+        same name if the session has no dispatcher.
+
+        :param str name: The name of the signal, like ``'outbound.CONVERSION_FINISHED'``.
+        '''
+        if self._dispatcher is None:
+            module, attr = name.split('.')
+            getattr(getattr(signals, module), attr).emit(**kwargs)
+        else:
+            self._dispatcher.emit(name, **kwargs)
+
+    def disconnect_signals(self):
+        '''
+        Disconnect this session's slots from the module-level signals, so it no longer receives
+        their events and may be garbage-collected. Afterward, the session cannot run actions
+        through the module-level signals.
+
+        Sessions with the :const:`~lychee.workflow.dispatch.SESSION` dispatch mode are not
+        connected to the module-level signals, so this does nothing for them.
+        '''
+        if self._dispatch_mode == dispatch.SESSION:
+            return
+        signals.outbound.REGISTER_FORMAT.disconnect(self._registrar.register)
+        signals.outbound.UNREGISTER_FORMAT.disconnect(self._registrar.unregister)
+        signals.ACTION_START.disconnect(self._action_start)
+        # NB: steps._vcs_driver stays connected, since it is shared by every session
+        signals.inbound.CONVERSION_FINISH.disconnect(self._inbound_conversion_finish)
+        signals.inbound.VIEWS_FINISH.disconnect(self._inbound_views_finish)
+
     def __del__(self):
         '''
         If this session is using a temporary directory, delete it.
@@ -168,12 +298,49 @@ class InteractiveSession(object):
         if self._repo_dir is None:
             self.set_repo_dir('')
 
-        self._doc = document.Document(self._repo_dir)
+        self._doc = document.Document(
+            self._repo_dir, durability=self._durability, search_index=self._search_index)
         if len(self._doc.get_section_ids()) == 0:
             self._doc.move_section_to(self._doc.put_section(etree.Element(mei.SECTION)), 0)
             self._doc.save_everything()
         return self._doc
 
+    def has_document(self):
+        '''
+        Return whether this session currently holds a :class:`~lychee.document.Document` in memory.
+
+        :rtype: bool
+        '''
+        return self._doc is not None
+
+    def estimate_memory(self):
+        '''
+        Estimate the memory used by this session's :class:`~lychee.document.Document`.
+
+        :returns: As for :meth:`lychee.document.Document.estimate_memory`, or ``0`` if the session
+            holds no :class:`Document`.
+        :rtype: int
+        '''
+        return 0 if self._doc is None else self._doc.estimate_memory()
+
+    @log.wrap('info', 'release the document')
+    def release_document(self):
+        '''
+        Save the :class:`~lychee.document.Document` if it has unsaved changes, then drop it from
+        memory. The :attr:`document` property opens it again when it is next used.
+
+        :returns: Whether a :class:`Document` was released.
+        :rtype: bool
+        :raises: :exc:`lychee.exceptions.CannotSaveError` if the changes cannot be saved, in which
+            case the :class:`Document` is kept.
+        '''
+        if self._doc is None:
+            return False
+        if self._doc.is_dirty():
+            self._doc.save_everything()
+        self._doc = None
+        return True
+
     @log.wrap('info', 'set the repository directory')
     def set_repo_dir(self, path, run_outbound=False):
         '''
@@ -247,6 +414,8 @@ class InteractiveSession(object):
         self._temp_dir = False
         self._hug = None
         self._doc = None
+        self._delta_bases = {}
+        self._settings = None
 
     def get_repo_dir(self):
         '''
@@ -264,51 +433,50 @@ class InteractiveSession(object):
             # NOTE: "run_outbound" must be False, in order to avoid a recursion loop
             return self.set_repo_dir('', run_outbound=False)
 
+    def _settings_cache(self):
+        '''
+        Return the :class:`~lychee.workflow.settings.SettingsCache` for this session's repository,
+        or ``None`` if no repository directory is set.
+        '''
+        if self._repo_dir is None:
+            return None
+        if self._settings is None:
+            pathname = os.path.join(self._repo_dir, USER_SETTINGS_FILE)
+            self._settings = settings.SettingsCache(pathname)
+        return self._settings
+
     def read_user_settings(self):
         """
         Read from this repo's user settings XML file.
-        """
-        user_settings = {}
-        if self._repo_dir is None:
-            return user_settings
 
-        settings_file_name = os.path.join(self._repo_dir, USER_SETTINGS_FILE)
-        try:
-            with codecs.open(settings_file_name, encoding='utf-8') as settings_file:
-                user_settings_xml = etree.parse(settings_file)
-        except IOError:
-            return user_settings
+        The file is only parsed again if it changed since it was last read or written. Refer to
+        :mod:`lychee.workflow.settings`.
 
-        for element in user_settings_xml.getroot():
-            user_settings[element.tag] = element.text
+        :returns: A copy of the settings, which the caller may modify.
+        :rtype: dict
+        """
+        return dict(self.user_settings_snapshot())
 
-        return user_settings
+    def user_settings_snapshot(self):
+        """
+        Return this repo's user settings without copying them.
+
+        :returns: The settings, which cannot be modified, so they may be shared by outbound
+            conversions that run at the same time.
+        :rtype: :class:`~lychee.workflow.settings.SettingsSnapshot`
+        """
+        cache = self._settings_cache()
+        if cache is None:
+            return settings.SettingsSnapshot()
+        return cache.read()
 
     def write_user_settings(self, user_settings):
         """
-        Write to this repo's user settings XML file.
+        Write to this repo's user settings XML file, unless the settings did not change.
         """
-        if self._repo_dir is None:
-            return
-
-        settings_file_name = os.path.join(self._repo_dir, USER_SETTINGS_FILE)
-        try:
-            os.makedirs(os.path.join(self._repo_dir, USER_SETTINGS_DIR))
-        except OSError:
-            pass
-
-        user_settings_xml = etree.Element('lycheeSettings')
-        for key in user_settings:
-            element = etree.Element(key)
-            element.text = user_settings[key]
-            user_settings_xml.append(element)
-        user_settings_xml = etree.ElementTree(user_settings_xml)
-
-        try:
-            with codecs.open(settings_file_name, 'w', encoding='utf-8') as settings_file:
-                user_settings_xml.write(settings_file, pretty_print=True)
-        except IOError:
-            pass
+        cache = self._settings_cache()
+        if cache is not None:
+            cache.write(user_settings)
 
     @staticmethod
     def make_save_path(repo_dir, sect_id, dtype):
@@ -424,8 +592,31 @@ class InteractiveSession(object):
             if initial_revision:
                 self._hug.update(initial_revision)
 
+    @property
+    def scheduler(self):
+        '''
+        Return the :class:`~lychee.workflow.scheduler.WorkflowScheduler` for this session, creating
+        it if required.
+        '''
+        if self._scheduler is None:
+            self._scheduler = scheduler.WorkflowScheduler(self)
+        return self._scheduler
+
+    def schedule_workflow(self, dtype, doc, sect_id=None):
+        '''
+        Schedule a full *Lychee* workflow to run soon on a background thread, collapsing it with
+        other scheduled workflows for the same ``<section>``. Arguments are as for
+        :meth:`run_workflow`.
+
+        :returns: Whether a waiting workflow for the same ``sect_id`` was replaced by this one.
+        :rtype: bool
+
+        Refer to :mod:`lychee.workflow.scheduler` for more information.
+        '''
+        return self.scheduler.submit(dtype, doc, sect_id)
+
     @log.wrap('critical', 'run full workflow', 'action')
-    def run_workflow(self, dtype, doc, sect_id=None, action=None):
+    def run_workflow(self, dtype, doc, sect_id=None, obsolete=None, action=None):
         '''
         Run a full *Lychee* workflow, including the inbound, document, VCS (if enabled), and
         outbund steps.
@@ -436,6 +627,7 @@ class InteractiveSession(object):
             converter module itself.
         :param str sect_id: The Lychee-MEI @xml:id attribute of the ``<section>`` contained in
             the "doc" argument. If omitted, "converted" will become a new ``<section>``.
+        :param obsolete: As for :meth:`run_outbound`.
 
         Emits the :const:`lychee.signals.outbound.CONVERSION_FINISHED` signal on completion. May
         also cause a bunch of different error signals if there's a problem.
@@ -447,7 +639,7 @@ class InteractiveSession(object):
                 action.failure(_FAILURE_DURING_INBOUND)
                 return
 
-            self.run_outbound(views_info=self._inbound_views_info)
+            self.run_outbound(views_info=self._inbound_views_info, obsolete=obsolete)
 
         finally:
             self._cleanup_for_new_action()
@@ -463,6 +655,8 @@ class InteractiveSession(object):
             converter module itself.
         :param str sect_id: The Lychee-MEI @xml:id attribute of the ``<section>`` contained in
             the "doc" argument. If omitted, "converted" will become a new ``<section>``.
+        :returns: The @xml:id attribute of the converted ``<section>``.
+        :rtype: str
         :raises: :exc:`lychee.exceptions.InboundConversionError` when the conversion or views
             processing steps fail.
         '''
@@ -470,20 +664,24 @@ class InteractiveSession(object):
 
         user_settings = self.read_user_settings()
 
-        steps.do_inbound_conversion(
+        converted = steps.do_inbound_conversion(
             session=self,
             dtype=dtype,
             document=doc,
             user_settings=user_settings)
+        if self._dispatcher is not None or self._deadline is not None:
+            self._inbound_converted = converted
         if not isinstance(self._inbound_converted, (etree._Element, etree._ElementTree)):
             raise exceptions.InboundConversionError()
 
-        steps.do_inbound_views(
+        views_info = steps.do_inbound_views(
             session=self,
             dtype=dtype,
             document=doc,
             converted=self._inbound_converted,
             views_info=sect_id)
+        if self._dispatcher is not None:
+            self._inbound_views_info = views_info
         if not isinstance(self._inbound_views_info, six.string_types):
             raise exceptions.InboundConversionError()
 
@@ -496,8 +694,36 @@ class InteractiveSession(object):
 
         steps.do_vcs(session=self, pathnames=document_pathnames)
 
+        return self._inbound_views_info
+
+    @log.wrap('critical', 'run bulk inbound workflow step')
+    def run_bulk_inbound(self, items, workers=None):
+        '''
+        Run the inbound, document, and (if enabled) VCS workflow steps for many inbound documents,
+        converting them in parallel and saving the document once.
+
+        :param items: The documents to import, each a ``(dtype, doc, sect_id)`` tuple with the
+            arguments for :meth:`run_inbound`.
+        :param int workers: The number of worker processes that convert the documents. Refer to
+            :func:`lychee.workflow.bulk.import_many`.
+        :returns: The result for each item, in the same order, with the @xml:id of its ``<section>``
+            or the reason it failed.
+        :rtype: list of :class:`~lychee.workflow.bulk.BulkResult`
+
+        Unlike :meth:`run_inbound`, this method does not raise an exception when an item fails.
+        Run :meth:`run_outbound` afterward to update the outbound formats.
+        '''
+        from lychee.workflow import bulk  # bulk imports steps, which imports this module
+        items = list(items)
+        for _, _, sect_id in items:
+            self._cleanup_for_new_action(sect_id)
+        try:
+            return bulk.import_many(self, items, workers=workers)
+        finally:
+            self._cleanup_for_new_action()
+
     @log.wrap('critical', 'run outbound workflow step', 'action')
-    def run_outbound(self, views_info=None, revision=None, action=None):
+    def run_outbound(self, views_info=None, revision=None, obsolete=None, action=None):
         '''
         Run the outbound workflow steps (views and conversion).
 
@@ -505,6 +731,10 @@ class InteractiveSession(object):
         :param str revision: Checkout a specific changeset before running the outbound steps.
             This may be a revision number, but we recommend using the changeset hash when possible.
             This argument is ignored when version control is not enabled.
+        :param obsolete: An optional function called without arguments before each outbound
+            conversion. If it returns ``True``, the remaining conversions are skipped because
+            their results would be out of date.
+        :type obsolete: callable
 
         You may request only (a portion of) a ``<section>`` for outbound conversion by providing
         the @xml:id attribute of that element. You may also request data from an arbitrary
@@ -553,18 +783,40 @@ class InteractiveSession(object):
                 else:
                     changeset = summary['parent']
 
-            user_settings = self.read_user_settings()
+            user_settings = self.user_settings_snapshot()
 
             # run the outbound conversions
-            signals.outbound.STARTED.emit()
+            self._emit('outbound.STARTED')
             repo_dir = self.get_repo_dir()
+            for dtype, who in list(self._delta_bases):
+                # forget the payloads sent to components that have since unregistered
+                if who not in self._registrar.get_delta_whos(dtype):
+                    del self._delta_bases[(dtype, who)]
             for outbound_dtype in self._registrar.get_registered_formats():
-                post = steps.do_outbound_steps(repo_dir, views_info, outbound_dtype, user_settings)
-                signals.outbound.CONVERSION_FINISHED.emit(
-                    dtype=outbound_dtype,
-                    placement=post['placement'],
-                    document=post['document'],
-                    changeset=changeset)
+                if obsolete is not None and obsolete():
+                    action.success('skipped outbound conversions made obsolete by a newer action')
+                    break
+                if self._deadline is None:
+                    post = steps.do_outbound_steps(
+                        repo_dir, views_info, outbound_dtype, user_settings)
+                else:
+                    try:
+                        post = steps.do_supervised_outbound_steps(
+                            self, repo_dir, views_info, outbound_dtype, user_settings)
+                    except exceptions.WorkerError as exc:
+                        self._emit('outbound.ERROR', msg=exc.args[0])
+                        if isinstance(exc, exceptions.ConversionCancelledError):
+                            action.failure('cancelled the outbound conversions')
+                            break
+                        continue
+                sent_full = self._registrar.wants_full(outbound_dtype)
+                if sent_full:
+                    self._emit_full(outbound_dtype, post, changeset)
+                for who in self._registrar.get_delta_whos(outbound_dtype):
+                    if not self._emit_delta(outbound_dtype, who, post, changeset) and not sent_full:
+                        # the "who" gets the whole document instead
+                        self._emit_full(outbound_dtype, post, changeset)
+                        sent_full = True
 
             # Currently we don't have any need for the outbound converters to write user settings,
             # but it may be necessary in the future. For some reason, this line causes outbound
@@ -578,6 +830,57 @@ class InteractiveSession(object):
             if initial_revision:
                 self._hug.update(initial_revision)
 
+    def _emit_full(self, dtype, post, changeset):
+        '''
+        Emit the :const:`~lychee.signals.outbound.CONVERSION_FINISHED` signal for one format.
+
+        :param str dtype: The outbound data type.
+        :param dict post: The data returned by :func:`~lychee.workflow.steps.do_outbound_steps`.
+        :param str changeset: As for :const:`~lychee.signals.outbound.CONVERSION_FINISHED`.
+        '''
+        self._emit(
+            'outbound.CONVERSION_FINISHED',
+            dtype=dtype,
+            placement=post['placement'],
+            document=post['document'],
+            changeset=changeset)
+
+    @log.wrap('debug', 'emit a delta', 'action')
+    def _emit_delta(self, dtype, who, post, changeset, action=None):
+        '''
+        Emit the :const:`~lychee.signals.outbound.DELTA_FINISHED` signal for one "who."
+
+        :param str dtype: The outbound data type.
+        :param str who: The "who" registered for deltas.
+        :param dict post: The data returned by :func:`~lychee.workflow.steps.do_outbound_steps`.
+        :param str changeset: As for :const:`~lychee.signals.outbound.CONVERSION_FINISHED`.
+        :returns: Whether the delta was emitted.
+        :rtype: bool
+
+        The delta is made against the previous payload sent to this "who," which is then replaced
+        with the current payload. If the delta cannot be made, nothing is emitted and the previous
+        payload is forgotten, so the next delta replaces the whole ``<section>``.
+        '''
+        key = (dtype, who)
+        try:
+            payload, self._delta_bases[key] = delta.make_delta(
+                dtype,
+                post['placement'],
+                post['document'],
+                self._delta_bases.get(key))
+        except Exception as exc:  # pylint: disable=broad-except
+            self._delta_bases.pop(key, None)
+            action.failure('could not make a delta for {who}: {exc!r}', who=who, exc=exc)
+            return False
+        self._emit(
+            'outbound.DELTA_FINISHED',
+            dtype=dtype,
+            placement=post['placement'],
+            delta=payload,
+            changeset=changeset,
+            who=who)
+        return True
+
     def _cleanup_for_new_action(self, sect_id=None):
         '''
         Perform required cleanup before starting a new "action."
@@ -590,11 +893,15 @@ class InteractiveSession(object):
         - Clear the result of the previous inbound conversion step (including "views").
         - Resets the selected inbound converter and views functions.
         - Deletes any saved "text editor" files for the section ID.
+        - Clears a cancellation from :meth:`cancel`.
         '''
+        self._cancel.clear()
         self._inbound_converted = None
         self._inbound_views_info = None
-        steps.flush_inbound_converters()
-        steps.flush_inbound_views()
+        if self._dispatcher is None:
+            # with a dispatcher, these would disconnect the converters of another session
+            steps.flush_inbound_converters()
+            steps.flush_inbound_views()
 
         if sect_id and self._repo_dir:
             shutil.rmtree(os.path.join(self._repo_dir, SAVE_DIR, str(sect_id)), True)
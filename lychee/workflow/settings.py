@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/settings.py
+# Purpose:                Cache the user settings file of a repository.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Cache the user settings file of a repository.
+
+Every workflow action reads the user settings, and the inbound steps write them again. The
+:class:`SettingsCache` keeps the settings in memory, parses the file again only when its
+modification time, size, or inode number changes (for example, if another program edits it), and
+writes the file only when the settings are different from what it holds. A file modified in the
+last :const:`_RACY_SECONDS` may be rewritten with the same size and modification time, so its
+contents are compared too.
+
+The settings are given out as :class:`SettingsSnapshot` instances, which cannot be modified, so
+one snapshot may be shared by outbound conversions running at the same time.
+'''
+
+import hashlib
+import os
+import os.path
+import threading
+import time
+
+from lxml import etree
+
+
+_READ_ONLY = 'User settings snapshots cannot be modified; copy one with dict() first'
+
+# a file modified less than this many seconds ago may change again without changing its
+# modification time, since some filesystems only store it to the second
+_RACY_SECONDS = 2.0
+
+
+class SettingsSnapshot(dict):
+    '''
+    A :class:`dict` of user settings that cannot be modified.
+    '''
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY)
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def __reduce__(self):
+        # the default for dict subclasses calls __setitem__() while unpickling
+        return (SettingsSnapshot, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class SettingsCache(object):
+    '''
+    The user settings file of one repository, held in memory.
+    '''
+
+    def __init__(self, pathname):
+        '''
+        :param str pathname: The absolute pathname of the user settings file. The file need not
+            exist yet.
+        '''
+        self._pathname = pathname
+        self._lock = threading.Lock()
+        self._snapshot = None
+        # the stamp of the file when self._snapshot was read or written; refer to _current_stamp()
+        self._stamp = None
+
+        self.reads = 0
+        '''The number of times the file was parsed.'''
+        self.writes = 0
+        '''The number of times the file was written.'''
+
+    def _current_stamp(self):
+        '''
+        Return the modification time, size, and inode number of the file, or ``None`` if it does
+        not exist. If the file was modified in the last :const:`_RACY_SECONDS`, the stamp also holds
+        a digest of its contents.
+        '''
+        try:
+            stat = os.stat(self._pathname)
+            stamp = (getattr(stat, 'st_mtime_ns', stat.st_mtime), stat.st_size, stat.st_ino)
+            if time.time() - stat.st_mtime < _RACY_SECONDS:
+                with open(self._pathname, 'rb') as settings_file:
+                    stamp += (hashlib.sha1(settings_file.read()).hexdigest(),)
+        except (IOError, OSError):
+            return None
+        return stamp
+
+    def read(self):
+        '''
+        Return the user settings, parsing the file only if it changed since it was last read or
+        written.
+
+        :returns: The settings. If the file does not exist or cannot be parsed, the snapshot is
+            empty.
+        :rtype: :class:`SettingsSnapshot`
+        '''
+        with self._lock:
+            stamp = self._current_stamp()
+            if self._snapshot is None or stamp != self._stamp:
+                self._snapshot = self._parse()
+                self._stamp = stamp
+            return self._snapshot
+
+    def _parse(self):
+        '''
+        Parse the user settings file.
+        '''
+        settings = {}
+        try:
+            settings_xml = etree.parse(self._pathname)
+        except (IOError, etree.XMLSyntaxError):
+            return SettingsSnapshot(settings)
+
+        self.reads += 1
+        for element in settings_xml.getroot():
+            settings[element.tag] = element.text
+        return SettingsSnapshot(settings)
+
+    def write(self, settings):
+        '''
+        Write the user settings, unless they are the same as the settings in the file.
+
+        :param dict settings: The settings to write.
+        :returns: Whether the file was written.
+        :rtype: bool
+        '''
+        current = self.read()
+        if current == settings and self._stamp is not None:
+            return False
+
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self._pathname))
+            except OSError:
+                pass
+
+            settings_xml = etree.Element('lycheeSettings')
+            for key in settings:
+                element = etree.Element(key)
+                element.text = settings[key]
+                settings_xml.append(element)
+            settings_xml = etree.ElementTree(settings_xml)
+
+            try:
+                settings_xml.write(self._pathname, encoding='UTF-8', pretty_print=True)
+            except IOError:
+                return False
+
+            self.writes += 1
+            self._snapshot = SettingsSnapshot(settings)
+            self._stamp = self._current_stamp()
+            return True
@@ -44,6 +44,7 @@ views/conversion steps. The views/conversion steps themselves are likely to happ
 possibly simultaneously, depending on which outbound formats are registered.
 '''
 
+import numbers
 import os.path
 
 from lxml import etree
@@ -56,6 +57,7 @@ from lychee.namespaces import mei
 from lychee import signals
 from lychee.views import inbound as views_in
 from lychee.views import outbound as views_out
+from lychee.workflow import dispatch
 import lychee.workflow.session
 
 
@@ -68,6 +70,42 @@ _SCORE_IS_EMPTY = 'The score is empty; cannot continue outbound processing'
 _NO_INBOUND_VIEWS = 'There is no inbound views processor for {0}'
 _NO_OUTBOUND_VIEWS = 'There is no outbound views processor for {0}'
 
+# inbound views processors that _choose_inbound_views() connects to "inbound.VIEWS_START"
+_INBOUND_VIEWS = {
+    'abjad': views_in.abjad.place_view,
+    'lilypond': views_in.lilypond.place_view,
+}
+
+
+def _get_dispatcher(session):
+    '''
+    Return the :class:`~lychee.workflow.dispatch.DirectDispatcher` of a session, or ``None`` if the
+    session dispatches through the module-level signals.
+    '''
+    dispatcher = getattr(session, 'dispatcher', None)
+    return dispatcher if isinstance(dispatcher, dispatch.DirectDispatcher) else None
+
+
+def _get_deadline(session):
+    '''
+    Return the :attr:`~lychee.workflow.session.InteractiveSession.deadline` of a session, or
+    ``None`` if its conversions are not supervised.
+    '''
+    deadline = getattr(session, 'deadline', None)
+    if isinstance(deadline, numbers.Real) and not isinstance(deadline, bool):
+        return deadline
+    return None
+
+
+def _error_message(exc, default):
+    '''
+    Return the message of an :exc:`~lychee.exceptions.InvalidDataTypeError`, or ``default`` for
+    any other exception.
+    '''
+    if isinstance(exc, exceptions.InvalidDataTypeError):
+        return exc.args[0]
+    return default
+
 
 @log.wrap('info', 'run the "inbound conversion" step')
 def do_inbound_conversion(session, dtype, document, user_settings=None):
@@ -86,7 +124,29 @@ def do_inbound_conversion(session, dtype, document, user_settings=None):
     by this function. If an error occurs during conversion, this function emits the
     :const:`~lychee.signals.inbound.CONVERSION_ERROR` signal with an error message, then the
     :const:`~lychee.signals.inbound.CONVERSION_FINISH` signal with ``None``.
+
+    If the session has a :class:`~lychee.workflow.dispatch.DirectDispatcher`, the converter is
+    called from its dispatch table instead, and the converted document (or ``None``) is returned.
+    The error message is emitted with the dispatcher's ``'inbound.CONVERSION_ERROR'`` signal.
+
+    If the session has a ``deadline``, the converter runs in a supervised worker process, and the
+    converted document (or ``None``) is returned. Refer to :func:`_supervised_inbound_conversion`.
     '''
+    dispatcher = _get_dispatcher(session)
+    if _get_deadline(session) is not None:
+        return _supervised_inbound_conversion(session, dispatcher, dtype, document, user_settings)
+    elif dispatcher is not None:
+        try:
+            dispatcher.emit('inbound.CONVERSION_STARTED')
+            converted = dispatcher.convert_inbound(
+                dtype.lower(), document, user_settings=user_settings)
+        except Exception as exc:
+            msg = _error_message(exc, _UNEXP_ERR_INBOUND_CONVERSION)
+            dispatcher.emit('inbound.CONVERSION_ERROR', msg=msg)
+            return None
+        dispatcher.emit('inbound.CONVERSION_FINISHED')
+        return converted
+
     try:
         _choose_inbound_converter(dtype.lower())
         signals.inbound.CONVERSION_START.emit(document=document, user_settings=user_settings)
@@ -101,6 +161,54 @@ def do_inbound_conversion(session, dtype, document, user_settings=None):
         flush_inbound_converters()
 
 
+def _convert_in_worker(dispatcher, dtype, document, user_settings):
+    '''
+    Run an inbound converter. This runs in a supervised worker process.
+
+    :returns: The converted ``<section>`` serialized as bytes, and the user settings after
+        conversion.
+    :rtype: tuple
+    '''
+    converted = dispatcher.convert_inbound(dtype, document, user_settings=user_settings)
+    if not isinstance(converted, (etree._Element, etree._ElementTree)):
+        raise exceptions.InboundConversionError()
+    return etree.tostring(converted), user_settings
+
+
+def _supervised_inbound_conversion(session, dispatcher, dtype, document, user_settings):
+    '''
+    Run the "inbound conversion" step in a supervised worker process, for a session with a
+    ``deadline``.
+
+    The converter comes from the session's dispatcher, or from
+    :const:`lychee.workflow.dispatch.INBOUND_CONVERTERS` if it has none. Signals are emitted with
+    the session, as for :meth:`~lychee.workflow.session.InteractiveSession._emit`. Changes the
+    converter makes to ``user_settings`` are copied back from the worker.
+
+    :returns: The converted ``<section>``, or ``None`` if the conversion failed, ran past the
+        deadline, or was cancelled.
+    :rtype: :class:`lxml.etree.Element`
+    '''
+    if dispatcher is None:
+        dispatcher = dispatch.DirectDispatcher()
+    session._emit('inbound.CONVERSION_STARTED')  # pylint: disable=protected-access
+    try:
+        serialized, worker_settings = session.run_supervised(
+            _convert_in_worker, (dispatcher, dtype.lower(), document, user_settings))
+    except Exception as exc:
+        if isinstance(exc, exceptions.WorkerError):
+            msg = exc.args[0]
+        else:
+            msg = _error_message(exc, _UNEXP_ERR_INBOUND_CONVERSION)
+        session._emit('inbound.CONVERSION_ERROR', msg=msg)  # pylint: disable=protected-access
+        return None
+
+    if user_settings is not None:
+        user_settings.update(worker_settings)
+    session._emit('inbound.CONVERSION_FINISHED')  # pylint: disable=protected-access
+    return etree.fromstring(serialized)
+
+
 @log.wrap('info', 'run the "inbound views" step')
 def do_inbound_views(session, dtype, document, converted, views_info):
     '''
@@ -123,7 +231,25 @@ def do_inbound_views(session, dtype, document, converted, views_info):
     by this function. If an error occurs during processing, this function emits the
     :const:`~lychee.signals.inbound.VIEWS_ERROR` signal with an error message, then the
     :const:`~lychee.signals.inbound.VIEWS_FINISH` signal with ``None``.
+
+    If the session has a :class:`~lychee.workflow.dispatch.DirectDispatcher`, the views processor
+    is called from its dispatch table instead, and the @xml:id of the ``<section>`` (or ``None``)
+    is returned. The error message is emitted with the dispatcher's ``'inbound.VIEWS_ERROR'``
+    signal.
     '''
+    dispatcher = _get_dispatcher(session)
+    if dispatcher is not None:
+        try:
+            dispatcher.emit('inbound.VIEWS_STARTED')
+            views_info = dispatcher.place_view(
+                dtype.lower(), converted, document, session, views_info)
+        except Exception as exc:
+            msg = _error_message(exc, _UNEXP_ERR_INBOUND_VIEWS)
+            dispatcher.emit('inbound.VIEWS_ERROR', msg=msg)
+            return None
+        dispatcher.emit('inbound.VIEWS_FINISHED')
+        return views_info
+
     try:
         _choose_inbound_views(dtype)
         signals.inbound.VIEWS_START.emit(
@@ -177,8 +303,14 @@ def do_vcs(session, pathnames):
     :returns: ``None``
 
     If the VCS step is disabled in the :class:`Session` instance given as ``session``, then the
-    VCS step is skipped.
+    VCS step is skipped. If the session has a :class:`~lychee.workflow.dispatch.DirectDispatcher`,
+    the VCS step is run directly, without the :mod:`~lychee.signals.vcs` notifications.
     '''
+    if _get_dispatcher(session) is not None:
+        if session.vcs_enabled:
+            _vcs_driver(session=session, pathnames=pathnames)
+        return
+
     if session.vcs_enabled:
         signals.vcs.START.emit(session=session, pathnames=pathnames)
     else:
@@ -291,6 +423,41 @@ def do_outbound_steps(repo_dir, views_info, dtype, user_settings=None):
         raise exceptions.InvalidDataTypeError(_INVALID_OUTBOUND_DTYPE.format(dtype))
 
 
+def _outbound_in_worker(repo_dir, views_info, dtype, user_settings):
+    '''
+    Run :func:`do_outbound_steps`. This runs in a supervised worker process.
+
+    :returns: The dictionary from :func:`do_outbound_steps`, and whether its ``document`` is an
+        element that was serialized as bytes, because elements cannot be pickled.
+    :rtype: tuple
+    '''
+    post = do_outbound_steps(repo_dir, views_info, dtype, user_settings)
+    if isinstance(post['document'], (etree._Element, etree._ElementTree)):
+        post['document'] = etree.tostring(post['document'])
+        return post, True
+    return post, False
+
+
+def do_supervised_outbound_steps(session, repo_dir, views_info, dtype, user_settings=None):
+    '''
+    Run :func:`do_outbound_steps` in a supervised worker process, for a session with a
+    ``deadline``. Refer to :meth:`~lychee.workflow.session.InteractiveSession.run_supervised`.
+
+    :param session: The session whose deadline and cancellation apply.
+    :type session: :class:`lychee.workflow.session.InteractiveSession`
+
+    The other arguments and the return value are as for :func:`do_outbound_steps`.
+
+    :raises: :exc:`~lychee.exceptions.WorkerError` if the worker was stopped or crashed.
+    :raises: The exceptions raised by :func:`do_outbound_steps`.
+    '''
+    post, serialized = session.run_supervised(
+        _outbound_in_worker, (repo_dir, views_info, dtype, user_settings))
+    if serialized:
+        post['document'] = etree.fromstring(post['document'])
+    return post
+
+
 def _vcs_driver(session, pathnames, **kwargs):
     '''
     Slot for vcs.START that actually runs the "VCS step," and will only be called when the VCS
@@ -323,7 +490,8 @@ def flush_inbound_converters():
     '''
     Clear any inbound converters that may be connected.
     '''
-    for each_converter in converters.INBOUND_CONVERTERS.values():
+    # a converter that was never imported cannot be connected
+    for each_converter in converters.INBOUND_CONVERTERS.loaded():
         signals.inbound.CONVERSION_START.disconnect(each_converter)
 
 
@@ -339,13 +507,8 @@ def _choose_inbound_views(dtype):
     '''
     dtype = dtype.lower()
 
-    modules = {
-        'abjad': views_in.abjad.place_view,
-        'lilypond': views_in.lilypond.place_view,
-    }
-
-    if dtype in modules:
-        signals.inbound.VIEWS_START.connect(modules[dtype])
+    if dtype in _INBOUND_VIEWS:
+        signals.inbound.VIEWS_START.connect(_INBOUND_VIEWS[dtype])
     else:
         raise exceptions.InvalidDataTypeError(_NO_INBOUND_VIEWS.format(dtype))
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/supervise.py
+# Purpose:                Run conversions in worker processes that are stopped at a deadline.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Run conversions in worker processes that are stopped at a deadline.
+
+Some inputs make a converter run for a very long time, like a pathological LilyPond file in the
+TatSu parser. A thread cannot be stopped, so :func:`run` calls the converter in a new worker
+process, and waits until it returns, or until the deadline passes or the conversion is cancelled.
+Then the worker is stopped (with ``SIGTERM``, then ``SIGKILL`` if it does not stop) and
+:exc:`~lychee.exceptions.DeadlineExceededError` or
+:exc:`~lychee.exceptions.ConversionCancelledError` is raised.
+
+An :class:`~lychee.workflow.session.InteractiveSession` created with a ``deadline`` runs its inbound
+conversions and outbound steps this way, and reports a conversion that was stopped with the
+:const:`~lychee.signals.inbound.CONVERSION_ERROR` or :const:`~lychee.signals.outbound.ERROR` signal.
+
+The worker is always started with the "fork" start method, even where the default is "spawn" (as on
+macOS with Python 3.8 and later), so the function and its arguments are given to the worker as they
+are when the process is forked, and need not be picklable. Where processes cannot be forked (as on
+Windows), :func:`run` raises :exc:`~lychee.exceptions.WorkerError`. The result, or the exception
+raised by the function, is sent back through a pipe, so it must be picklable; an exception that is
+not is replaced by a :exc:`~lychee.exceptions.WorkerError` with the same message.
+
+Only the thread that calls :func:`run` exists in the worker. If another thread held a lock when the
+worker was forked, like the lock of a logging handler, the lock stays held in the worker, and the
+worker blocks if it needs the lock; then it is stopped at the deadline like any other stuck worker.
+This matters for the :mod:`~lychee.tui.daemon`, which calls :func:`run` from a handler thread.
+'''
+
+import multiprocessing
+import os
+import signal
+import timeit
+
+from six.moves import cPickle as pickle
+
+from lychee import exceptions
+from lychee.signals import signal as signal_mod
+
+
+DEFAULT_GRACE = 1.0
+'''Seconds a worker has to exit after ``SIGTERM``, before ``SIGKILL``.'''
+
+# seconds between checks for cancellation
+_POLL_INTERVAL = 0.05
+
+_ERR_DEADLINE = 'The conversion did not finish within {0} seconds'
+_ERR_CANCELLED = 'The conversion was cancelled'
+_ERR_DIED = 'The conversion worker exited with code {0} before it finished'
+_ERR_UNPICKLABLE = '{kind}: {error}'
+_ERR_NO_FORK = 'Supervised conversions need the "fork" start method, which is unavailable here'
+
+# whether this platform can fork worker processes
+_CAN_FORK = hasattr(os, 'fork')
+
+
+def _fork_context():
+    '''
+    Return the :mod:`multiprocessing` context that forks worker processes.
+
+    :raises: :exc:`~lychee.exceptions.WorkerError` if processes cannot be forked.
+    '''
+    if not _CAN_FORK:
+        raise exceptions.WorkerError(_ERR_NO_FORK)
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('fork')
+    # Python 2 always forks on POSIX
+    return multiprocessing
+
+
+def _work(sender, func, args):
+    '''
+    Call the function and send the result. This runs in the worker process.
+    '''
+    # the parent's Fujian connection must not be used by two processes
+    signal_mod.set_fujian(None)
+
+    try:
+        result = ('ok', func(*args))
+    except Exception as exc:  # pylint: disable=broad-except
+        result = ('error', exc)
+        try:
+            pickle.loads(pickle.dumps(exc, 2))
+        except Exception:  # pylint: disable=broad-except
+            result = ('error', exceptions.WorkerError(_ERR_UNPICKLABLE.format(
+                kind=type(exc).__name__, error=str(exc).strip().split('\n')[0])))
+
+    try:
+        sender.send(result)
+    except Exception as exc:  # pylint: disable=broad-except
+        sender.send(('error', exceptions.WorkerError(_ERR_UNPICKLABLE.format(
+            kind=type(exc).__name__, error=exc))))
+    finally:
+        sender.close()
+
+
+def _stop(worker, grace, now):
+    '''
+    Stop a worker process: unless ``now``, wait up to ``grace`` seconds for it to exit; then send
+    ``SIGTERM`` and wait up to ``grace`` seconds; then send ``SIGKILL``.
+    '''
+    if not now:
+        worker.join(grace)
+    if worker.is_alive():
+        worker.terminate()
+        worker.join(grace)
+    if worker.is_alive():
+        os.kill(worker.pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        worker.join()
+
+
+def run(func, args=(), deadline=None, cancel=None, grace=DEFAULT_GRACE):
+    '''
+    Call a function in a new worker process and return its result.
+
+    :param func: The function to call.
+    :param tuple args: The positional arguments for ``func``.
+    :param float deadline: Seconds to wait for the result. ``None`` waits forever.
+    :param cancel: An event that cancels the call when it is set, for example from another thread.
+    :type cancel: :class:`threading.Event`
+    :param float grace: Seconds the worker has to exit when it is stopped, before it is killed.
+    :returns: What ``func`` returned.
+    :raises: :exc:`~lychee.exceptions.DeadlineExceededError` if the deadline passed.
+    :raises: :exc:`~lychee.exceptions.ConversionCancelledError` if ``cancel`` was set.
+    :raises: :exc:`~lychee.exceptions.WorkerError` if the worker exited without a result, or if
+        processes cannot be forked on this platform.
+    :raises: The exception raised by ``func``, if any.
+    '''
+    context = _fork_context()
+    receiver, sender = context.Pipe(duplex=False)
+    worker = context.Process(
+        target=_work, args=(sender, func, args), name='lychee-supervised-worker')
+    worker.daemon = True
+    start = timeit.default_timer()
+    worker.start()
+    sender.close()
+
+    stopping = True
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise exceptions.ConversionCancelledError(_ERR_CANCELLED)
+            wait = None
+            if deadline is not None:
+                wait = deadline - (timeit.default_timer() - start)
+                if wait <= 0:
+                    raise exceptions.DeadlineExceededError(_ERR_DEADLINE.format(deadline))
+            if cancel is not None:
+                wait = _POLL_INTERVAL if wait is None else min(wait, _POLL_INTERVAL)
+            if receiver.poll(wait):
+                break
+
+        try:
+            status, value = receiver.recv()
+        except EOFError:
+            worker.join()
+            raise exceptions.WorkerError(_ERR_DIED.format(worker.exitcode))
+        stopping = False
+    finally:
+        receiver.close()
+        _stop(worker, grace, now=stopping)
+
+    if status == 'error':
+        raise value
+    return value
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_aio.py
+# Purpose:                Tests for the "aio" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "aio" module.
+
+NB: these tests do not use "async" and "await" so the module can be collected with Python 2.
+'''
+
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from lychee import exceptions
+from lychee.workflow import aio
+
+
+pytestmark = pytest.mark.skipif(aio.asyncio is None, reason='requires asyncio')
+
+
+def make_session(dtypes):
+    '''
+    Make a mock InteractiveSession with the "dtypes" registered.
+    '''
+    session = mock.Mock()
+    session.get_repo_dir.return_value = '/repo'
+    session.user_settings_snapshot.return_value = {}
+    session.registrar.get_registered_formats.return_value = dtypes
+    session.run_inbound.return_value = 'Sme-s-m-l-e1234567'
+    return session
+
+
+class TestAsyncSession(object):
+
+    def setup_method(self, method):
+        self.loop = aio.asyncio.new_event_loop()
+
+    def teardown_method(self, method):
+        self.loop.close()
+
+    def test_python_2(self):
+        '''
+        Without asyncio, AsyncSession cannot be made.
+        '''
+        with mock.patch('lychee.workflow.aio.asyncio', None):
+            with pytest.raises(RuntimeError):
+                aio.AsyncSession(make_session([]))
+
+    def test_running_loop(self):
+        '''
+        Without a "loop" argument, an AsyncSession made on the event loop uses that loop.
+        '''
+        made = []
+        self.loop.call_soon(lambda: made.append(aio.AsyncSession(make_session([]))))
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        assert self.loop is made[0].loop
+        assert [] == self.loop.run_until_complete(made[0].run_outbound().collect())
+
+    def test_run_inbound(self):
+        '''
+        The inbound steps run on another thread, and give the section's @xml:id.
+        '''
+        session = make_session([])
+        threads = []
+        session.run_inbound.side_effect = lambda *args: (
+            threads.append(threading.current_thread()) or 'S1')
+        aio_session = aio.AsyncSession(session, loop=self.loop)
+
+        actual = self.loop.run_until_complete(aio_session.run_inbound('lilypond', 'doc', 'S1'))
+
+        assert 'S1' == actual
+        session.run_inbound.assert_called_once_with('lilypond', 'doc', 'S1')
+        assert threading.current_thread() is not threads[0]
+        aio_session.close()
+
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    def test_completion_order(self, mock_do_out):
+        '''
+        Outbound results arrive in the order the conversions finish, not the order registered.
+        '''
+        def do_outbound(repo_dir, views_info, dtype, user_settings):
+            if dtype == 'mei':
+                time.sleep(0.2)
+            return {'dtype': dtype, 'placement': views_info, 'document': dtype.upper()}
+        mock_do_out.side_effect = do_outbound
+        aio_session = aio.AsyncSession(make_session(['mei', 'verovio']), loop=self.loop)
+
+        results = aio_session.run_outbound('S1')
+        first = self.loop.run_until_complete(results.__anext__())
+        rest = self.loop.run_until_complete(results.collect())
+
+        assert 'verovio' == first['dtype']
+        assert ['mei'] == [result['dtype'] for result in rest]
+        mock_do_out.assert_any_call('/repo', 'S1', 'mei', {})
+        with pytest.raises(StopAsyncIteration):  # pylint: disable=undefined-variable
+            self.loop.run_until_complete(results.__anext__())
+        aio_session.close()
+
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    def test_run_workflow(self, mock_do_out):
+        '''
+        The outbound steps use the @xml:id from the inbound steps.
+        '''
+        mock_do_out.return_value = {'dtype': 'mei', 'placement': None, 'document': None}
+        aio_session = aio.AsyncSession(make_session(['mei']), loop=self.loop)
+
+        actual = self.loop.run_until_complete(
+            aio_session.run_workflow('lilypond', 'doc').collect())
+
+        assert [mock_do_out.return_value] == actual
+        mock_do_out.assert_called_once_with('/repo', 'Sme-s-m-l-e1234567', 'mei', {})
+        aio_session.close()
+
+    def test_inbound_fails(self):
+        '''
+        When the inbound steps fail, iterating raises their exception.
+        '''
+        session = make_session(['mei'])
+        session.run_inbound.side_effect = exceptions.InboundConversionError()
+        aio_session = aio.AsyncSession(session, loop=self.loop)
+
+        with pytest.raises(exceptions.InboundConversionError):
+            self.loop.run_until_complete(aio_session.run_workflow('lilypond', 'doc').collect())
+        aio_session.close()
+
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    def test_cancelled_next(self, mock_do_out):
+        '''
+        When the caller stops waiting for a result, the result is given by the next call instead.
+        '''
+        mock_do_out.return_value = {'dtype': 'mei', 'placement': 'S1', 'document': None}
+        aio_session = aio.AsyncSession(make_session(['mei']), loop=self.loop)
+        results = aio_session.run_outbound('S1')
+
+        waiting = results.__anext__()
+        self.loop.call_soon(waiting.cancel)
+        with pytest.raises(aio.asyncio.CancelledError):
+            self.loop.run_until_complete(waiting)
+        assert [mock_do_out.return_value] == self.loop.run_until_complete(results.collect())
+
+        # the result is taken from the queue just as the caller stops waiting
+        results = aio_session.run_outbound('S1')
+        self.loop.run_until_complete(aio.asyncio.sleep(0.1))
+        waiting = results.__anext__()
+        self.loop.call_soon(waiting.cancel)
+        with pytest.raises(aio.asyncio.CancelledError):
+            self.loop.run_until_complete(waiting)
+        self.loop.run_until_complete(aio.asyncio.sleep(0))
+        assert 1 == len(results._returned)
+        assert [mock_do_out.return_value] == self.loop.run_until_complete(results.collect())
+        aio_session.close()
+
+    def test_closed(self):
+        '''
+        After close(), iterating results that were waiting to start raises RuntimeError.
+        '''
+        aio_session = aio.AsyncSession(make_session(['mei']), loop=self.loop)
+        inbound = self.loop.create_future()
+        results = aio.OutboundResults(aio_session, inbound)
+        aio_session.close()
+        inbound.set_result('S1')
+        with pytest.raises(RuntimeError):
+            self.loop.run_until_complete(results.collect())
+        with pytest.raises(RuntimeError):
+            self.loop.run_until_complete(aio_session.run_inbound('lilypond', 'doc'))
+
+    def test_no_formats(self):
+        '''
+        With no registered formats, there are no results.
+        '''
+        aio_session = aio.AsyncSession(make_session([]), loop=self.loop)
+        assert [] == self.loop.run_until_complete(aio_session.run_outbound().collect())
+        aio_session.close()
+
+    def test_deadline(self):
+        '''
+        With a deadline, the conversions are supervised, and a stopped conversion raises.
+        '''
+        session = make_session(['mei'])
+        session.deadline = 30
+        session.run_supervised.side_effect = exceptions.DeadlineExceededError('late')
+        aio_session = aio.AsyncSession(session, loop=self.loop)
+
+        with pytest.raises(exceptions.DeadlineExceededError):
+            self.loop.run_until_complete(aio_session.run_outbound('S1').collect())
+        assert 1 == session.run_supervised.call_count
+        aio_session.close()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_bulk.py
+# Purpose:                Tests for the "bulk" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "bulk" module.
+'''
+
+import shutil
+import tempfile
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lychee import document
+from lychee.workflow import bulk, session
+
+
+_STAFF = r'\new Staff { \clef "treble" c4 d4 e2 }'
+
+
+class TestImportMany(object):
+
+    def setup_method(self, method):
+        self.repo_dir = tempfile.mkdtemp()
+        self.session = session.InteractiveSession()
+        self.session.set_repo_dir(self.repo_dir)
+
+    def teardown_method(self, method):
+        self.session.unset_repo_dir()
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def check_imported(self, results, count):
+        '''
+        Every result succeeded and its <section> is in the score, in order.
+        '''
+        assert [None] * count == [result.error for result in results]
+        assert list(range(count)) == [result.index for result in results]
+        sect_ids = [result.sect_id for result in results]
+        assert sect_ids == self.session.document.get_section_ids()
+        for sect_id in sect_ids:
+            assert len(self.session.document.get_section(sect_id)) > 0
+
+    def test_in_process(self):
+        '''
+        With no workers, the documents are converted in this process, and the placeholder
+        <section> of a new repository is replaced.
+        '''
+        placeholder = self.session.document.get_section_ids()[0]
+        items = [('lilypond', _STAFF, None)] * 3
+
+        with mock.patch.object(document.Document, 'save_everything',
+                               autospec=True, side_effect=document.Document.save_everything) as save:
+            results = self.session.run_bulk_inbound(items, workers=0)
+
+        self.check_imported(results, 3)
+        assert placeholder == results[0].sect_id
+        assert 1 == save.call_count
+
+    def test_pool(self):
+        '''
+        With workers, the documents are converted in other processes.
+        '''
+        items = [('LilyPond', _STAFF, None)] * 3
+        self.check_imported(self.session.run_bulk_inbound(items, workers=2), 3)
+
+    def test_errors(self):
+        '''
+        An item that fails gets an error message, and the others are still imported.
+        '''
+        items = [
+            ('lilypond', _STAFF, None),
+            ('nothing', _STAFF, None),
+            ('lilypond', r'\new Staff { c4 d4 e2', None),
+            ('lilypond', _STAFF, None),
+        ]
+
+        results = self.session.run_bulk_inbound(items, workers=0)
+
+        assert [None, None] == [results[0].error, results[3].error]
+        assert 'nothing' in results[1].error
+        assert results[2].error is not None
+        assert [None, None] == [results[1].sect_id, results[2].sect_id]
+        assert [results[0].sect_id, results[3].sect_id] == (
+            self.session.document.get_section_ids())
+
+    def test_replace_and_settings(self):
+        '''
+        An item with a "sect_id" replaces that <section> in place, and the user settings are saved
+        as if the items were imported in order.
+        '''
+        first = self.session.run_bulk_inbound([('lilypond', _STAFF, None)] * 2, workers=0)
+        items = [
+            ('lilypond', _STAFF, None),
+            ('lilypond', r'\language "deutsch" \new Staff { h4 }', first[0].sect_id),
+        ]
+
+        results = self.session.run_bulk_inbound(items, workers=0)
+
+        assert first[0].sect_id == results[1].sect_id
+        assert [first[0].sect_id, first[1].sect_id, results[0].sect_id] == (
+            self.session.document.get_section_ids())
+        assert {'lilyPondLanguage': 'deutsch'} == self.session.read_user_settings()
+
+    def test_result(self):
+        '''
+        BulkResult is a namedtuple.
+        '''
+        result = bulk.BulkResult(1, 'S1', None)
+        assert (1, 'S1', None) == tuple(result)
+        assert 'S1' == result.sect_id
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_delta.py
+# Purpose:                Tests for the "delta" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "delta" module.
+'''
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lxml import etree
+import pytest
+
+from lychee.converters.outbound import mei as lmei_to_mei
+from lychee.converters.outbound import verovio as lmei_to_verovio
+from lychee import exceptions
+from lychee.namespaces import mei
+from lychee.workflow import delta
+
+
+def make_section(pitches):
+    '''
+    Make a Lychee-MEI <section> with one <staff> and one <layer> holding whole notes.
+    '''
+    section = etree.Element(mei.SECTION)
+    score_def = etree.SubElement(section, mei.SCORE_DEF)
+    staff_grp = etree.SubElement(score_def, mei.STAFF_GRP)
+    etree.SubElement(staff_grp, mei.STAFF_DEF, {'n': '1', 'meter.count': '4', 'meter.unit': '4'})
+    staff = etree.SubElement(section, mei.STAFF, {'n': '1'})
+    layer = etree.SubElement(staff, mei.LAYER, {'n': '1'})
+    for pname in pitches:
+        etree.SubElement(layer, mei.NOTE, {'pname': pname, 'oct': '4', 'dur': '1'})
+    return section
+
+
+class TestMakeDelta(object):
+
+    def test_first_payload(self):
+        '''
+        Without a previous payload, the whole <section> is replaced.
+        '''
+        document = lmei_to_mei.convert(make_section(['c', 'd']))
+        actual, base = delta.make_delta('mei', 'Sme-s-m-l-e1234567', document)
+        assert actual['base'] is None
+        assert 1 == len(actual['edits'])
+        assert {'action': 'replace', 'path': '', 'index': 0} == {
+            k: v for k, v in actual['edits'][0].items() if k != 'fragment'}
+        assert actual['edits'][0]['fragment'] is base.section
+        assert actual['hash'] in base.cache.values()
+
+    def test_changed_measure(self):
+        '''
+        For "mei," only the changed <layer> is in the delta, and the hashes link to the base.
+        '''
+        first = lmei_to_mei.convert(make_section(['c', 'd', 'e']))
+        second = lmei_to_mei.convert(make_section(['c', 'f', 'e']))
+        first_delta, base = delta.make_delta('mei', 'S1', first)
+        actual, _ = delta.make_delta('mei', 'S1', second, base)
+        assert first_delta['hash'] == actual['base']
+        assert 1 == len(actual['edits'])
+        assert 'measure[n=2]/staff[n=1]/layer[n=1]' == actual['edits'][0]['path']
+        assert mei.LAYER == actual['edits'][0]['fragment'].tag
+
+    def test_verovio(self):
+        '''
+        For "verovio," fragments are strings, and tags have no namespace.
+        '''
+        first = lmei_to_verovio.convert(make_section(['c', 'd']))
+        second = lmei_to_verovio.convert(make_section(['c', 'd', 'e']))
+        _, base = delta.make_delta('verovio', 'S1', first)
+        actual, _ = delta.make_delta('verovio', 'S1', second, base)
+        assert [('insert', 'measure[n=3]')] == [
+            (edit['action'], edit['path']) for edit in actual['edits']]
+        fragment = etree.fromstring(actual['edits'][0]['fragment'])
+        assert 'measure' == fragment.tag
+
+    def test_new_placement(self):
+        '''
+        When the placement changes, the whole <section> is replaced.
+        '''
+        document = lmei_to_mei.convert(make_section(['c']))
+        _, base = delta.make_delta('mei', 'S1', document)
+        actual, _ = delta.make_delta('mei', 'S2', document, base)
+        assert actual['base'] is None
+        assert '' == actual['edits'][0]['path']
+
+    def test_unchanged(self):
+        '''
+        The same music gives an empty list of edits.
+        '''
+        _, base = delta.make_delta('mei', 'S1', lmei_to_mei.convert(make_section(['c'])))
+        actual, _ = delta.make_delta('mei', 'S1', lmei_to_mei.convert(make_section(['c'])), base)
+        assert [] == actual['edits']
+        assert actual['base'] == actual['hash']
+
+    def test_reordered_measures(self):
+        '''
+        Swapped measures are not lost: the delta replaces the <section>.
+        '''
+        first = lmei_to_mei.convert(make_section(['c', 'd']))
+        second = lmei_to_mei.convert(make_section(['c', 'd']))
+        section = delta.find_section('mei', second)
+        section.append(section.find(mei.MEASURE))
+        _, base = delta.make_delta('mei', 'S1', first)
+        actual, _ = delta.make_delta('mei', 'S1', second, base)
+        assert actual['base'] != actual['hash']
+        assert [('replace', '')] == [(edit['action'], edit['path']) for edit in actual['edits']]
+
+    def test_changed_without_edits(self):
+        '''
+        If the section changed but the diff has no edits, the delta replaces the <section>.
+        '''
+        _, base = delta.make_delta('mei', 'S1', lmei_to_mei.convert(make_section(['c'])))
+        with mock.patch('lychee.workflow.delta.section_diff', return_value=[]):
+            actual, next_base = delta.make_delta(
+                'mei', 'S1', lmei_to_mei.convert(make_section(['d'])), base)
+        assert 1 == len(actual['edits'])
+        assert {'action': 'replace', 'path': '', 'index': 0} == {
+            k: v for k, v in actual['edits'][0].items() if k != 'fragment'}
+        assert actual['edits'][0]['fragment'] is next_base.section
+
+    def test_no_section(self):
+        '''
+        A document without a <section> cannot have a delta.
+        '''
+        with pytest.raises(exceptions.OutboundConversionError):
+            delta.make_delta('mei', 'S1', etree.Element(mei.MEI))
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_dispatch.py
+# Purpose:                Tests for the "dispatch" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "dispatch" module.
+'''
+
+
+import threading
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+import signalslot
+
+from lychee import exceptions
+from lychee.namespaces import mei
+from lychee import signals
+from lychee.views.inbound import abjad as views_abjad
+from lychee.workflow import dispatch, session, steps
+
+
+def make_slot_mock():
+    slot = mock.MagicMock(spec=signalslot.slot.BaseSlot)
+    slot.is_alive = True
+    return slot
+
+
+class TestDirectDispatcher(object):
+
+    def test_emit_observed(self):
+        '''
+        The module-level signals are emitted when they are observed.
+        '''
+        dispatcher = dispatch.DirectDispatcher()
+        assert signals.outbound.ERROR is dispatcher.signal('outbound.ERROR')
+        slot = make_slot_mock()
+        signals.outbound.ERROR.connect(slot)
+        try:
+            dispatcher.emit('outbound.ERROR', msg='rawr')
+        finally:
+            signals.outbound.ERROR.disconnect(slot)
+        slot.assert_called_once_with(msg='rawr')
+
+    def test_emit_unobserved(self):
+        '''
+        The module-level signals are not emitted when nothing observes them.
+        '''
+        dispatcher = dispatch.DirectDispatcher()
+        with mock.patch.object(signals.inbound.VIEWS_STARTED, 'emit') as mock_emit:
+            dispatcher.emit('inbound.VIEWS_STARTED')
+        assert 0 == mock_emit.call_count
+
+    def test_tables(self):
+        '''
+        Each dispatcher has its own copy of the dispatch tables.
+        '''
+        dispatcher = dispatch.DirectDispatcher()
+        dispatcher.inbound_converters['test'] = mock.Mock()
+        assert 'test' not in dispatch.INBOUND_CONVERTERS
+        assert 'test' not in dispatch.DirectDispatcher().inbound_converters
+
+
+class TestSessionBus(object):
+
+    def test_signals(self):
+        '''
+        The signals on a bus have the same arguments as the module-level signals, but are separate.
+        '''
+        bus = dispatch.SessionBus()
+        other = dispatch.SessionBus()
+        assert signals.outbound.CONVERSION_FINISHED.args == (
+            bus.signal('outbound.CONVERSION_FINISHED').args)
+        assert bus.signal('outbound.ERROR') is not other.signal('outbound.ERROR')
+        with pytest.raises(KeyError):
+            bus.signal('outbound.REGISTER_FORMAT')
+
+    def test_emit(self):
+        '''
+        Emitting on a bus does not emit the module-level signal.
+        '''
+        bus = dispatch.SessionBus()
+        bus_slot = make_slot_mock()
+        global_slot = make_slot_mock()
+        bus.connect('outbound.ERROR', bus_slot)
+        signals.outbound.ERROR.connect(global_slot)
+        try:
+            bus.emit('outbound.ERROR', msg='rawr')
+        finally:
+            signals.outbound.ERROR.disconnect(global_slot)
+        bus_slot.assert_called_once_with(msg='rawr')
+        assert 0 == global_slot.call_count
+
+    def test_invalid_dtype(self):
+        '''
+        Formats without a converter or views processor raise InvalidDataTypeError.
+        '''
+        bus = dispatch.SessionBus()
+        with pytest.raises(exceptions.InvalidDataTypeError):
+            bus.convert_inbound('mei', 'doc')
+        with pytest.raises(exceptions.InvalidDataTypeError):
+            bus.place_view('mei', 'converted', 'doc', 'session', None)
+
+    def test_registry(self):
+        '''
+        Converters are called through the bus's registry.
+        '''
+        bus = dispatch.SessionBus()
+        bus.inbound_converters['test'] = mock.Mock(return_value='converted')
+        assert 'converted' == bus.convert_inbound('test', 'doc', user_settings={'a': 'b'})
+        bus.inbound_converters['test'].assert_called_once_with('doc', user_settings={'a': 'b'})
+
+    def test_abjad_ids(self, tmpdir):
+        '''
+        The Abjad views processor uses the bus's @xml:id mapping, not the module-level mapping.
+        '''
+        bus = dispatch.SessionBus()
+        converted = mock.Mock(tag=mei.SECTION)
+        converted.get.return_value = 'abjad-id'
+        converted.iter.return_value = []
+        fake_session = mock.Mock()
+        fake_session.get_repo_dir.return_value = str(tmpdir)
+
+        with mock.patch.object(views_abjad, '_ids_atom', {}):
+            xmlid = bus.place_view('abjad', converted, 'doc', fake_session, 'Sme-s-m-l-e1234567')
+            assert {} == views_abjad._ids_atom
+
+        assert 'Sme-s-m-l-e1234567' == xmlid
+        assert 'Sme-s-m-l-e1234567' == bus._abjad_ids['abjad-id']
+
+
+class TestSessionDispatch(object):
+
+    DOC = r'\new Staff { \clef "treble" c4 d4 e2 }'
+
+    def test_invalid_mode(self):
+        '''
+        An unknown dispatch mode raises ValueError.
+        '''
+        with pytest.raises(ValueError):
+            session.InteractiveSession(dispatch='fujian')
+
+    def test_direct(self):
+        '''
+        A session with a DirectDispatcher gets results from the steps, not from the module-level
+        signals, and still registers formats from the module-level signal.
+        '''
+        sess = session.InteractiveSession(dispatch=dispatch.DIRECT)
+        assert sess.bus is None
+        assert isinstance(sess.dispatcher, dispatch.DirectDispatcher)
+        assert not signals.inbound.CONVERSION_FINISH.is_connected(sess._inbound_conversion_finish)
+        received = make_slot_mock()
+        signals.outbound.CONVERSION_FINISHED.connect(received)
+        signals.outbound.REGISTER_FORMAT.emit(dtype='mei', who='direct')
+
+        try:
+            sess.set_repo_dir('')
+            sess.run_workflow('lilypond', self.DOC)
+            assert 0 == len(signals.inbound.CONVERSION_START.slots)
+        finally:
+            signals.outbound.CONVERSION_FINISHED.disconnect(received)
+            signals.outbound.UNREGISTER_FORMAT.emit(dtype='mei', who='direct')
+
+        received.assert_called_once_with(
+            dtype='mei',
+            placement=sess.document.get_section_ids()[0],
+            document=mock.ANY,
+            changeset='')
+        sess.unset_repo_dir()
+
+    def test_benchmark(self):
+        '''
+        The benchmark runs every mode, and leaves no format registered.
+        '''
+        actual = dispatch.benchmark(count=2)
+        assert set(dispatch.DISPATCH_MODES) == set(actual)
+        assert 'benchmark' not in steps._INBOUND_VIEWS
+        assert 'benchmark' not in steps.converters.INBOUND_CONVERTERS
+
+    def test_ignores_global_signals(self):
+        '''
+        A session with a bus does not register formats from the module-level signal.
+        '''
+        sess = session.InteractiveSession(dispatch=dispatch.SESSION)
+        assert sess.bus is not None
+        assert session.InteractiveSession().bus is None
+        signals.outbound.REGISTER_FORMAT.emit(dtype='mei', who='someone')
+        try:
+            assert [] == sess.registrar.get_registered_formats()
+        finally:
+            signals.outbound.UNREGISTER_FORMAT.emit(dtype='mei', who='someone')
+
+    def test_inbound_error(self):
+        '''
+        Inbound errors are emitted on the bus, and not on the module-level signal.
+        '''
+        sess = session.InteractiveSession(dispatch=dispatch.SESSION)
+        bus_slot = make_slot_mock()
+        global_slot = make_slot_mock()
+        sess.bus.connect('inbound.CONVERSION_ERROR', bus_slot)
+        signals.inbound.CONVERSION_ERROR.connect(global_slot)
+        try:
+            assert steps.do_inbound_conversion(sess, 'nothing', 'doc') is None
+        finally:
+            signals.inbound.CONVERSION_ERROR.disconnect(global_slot)
+        bus_slot.assert_called_once_with(msg=steps._INVALID_INBOUND_DTYPE.format('nothing'))
+        assert 0 == global_slot.call_count
+
+    def test_parallel_sessions(self):
+        '''
+        Sessions with a bus run in parallel threads, and each receives only its own results.
+        '''
+        sessions = []
+        results = []
+        for _ in range(3):
+            sess = session.InteractiveSession(dispatch=dispatch.SESSION)
+            sess.set_repo_dir('')
+            sess.registrar.register('mei', 'test')
+            received = []
+            sess.bus.connect(
+                'outbound.CONVERSION_FINISHED',
+                lambda received=received, **kwargs: received.append(kwargs))
+            sessions.append(sess)
+            results.append(received)
+        global_slot = make_slot_mock()
+        signals.outbound.CONVERSION_FINISHED.connect(global_slot)
+
+        try:
+            threads = [
+                threading.Thread(target=sess.run_workflow, args=('lilypond', self.DOC))
+                for sess in sessions
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+        finally:
+            signals.outbound.CONVERSION_FINISHED.disconnect(global_slot)
+
+        assert 0 == global_slot.call_count
+        for sess, received in zip(sessions, results):
+            assert 1 == len(received)
+            assert 'mei' == received[0]['dtype']
+            assert sess.document.get_section_ids() == [received[0]['placement']]
+            sess.unset_repo_dir()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_manager.py
+# Purpose:                Tests for the "manager" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "manager" module.
+'''
+
+
+import gc
+import shutil
+import tempfile
+import weakref
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lychee import signals
+from lychee.workflow import dispatch, manager
+
+
+class TestSessionManager(object):
+
+    def setup_method(self, method):
+        self.repo_dirs = [tempfile.mkdtemp() for _ in range(3)]
+
+    def teardown_method(self, method):
+        for repo_dir in self.repo_dirs:
+            shutil.rmtree(repo_dir, ignore_errors=True)
+
+    def test_get(self):
+        '''
+        The same session is returned for the same repository.
+        '''
+        manage = manager.SessionManager()
+        first = manage.get(self.repo_dirs[0])
+        assert first is manage.get(self.repo_dirs[0] + '/')
+        assert first is not manage.get(self.repo_dirs[1])
+        assert 2 == len(manage)
+        assert self.repo_dirs[0] in manage
+        manage.close_all()
+
+    def test_session_kwargs(self):
+        '''
+        Keyword arguments are given to every new session.
+        '''
+        manage = manager.SessionManager(durability='none')
+        session = manage.get(self.repo_dirs[0])
+        assert 'none' == session.document.get_durability()
+        manage.close_all()
+
+    def test_lru_eviction(self):
+        '''
+        The least recently used documents are released to stay within the budget, but never the
+        session just returned.
+        '''
+        manage = manager.SessionManager(memory_budget=1)
+        sessions = []
+        for repo_dir in self.repo_dirs:
+            sessions.append(manage.get(repo_dir))
+            sessions[-1].document  # pylint: disable=pointless-statement
+
+        assert [self.repo_dirs[2]] == manage.resident()
+        assert 2 == manage.evictions
+
+        # released documents are saved, so they open again with the same sections
+        sect_ids = sessions[0].document.get_section_ids()
+        manage.get(self.repo_dirs[0])
+        assert [self.repo_dirs[0]] == manage.resident()
+        assert sect_ids == sessions[0].document.get_section_ids()
+        manage.close_all()
+
+    def test_within_budget(self):
+        '''
+        Nothing is released while the memory used is within the budget.
+        '''
+        manage = manager.SessionManager()
+        for repo_dir in self.repo_dirs:
+            manage.get(repo_dir).document  # pylint: disable=pointless-statement
+        assert 0 == manage.enforce_budget()
+        assert self.repo_dirs == manage.resident()
+        assert 0 < manage.memory_used()
+        manage.close_all()
+
+    def test_close(self):
+        '''
+        Closing a session saves its document and forgets the session.
+        '''
+        manage = manager.SessionManager()
+        session = manage.get(self.repo_dirs[0])
+        with mock.patch.object(session, 'release_document') as mock_release:
+            assert manage.close(self.repo_dirs[0]) is True
+        mock_release.assert_called_once_with()
+        assert 0 == len(manage)
+        assert manage.close(self.repo_dirs[0]) is False
+        assert manage.release(self.repo_dirs[0]) is False
+
+    def test_sessions_isolated(self):
+        '''
+        Managed sessions have their own signals, so they do not receive the events of another
+        session, and one session's registrations do not reach another.
+        '''
+        manage = manager.SessionManager()
+        first = manage.get(self.repo_dirs[0])
+        second = manage.get(self.repo_dirs[1])
+        first.registrar.register('mei', 'first')
+        assert ['mei'] == first.registrar.get_registered_formats()
+        assert [] == second.registrar.get_registered_formats()
+
+        signals.outbound.REGISTER_FORMAT.emit(dtype='verovio', who='outside')
+        try:
+            assert ['mei'] == first.registrar.get_registered_formats()
+            assert [] == second.registrar.get_registered_formats()
+        finally:
+            signals.outbound.UNREGISTER_FORMAT.emit(dtype='verovio', who='outside')
+        manage.close_all()
+
+    def test_closed_session_collected(self):
+        '''
+        A closed session is garbage-collected, even with the module-level signals.
+        '''
+        for mode in (dispatch.SESSION, dispatch.SIGNALS):
+            manage = manager.SessionManager(dispatch=mode)
+            session = weakref.ref(manage.get(self.repo_dirs[0]))
+            session().document  # pylint: disable=pointless-statement
+            manage.close(self.repo_dirs[0])
+            gc.collect()
+            assert session() is None, mode
@@ -499,4 +499,51 @@ class TestRegisterOutbound(object):
         assert mock_signals.ACTION_START.emit.call_count == 0
 
 
+class TestDelta(object):
+    '''
+    Tests for the "delta" argument to Registrar.register().
+    '''
+
+    def test_mixed(self):
+        '''
+        One "who" registers for deltas and another does not.
+        '''
+        reg = registrar.Registrar()
+        reg.register('verovio', 'full')
+        reg.register('verovio', 'delta', delta=True)
+        assert ['delta'] == reg.get_delta_whos('verovio')
+        assert reg.wants_full('verovio')
+
+    def test_only_deltas(self):
+        '''
+        When every "who" registers for deltas, the full document is not wanted. Unregistering
+        removes the "who" from the deltas.
+        '''
+        reg = registrar.Registrar()
+        reg.register('mei', 'delta', delta=True)
+        assert ['delta'] == reg.get_delta_whos('mei')
+        assert not reg.wants_full('mei')
+        reg.unregister('mei', 'delta')
+        assert [] == reg.get_delta_whos('mei')
+        assert not reg.wants_full('mei')
+
+    def test_register_again(self):
+        '''
+        Registering again with the same "who" changes whether it receives deltas.
+        '''
+        reg = registrar.Registrar()
+        reg.register('mei', '111', delta=True)
+        reg.register('mei', '111')
+        assert [] == reg.get_delta_whos('mei')
+        assert reg.wants_full('mei')
+
+    def test_invalid_dtype(self):
+        '''
+        Formats without a <section> cannot be registered for deltas.
+        '''
+        reg = registrar.Registrar()
+        reg.register('lilypond', '111', delta=True)
+        assert [] == reg.get_registered_formats()
+
+
 # Okay, I think that's far enough overboard for this module...
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_scheduler.py
+# Purpose:                Tests for the "scheduler" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "scheduler" module.
+'''
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lychee.workflow import scheduler
+
+
+class TestWorkflowScheduler(object):
+
+    def test_collapse(self):
+        '''
+        Actions for the same section are collapsed into the newest one.
+        '''
+        session = mock.Mock()
+        sched = scheduler.WorkflowScheduler(session, delay=0.05)
+        assert sched.submit('lilypond', 'a', 'S1') is False
+        assert sched.submit('lilypond', 'b', 'S1') is True
+        assert sched.submit('lilypond', 'c', 'S1') is True
+        assert sched.flush(5)
+
+        session.run_workflow.assert_called_once_with('lilypond', 'c', 'S1', obsolete=mock.ANY)
+        assert 2 == sched.collapsed
+        assert 1 == sched.completed
+
+    def test_different_sections(self):
+        '''
+        Actions for different sections, or without a section, are not collapsed.
+        '''
+        session = mock.Mock()
+        sched = scheduler.WorkflowScheduler(session, delay=0.01)
+        sched.submit('lilypond', 'a', 'S1')
+        sched.submit('lilypond', 'b', 'S2')
+        sched.submit('lilypond', 'c')
+        sched.submit('lilypond', 'd')
+        assert sched.flush(5)
+
+        assert 4 == session.run_workflow.call_count
+        assert 0 == sched.collapsed
+
+    def test_obsolete(self):
+        '''
+        When a newer action for the same section arrives while one runs, the running action is told
+        that its outbound conversions are obsolete.
+        '''
+        session = mock.Mock()
+        sched = scheduler.WorkflowScheduler(session, delay=0.01)
+        results = []
+
+        def run_workflow(dtype, doc, sect_id, obsolete):
+            if doc == 'a':
+                results.append(obsolete())
+                sched.submit(dtype, 'b', sect_id)
+            results.append(obsolete())
+        session.run_workflow.side_effect = run_workflow
+
+        sched.submit('lilypond', 'a', 'S1')
+        assert sched.flush(5)
+
+        assert [False, True, False] == results
+        assert 1 == sched.cancelled
+        assert 2 == sched.completed
+
+    def test_error(self):
+        '''
+        An exception from one action is kept, and later actions still run.
+        '''
+        session = mock.Mock()
+        session.run_workflow.side_effect = [RuntimeError('one'), None]
+        sched = scheduler.WorkflowScheduler(session, delay=0.01)
+        sched.submit('lilypond', 'a', 'S1')
+        sched.submit('lilypond', 'b', 'S2')
+        assert sched.flush(5)
+
+        assert 2 == sched.completed
+        assert isinstance(sched.last_error, RuntimeError)
+
+    def test_flush_timeout(self):
+        '''
+        flush() returns False if the actions have not run before the timeout.
+        '''
+        sched = scheduler.WorkflowScheduler(mock.Mock(), delay=0.5)
+        sched.submit('lilypond', 'a', 'S1')
+        assert sched.flush(0.01) is False
+        assert sched.flush(5) is True
@@ -46,6 +46,7 @@ import signalslot
 
 from lychee import document
 from lychee import exceptions
+from lychee.namespaces import mei
 from lychee import signals
 from lychee.workflow import registrar, session, steps
 
@@ -129,6 +130,28 @@ class TestGeneral(TestInteractiveSession):
         actual = session.InteractiveSession(vcs=None)
         assert actual.vcs_enabled is False
 
+    def test_init_with_durability_1(self):
+        '''
+        The "durability" argument is given to the Document.
+        '''
+        actual = session.InteractiveSession(durability=document.DURABILITY_RENAME)
+        assert actual.document.get_durability() == document.DURABILITY_RENAME
+
+    def test_init_with_durability_2(self):
+        '''
+        The __init__() method complains when the "durability" is invalid.
+        '''
+        with pytest.raises(ValueError):
+            session.InteractiveSession(durability='sometimes')
+
+    def test_init_with_search_index(self):
+        '''
+        The "search_index" argument is given to the Document, which makes its index.
+        '''
+        assert session.InteractiveSession().document.get_search_index() is None
+        actual = session.InteractiveSession(search_index=True)
+        assert actual.document.get_search_index() is not None
+
 
 class TestCleanupForNewAction(TestInteractiveSession):
     """
@@ -532,6 +555,38 @@ class TestDocument(TestInteractiveSession):
         assert self.session._doc is not initial_document
 
 
+    def test_release_document_1(self):
+        '''
+        When there is no document, release_document() does nothing.
+        '''
+        assert self.session.release_document() is False
+        assert self.session.estimate_memory() == 0
+
+    def test_release_document_2(self):
+        '''
+        A document with unsaved changes is saved before it is released, then opened again when it
+        is next used.
+        '''
+        self.session.set_repo_dir('')
+        initial_document = self.session.document
+        initial_document.put_section(etree.Element(mei.SECTION))
+        assert self.session.estimate_memory() > 0
+        with mock.patch.object(initial_document, 'save_everything') as mock_save:
+            assert self.session.release_document() is True
+        mock_save.assert_called_once_with()
+        assert self.session.has_document() is False
+        assert self.session.estimate_memory() == 0
+
+    def test_release_document_3(self):
+        '''
+        A released document is opened again with the same sections.
+        '''
+        self.session.set_repo_dir('')
+        sect_ids = self.session.document.get_section_ids()
+        self.session.release_document()
+        assert self.session.document.get_section_ids() == sect_ids
+
+
 class TestInbound(TestInteractiveSession):
     '''
     Tests for the inbound stage.
@@ -737,7 +792,7 @@ class TestRunWorkflow(TestInteractiveSession):
         self.session.run_workflow(dtype=dtype, doc=doc)
 
         self.session.run_inbound.assert_called_once_with(dtype, doc, None)
-        self.session.run_outbound.assert_called_once_with(views_info='IBV')
+        self.session.run_outbound.assert_called_once_with(views_info='IBV', obsolete=None)
         assert self.session._cleanup_for_new_action.called
 
     def test_existing_section_unit(self):
@@ -754,7 +809,7 @@ class TestRunWorkflow(TestInteractiveSession):
 
         self.session.run_workflow(dtype=dtype, doc=doc, sect_id=sect_id)
 
-        self.session.run_outbound.assert_called_once_with(views_info='IBV')
+        self.session.run_outbound.assert_called_once_with(views_info='IBV', obsolete=None)
         self.session.run_inbound.assert_called_once_with(dtype, doc, sect_id)
         assert self.session._cleanup_for_new_action.called
 
@@ -990,6 +1045,106 @@ class TestRunOutbound(TestInteractiveSession):
         mock_do_out.assert_called_with(self.session.get_repo_dir(), views_info, 'mei', mock.ANY)
         assert self.session._cleanup_for_new_action.called
 
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    @mock.patch('lychee.signals.outbound.CONVERSION_FINISHED')
+    def test_obsolete(self, mock_out_finished, mock_do_out):
+        '''
+        When the "obsolete" function returns True, the remaining conversions are skipped.
+        '''
+        mock_do_out.return_value = {'placement': None, 'document': None}
+        self.session._registrar.register('mei')
+        self.session._registrar.register('verovio')
+        obsolete = mock.Mock(side_effect=[False, True])
+
+        self.session.run_outbound(views_info='IBV', obsolete=obsolete)
+
+        assert obsolete.call_count == 2
+        assert mock_do_out.call_count == 1
+        assert mock_out_finished.emit.call_count == 1
+
+    @mock.patch('lychee.workflow.scheduler.WorkflowScheduler.submit')
+    def test_schedule_workflow(self, mock_submit):
+        '''
+        schedule_workflow() submits to the session's scheduler.
+        '''
+        self.session.schedule_workflow('lilypond', 'doc', 'S1')
+        mock_submit.assert_called_once_with('lilypond', 'doc', 'S1')
+        assert self.session.scheduler is self.session.scheduler
+
+    @mock.patch('lychee.workflow.delta.make_delta')
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    @mock.patch('lychee.signals.outbound.DELTA_FINISHED')
+    @mock.patch('lychee.signals.outbound.CONVERSION_FINISHED')
+    def test_delta(self, mock_out_finished, mock_delta_finished, mock_do_out, mock_make_delta):
+        '''
+        One "who" is registered for deltas and one is not. Both signals are emitted, and the delta
+        is made against the previous payload for that "who."
+        '''
+        mock_do_out.return_value = {'placement': 'S1', 'document': '<mei/>'}
+        mock_make_delta.side_effect = [('delta 1', 'base 1'), ('delta 2', 'base 2')]
+        self.session._registrar.register('verovio', 'full')
+        self.session._registrar.register('verovio', 'partial', delta=True)
+
+        self.session.run_outbound(views_info='S1')
+        self.session.run_outbound(views_info='S1')
+
+        assert mock_out_finished.emit.call_count == 2
+        mock_make_delta.assert_any_call('verovio', 'S1', '<mei/>', None)
+        mock_make_delta.assert_called_with('verovio', 'S1', '<mei/>', 'base 1')
+        mock_delta_finished.emit.assert_called_with(
+            dtype='verovio',
+            placement='S1',
+            delta='delta 2',
+            changeset='',
+            who='partial')
+
+    @mock.patch('lychee.workflow.delta.make_delta')
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    @mock.patch('lychee.signals.outbound.DELTA_FINISHED')
+    @mock.patch('lychee.signals.outbound.CONVERSION_FINISHED')
+    def test_delta_fails(self, mock_out_finished, mock_delta_finished, mock_do_out, mock_make_delta):
+        '''
+        When a delta cannot be made, the format gets CONVERSION_FINISHED once instead, the other
+        formats are still converted, and the next delta starts from a whole <section>.
+        '''
+        mock_do_out.return_value = {'placement': 'S1', 'document': '<mei/>'}
+        def make_delta(dtype, placement, document, base):
+            if dtype == 'verovio':
+                raise exceptions.OutboundConversionError('no <section>')
+            return 'delta', 'base'
+        mock_make_delta.side_effect = make_delta
+        self.session._registrar.register('verovio', 'one', delta=True)
+        self.session._registrar.register('verovio', 'two', delta=True)
+        self.session._registrar.register('mei', 'three', delta=True)
+        self.session._registrar.register('mei', 'four', delta=True)
+
+        self.session.run_outbound(views_info='S1')
+
+        assert 2 == mock_do_out.call_count
+        assert 2 == mock_delta_finished.emit.call_count
+        assert 1 == mock_out_finished.emit.call_count
+        assert 2 == len(self.session._delta_bases)
+
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    @mock.patch('lychee.signals.outbound.DELTA_FINISHED')
+    @mock.patch('lychee.signals.outbound.CONVERSION_FINISHED')
+    def test_delta_unregistered(self, mock_out_finished, mock_delta_finished, mock_do_out):
+        '''
+        When only deltas are registered, CONVERSION_FINISHED is not emitted. The previous payload
+        is forgotten after the "who" unregisters.
+        '''
+        mock_do_out.return_value = {'placement': 'S1', 'document': '<mei><section/></mei>'}
+        self.session._registrar.register('verovio', 'partial', delta=True)
+        self.session.run_outbound(views_info='S1')
+        assert mock_out_finished.emit.call_count == 0
+        assert mock_delta_finished.emit.call_count == 1
+        assert ('verovio', 'partial') in self.session._delta_bases
+
+        self.session._registrar.unregister('verovio', 'partial')
+        self.session.run_outbound(views_info='S1')
+        assert mock_delta_finished.emit.call_count == 1
+        assert {} == self.session._delta_bases
+
 
 class TestRunInboundDocVcs(TestInteractiveSession):
     '''
@@ -1169,6 +1324,29 @@ class TestUserSettings(TestInteractiveSession):
         actual_user_settings = self.session.read_user_settings()
         assert actual_user_settings == user_settings
 
+    def test_user_settings_cached(self):
+        '''
+        The settings file is parsed once and written once while the settings do not change.
+        '''
+        self.session.set_repo_dir('')
+        self.session.write_user_settings({'a': 'b'})
+        self.session.write_user_settings({'a': 'b'})
+        assert {'a': 'b'} == self.session.read_user_settings()
+        snapshot = self.session.user_settings_snapshot()
+        assert snapshot is self.session.user_settings_snapshot()
+        with pytest.raises(TypeError):
+            snapshot['a'] = 'c'
+        assert 1 == self.session._settings.writes
+        assert 0 == self.session._settings.reads
+
+    def test_user_settings_without_repo(self):
+        '''
+        Without a repository directory, the settings are empty and are not written.
+        '''
+        self.session.write_user_settings({'a': 'b'})
+        assert {} == self.session.read_user_settings()
+        assert {} == self.session.user_settings_snapshot()
+
     def test_inbound_lilypond_language_creates_user_settings(self):
         '''Integration test of inbound LilyPond language.'''
         input_ly = r"""\language "deutsch" \new Staff { h'4 }"""
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_settings.py
+# Purpose:                Tests for the "settings" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "settings" module.
+'''
+
+
+import copy
+import os
+import os.path
+import pickle
+
+import pytest
+
+from lychee.workflow import settings
+
+
+class TestSettingsSnapshot(object):
+
+    def test_read_only(self):
+        '''
+        A snapshot cannot be modified, but a copy made with dict() can.
+        '''
+        snapshot = settings.SettingsSnapshot({'a': 'b'})
+        with pytest.raises(TypeError):
+            snapshot['a'] = 'c'
+        with pytest.raises(TypeError):
+            snapshot.update(a='c')
+        with pytest.raises(TypeError):
+            del snapshot['a']
+        copied = dict(snapshot)
+        copied['a'] = 'c'
+        assert {'a': 'b'} == snapshot
+
+    def test_pickle(self):
+        '''
+        A snapshot can be sent to another process, and copying it gives the same snapshot.
+        '''
+        snapshot = settings.SettingsSnapshot({'a': 'b'})
+        actual = pickle.loads(pickle.dumps(snapshot, 2))
+        assert isinstance(actual, settings.SettingsSnapshot)
+        assert snapshot == actual
+        assert snapshot is copy.deepcopy(snapshot)
+
+
+class TestSettingsCache(object):
+
+    def test_missing_file(self, tmpdir):
+        '''
+        Without a file, the settings are empty.
+        '''
+        cache = settings.SettingsCache(str(tmpdir.join('user', 'settings.xml')))
+        assert {} == cache.read()
+        assert 0 == cache.reads
+
+    def test_cached(self, tmpdir):
+        '''
+        Written settings are read without parsing the file, and identical settings are not written
+        again.
+        '''
+        cache = settings.SettingsCache(str(tmpdir.join('user', 'settings.xml')))
+        assert cache.write({'lilyPondLanguage': 'deutsch'}) is True
+        assert {'lilyPondLanguage': 'deutsch'} == cache.read()
+        assert cache.write({'lilyPondLanguage': 'deutsch'}) is False
+        assert 0 == cache.reads
+        assert 1 == cache.writes
+
+        # a new cache parses the file
+        other = settings.SettingsCache(cache._pathname)
+        assert {'lilyPondLanguage': 'deutsch'} == other.read()
+        assert {'lilyPondLanguage': 'deutsch'} == other.read()
+        assert 1 == other.reads
+
+    def test_external_change(self, tmpdir):
+        '''
+        When the file changes outside the cache, it is parsed again.
+        '''
+        pathname = str(tmpdir.join('settings.xml'))
+        cache = settings.SettingsCache(pathname)
+        cache.write({'a': 'b'})
+        with open(pathname, 'w') as settings_file:
+            settings_file.write('<lycheeSettings><a>longer</a></lycheeSettings>')
+        assert {'a': 'longer'} == cache.read()
+        assert 1 == cache.reads
+
+    def test_same_stamp_change(self, tmpdir):
+        '''
+        When the file is rewritten with the same size and modification time soon after it was
+        read, it is parsed again.
+        '''
+        pathname = str(tmpdir.join('settings.xml'))
+        cache = settings.SettingsCache(pathname)
+        cache.write({'a': 'b'})
+        stat = os.stat(pathname)
+        with open(pathname, 'rb') as settings_file:
+            contents = settings_file.read()
+        with open(pathname, 'wb') as settings_file:
+            settings_file.write(contents.replace(b'>b<', b'>c<'))
+        os.utime(pathname, (stat.st_atime, stat.st_mtime))
+        assert stat.st_size == os.stat(pathname).st_size
+        assert {'a': 'c'} == cache.read()
+        assert 1 == cache.reads
+
+    def test_invalid_file(self, tmpdir):
+        '''
+        A file that cannot be parsed gives empty settings.
+        '''
+        pathname = str(tmpdir.join('settings.xml'))
+        with open(pathname, 'w') as settings_file:
+            settings_file.write('<lycheeSettings>')
+        assert {} == settings.SettingsCache(pathname).read()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#--------------------------------------------------------------------------------------------------
+# Program Name:           Lychee
+# Program Description:    MEI document manager for formalized document control
+#
+# Filename:               lychee/workflow/tests/test_supervise.py
+# Purpose:                Tests for the "supervise" module.
+#
+# Copyright (C) 2018 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#--------------------------------------------------------------------------------------------------
+'''
+Tests for the "supervise" module.
+'''
+
+import os
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from lychee import exceptions
+from lychee.workflow import dispatch, session, steps, supervise
+
+
+_DOC = r'\new Staff { \clef "treble" c4 d4 e2 }'
+
+
+def _sleep(document, **kwargs):
+    time.sleep(30)
+
+
+class _Unpicklable(Exception):
+    def __init__(self, message, handle):
+        super(_Unpicklable, self).__init__(message)
+        self.handle = handle
+
+
+def _raise_unpicklable():
+    raise _Unpicklable('with a lock', threading.Lock())
+
+
+class TestRun(object):
+    '''
+    Tests for run().
+    '''
+
+    def test_result(self):
+        '''
+        The result comes back from the worker, which has a different process ID.
+        '''
+        assert 1024 == supervise.run(pow, (2, 10), deadline=30)
+        assert os.getpid() != supervise.run(os.getpid)
+
+    def test_exception(self):
+        '''
+        An exception raised in the worker is raised again.
+        '''
+        with pytest.raises(ValueError):
+            supervise.run(int, ('x',))
+
+    def test_forks(self):
+        '''
+        The worker is forked even when the default start method is "spawn," so an unpicklable
+        function can be called.
+        '''
+        lock = threading.Lock()
+        if hasattr(supervise.multiprocessing, 'set_start_method'):
+            with mock.patch.object(supervise.multiprocessing, 'Process') as mock_process:
+                assert 'ok' == supervise.run(lambda: 'ok' if lock else None)
+            assert not mock_process.called
+        else:
+            assert 'ok' == supervise.run(lambda: 'ok' if lock else None)
+
+    def test_cannot_fork(self):
+        '''
+        Where processes cannot be forked, WorkerError is raised before anything is started.
+        '''
+        with mock.patch.object(supervise, '_CAN_FORK', False):
+            with pytest.raises(exceptions.WorkerError) as exc:
+                supervise.run(pow, (2, 10))
+        assert supervise._ERR_NO_FORK == exc.value.args[0]
+
+    def test_unpicklable_exception(self):
+        '''
+        An exception that cannot be pickled becomes WorkerError with the same message.
+        '''
+        with pytest.raises(exceptions.WorkerError) as exc:
+            supervise.run(_raise_unpicklable)
+        assert '_Unpicklable: with a lock' == exc.value.args[0]
+
+    def test_deadline(self):
+        '''
+        A worker that runs past the deadline is stopped.
+        '''
+        start = time.time()
+        with pytest.raises(exceptions.DeadlineExceededError):
+            supervise.run(time.sleep, (30,), deadline=0.2, grace=0.2)
+        assert time.time() - start < 10
+
+    def test_cancel(self):
+        '''
+        Setting the "cancel" event from another thread stops the worker.
+        '''
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+        start = time.time()
+        with pytest.raises(exceptions.ConversionCancelledError):
+            supervise.run(time.sleep, (30,), cancel=cancel, grace=0.2)
+        assert time.time() - start < 10
+
+    def test_worker_dies(self):
+        '''
+        A worker that exits without a result raises WorkerError.
+        '''
+        with pytest.raises(exceptions.WorkerError) as exc:
+            supervise.run(os._exit, (3,))
+        assert 'code 3' in exc.value.args[0]
+
+
+class TestSupervisedSession(object):
+    '''
+    Tests for an InteractiveSession with a deadline.
+    '''
+
+    def setup_method(self, method):
+        self.sess = session.InteractiveSession(dispatch=dispatch.SESSION, deadline=30)
+        self.sess.set_repo_dir('')
+        self.errors = []
+        self.finished = []
+        for name in ('inbound.CONVERSION_ERROR', 'outbound.ERROR'):
+            self.sess.bus.connect(name, lambda **kwargs: self.errors.append(kwargs['msg']))
+        self.sess.bus.connect(
+            'outbound.CONVERSION_FINISHED', lambda **kwargs: self.finished.append(kwargs))
+
+    def teardown_method(self, method):
+        self.sess.unset_repo_dir()
+
+    def test_invalid_deadline(self):
+        '''
+        The deadline must be a positive number or None.
+        '''
+        assert session.InteractiveSession().deadline is None
+        for deadline in (0, -1, 'soon', True):
+            with pytest.raises(ValueError):
+                session.InteractiveSession(deadline=deadline)
+
+    def test_workflow(self):
+        '''
+        A supervised workflow gives the same results as one in this process.
+        '''
+        self.sess.registrar.register('mei', 'test')
+        self.sess.run_workflow('lilypond', _DOC)
+        assert [] == self.errors
+        assert 1 == len(self.finished)
+        assert self.sess.document.get_section_ids() == [self.finished[0]['placement']]
+
+    def test_inbound_deadline(self):
+        '''
+        An inbound conversion that runs past the deadline emits CONVERSION_ERROR, and the action
+        fails.
+        '''
+        self.sess._deadline = 0.2
+        self.sess.dispatcher.inbound_converters['lilypond'] = _sleep
+        start = time.time()
+        with pytest.raises(exceptions.InboundConversionError):
+            self.sess.run_inbound('lilypond', _DOC)
+        assert time.time() - start < 10
+        assert ['The conversion did not finish within 0.2 seconds'] == self.errors
+
+    def test_inbound_error(self):
+        '''
+        An unknown format emits CONVERSION_ERROR from the worker, as without a deadline.
+        '''
+        assert steps.do_inbound_conversion(self.sess, 'nothing', 'doc') is None
+        assert [steps._INVALID_INBOUND_DTYPE.format('nothing')] == self.errors
+
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    def test_outbound_deadline(self, mock_do_out):
+        '''
+        An outbound format that runs past the deadline emits outbound.ERROR, and the other formats
+        are still converted.
+        '''
+        def do_outbound(repo_dir, views_info, dtype, user_settings):
+            if dtype == 'mei':
+                time.sleep(30)
+            return {'placement': views_info, 'document': dtype}
+        mock_do_out.side_effect = do_outbound
+        self.sess._deadline = 0.2
+        self.sess.registrar.register('mei', 'test')
+        self.sess.registrar.register('verovio', 'test')
+
+        self.sess.run_outbound('S1')
+
+        assert ['The conversion did not finish within 0.2 seconds'] == self.errors
+        assert ['verovio'] == [post['dtype'] for post in self.finished]
+
+    @mock.patch('lychee.workflow.steps.do_outbound_steps')
+    def test_cancel(self, mock_do_out):
+        '''
+        Cancelling stops the running conversion and skips the others, but not the next action.
+        '''
+        mock_do_out.side_effect = lambda *args: time.sleep(30)
+        self.sess.registrar.register('mei', 'test')
+        self.sess.registrar.register('verovio', 'test')
+        threading.Timer(0.2, self.sess.cancel).start()
+
+        start = time.time()
+        self.sess.run_outbound('S1')
+
+        assert time.time() - start < 10
+        assert ['The conversion was cancelled'] == self.errors
+        assert not self.sess._cancel.is_set()
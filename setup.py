@@ -26,6 +26,10 @@ setup(
             'sphinx',
             'versioneer',
         ),
+        # columnar event tables with NumPy; refer to lychee.utils.events
+        'fast': (
+            'numpy',
+        ),
     },
 
     # metadata for upload to PyPI